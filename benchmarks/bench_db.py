@@ -0,0 +1,73 @@
+# benchmarks/bench_db.py
+"""
+AsyncPostgresDB.insert_chat / get_history on the in-memory fallback and, when
+BENCH_POSTGRES_DSN is set (plain asyncpg DSN), on a real Postgres.
+"""
+import itertools
+import os
+import uuid
+
+from harness import QUICK, ameasure, emit, run, skip, summarize, use_service
+
+use_service("chat-orchestrator")
+
+try:
+    import db_postgres
+except ImportError as e:
+    skip(f"chat-orchestrator dependencies missing: {e}")
+
+HISTORY_SIZES = (100, 1_000) if QUICK else (100, 1_000, 10_000)
+SESSIONS = 10
+REPEAT = 50 if QUICK else 200
+
+
+async def bench_backend(db, backend: str):
+    prefix = f"bench-{uuid.uuid4().hex[:8]}"
+    try:
+        for size in HISTORY_SIZES:
+            sessions = [f"{prefix}-{size}-{i}" for i in range(SESSIONS)]
+            # fill every session to `size` rows (the in-memory store scans all rows on read)
+            for sid in sessions:
+                for n in range(size):
+                    await db.insert_chat(sid, f"message {n}", "User" if n % 2 else "Bot")
+
+            sid_cycle = itertools.cycle(sessions)
+            samples = await ameasure(lambda: db.insert_chat(next(sid_cycle), "benchmark message", "User"),
+                                     repeat=REPEAT)
+            emit(summarize("db.insert_chat", samples, backend=backend, rows_per_session=size, sessions=SESSIONS))
+
+            samples = await ameasure(lambda: db.get_history(next(sid_cycle), limit=100), repeat=REPEAT)
+            emit(summarize("db.get_history", samples, backend=backend, rows_per_session=size,
+                           sessions=SESSIONS, limit=100))
+    finally:
+        if db.pool:
+            async with db.pool.acquire() as conn:
+                await conn.execute("DELETE FROM chat_logs WHERE session_id LIKE $1", f"{prefix}-%")
+
+
+async def main():
+    memory = db_postgres.AsyncPostgresDB(dsn="")  # no init_db(): stays on the in-memory fallback
+    await bench_backend(memory, "memory")
+
+    dsn = os.environ.get("BENCH_POSTGRES_DSN")
+    if not dsn:
+        skip("postgres backend: set BENCH_POSTGRES_DSN to include it", exit=False)
+        return
+    if db_postgres.asyncpg is None:
+        skip("postgres backend: asyncpg not installed", exit=False)
+        return
+    db = db_postgres.AsyncPostgresDB(dsn=dsn)
+    await db.init_db()
+    async with db.pool.acquire() as conn:
+        await conn.execute(
+            "CREATE TABLE IF NOT EXISTS chat_logs ("
+            "id SERIAL PRIMARY KEY, session_id TEXT NOT NULL, role TEXT, message TEXT)"
+        )
+    try:
+        await bench_backend(db, "postgres")
+    finally:
+        await db.close()
+
+
+if __name__ == "__main__":
+    run(main)
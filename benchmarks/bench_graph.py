@@ -0,0 +1,99 @@
+# benchmarks/bench_graph.py
+"""
+Graph compile and ainvoke overhead with stub LLM/RAG/DB (root app), or with a
+mocked HTTP transport (langgraph-service). Usage: bench_graph.py root|service
+"""
+import itertools
+import sys
+
+from harness import QUICK, ameasure, emit, measure, run, skip, summarize, use_service
+
+TARGET = sys.argv[1] if len(sys.argv) > 1 else "root"
+REPEAT = 30 if QUICK else 200
+MESSAGES = {"smalltalk": "thanks!", "knowledge": "what does the refund policy say about invoices?"}
+
+use_service(None if TARGET == "root" else "langgraph-service")
+
+
+class _Doc:
+    def __init__(self, text):
+        self.page_content = text
+
+
+class StubRAG:
+    """similarity_search_with_score with fixed hits, so only graph overhead is measured."""
+
+    def __init__(self, n_docs: int = 10):
+        self.hits = [(_Doc(f"Refund policy paragraph {i}. " * 10), 0.8) for i in range(n_docs)]
+
+    @staticmethod
+    def partitions_for_session(session_id=None, tenant_id=None):
+        return ["global"]
+
+    async def similarity_search_with_score(self, query, k=4, mode=None, partitions=None, with_similarity=False):
+        hits = self.hits[:k]
+        return [(doc, score, score) for doc, score in hits] if with_similarity else hits
+
+
+async def bench_root():
+    try:
+        from langgraph_nodes import LangGraphNodes
+        from utils import RWLock
+    except ImportError as e:
+        skip(f"root graph dependencies missing: {e}")
+    from stubs import MemoryDB, StubLLM
+
+    emit(summarize("graph.compile", measure(LangGraphNodes.build_graph, repeat=REPEAT), target="root"))
+    compiled = LangGraphNodes.build_graph()
+    db, llm, rag, lock = MemoryDB(), StubLLM(), StubRAG(), RWLock()
+    sessions = itertools.cycle(f"bench-{i}" for i in range(50))
+
+    def state(message):
+        return {"session_id": next(sessions), "user_message": message, "db": db, "llm": llm,
+                "rag": rag, "rag_lock": lock, "ws": None}
+
+    for kind, message in MESSAGES.items():
+        samples = await ameasure(lambda: compiled.ainvoke(state(message)), repeat=REPEAT)
+        emit(summarize("graph.ainvoke", samples, target="root", path=kind))
+        samples = await ameasure(lambda: LangGraphNodes.run_graph(state(message)), repeat=REPEAT)
+        emit(summarize("graph.compile_and_ainvoke", samples, target="root", path=kind))
+
+
+async def bench_service():
+    try:
+        import httpx
+        from nodes.langgraph_nodes import LangGraphNodes
+    except ImportError as e:
+        skip(f"langgraph-service dependencies missing: {e}")
+
+    def handler(request):
+        if request.url.path == "/search":
+            return httpx.Response(200, json={"results": [
+                {"id": f"doc~{i}", "score": 0.8, "text": "Refund policy paragraph. " * 10} for i in range(5)]})
+        if request.url.path == "/llm_rag":
+            return httpx.Response(200, json={"llm_output": "stub answer"})
+        return httpx.Response(200, json={"output": "stub answer"})
+
+    from http_clients import clients
+    # keep the pooled clients' event hooks (metrics, tracing) so their overhead is measured too
+    hooks = clients.get("rag").event_hooks
+    mock = httpx.AsyncClient(base_url="http://upstream", transport=httpx.MockTransport(handler), event_hooks=hooks)
+    nodes = LangGraphNodes(rag_client=mock, embedding_client=mock)
+    sessions = itertools.cycle(f"bench-{i}" for i in range(50))
+
+    def state(message):
+        return {"session_id": next(sessions), "type": "user_message", "user_message": message, "events": []}
+
+    emit(summarize("graph.compile", measure(nodes.build_graph, repeat=REPEAT), target="service"))
+    compiled = nodes.build_graph()
+    for kind, message in MESSAGES.items():
+        samples = await ameasure(lambda: compiled.ainvoke(state(message)), repeat=REPEAT)
+        emit(summarize("graph.ainvoke", samples, target="service", path=kind))
+        samples = await ameasure(lambda: nodes.run_graph(state(message)), repeat=REPEAT)
+        emit(summarize("graph.compile_and_ainvoke", samples, target="service", path=kind))
+    await mock.aclose()
+    await clients.aclose()
+
+
+if __name__ == "__main__":
+    run(bench_root if TARGET == "root" else bench_service)
@@ -0,0 +1,80 @@
+# benchmarks/bench_rag_search.py
+"""
+RAGEngine.similarity_search_with_score at several corpus sizes, per search
+mode, plus bursts of concurrent vector searches with and without the
+query batcher.
+"""
+import asyncio
+import itertools
+import os
+import tempfile
+
+from harness import QUICK, ameasure, emit, run, skip, summarize, use_service
+from stubs import StubEmbeddings, StubLLM, make_corpus, make_queries
+
+# FAISS_TEMP_DIR is derived from the working directory at import time
+os.chdir(tempfile.mkdtemp(prefix="bench-rag-"))
+use_service(None)
+
+try:
+    import rag_engine
+    from langchain_core.documents import Document
+    from langchain_community.vectorstores import FAISS
+except ImportError as e:
+    skip(f"root RAG dependencies missing: {e}")
+
+SIZES = (1_000, 5_000) if QUICK else (1_000, 10_000, 50_000)
+REPEAT = 30 if QUICK else 100
+K = 10  # what retrieve_node asks for
+CONCURRENCY = 64
+
+
+def build_store(n_docs: int, embeddings, seed: int = 0):
+    docs = [Document(page_content=text, metadata={"source": doc_id}) for doc_id, text in make_corpus(n_docs, seed=seed)]
+    store = FAISS.from_documents(docs, embeddings)
+    return store, rag_engine.RAGEngine._lexical_for(store)
+
+
+async def main():
+    embeddings = StubEmbeddings()
+    engine = rag_engine.RAGEngine(api_key="sk-offline-benchmark")
+    engine.embeddings = embeddings
+    engine.llm = StubLLM()
+    queries = make_queries(200)
+    session_store = build_store(500, embeddings, seed=10_000)
+
+    for size in SIZES:
+        engine.vectorstore, engine.lexical = build_store(size, embeddings)
+        engine.partitions = {"session-bench": session_store}
+        ids = itertools.cycle(f"DOC-{i:06d}" for i in range(0, size, max(1, size // 100)))
+
+        for mode in ("vector", "hybrid", "auto"):
+            q = itertools.cycle(queries)
+            samples = await ameasure(lambda: engine.similarity_search_with_score(next(q), k=K, mode=mode),
+                                     repeat=REPEAT)
+            emit(summarize("rag.similarity_search", samples, corpus=size, mode=mode, k=K))
+
+        # exact identifier: auto mode answers from BM25 without embedding the query
+        samples = await ameasure(lambda: engine.similarity_search_with_score(next(ids), k=K, mode="auto"),
+                                 repeat=REPEAT)
+        emit(summarize("rag.similarity_search", samples, corpus=size, mode="auto-identifier", k=K))
+
+        q = itertools.cycle(queries)
+        partitions = engine.partitions_for_session("bench")
+        samples = await ameasure(lambda: engine.similarity_search_with_score(
+            next(q), k=K, mode="hybrid", partitions=partitions), repeat=REPEAT)
+        emit(summarize("rag.similarity_search", samples, corpus=size, mode="hybrid-partitioned", k=K))
+
+        # CONCURRENCY searches in flight at once: one matrix search per batch vs one thread hop per query
+        for max_batch in (1, CONCURRENCY):
+            engine.query_batcher.max_batch = max_batch
+            q = itertools.cycle(queries)
+            samples = await ameasure(lambda: asyncio.gather(*(
+                engine.similarity_search_with_score(next(q), k=K, mode="vector") for _ in range(CONCURRENCY))),
+                repeat=max(5, REPEAT // 10))
+            emit(summarize("rag.similarity_search_concurrent", samples, ops_per_sample=CONCURRENCY,
+                           corpus=size, concurrency=CONCURRENCY, max_batch=max_batch))
+
+
+if __name__ == "__main__":
+    run(main)
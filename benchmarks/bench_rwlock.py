@@ -0,0 +1,75 @@
+# benchmarks/bench_rwlock.py
+"""Read/write contention for both RWLock implementations (root utils.py, chat-orchestrator/rw_lock.py)."""
+import asyncio
+import importlib.util
+import os
+import random
+import sys
+import time
+
+from harness import QUICK, REPO_ROOT, emit, run, skip, summarize
+
+CONCURRENCY = (10, 100)
+WRITE_RATIOS = (0.0, 0.1, 0.5)
+OPS = 2_000 if QUICK else 20_000
+
+
+def load_lock(label: str, path: str, service_dir: str = None):
+    if service_dir:
+        sys.path.insert(0, service_dir)
+    spec = importlib.util.spec_from_file_location(f"bench_lock_{label}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.RWLock
+
+
+async def contend(lock_cls, concurrency: int, write_ratio: float, ops: int):
+    """`concurrency` tasks share `ops` acquisitions; each holds the lock across one event-loop yield."""
+    lock = lock_cls()
+    rng = random.Random(0)
+    plan = [rng.random() < write_ratio for _ in range(ops)]
+    waits = {"read": [], "write": []}
+
+    async def worker(mine):
+        for is_write in mine:
+            started = time.perf_counter()
+            if is_write:
+                await lock.acquire_write()
+                waits["write"].append(time.perf_counter() - started)
+                await asyncio.sleep(0)
+                lock.release_write()
+            else:
+                await lock.acquire_read()
+                waits["read"].append(time.perf_counter() - started)
+                await asyncio.sleep(0)
+                await lock.release_read()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(plan[i::concurrency]) for i in range(concurrency)))
+    return time.perf_counter() - started, waits
+
+
+async def main():
+    impls = {"root.utils": load_lock("root", os.path.join(REPO_ROOT, "utils.py"))}
+    try:
+        orchestrator = os.path.join(REPO_ROOT, "chat-orchestrator")
+        impls["chat-orchestrator.rw_lock"] = load_lock("orchestrator", os.path.join(orchestrator, "rw_lock.py"),
+                                                       orchestrator)
+    except ImportError as e:
+        skip(f"chat-orchestrator rw_lock not importable: {e}", exit=False)
+
+    for impl, lock_cls in impls.items():
+        for concurrency in CONCURRENCY:
+            for write_ratio in WRITE_RATIOS:
+                elapsed, waits = await contend(lock_cls, concurrency, write_ratio, OPS)
+                for mode, samples in waits.items():
+                    if not samples:
+                        continue
+                    result = summarize("rwlock.acquire_wait", samples, impl=impl, mode=mode,
+                                       concurrency=concurrency, write_ratio=write_ratio)
+                    result["ops_per_s"] = round(OPS / elapsed, 2)
+                    emit(result)
+
+
+if __name__ == "__main__":
+    run(main)
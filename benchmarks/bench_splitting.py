@@ -0,0 +1,65 @@
+# benchmarks/bench_splitting.py
+"""
+Document splitting throughput: rag-indexer's streaming token splitter, or the
+root app's RecursiveCharacterTextSplitter. Usage: bench_splitting.py indexer|root
+"""
+import sys
+
+from harness import QUICK, ameasure, emit, measure, run, skip, summarize, use_service
+from stubs import make_text
+
+TARGET = sys.argv[1] if len(sys.argv) > 1 else "indexer"
+WORDS = (10_000, 100_000) if QUICK else (10_000, 100_000, 500_000)
+PAGE_WORDS = 500
+REPEAT = 5 if QUICK else 20
+
+use_service("rag-indexer" if TARGET == "indexer" else None)
+
+
+def pages_of(n_words: int):
+    return [make_text(PAGE_WORDS, seed=i) for i in range(max(1, n_words // PAGE_WORDS))]
+
+
+def with_throughput(result, pages):
+    mb = sum(len(p.encode("utf-8")) for p in pages) / 1e6
+    result["mb_per_s"] = round(mb / (result["mean_ms"] / 1000), 3) if result["mean_ms"] else None
+    return result
+
+
+async def bench_indexer():
+    try:
+        from pipeline.splitter import TextSplitter, TIKTOKEN_AVAILABLE
+    except ImportError as e:
+        skip(f"rag-indexer splitter not importable: {e}")
+    splitter = TextSplitter()
+
+    async def split(pages):
+        async def stream():
+            for p in pages:
+                yield p
+        return [c async for c in splitter.split_stream(stream(), source_id="bench")]
+
+    for n_words in WORDS:
+        pages = pages_of(n_words)
+        samples = await ameasure(lambda: split(pages), repeat=REPEAT, warmup=1)
+        emit(with_throughput(summarize("split.token_stream", samples, words=n_words,
+                                       tokenizer="tiktoken" if TIKTOKEN_AVAILABLE else "approx"), pages))
+
+
+async def bench_root():
+    try:
+        from langchain_core.documents import Document
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+    except ImportError as e:
+        skip(f"langchain text splitters missing: {e}")
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)  # as in RAGEngine
+
+    for n_words in WORDS:
+        pages = pages_of(n_words)
+        docs = [Document(page_content=p, metadata={"page": i}) for i, p in enumerate(pages)]
+        samples = measure(lambda: splitter.split_documents(docs), repeat=REPEAT, warmup=1)
+        emit(with_throughput(summarize("split.recursive_character", samples, words=n_words), pages))
+
+
+if __name__ == "__main__":
+    run(bench_indexer if TARGET == "indexer" else bench_root)
@@ -0,0 +1,74 @@
+# benchmarks/bench_upsert.py
+"""
+The /upsert path in rag-indexer (load -> split -> manifest filter -> embed ->
+upsert -> BM25) against the local backend with the hash embedder, for a
+fresh file, an unchanged re-upload and a re-upload with one edited paragraph.
+"""
+import os
+import tempfile
+import time
+
+from harness import QUICK, emit, run, skip, summarize, use_service
+from stubs import MemoryManifest, make_text
+
+WORKDIR = tempfile.mkdtemp(prefix="bench-upsert-")
+os.environ.update({
+    "VECTOR_BACKEND": "local",
+    "EMBEDDER": "hash",
+    "EMBED_DIM": "256",
+    "LOCAL_INDEX_DIR": os.path.join(WORKDIR, "local_index"),
+    "LEXICAL_INDEX_PATH": os.path.join(WORKDIR, "lexical", "bm25.json"),
+})
+use_service("rag-indexer")
+
+try:
+    from pipeline.ingest import IngestPipeline
+    from pipeline.embedder import HashEmbedder
+    from pipeline.local_index import LocalIndexer
+except ImportError as e:
+    skip(f"rag-indexer dependencies missing: {e}")
+
+WORDS = (20_000, 100_000) if QUICK else (20_000, 100_000, 400_000)
+REPEAT = 3 if QUICK else 10
+
+
+async def timed_run(pipeline, path, **kwargs):
+    started = time.perf_counter()
+    result = await pipeline.run(path, **kwargs)
+    return time.perf_counter() - started, result
+
+
+async def main():
+    for n_words in WORDS:
+        path = os.path.join(WORKDIR, f"doc-{n_words}.txt")
+        text = make_text(n_words)
+        fresh, unchanged, edited = [], [], []
+        chunks = 0
+        for i in range(REPEAT):
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+            indexer = LocalIndexer(embedder=HashEmbedder(256), index_dir=os.path.join(WORKDIR, f"idx-{n_words}-{i}"))
+            pipeline = IngestPipeline(indexer, MemoryManifest())
+
+            elapsed, result = await timed_run(pipeline, path, source_id=f"doc-{n_words}")
+            fresh.append(elapsed)
+            chunks = result["chunks_total"]
+
+            elapsed, _ = await timed_run(pipeline, path, source_id=f"doc-{n_words}")
+            unchanged.append(elapsed)
+
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text + "\n" + make_text(200, seed=1000 + i))
+            elapsed, _ = await timed_run(pipeline, path, source_id=f"doc-{n_words}")
+            edited.append(elapsed)
+
+        for case, samples in (("fresh", fresh), ("unchanged", unchanged), ("edited_tail", edited)):
+            result = summarize("upsert.ingest_file", samples, words=n_words, case=case)
+            result["chunks"] = chunks
+            if case == "fresh":
+                result["chunks_per_s"] = round(chunks / (result["mean_ms"] / 1000), 1)
+            emit(result)
+
+
+if __name__ == "__main__":
+    run(main)
@@ -0,0 +1,80 @@
+# benchmarks/bench_wire.py
+"""
+Encode+decode cost and payload size of the inter-service responses: /embed
+vectors, /search matches (full vs projected) and /run_graph (full state vs
+events + llm_output), as JSON, msgpack and raw float32.
+"""
+import json
+import random
+
+from harness import QUICK, emit, measure, run, skip, summarize, use_service
+from stubs import make_text
+
+use_service("rag-indexer")
+
+try:
+    import wire
+except ImportError as e:
+    skip(f"wire module not importable: {e}")
+
+REPEAT = 50 if QUICK else 500
+DIM = 1536  # text-embedding-3-small / ada-002
+
+
+class _Resp:
+    """Just enough of an httpx.Response for wire.decode."""
+
+    def __init__(self, r):
+        self.content = bytes(r.body)
+        self.headers = {k.decode(): v.decode() for k, v in r.raw_headers}
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def payloads():
+    rng = random.Random(0)
+    vector = [rng.uniform(-0.1, 0.1) for _ in range(DIM)]
+    matches = [{
+        "id": f"handbook.pdf~{i}", "score": rng.random(), "namespace": "",
+        "metadata": {"filename": "handbook.pdf", "page": i, "chunk_id": i, "snippet": make_text(120, seed=i),
+                     "text": make_text(120, seed=i)},
+        "text": make_text(120, seed=i),
+    } for i in range(10)]
+    projected = [wire.project(m, ["id", "score", "text"]) for m in matches]
+    context = "\n\n".join(m["text"] for m in matches)
+    state = {"session_id": "s", "type": "user_message", "user_message": "what is the refund policy?",
+             "events": ["WS:route:retrieve:default", "WS:retrieval:done", "WS:rag:using", "WS:generated:rag",
+                        "WS:memory:ready"],
+             "retrieved_docs": projected, "rag_answer": context, "confidence": 0.71, "use_rag": True,
+             "llm_output": make_text(150, seed=99), "history": [make_text(30, seed=i) for i in range(20)],
+             "namespaces": ["", "session-s"], "route": "retrieve"}
+    graph = {"events": state["events"], "llm_output": state["llm_output"], "state": state}
+    return [
+        ("embed", "full", {"embedding": vector}, True),
+        ("search", "full", {"matches": matches}, False),
+        ("search", "projected", {"matches": projected}, False),
+        ("run_graph", "full", graph, False),
+        ("run_graph", "projected", wire.project(graph, ["events", "llm_output"]), False),
+    ]
+
+
+async def main():
+    media_types = [wire.JSON] + ([wire.MSGPACK] if wire.MSGPACK_AVAILABLE else [])
+    if not wire.MSGPACK_AVAILABLE:
+        skip("msgpack not installed: JSON and float32 only", exit=False)
+    for endpoint, shape, payload, is_vector in payloads():
+        cases = [(m, lambda p=payload, m=m, v=is_vector: wire.encode(p, m, single_float=v)) for m in media_types]
+        if is_vector:
+            cases.append((wire.FLOAT32, lambda p=payload: wire.pack_vectors([p["embedding"]])))
+        for media_type, enc in cases:
+            size = len(enc().body)
+            samples = measure(lambda: wire.decode(_Resp(enc())), repeat=REPEAT)
+            result = summarize("wire.encode_decode", samples, endpoint=endpoint, shape=shape,
+                               encoding=media_type.split("/")[-1])
+            result["bytes"] = size
+            emit(result)
+
+
+if __name__ == "__main__":
+    run(main)
@@ -0,0 +1,397 @@
+# benchmarks/eval_retrieval.py
+"""
+Retrieval recall vs latency vs memory for different index types, chunk sizes
+and k, plus how often the graph's confidence gates would pass.
+
+    python benchmarks/eval_retrieval.py                          # synthetic corpus, hash embeddings
+    python benchmarks/eval_retrieval.py --corpus docs --embedder openai
+    python benchmarks/eval_retrieval.py --chunk-sizes 200,400,800 --ks 4,10 --queries my_queries.txt
+
+recall@k is measured against exact (brute-force) search over the same
+vectors, so it isolates what the ANN index loses. hit@k checks whether the
+chunk a known-item query was drawn from comes back, which is what makes
+chunk sizes comparable with each other. Results go to
+benchmarks/results/retrieval/ as JSON/CSV, plus recall-vs-latency plots when
+matplotlib is installed.
+"""
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import os
+import random
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from harness import QUICK, REPO_ROOT, emit, skip, summarize, use_service
+from stubs import StubEmbeddings, make_corpus
+
+use_service("rag-indexer")
+
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+    print("⚠️ faiss not available, only exact NumPy search will be evaluated.")
+
+try:
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    PLOT_AVAILABLE = True
+except ImportError:
+    PLOT_AVAILABLE = False
+    print("⚠️ matplotlib not available, writing JSON/CSV only.")
+
+OUTPUT_DIR = os.path.join(REPO_ROOT, "benchmarks", "results", "retrieval")
+CACHE_DIR = os.path.join(OUTPUT_DIR, "embeddings")
+
+# the graph's gates: root decide_node and langgraph-service decide_node
+ROOT_THRESHOLD = 0.4
+SERVICE_THRESHOLD = 0.35
+
+
+# -----------------------------
+# Corpus, queries, embeddings
+# -----------------------------
+def load_docs_pages(folder: str) -> List[Tuple[str, Any]]:
+    """(source, page) pairs from the bundled docs/ via rag-indexer's loaders."""
+    try:
+        from pipeline.loader import load_documents_from_file
+    except ImportError as e:
+        skip(f"docs corpus needs rag-indexer loaders: {e}")
+
+    async def _load():
+        out = []
+        for fname in sorted(os.listdir(folder)):
+            for page in await load_documents_from_file(os.path.join(folder, fname)):
+                out.append((fname, page))
+        return out
+
+    pages = asyncio.run(_load())
+    if not pages:
+        skip(f"no loadable documents in {folder}")
+    return pages
+
+
+def synthetic_pages(n_docs: int) -> List[Tuple[str, Any]]:
+    return [(doc_id, text) for doc_id, text in make_corpus(n_docs, words_per_doc=400)]
+
+
+def split_pages(pages: List[Tuple[str, Any]], chunk_size: int) -> List[Dict[str, Any]]:
+    """Chunk with rag-indexer's TextSplitter (token-bounded, 10% overlap)."""
+    from pipeline.splitter import TextSplitter
+    splitter = TextSplitter(chunk_size=chunk_size, chunk_overlap=max(1, chunk_size // 10))
+
+    async def _split():
+        chunks = []
+        for source in dict.fromkeys(s for s, _ in pages):
+            async def stream(source=source):
+                for s, page in pages:
+                    if s == source:
+                        yield page
+            chunks.extend([c async for c in splitter.split_stream(stream(), source_id=source)])
+        return chunks
+
+    return asyncio.run(_split())
+
+
+def known_item_queries(chunks: List[Dict[str, Any]], n: int, seed: int = 7) -> List[Tuple[str, str]]:
+    """(query, source chunk text) pairs: a short span lifted from a random chunk."""
+    rng = random.Random(seed)
+    out = []
+    for chunk in rng.sample(chunks, min(n, len(chunks))):
+        words = chunk["text"].split()
+        if len(words) < 6:
+            continue
+        start = rng.randrange(0, max(1, len(words) - 12))
+        out.append((" ".join(words[start:start + rng.randint(6, 12)]), chunk["text"]))
+    return out
+
+
+def make_embedder(name: str):
+    if name == "stub":
+        return StubEmbeddings(dim=256), "stub-256"
+    try:
+        from langchain_openai import OpenAIEmbeddings
+    except ImportError as e:
+        skip(f"openai embedder needs langchain_openai: {e}")
+    if not os.environ.get("OPENAI_API_KEY"):
+        skip("openai embedder needs OPENAI_API_KEY")
+    model = os.environ.get("EVAL_EMBED_MODEL", "text-embedding-3-small")
+    return OpenAIEmbeddings(model=model), model
+
+
+def embed_cached(embedder, model: str, texts: List[str], batch: int = 256) -> np.ndarray:
+    """Embed once per (model, texts); provider embeddings are cached on disk between runs."""
+    if model.startswith("stub"):
+        return np.asarray(embedder.embed_documents(texts), dtype=np.float32)
+    digest = hashlib.sha256(("\x00".join([model] + texts)).encode("utf-8")).hexdigest()[:24]
+    path = os.path.join(CACHE_DIR, f"{digest}.npy")
+    if os.path.exists(path):
+        return np.load(path)
+    vecs = []
+    for i in range(0, len(texts), batch):
+        vecs.extend(embedder.embed_documents(texts[i:i + batch]))
+    arr = np.asarray(vecs, dtype=np.float32)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    np.save(path, arr)
+    return arr
+
+
+# -----------------------------
+# Indexes
+# -----------------------------
+class ExactIndex:
+    """Brute-force L2 in NumPy: the ground truth, and the fallback when faiss is missing."""
+
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = vectors
+        self.norms = (vectors ** 2).sum(axis=1)
+
+    def search(self, q: np.ndarray, k: int):
+        d = self.norms[None, :] - 2 * q @ self.vectors.T + (q ** 2).sum(axis=1)[:, None]
+        k = min(k, len(self.vectors))
+        idx = np.argpartition(d, k - 1, axis=1)[:, :k]
+        part = np.take_along_axis(d, idx, axis=1)
+        order = np.argsort(part, axis=1)
+        return np.take_along_axis(part, order, axis=1), np.take_along_axis(idx, order, axis=1)
+
+    def memory_bytes(self) -> int:
+        return self.vectors.nbytes
+
+
+class FaissIndex:
+    def __init__(self, index):
+        self.index = index
+
+    def search(self, q: np.ndarray, k: int):
+        return self.index.search(q, k)
+
+    def memory_bytes(self) -> int:
+        return int(faiss.serialize_index(self.index).nbytes)
+
+
+def index_configs(n: int, dim: int) -> List[Tuple[str, Dict[str, Any], Any]]:
+    """(index type, params, builder) for every configuration to evaluate."""
+    configs = [("exact-numpy", {}, lambda v: ExactIndex(v))]
+    if not FAISS_AVAILABLE:
+        return configs
+
+    def flat(v):
+        index = faiss.IndexFlatL2(dim)  # what langchain's FAISS store uses
+        index.add(v)
+        return FaissIndex(index)
+
+    def hnsw(ef):
+        def build(v):
+            index = faiss.IndexHNSWFlat(dim, 32)
+            index.hnsw.efSearch = ef
+            index.add(v)
+            return FaissIndex(index)
+        return build
+
+    nlist = max(1, min(int(4 * np.sqrt(n)), n // 39))  # faiss wants ~39 points per centroid
+
+    def ivf(nprobe):
+        def build(v):
+            index = faiss.IndexIVFFlat(faiss.IndexFlatL2(dim), dim, nlist)
+            index.train(v)
+            index.add(v)
+            index.nprobe = nprobe
+            return FaissIndex(index)
+        return build
+
+    def sq8(v):
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit)
+        index.train(v)
+        index.add(v)
+        return FaissIndex(index)
+
+    configs.append(("faiss-flat", {}, flat))
+    configs.extend(("faiss-hnsw32", {"ef_search": ef}, hnsw(ef)) for ef in (16, 64, 256))
+    configs.extend(("faiss-ivf", {"nlist": nlist, "nprobe": p}, ivf(p)) for p in (1, 4, 16) if p <= nlist)
+    configs.append(("faiss-sq8", {}, sq8))
+    return configs
+
+
+# -----------------------------
+# Metrics
+# -----------------------------
+def root_confidence(distances: np.ndarray) -> float:
+    """RAGEngine.similarity_search_with_score: 1 - dist/max_dist, averaged over the hits."""
+    max_dist = float(distances.max()) or 1.0
+    return float(np.mean(1.0 - distances / max_dist))
+
+
+def service_confidence(q: np.ndarray, vectors: np.ndarray, ids: np.ndarray) -> float:
+    """langgraph-service: mean cosine score of the returned matches."""
+    hits = vectors[ids[ids >= 0]]
+    if not len(hits):
+        return 0.0
+    hits = hits / np.maximum(np.linalg.norm(hits, axis=1, keepdims=True), 1e-12)
+    qn = q / max(np.linalg.norm(q), 1e-12)
+    return float(np.mean(hits @ qn))
+
+
+def evaluate(index, exact: ExactIndex, q_vecs: np.ndarray, sources: List[int], k: int,
+             repeat: int, thresholds: List[float]) -> Dict[str, Any]:
+    _, truth = exact.search(q_vecs, k)
+    recalls, hits, root_conf, service_conf, samples = [], [], [], [], []
+    for i in range(len(q_vecs)):
+        q = q_vecs[i:i + 1]  # one query at a time, as the nodes search
+        D, I = index.search(q, k)
+        for _ in range(repeat):
+            started = time.perf_counter()
+            index.search(q, k)
+            samples.append(time.perf_counter() - started)
+        found = set(int(x) for x in I[0] if x >= 0)
+        recalls.append(len(found & set(int(x) for x in truth[i])) / len(truth[i]))
+        if sources[i] >= 0:
+            hits.append(1.0 if sources[i] in found else 0.0)
+        root_conf.append(root_confidence(D[0][I[0] >= 0]) if (I[0] >= 0).any() else 0.0)
+        service_conf.append(service_confidence(q[0], exact.vectors, I[0]))
+
+    def pass_rates(values):
+        return {f"{t:g}": round(float(np.mean([v >= t for v in values])), 3) for t in thresholds}
+
+    return {
+        "samples": samples,
+        "recall_at_k": round(float(np.mean(recalls)), 4),
+        "hit_at_k": round(float(np.mean(hits)), 4) if hits else None,
+        "root_confidence_mean": round(float(np.mean(root_conf)), 3),
+        "root_gate_pass": pass_rates(root_conf),
+        "service_confidence_mean": round(float(np.mean(service_conf)), 3),
+        "service_gate_pass": pass_rates(service_conf),
+    }
+
+
+# -----------------------------
+# Report
+# -----------------------------
+def write_report(rows: List[Dict[str, Any]], meta: Dict[str, Any]):
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    with open(os.path.join(OUTPUT_DIR, "results.json"), "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "results": rows}, f, indent=2)
+
+    flat_keys = ["chunk_size", "k", "index", "index_params", "chunks", "recall_at_k", "hit_at_k",
+                 "p50_ms", "p99_ms", "memory_mb", "build_s", "root_confidence_mean", "service_confidence_mean",
+                 f"root_pass@{meta['root_threshold']:g}", f"service_pass@{meta['service_threshold']:g}"]
+    with open(os.path.join(OUTPUT_DIR, "results.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=flat_keys)
+        writer.writeheader()
+        for r in rows:
+            writer.writerow({
+                **{key: r.get(key) for key in flat_keys},
+                "index_params": json.dumps(r["index_params"]),
+                f"root_pass@{meta['root_threshold']:g}": r["root_gate_pass"][f"{meta['root_threshold']:g}"],
+                f"service_pass@{meta['service_threshold']:g}": r["service_gate_pass"][f"{meta['service_threshold']:g}"],
+            })
+
+    print(f"\n{'chunk':>6} {'k':>3}  {'index':28s} {'recall':>7} {'hit':>6} {'p50 ms':>8} {'p99 ms':>8} {'MB':>8}"
+          f" {'root≥' + format(meta['root_threshold'], 'g'):>8} {'svc≥' + format(meta['service_threshold'], 'g'):>8}")
+    for r in rows:
+        label = r["index"] + ("" if not r["index_params"] else " " + ",".join(f"{k}={v}" for k, v in r["index_params"].items()))
+        hit = f"{r['hit_at_k']:.3f}" if r["hit_at_k"] is not None else "-"
+        print(f"{r['chunk_size']:>6} {r['k']:>3}  {label:28s} {r['recall_at_k']:>7.3f} {hit:>6} {r['p50_ms']:>8.3f}"
+              f" {r['p99_ms']:>8.3f} {r['memory_mb']:>8.2f}"
+              f" {r['root_gate_pass'][format(meta['root_threshold'], 'g')]:>8.2f}"
+              f" {r['service_gate_pass'][format(meta['service_threshold'], 'g')]:>8.2f}")
+
+    if not PLOT_AVAILABLE:
+        return
+    for k in sorted({r["k"] for r in rows}):
+        fig, axes = plt.subplots(1, 3, figsize=(18, 5))
+        for chunk_size in sorted({r["chunk_size"] for r in rows}):
+            subset = [r for r in rows if r["k"] == k and r["chunk_size"] == chunk_size]
+            for ax, x in zip(axes, ("p50_ms", "p99_ms", "memory_mb")):
+                ax.scatter([r[x] for r in subset], [r["recall_at_k"] for r in subset], label=f"chunk {chunk_size}")
+                for r in subset:
+                    ax.annotate(r["index"].replace("faiss-", "") + "".join(f" {v}" for v in r["index_params"].values()),
+                                (r[x], r["recall_at_k"]), fontsize=7, alpha=0.7)
+        for ax, x in zip(axes, ("p50 latency (ms)", "p99 latency (ms)", "index memory (MB)")):
+            ax.set_xlabel(x)
+            ax.set_ylabel(f"recall@{k}")
+            ax.set_xscale("log")
+            ax.grid(alpha=0.3)
+        axes[0].legend()
+        fig.suptitle(f"recall@{k} vs latency / memory ({meta['corpus']}, {meta['embedder']})")
+        fig.tight_layout()
+        path = os.path.join(OUTPUT_DIR, f"recall_k{k}.png")
+        fig.savefig(path, dpi=120)
+        plt.close(fig)
+        print(f"📈 Wrote {path}")
+
+
+# -----------------------------
+# Main
+# -----------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Retrieval recall vs latency evaluation")
+    parser.add_argument("--corpus", choices=("synthetic", "docs"), default="synthetic")
+    parser.add_argument("--docs-dir", default=os.path.join(REPO_ROOT, "docs"))
+    parser.add_argument("--synthetic-docs", type=int, default=500 if QUICK else 5_000)
+    parser.add_argument("--embedder", choices=("stub", "openai"), default="stub")
+    parser.add_argument("--chunk-sizes", default="200,400,800", help="tokens per chunk (rag-indexer splitter)")
+    parser.add_argument("--ks", default="4,10", help="4 = RAGEngine.query, 10 = retrieve_node")
+    parser.add_argument("--queries", default=None, help="file with one query per line (default: known-item queries)")
+    parser.add_argument("--n-queries", type=int, default=50 if QUICK else 200)
+    parser.add_argument("--repeat", type=int, default=3 if QUICK else 10, help="timed searches per query")
+    parser.add_argument("--root-threshold", type=float, default=ROOT_THRESHOLD)
+    parser.add_argument("--service-threshold", type=float, default=SERVICE_THRESHOLD)
+    args = parser.parse_args()
+
+    chunk_sizes = [int(x) for x in args.chunk_sizes.split(",") if x.strip()]
+    ks = [int(x) for x in args.ks.split(",") if x.strip()]
+    thresholds = sorted({0.2, 0.3, 0.5, args.root_threshold, args.service_threshold})
+
+    pages = load_docs_pages(args.docs_dir) if args.corpus == "docs" else synthetic_pages(args.synthetic_docs)
+    embedder, model = make_embedder(args.embedder)
+    fixed_queries = None
+    if args.queries:
+        with open(args.queries, "r", encoding="utf-8") as f:
+            fixed_queries = [line.strip() for line in f if line.strip()]
+
+    rows = []
+    for chunk_size in chunk_sizes:
+        chunks = split_pages(pages, chunk_size)
+        texts = [c["text"] for c in chunks]
+        print(f"🔹 chunk_size={chunk_size}: {len(chunks)} chunks")
+        vectors = embed_cached(embedder, model, texts)
+
+        if fixed_queries is not None:
+            queries, sources = fixed_queries, [-1] * len(fixed_queries)
+        else:
+            position = {t: i for i, t in enumerate(texts)}
+            pairs = known_item_queries(chunks, args.n_queries)
+            queries, sources = [q for q, _ in pairs], [position[t] for _, t in pairs]
+        q_vecs = embed_cached(embedder, model, queries)
+        exact = ExactIndex(vectors)
+
+        for name, params, build in index_configs(len(vectors), vectors.shape[1]):
+            started = time.perf_counter()
+            index = build(vectors)
+            build_s = time.perf_counter() - started
+            for k in ks:
+                r = evaluate(index, exact, q_vecs, sources, k, args.repeat, thresholds)
+                stats = summarize("retrieval.search", r.pop("samples"), chunk_size=chunk_size, k=k,
+                                  index=name, **params)
+                row = {"chunk_size": chunk_size, "k": k, "index": name, "index_params": params,
+                       "chunks": len(chunks), "p50_ms": stats["p50_ms"], "p99_ms": stats["p99_ms"],
+                       "memory_mb": round(index.memory_bytes() / 1e6, 3), "build_s": round(build_s, 3), **r}
+                rows.append(row)
+                emit({**stats, "recall_at_k": row["recall_at_k"], "hit_at_k": row["hit_at_k"],
+                      "memory_mb": row["memory_mb"]})
+
+    meta = {"corpus": args.corpus, "embedder": model, "queries": args.queries or "known-item",
+            "root_threshold": args.root_threshold, "service_threshold": args.service_threshold,
+            "faiss": FAISS_AVAILABLE, "timestamp": int(time.time())}
+    write_report(rows, meta)
+
+
+if __name__ == "__main__":
+    main()
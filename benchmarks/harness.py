@@ -0,0 +1,84 @@
+# benchmarks/harness.py
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULT_PREFIX = "BENCH "
+SKIP_PREFIX = "BENCH_SKIP "
+
+QUICK = os.environ.get("BENCH_QUICK", "0") == "1"
+
+
+def use_service(name: Optional[str] = None):
+    """
+    Put one service directory (or the repo root for None) first on sys.path.
+    Every service has its own `config` module, so each benchmark script
+    imports exactly one of them.
+    """
+    path = os.path.join(REPO_ROOT, name) if name else REPO_ROOT
+    sys.path.insert(0, path)
+    return path
+
+
+def summarize(name: str, samples: List[float], ops_per_sample: int = 1, **params) -> Dict[str, Any]:
+    """Latency percentiles (ms) and throughput for a list of per-sample durations (seconds)."""
+    ordered = sorted(samples)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000
+
+    total = sum(samples)
+    return {
+        "name": name,
+        "params": params,
+        "n": len(samples),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 4),
+        "p50_ms": round(pct(50), 4),
+        "p95_ms": round(pct(95), 4),
+        "p99_ms": round(pct(99), 4),
+        "min_ms": round(ordered[0] * 1000, 4),
+        "ops_per_s": round(len(samples) * ops_per_sample / total, 2) if total else None,
+    }
+
+
+def measure(fn: Callable[[], Any], repeat: int = 50, warmup: int = 3) -> List[float]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def ameasure(fn: Callable[[], Awaitable[Any]], repeat: int = 50, warmup: int = 3) -> List[float]:
+    for _ in range(warmup):
+        await fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def emit(result: Dict[str, Any]):
+    """One machine-readable result line for run.py to collect."""
+    print(RESULT_PREFIX + json.dumps(result), flush=True)
+
+
+def skip(reason: str, exit: bool = True):
+    """Report a benchmark that cannot run here (missing optional dependency or service)."""
+    print(SKIP_PREFIX + reason, flush=True)
+    if exit:
+        sys.exit(0)
+
+
+def run(main: Callable[[], Awaitable[None]]):
+    asyncio.run(main())
@@ -0,0 +1,160 @@
+# benchmarks/run.py
+"""
+Run the microbenchmark suite offline and compare against a baseline.
+
+    python benchmarks/run.py                       # full run -> benchmarks/results/latest.json
+    python benchmarks/run.py --quick --only rwlock,db
+    python benchmarks/run.py --save-baseline        # record benchmarks/baseline.json
+    python benchmarks/run.py --baseline benchmarks/baseline.json --fail-on-regression
+
+Each benchmark runs in its own interpreter (every service has its own
+`config` module) and prints one JSON result per line.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+from harness import REPO_ROOT, RESULT_PREFIX, SKIP_PREFIX
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "results", "latest.json")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+# name -> (script, args)
+SUITE = {
+    "rag_search": ("bench_rag_search.py", []),
+    "rwlock": ("bench_rwlock.py", []),
+    "db": ("bench_db.py", []),
+    "graph_root": ("bench_graph.py", ["root"]),
+    "graph_service": ("bench_graph.py", ["service"]),
+    "split_indexer": ("bench_splitting.py", ["indexer"]),
+    "split_root": ("bench_splitting.py", ["root"]),
+    "upsert": ("bench_upsert.py", []),
+    "retrieval": ("eval_retrieval.py", []),
+    "wire": ("bench_wire.py", []),
+}
+
+
+def run_one(name: str, quick: bool, timeout: float) -> Tuple[List[Dict[str, Any]], List[str]]:
+    script, args = SUITE[name]
+    pythonpath = os.pathsep.join(filter(None, [BENCH_DIR, os.environ.get("PYTHONPATH")]))
+    env = dict(os.environ, BENCH_QUICK="1" if quick else "0", PYTHONPATH=pythonpath)
+    print(f"▶️ {name}", flush=True)
+    try:
+        proc = subprocess.run([sys.executable, os.path.join(BENCH_DIR, script), *args],
+                              capture_output=True, text=True, env=env, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return [], [f"{name}: timed out after {timeout:.0f}s"]
+
+    results, skipped = [], []
+    for line in proc.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            result = json.loads(line[len(RESULT_PREFIX):])
+            result["suite"] = name
+            results.append(result)
+        elif line.startswith(SKIP_PREFIX):
+            skipped.append(f"{name}: {line[len(SKIP_PREFIX):]}")
+    if proc.returncode != 0:
+        tail = (proc.stderr.strip().splitlines() or ["no output"])[-1]
+        skipped.append(f"{name}: failed ({tail})")
+    return results, skipped
+
+
+def result_key(result: Dict[str, Any]) -> str:
+    params = ",".join(f"{k}={v}" for k, v in sorted(result.get("params", {}).items()))
+    return f"{result['name']}[{params}]"
+
+
+def compare(current: List[Dict[str, Any]], baseline: List[Dict[str, Any]], threshold: float,
+            metric: str = "p50_ms") -> List[Dict[str, Any]]:
+    """Pair results by name+params and flag those slower than baseline by more than `threshold`."""
+    base = {result_key(r): r for r in baseline}
+    rows = []
+    for r in current:
+        b = base.get(result_key(r))
+        if not b or not b.get(metric) or r.get(metric) is None:
+            continue
+        ratio = r[metric] / b[metric]
+        rows.append({"key": result_key(r), "baseline": b[metric], "current": r[metric],
+                     "ratio": round(ratio, 3), "regression": ratio > 1 + threshold})
+    return rows
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, timeout=10).stdout.strip()
+    except Exception:
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline microbenchmarks for the hot paths")
+    parser.add_argument("--only", default="", help=f"comma-separated subset of: {', '.join(SUITE)}")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes and fewer repeats")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="where to write this run's JSON")
+    parser.add_argument("--baseline", default=None, help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE, default=None,
+                        help="also write this run as the baseline (default benchmarks/baseline.json)")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed p50 slowdown (0.2 = 20%%)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit 1 if any result regressed")
+    parser.add_argument("--timeout", type=float, default=1800, help="per-benchmark timeout in seconds")
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.only.split(",") if n.strip()] or list(SUITE)
+    unknown = [n for n in names if n not in SUITE]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    started = time.time()
+    results, skipped = [], []
+    for name in names:
+        r, s = run_one(name, args.quick, args.timeout)
+        results.extend(r)
+        skipped.extend(s)
+        for result in r:
+            print(f"   {result_key(result):70s} p50 {result['p50_ms']:>10.3f} ms  p99 {result['p99_ms']:>10.3f} ms")
+
+    report = {
+        "meta": {
+            "timestamp": int(started),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": args.quick,
+            "elapsed_s": round(time.time() - started, 1),
+        },
+        "results": results,
+        "skipped": skipped,
+    }
+
+    baseline_path = args.baseline or (DEFAULT_BASELINE if os.path.exists(DEFAULT_BASELINE) else None)
+    regressions = []
+    if baseline_path and os.path.exists(baseline_path):
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            rows = compare(results, json.load(f)["results"], args.threshold)
+        report["comparison"] = {"baseline": baseline_path, "threshold": args.threshold, "rows": rows}
+        regressions = [row for row in rows if row["regression"]]
+        print(f"\n📊 Compared {len(rows)} results with {baseline_path}: {len(regressions)} regression(s)")
+        for row in regressions:
+            print(f"   ⚠️ {row['key']}: {row['baseline']} -> {row['current']} ms p50 (x{row['ratio']})")
+
+    for path in filter(None, [args.output, args.save_baseline]):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Wrote {path}")
+    for s in skipped:
+        print(f"⏭️ {s}")
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
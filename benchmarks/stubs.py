@@ -0,0 +1,143 @@
+# benchmarks/stubs.py
+import asyncio
+import hashlib
+import random
+import re
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+try:
+    from langchain_core.embeddings import Embeddings as _EmbeddingsBase
+except ImportError:
+    _EmbeddingsBase = object
+
+_TOKEN = re.compile(r"\w+")
+
+_WORDS = (
+    "invoice refund policy contract payment customer account order shipping delivery warranty "
+    "service support ticket billing report quarter revenue forecast budget audit compliance "
+    "security access password reset login network server storage backup deployment release "
+    "feature request roadmap design review meeting schedule project milestone risk issue "
+    "vendor supplier pricing discount license renewal onboarding training manual guide"
+).split()
+
+
+class StubEmbeddings(_EmbeddingsBase):
+    """
+    Offline embeddings (feature hashing), so search benchmarks measure our code
+    and the vector index rather than a provider round-trip.
+    Same interface as langchain's Embeddings.
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def embed_query(self, text: str) -> List[float]:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for tok in _TOKEN.findall(text.lower()):
+            h = int.from_bytes(hashlib.blake2b(tok.encode("utf-8"), digest_size=8).digest(), "little")
+            vec[h % self.dim] += 1.0 if (h >> 63) & 1 else -1.0
+        norm = np.linalg.norm(vec)
+        return (vec / norm if norm else vec).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(t) for t in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return self.embed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_documents(texts)
+
+    def __call__(self, text: str) -> List[float]:
+        return self.embed_query(text)
+
+
+class _Reply:
+    def __init__(self, content: str):
+        self.content = content
+
+
+class StubLLM:
+    """Chat model stand-in: fixed reply after an optional simulated latency."""
+
+    def __init__(self, latency: float = 0.0, reply: str = "stub answer"):
+        self.latency = latency
+        self.reply = reply
+        self.calls = 0
+
+    async def ainvoke(self, messages, **kwargs):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return _Reply(self.reply)
+
+    def invoke(self, messages, **kwargs):
+        self.calls += 1
+        return _Reply(self.reply)
+
+
+class MemoryDB:
+    """Chat-log store with the AsyncPostgresDB interface used by the graph nodes."""
+
+    def __init__(self):
+        self.rows: Dict[str, List[str]] = {}
+
+    async def insert_chat(self, session_id: str, text: str, role: str = "User", timestamp=None):
+        self.rows.setdefault(session_id, []).append(f"{role}: {text}")
+
+    async def get_history(self, session_id: str, limit: int = 100) -> List[str]:
+        return self.rows.get(session_id, [])[-limit:]
+
+
+class MemoryManifest:
+    """In-process stand-in for rag-indexer's Redis IngestManifest."""
+
+    def __init__(self):
+        self.files: Dict[str, str] = {}
+        self.chunks: Dict[str, Dict[str, str]] = {}
+
+    @staticmethod
+    def _scope(source_id: str, namespace: str = "") -> str:
+        return f"{namespace}/{source_id}" if namespace else source_id
+
+    async def file_unchanged(self, source_id: str, file_hash: str, namespace: str = "") -> bool:
+        return self.files.get(self._scope(source_id, namespace)) == file_hash
+
+    async def chunk_hashes(self, source_id: str, namespace: str = "") -> Dict[str, str]:
+        return dict(self.chunks.get(self._scope(source_id, namespace), {}))
+
+    async def commit(self, source_id: str, file_hash: str, chunk_hashes: Dict[str, str], namespace: str = ""):
+        scope = self._scope(source_id, namespace)
+        self.files[scope] = file_hash
+        self.chunks[scope] = dict(chunk_hashes)
+
+    async def forget(self, source_id: str, namespace: str = ""):
+        scope = self._scope(source_id, namespace)
+        self.files.pop(scope, None)
+        self.chunks.pop(scope, None)
+
+
+def make_text(n_words: int, seed: int = 0) -> str:
+    """Deterministic pseudo-prose with sentence and paragraph breaks."""
+    rng = random.Random(seed)
+    out, sentence = [], []
+    for i in range(n_words):
+        sentence.append(rng.choice(_WORDS))
+        if len(sentence) >= rng.randint(8, 20):
+            out.append(" ".join(sentence).capitalize() + (".\n" if rng.random() < 0.2 else ". "))
+            sentence = []
+    if sentence:
+        out.append(" ".join(sentence).capitalize() + ".")
+    return "".join(out)
+
+
+def make_corpus(n_docs: int, words_per_doc: int = 120, seed: int = 0) -> List[Tuple[str, str]]:
+    """(doc_id, text) pairs; every doc carries a unique identifier for exact-match queries."""
+    return [(f"doc-{i}", f"Reference DOC-{i:06d}. " + make_text(words_per_doc, seed + i)) for i in range(n_docs)]
+
+
+def make_queries(n: int, seed: int = 1) -> List[str]:
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(_WORDS) for _ in range(rng.randint(3, 8))) for _ in range(n)]
@@ -0,0 +1,100 @@
+# chat-orchestrator/admission.py
+import math
+import time
+from typing import Dict
+
+from config import (
+    ADMISSION_INITIAL_LIMIT, ADMISSION_MIN_LIMIT, ADMISSION_MAX_LIMIT, ADMISSION_LATENCY_TARGET,
+    ADMISSION_BACKOFF, ADMISSION_SESSION_INFLIGHT, ADMISSION_RETRY_MIN, ADMISSION_RETRY_MAX,
+)
+from metrics import ADMISSION_LIMIT, ADMISSION_INFLIGHT, ADMISSION_REJECTED, ADMISSION_LATENCY_EWMA
+
+
+class Busy(Exception):
+    """A message was shed; the client should retry after `retry_after` seconds."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdaptiveLimiter:
+    """
+    Admission control for WebSocket turns. A message is admitted when it
+    arrives (it then counts as in flight while queued and while running) or
+    shed immediately with Busy if its session already has
+    ADMISSION_SESSION_INFLIGHT turns pending or the global limit is reached.
+
+    The global limit adapts to downstream latency (AIMD): each on-target
+    /run_graph call while the limit is in use grows it by 1/limit (about +1
+    per round of turns); a slow or failed call cuts it by ADMISSION_BACKOFF,
+    at most once per latency target, so one burst of slow replies does not
+    collapse it. Overload shows up as fast "busy" replies instead of an
+    ever-growing queue.
+    """
+
+    def __init__(self, limit: float = ADMISSION_INITIAL_LIMIT):
+        self.limit = float(limit)
+        self.inflight = 0
+        self._sessions: Dict[str, int] = {}
+        self._latency = None  # EWMA of downstream latency, seconds
+        self._last_decrease = 0.0
+        ADMISSION_LIMIT.set(self.limit)
+
+    # -----------------------------
+    # Admission
+    # -----------------------------
+    def admit(self, session_id: str):
+        pending = self._sessions.get(session_id, 0)
+        if pending >= ADMISSION_SESSION_INFLIGHT:
+            ADMISSION_REJECTED.labels("session").inc()
+            raise Busy("session", self.retry_after())
+        if self.inflight >= int(self.limit):
+            ADMISSION_REJECTED.labels("global").inc()
+            raise Busy("global", self.retry_after())
+        self._sessions[session_id] = pending + 1
+        self.inflight += 1
+        ADMISSION_INFLIGHT.set(self.inflight)
+
+    def release(self, session_id: str):
+        pending = self._sessions.get(session_id, 0) - 1
+        if pending > 0:
+            self._sessions[session_id] = pending
+        else:
+            self._sessions.pop(session_id, None)
+        self.inflight = max(0, self.inflight - 1)
+        ADMISSION_INFLIGHT.set(self.inflight)
+
+    def retry_after(self) -> int:
+        """Rough time for the backlog ahead of a new message to drain, in whole seconds."""
+        latency = self._latency or ADMISSION_LATENCY_TARGET
+        rounds = max(1.0, self.inflight / max(self.limit, 1.0))
+        return int(min(ADMISSION_RETRY_MAX, max(ADMISSION_RETRY_MIN, math.ceil(latency * rounds))))
+
+    # -----------------------------
+    # Feedback
+    # -----------------------------
+    def observe(self, latency: float, ok: bool = True):
+        """Feed one downstream call's latency (and whether it succeeded) back into the limit."""
+        self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+        ADMISSION_LATENCY_EWMA.set(self._latency)
+        now = time.monotonic()
+        if not ok or latency > ADMISSION_LATENCY_TARGET:
+            if now - self._last_decrease >= ADMISSION_LATENCY_TARGET:
+                self.limit = max(ADMISSION_MIN_LIMIT, self.limit * ADMISSION_BACKOFF)
+                self._last_decrease = now
+        elif self.inflight >= self.limit / 2:
+            # only grow while the limit is actually in use
+            self.limit = min(ADMISSION_MAX_LIMIT, self.limit + 1.0 / self.limit)
+        ADMISSION_LIMIT.set(self.limit)
+
+    def stats(self):
+        return {
+            "limit": round(self.limit, 2),
+            "inflight": self.inflight,
+            "sessions": len(self._sessions),
+            "latency_ewma_s": round(self._latency, 3) if self._latency is not None else None,
+            "latency_target_s": ADMISSION_LATENCY_TARGET,
+            "session_cap": ADMISSION_SESSION_INFLIGHT,
+        }
@@ -9,3 +9,56 @@ REDIS_URL = f"redis://{os.environ.get('REDIS_HOST', 'redis')}:{os.environ.get('R
 
 LANGGRAPH_SERVICE_URL = os.environ.get("LANGGRAPH_SERVICE_URL", "http://langgraph-service:8003")
 SERVICE_API_KEY = os.environ.get("SERVICE_API_KEY", "default-orchestrator-key")  # used to call LangGraph
+API_KEY = os.environ.get("API_KEY", SERVICE_API_KEY)
+
+# File uploads go straight to the RAG service, into the session's partition
+RAG_SERVICE_URL = os.environ.get("RAG_SERVICE_URL", "http://rag-service:8001")
+RAG_API_KEY = os.environ.get("RAG_API_KEY", API_KEY)
+# Caller scope: each turn's session/tenant is HMAC-signed (secret shared with the RAG service) and
+# forwarded as x-rag-scope, so the RAG service decides which partitions a turn may read or write
+RAG_SCOPE_SECRET = os.environ.get("RAG_SCOPE_SECRET", "default-scope-secret")
+RAG_SCOPE_TTL = float(os.environ.get("RAG_SCOPE_TTL", 300))  # seconds a signed scope stays valid
+# WebSocket handshake header carrying the tenant, set by the authenticating gateway in front of the
+# orchestrator (clients must not reach it directly); empty disables tenant partitions
+TENANT_HEADER = os.environ.get("TENANT_HEADER", "x-tenant-id").lower()
+
+# Pooled inter-service HTTP clients (one per upstream, opened/closed by the app lifespan)
+UPSTREAM_MAX_CONNECTIONS = int(os.environ.get("UPSTREAM_MAX_CONNECTIONS", 100))
+UPSTREAM_MAX_KEEPALIVE = int(os.environ.get("UPSTREAM_MAX_KEEPALIVE", 20))
+# keep below the upstream's own idle timeout (uvicorn --timeout-keep-alive)
+UPSTREAM_KEEPALIVE_EXPIRY = float(os.environ.get("UPSTREAM_KEEPALIVE_EXPIRY", 60))
+UPSTREAM_POOL_TIMEOUT = float(os.environ.get("UPSTREAM_POOL_TIMEOUT", 5))  # wait for a free connection
+# per-upstream connection limits, e.g. "langgraph=200"
+UPSTREAM_LIMITS = {
+    name.strip(): int(limit)
+    for name, _, limit in (item.partition("=") for item in os.environ.get("UPSTREAM_LIMITS", "").split(","))
+    if name.strip() and limit.strip()
+}
+UPSTREAM_HTTP2 = os.environ.get("UPSTREAM_HTTP2", "0") in ("1", "true", "True")  # needs the h2 package
+# h2c: plain-http upstreams served by an HTTP/2 server (e.g. hypercorn); uvicorn speaks HTTP/1.1 only
+UPSTREAM_HTTP2_PRIOR_KNOWLEDGE = os.environ.get("UPSTREAM_HTTP2_PRIOR_KNOWLEDGE", "0") in ("1", "true", "True")
+
+# Admission control at the WebSocket edge: turns in flight (queued + running), shed with a
+# "busy, retry in N seconds" reply beyond the limits. The global limit adapts to /run_graph latency.
+ADMISSION_INITIAL_LIMIT = int(os.environ.get("ADMISSION_INITIAL_LIMIT", 32))
+ADMISSION_MIN_LIMIT = int(os.environ.get("ADMISSION_MIN_LIMIT", 4))
+ADMISSION_MAX_LIMIT = int(os.environ.get("ADMISSION_MAX_LIMIT", 256))
+ADMISSION_LATENCY_TARGET = float(os.environ.get("ADMISSION_LATENCY_TARGET", 8.0))  # seconds per turn downstream
+ADMISSION_BACKOFF = float(os.environ.get("ADMISSION_BACKOFF", 0.8))  # limit multiplier on a slow/failed turn
+ADMISSION_SESSION_INFLIGHT = int(os.environ.get("ADMISSION_SESSION_INFLIGHT", 4))  # per-session receive queue
+ADMISSION_MAX_CONNECTIONS = int(os.environ.get("ADMISSION_MAX_CONNECTIONS", 2000))
+ADMISSION_RETRY_MIN = int(os.environ.get("ADMISSION_RETRY_MIN", 1))
+ADMISSION_RETRY_MAX = int(os.environ.get("ADMISSION_RETRY_MAX", 30))
+
+# Tracing: W3C traceparent propagation; spans go to a JSON-lines file and/or an OTLP/HTTP collector
+SERVICE_NAME = os.environ.get("SERVICE_NAME", "chat-orchestrator")
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", 1.0))
+TRACE_EXPORT_FILE = os.environ.get("TRACE_EXPORT_FILE", "")  # e.g. traces/chat-orchestrator.jsonl
+TRACE_COLLECTOR_URL = os.environ.get("TRACE_COLLECTOR_URL", "")  # e.g. http://otel-collector:4318/v1/traces
+
+# Opt-in sampled CPU profiling (pyinstrument); keeps the PROFILE_KEEP slowest requests
+PROFILE_ENABLED = os.environ.get("PROFILE_ENABLED", "0") in ("1", "true", "True")
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0.05))
+PROFILE_SLOW_MS = float(os.environ.get("PROFILE_SLOW_MS", 2000))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", 20))
@@ -1,7 +1,10 @@
 # chat-orchestrator/db_postgres.py
 import asyncio
 import os
-from typing import List
+from typing import Dict, List
+
+from metrics import DB_QUERY_LATENCY
+from tracing import span
 
 try:
     import asyncpg
@@ -32,25 +35,34 @@ class AsyncPostgresDB:
         else:
             await asyncio.sleep(0)
 
+    def pool_stats(self) -> Dict[str, int]:
+        """Pool utilization; all zeros for the in-memory fallback."""
+        if not self.pool:
+            return {"size": 0, "in_use": 0, "max": 0}
+        size = self.pool.get_size()
+        return {"size": size, "in_use": size - self.pool.get_idle_size(), "max": self.pool.get_max_size()}
+
     async def insert_chat(self, session_id: str, text: str, role: str = "User", timestamp=None):
         timestamp = timestamp or None
         if self.pool:
-            async with self.pool.acquire() as conn:
-                await conn.execute(
-                    "INSERT INTO chat_logs(session_id, role, message) VALUES($1, $2, $3)",
-                    session_id, role, text
-                )
+            with DB_QUERY_LATENCY.labels("insert_chat").time(), span("db.insert_chat", **{"db.system": "postgresql"}):
+                async with self.pool.acquire() as conn:
+                    await conn.execute(
+                        "INSERT INTO chat_logs(session_id, role, message) VALUES($1, $2, $3)",
+                        session_id, role, text
+                    )
         else:
             self._in_memory.append((session_id, role, text))
 
     async def get_history(self, session_id: str, limit: int = 100) -> List[str]:
         if self.pool:
-            async with self.pool.acquire() as conn:
-                rows = await conn.fetch(
-                    "SELECT role, message FROM chat_logs WHERE session_id=$1 ORDER BY id DESC LIMIT $2",
-                    session_id, limit
-                )
-                return [f"{r['role']}: {r['message']}" for r in reversed(rows)]
+            with DB_QUERY_LATENCY.labels("get_history").time(), span("db.get_history", **{"db.system": "postgresql"}):
+                async with self.pool.acquire() as conn:
+                    rows = await conn.fetch(
+                        "SELECT role, message FROM chat_logs WHERE session_id=$1 ORDER BY id DESC LIMIT $2",
+                        session_id, limit
+                    )
+            return [f"{r['role']}: {r['message']}" for r in reversed(rows)]
         else:
             entries = [t for t in self._in_memory if t[0] == session_id]
             # return last `limit` messages
@@ -0,0 +1,139 @@
+# chat-orchestrator/http_clients.py
+from typing import Any, Dict, Optional
+
+import httpx
+
+from config import (
+    UPSTREAM_MAX_CONNECTIONS, UPSTREAM_MAX_KEEPALIVE, UPSTREAM_KEEPALIVE_EXPIRY, UPSTREAM_POOL_TIMEOUT,
+    UPSTREAM_LIMITS, UPSTREAM_HTTP2, UPSTREAM_HTTP2_PRIOR_KNOWLEDGE,
+    LANGGRAPH_SERVICE_URL, API_KEY, RAG_SERVICE_URL, RAG_API_KEY,
+)
+from metrics import on_scrape, UPSTREAM_POOL_CONNECTIONS, UPSTREAM_POOL_QUEUED, UPSTREAM_CONNECTS
+import tracing
+
+try:
+    import h2  # noqa: F401  (httpx's HTTP/2 support)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+    if UPSTREAM_HTTP2:
+        print("⚠️ h2 not available, upstream clients will use HTTP/1.1 keep-alive.")
+
+
+class Upstream:
+    """
+    One pooled client for one upstream service. Connections are kept alive and
+    reused across requests (and multiplexed when HTTP/2 is on), and new TCP/TLS
+    connections are counted so pool sizing can be checked against reuse.
+    """
+
+    def __init__(self, name: str, base_url: str, headers: Optional[Dict[str, str]] = None,
+                 timeout: float = 60.0, max_connections: Optional[int] = None):
+        self.name = name
+        self.base_url = base_url
+        self.headers = headers or {}
+        self.timeout = timeout
+        self.max_connections = max_connections or UPSTREAM_LIMITS.get(name, UPSTREAM_MAX_CONNECTIONS)
+        self.requests = 0
+        self.connects = 0
+        self.tls_handshakes = 0
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = self._open()
+        return self._client
+
+    def _open(self) -> httpx.AsyncClient:
+        http2 = UPSTREAM_HTTP2 and HTTP2_AVAILABLE
+        print(f"🔌 Upstream '{self.name}' -> {self.base_url} (max {self.max_connections} connections"
+              f"{', HTTP/2' if http2 else ''})")
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=self.headers,
+            timeout=httpx.Timeout(self.timeout, pool=UPSTREAM_POOL_TIMEOUT),
+            limits=httpx.Limits(max_connections=self.max_connections,
+                                max_keepalive_connections=min(UPSTREAM_MAX_KEEPALIVE, self.max_connections),
+                                keepalive_expiry=UPSTREAM_KEEPALIVE_EXPIRY),
+            # plain-http upstreams only speak HTTP/2 with prior knowledge (h2c)
+            http2=http2,
+            http1=not (http2 and UPSTREAM_HTTP2_PRIOR_KNOWLEDGE),
+            event_hooks=tracing.merge_event_hooks({"request": [self._on_request], "response": []},
+                                                  tracing.httpx_event_hooks()),
+        )
+
+    async def _on_request(self, request: httpx.Request):
+        self.requests += 1
+        request.extensions.setdefault("trace", self._trace)
+
+    async def _trace(self, event: str, info: Dict[str, Any]):
+        # httpcore connection events; fired only when a new connection is made
+        if event == "connection.connect_tcp.complete":
+            self.connects += 1
+            UPSTREAM_CONNECTS.labels(self.name, "tcp").inc()
+        elif event == "connection.start_tls.complete":
+            self.tls_handshakes += 1
+            UPSTREAM_CONNECTS.labels(self.name, "tls").inc()
+
+    def stats(self) -> Dict[str, Any]:
+        pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []) or [])
+        idle = sum(1 for c in connections if c.is_idle())
+        queued = sum(1 for r in getattr(pool, "_requests", []) or [] if getattr(r, "connection", None) is None)
+        return {
+            "base_url": self.base_url,
+            "open": self._client is not None and not self._client.is_closed,
+            "max_connections": self.max_connections,
+            "connections": len(connections),
+            "idle": idle,
+            "active": len(connections) - idle,
+            "http2": sum(1 for c in connections if c.info().startswith("HTTP/2")),
+            "queued": queued,
+            "requests": self.requests,
+            "connects": self.connects,
+            "tls_handshakes": self.tls_handshakes,
+            "reuse_ratio": round(1 - self.connects / self.requests, 3) if self.requests else None,
+        }
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class UpstreamClients:
+    """Registry of pooled upstream clients; opened and closed by the FastAPI lifespan."""
+
+    def __init__(self):
+        self._upstreams: Dict[str, Upstream] = {}
+
+    def register(self, name: str, base_url: str, **kwargs) -> Upstream:
+        self._upstreams[name] = Upstream(name, base_url, **kwargs)
+        return self._upstreams[name]
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        return self._upstreams[name].client
+
+    def open(self):
+        for upstream in self._upstreams.values():
+            upstream.client
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: u.stats() for name, u in self._upstreams.items()}
+
+    def collect_metrics(self):
+        for name, s in self.stats().items():
+            UPSTREAM_POOL_CONNECTIONS.labels(name, "idle").set(s["idle"])
+            UPSTREAM_POOL_CONNECTIONS.labels(name, "active").set(s["active"])
+            UPSTREAM_POOL_QUEUED.labels(name).set(s["queued"])
+
+    async def aclose(self):
+        for upstream in self._upstreams.values():
+            await upstream.aclose()
+
+
+clients = UpstreamClients()
+clients.register("langgraph", LANGGRAPH_SERVICE_URL, headers={"x-api-key": API_KEY})
+clients.register("rag", RAG_SERVICE_URL, headers={"x-api-key": RAG_API_KEY})
+on_scrape(clients.collect_metrics)
@@ -4,28 +4,36 @@ from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from websocket_manager import WebSocketManager
 from db_postgres import AsyncPostgresDB
-from rag_engine import RAGEngine
 from config import POSTGRES_DSN, REDIS_URL
+from http_clients import clients
+from metrics import instrument, on_scrape, ACTIVE_WEBSOCKETS, DB_POOL_SIZE, DB_POOL_IN_USE, DB_POOL_MAX
 import uvicorn
 
 class AppServer:
     def __init__(self, db_dsn=None, redis_url=REDIS_URL):
         self.app = FastAPI(lifespan=self._lifespan)
         self.db = AsyncPostgresDB(dsn=db_dsn or POSTGRES_DSN)
-        self.rag = RAGEngine(redis_url=redis_url)
-        self.websocket_manager = WebSocketManager(db=self.db, rag=self.rag)
+        self.websocket_manager = WebSocketManager(db=self.db)
         self.websocket_manager.setup_routes(self.app)
+        instrument(self.app)
+        on_scrape(self._collect_metrics)
+        self.app.add_api_route("/http/stats", clients.stats, methods=["GET"])
+        self.app.add_api_route("/admission/stats", self.websocket_manager.limiter.stats, methods=["GET"])
+
+    def _collect_metrics(self):
+        ACTIVE_WEBSOCKETS.set(len(self.websocket_manager.active_connections))
+        pool = self.db.pool_stats()
+        DB_POOL_SIZE.set(pool["size"])
+        DB_POOL_IN_USE.set(pool["in_use"])
+        DB_POOL_MAX.set(pool["max"])
 
     @asynccontextmanager
     async def _lifespan(self, app: FastAPI):
         await self.db.init_db()
-        try:
-            await self.rag.init_redis()
-            await self.rag.load_index()
-        except FileNotFoundError:
-            print("⚠️ No existing RAG index found.")
+        clients.open()
         asyncio.create_task(self.websocket_manager.monitor_idle_sessions())
         yield
+        await clients.aclose()
         await self.db.close()
 
     def run(self, host="0.0.0.0", port=8000):
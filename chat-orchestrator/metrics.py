@@ -0,0 +1,133 @@
+# chat-orchestrator/metrics.py
+import time
+from typing import Callable, List
+
+from fastapi import FastAPI, Request, Response
+
+try:
+    from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+    print("⚠️ prometheus_client not available, /metrics will be empty.")
+
+
+class _NoopMetric:
+    """Stand-in used when prometheus_client is missing, so call sites never branch."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def dec(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+    def observe(self, value):
+        pass
+
+    def time(self):
+        return _NoopTimer()
+
+
+class _NoopTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+if not PROMETHEUS_AVAILABLE:
+    Counter = Gauge = Histogram = _NoopMetric
+
+# -----------------------------
+# HTTP
+# -----------------------------
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route", "status"],
+)
+
+# -----------------------------
+# WebSocket edge
+# -----------------------------
+ACTIVE_WEBSOCKETS = Gauge("ws_active_connections", "Open WebSocket connections")
+WS_MESSAGES = Counter("ws_messages_total", "WebSocket messages received", ["type"])
+WS_TURN_LATENCY = Histogram(
+    "ws_turn_duration_seconds", "Time from receiving a WebSocket message to the final reply",
+    ["type"], buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120),
+)
+ADMISSION_LIMIT = Gauge("ws_admission_limit", "Current adaptive limit on turns in flight")
+ADMISSION_INFLIGHT = Gauge("ws_admission_inflight", "Turns admitted and not yet answered (queued + running)")
+ADMISSION_REJECTED = Counter("ws_admission_rejected_total", "Messages/connections shed with a busy reply", ["reason"])
+ADMISSION_LATENCY_EWMA = Gauge("ws_admission_latency_ewma_seconds", "Smoothed /run_graph latency driving the limit")
+RWLOCK_WAIT = Histogram(
+    "rwlock_wait_seconds", "Time spent waiting to acquire the RWLock", ["mode"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30),
+)
+
+# -----------------------------
+# Downstream calls
+# -----------------------------
+LANGGRAPH_LATENCY = Histogram(
+    "langgraph_call_duration_seconds", "Latency of /run_graph calls", ["type", "outcome"],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60),
+)
+UPSTREAM_POOL_CONNECTIONS = Gauge(
+    "upstream_pool_connections", "Pooled connections per upstream service", ["upstream", "state"],
+)
+UPSTREAM_POOL_QUEUED = Gauge("upstream_pool_queued_requests", "Requests waiting for a pooled connection", ["upstream"])
+UPSTREAM_CONNECTS = Counter(
+    "upstream_connections_opened_total", "New TCP connections and TLS handshakes per upstream", ["upstream", "kind"],
+)
+DB_QUERY_LATENCY = Histogram("db_query_duration_seconds", "Chat-log query latency", ["op"])
+DB_POOL_SIZE = Gauge("db_pool_connections", "Connections currently open in the asyncpg pool")
+DB_POOL_IN_USE = Gauge("db_pool_connections_in_use", "Pool connections checked out")
+DB_POOL_MAX = Gauge("db_pool_connections_max", "Configured pool maximum")
+
+# -----------------------------
+# Exposition
+# -----------------------------
+_collectors: List[Callable[[], None]] = []
+
+
+def on_scrape(fn: Callable[[], None]):
+    """Register a callback that refreshes point-in-time gauges right before /metrics renders."""
+    _collectors.append(fn)
+    return fn
+
+
+def instrument(app: FastAPI):
+    """Add request-latency middleware and the /metrics endpoint to `app`."""
+
+    @app.middleware("http")
+    async def _observe_latency(request: Request, call_next):
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            # label by route template, not raw path, to keep cardinality bounded
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            REQUEST_LATENCY.labels(request.method, route, str(status)).observe(time.perf_counter() - started)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        for fn in _collectors:
+            try:
+                fn()
+            except Exception as e:
+                print(f"[Metrics] collector failed: {e}")
+        if not PROMETHEUS_AVAILABLE:
+            return Response("# prometheus_client not installed\n", media_type="text/plain")
+        return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -2,8 +2,11 @@
 # Async Reader–Writer Lock for RAG & LangGraph concurrency
 
 import asyncio
+import time
 from contextlib import asynccontextmanager
 
+from metrics import RWLOCK_WAIT
+
 
 class RWLock:
     """Efficient async Reader/Writer lock.
@@ -16,10 +19,12 @@ class RWLock:
         self._readers = 0
 
     async def acquire_read(self):
+        started = time.perf_counter()
         async with self._rlock:
             self._readers += 1
             if self._readers == 1:
                 await self._wlock.acquire()
+        RWLOCK_WAIT.labels("read").observe(time.perf_counter() - started)
 
     async def release_read(self):
         async with self._rlock:
@@ -28,7 +33,9 @@ class RWLock:
                 self._wlock.release()
 
     async def acquire_write(self):
+        started = time.perf_counter()
         await self._wlock.acquire()
+        RWLOCK_WAIT.labels("write").observe(time.perf_counter() - started)
 
     def release_write(self):
         if self._wlock.locked():
@@ -0,0 +1,69 @@
+# chat-orchestrator/scope.py
+"""
+Caller scope: the RAG partitions a request may read and write.
+
+The chat orchestrator is the only service that knows who the end user is; it
+signs each turn's session (and tenant) into a short-lived token that the other
+services forward unchanged in the `x-rag-scope` header. Namespaces are worked
+out from the verified token, never taken from the request body alone: a
+request without a valid token only sees the shared default namespace.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+from config import RAG_SCOPE_SECRET, RAG_SCOPE_TTL
+
+HEADER = "x-rag-scope"
+
+
+def _b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _mac(body: str, secret: str) -> str:
+    return _b64(hmac.new(secret.encode(), body.encode(), hashlib.sha256).digest())
+
+
+def sign(session_id: str, tenant_id: Optional[str] = None, ttl: float = RAG_SCOPE_TTL,
+         secret: str = RAG_SCOPE_SECRET) -> str:
+    """Token for one session's turn: `<claims>.<hmac>`, valid for `ttl` seconds."""
+    claims = {"sid": session_id, "exp": int(time.time() + ttl)}
+    if tenant_id:
+        claims["tid"] = tenant_id
+    body = _b64(json.dumps(claims, separators=(",", ":")).encode())
+    return f"{body}.{_mac(body, secret)}"
+
+
+def verify(token: Optional[str], secret: str = RAG_SCOPE_SECRET) -> Optional[Dict[str, Any]]:
+    """The token's claims, or None if it is missing, forged or expired."""
+    if not token:
+        return None
+    body, _, mac = token.partition(".")
+    if not hmac.compare_digest(mac, _mac(body, secret)):
+        return None
+    try:
+        claims = json.loads(base64.urlsafe_b64decode(body + "=" * (-len(body) % 4)))
+    except ValueError:
+        return None
+    if not isinstance(claims, dict) or claims.get("exp", 0) < time.time() or not claims.get("sid"):
+        return None
+    return claims
+
+
+def readable(claims: Optional[Dict[str, Any]]) -> List[str]:
+    """Partitions a scope may search: the shared default namespace, its tenant's and its session's."""
+    names = [""]
+    if claims and claims.get("tid"):
+        names.append(f"tenant-{claims['tid']}")
+    if claims:
+        names.append(f"session-{claims['sid']}")
+    return names
+
+
+def writable(claims: Optional[Dict[str, Any]]) -> List[str]:
+    """Partitions a scope may upload to; only unscoped (operator) calls write the shared namespace."""
+    return readable(claims)[1:] if claims else [""]
@@ -1,7 +1,11 @@
 # chat-orchestrator/services/calls_to_langgraph.py
+import time
 import httpx
 from typing import Dict, Any, Optional
-from config import LANGGRAPH_SERVICE_URL, API_KEY
+from metrics import LANGGRAPH_LATENCY
+from http_clients import clients
+import scope
+import wire
 
 class LangGraphClient:
     """
@@ -10,25 +14,35 @@ class LangGraphClient:
     and to persist memory if present in the returned state.
     """
 
-    def __init__(self, timeout: float = 60.0):
-        self._client = httpx.AsyncClient(timeout=timeout, headers={"x-api-key": API_KEY})
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        # the pooled, keep-alive client is shared and owned by the app lifespan
+        self._client = client
 
     async def run_graph(self, session_id: str, message: Optional[str] = None,
                         file_meta: Optional[Dict[str, Any]] = None,
-                        history: Optional[list] = None, msg_type: str = "user_message") -> Dict[str, Any]:
+                        history: Optional[list] = None, msg_type: str = "user_message",
+                        rag_scope: Optional[str] = None) -> Dict[str, Any]:
         """
         Call LangGraph service /run_graph and return the parsed JSON response.
+        `rag_scope` is the session's signed scope, forwarded by LangGraph to the RAG service.
         """
         payload = {
             "session_id": session_id,
             "type": msg_type,
             "message": message,
             "file_meta": file_meta,
-            "history": history or []
+            "history": history or [],
+            # only what the WebSocket manager reads; the full final state stays server-side
+            "fields": ["events", "llm_output"],
         }
-        resp = await self._client.post(f"{LANGGRAPH_SERVICE_URL}/run_graph", json=payload)
-        resp.raise_for_status()
-        return resp.json()
-
-    async def close(self):
-        await self._client.aclose()
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            headers = {**wire.ACCEPT_COMPACT, **({scope.HEADER: rag_scope} if rag_scope else {})}
+            resp = await (self._client or clients.get("langgraph")).post("/run_graph", json=payload,
+                                                                         headers=headers)
+            resp.raise_for_status()
+            outcome = "ok"
+            return wire.decode(resp)
+        finally:
+            LANGGRAPH_LATENCY.labels(msg_type, outcome).observe(time.perf_counter() - started)
@@ -0,0 +1,22 @@
+# chat-orchestrator/services/calls_to_rag.py
+from typing import Dict, Any, Optional
+import httpx
+from http_clients import clients
+import scope
+
+class RagClient:
+    """
+    HTTP client for the RAG service's /upsert. Uploads carry the session's
+    signed scope, so the RAG service only accepts partitions that session may write.
+    """
+
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        self._client = client
+
+    async def upsert_file(self, filename: str, data: bytes, namespace: str, rag_scope: str) -> Dict[str, Any]:
+        """Index one uploaded file into `namespace`; returns the RAG service's ingest summary."""
+        resp = await (self._client or clients.get("rag")).post(
+            "/upsert", files={"file": (filename, data)}, data={"namespace": namespace},
+            headers={scope.HEADER: rag_scope})
+        resp.raise_for_status()
+        return resp.json()
@@ -0,0 +1,78 @@
+# chat-orchestrator/tests/test_admission.py
+import pytest
+
+import admission
+from admission import AdaptiveLimiter, Busy
+from config import (ADMISSION_BACKOFF, ADMISSION_LATENCY_TARGET, ADMISSION_MAX_LIMIT, ADMISSION_MIN_LIMIT,
+                    ADMISSION_SESSION_INFLIGHT)
+
+
+def _fill(limiter, n, prefix="s"):
+    for i in range(n):
+        limiter.admit(f"{prefix}{i}")
+
+
+def test_session_cap_sheds_the_extra_message():
+    limiter = AdaptiveLimiter(limit=100)
+    for _ in range(ADMISSION_SESSION_INFLIGHT):
+        limiter.admit("chatty")
+    with pytest.raises(Busy) as err:
+        limiter.admit("chatty")
+    assert err.value.reason == "session"
+    limiter.admit("quiet")  # other sessions are unaffected
+    limiter.release("chatty")
+    limiter.admit("chatty")
+
+
+def test_global_limit_sheds_and_release_frees_a_slot():
+    limiter = AdaptiveLimiter(limit=3)
+    _fill(limiter, 3)
+    with pytest.raises(Busy) as err:
+        limiter.admit("late")
+    assert err.value.reason == "global"
+    assert err.value.retry_after >= 1
+    limiter.release("s0")
+    limiter.admit("late")
+    assert limiter.inflight == 3
+
+
+def test_on_target_latency_grows_the_limit_additively_while_in_use():
+    limiter = AdaptiveLimiter(limit=10)
+    _fill(limiter, 10)
+    limiter.observe(ADMISSION_LATENCY_TARGET / 2)
+    assert limiter.limit == pytest.approx(10.1)
+
+
+def test_limit_does_not_grow_while_mostly_unused():
+    limiter = AdaptiveLimiter(limit=10)
+    limiter.admit("only")
+    limiter.observe(ADMISSION_LATENCY_TARGET / 2)
+    assert limiter.limit == 10
+
+
+def test_slow_or_failed_calls_cut_the_limit_once_per_latency_target(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(admission.time, "monotonic", lambda: now[0])
+    limiter = AdaptiveLimiter(limit=20)
+    limiter.observe(ADMISSION_LATENCY_TARGET * 2)
+    assert limiter.limit == pytest.approx(20 * ADMISSION_BACKOFF)
+    limiter.observe(0.1, ok=False)  # same burst: no second cut
+    assert limiter.limit == pytest.approx(20 * ADMISSION_BACKOFF)
+    now[0] += ADMISSION_LATENCY_TARGET
+    limiter.observe(0.1, ok=False)
+    assert limiter.limit == pytest.approx(20 * ADMISSION_BACKOFF ** 2)
+
+
+def test_limit_stays_within_bounds(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(admission.time, "monotonic", lambda: now[0])
+    limiter = AdaptiveLimiter(limit=ADMISSION_MIN_LIMIT)
+    for _ in range(20):
+        now[0] += ADMISSION_LATENCY_TARGET
+        limiter.observe(0.1, ok=False)
+    assert limiter.limit == ADMISSION_MIN_LIMIT
+
+    limiter = AdaptiveLimiter(limit=ADMISSION_MAX_LIMIT)
+    _fill(limiter, ADMISSION_MAX_LIMIT)
+    limiter.observe(0.1)
+    assert limiter.limit == ADMISSION_MAX_LIMIT
@@ -1,12 +1,19 @@
 # chat-orchestrator/websocket_manager.py
 import asyncio
+import base64
 import json
+import time
 from datetime import datetime, timezone, timedelta
 from typing import Dict, Optional
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 
 from services.calls_to_langgraph import LangGraphClient
-from rw_lock import RWLock
+from services.calls_to_rag import RagClient
+from admission import AdaptiveLimiter, Busy
+from config import ADMISSION_SESSION_INFLIGHT, ADMISSION_MAX_CONNECTIONS, TENANT_HEADER
+from metrics import WS_MESSAGES, WS_TURN_LATENCY, ADMISSION_REJECTED
+from tracing import span, profiled
+import scope
 
 class WebSocketManager:
     IDLE_TIMEOUT = timedelta(seconds=180)
@@ -16,17 +23,29 @@ class WebSocketManager:
     def __init__(self, db=None):
         self.db = db
         self.langgraph = LangGraphClient()
+        self.rag = RagClient()
         self.active_connections: Dict[str, WebSocket] = {}
         self.last_active: Dict[str, datetime] = {}
         self._last_warning_sent: Dict[str, int] = {}
-        self._lock = RWLock()
+        # tenant of each session, from the gateway's handshake header
+        self.tenants: Dict[str, Optional[str]] = {}
+        self.limiter = AdaptiveLimiter()
 
     def setup_routes(self, app: FastAPI):
         @app.websocket("/ws/{session_id}")
         async def ws_endpoint(ws: WebSocket, session_id: str):
             await ws.accept()
+            if len(self.active_connections) >= ADMISSION_MAX_CONNECTIONS and session_id not in self.active_connections:
+                ADMISSION_REJECTED.labels("connections").inc()
+                await self._send_busy(ws, self.limiter.retry_after())
+                await ws.close(code=1013)  # try again later
+                return
             self.active_connections[session_id] = ws
             self.last_active[session_id] = datetime.now(timezone.utc)
+            self.tenants[session_id] = ws.headers.get(TENANT_HEADER) if TENANT_HEADER else None
+            # admitted turns wait here; the worker runs them one at a time, in order
+            queue: asyncio.Queue = asyncio.Queue(maxsize=ADMISSION_SESSION_INFLIGHT)
+            worker = asyncio.create_task(self._session_worker(ws, session_id, queue))
 
             try:
                 while True:
@@ -41,52 +60,115 @@ class WebSocketManager:
                     except Exception:
                         payload = None
                         p_type = "user_message"
+                    kind = "file_upload" if p_type == "file_upload" else "user_message"
+                    WS_MESSAGES.labels(kind).inc()
 
-                    # Acquire write lock for session to ensure sequential processing
-                    await self._lock.acquire_write()
+                    # shed at the edge: answer "busy" now rather than queue without bound
                     try:
-                        # ---------------- FILE UPLOAD ----------------
-                        if p_type == "file_upload":
-                            await ws.send_text("📁 Received file, forwarding to LangGraph...")
-                            lg_resp = await self.langgraph.run_graph(
-                                session_id=session_id,
-                                file_meta=payload,
-                                msg_type="file_uploaded"
-                            )
-                        # ---------------- USER MESSAGE ----------------
-                        else:
-                            message = payload.get("message") if payload else data
-                            # persist user message
-                            if self.db:
-                                await self.db.insert_chat(session_id, message, "User")
-
-                            lg_resp = await self.langgraph.run_graph(
-                                session_id=session_id,
-                                message=message,
-                                msg_type="user_message"
-                            )
-
-                        # Forward LangGraph events
-                        for ev in lg_resp.get("events", []):
-                            await ws.send_text(ev)
-
-                        output = lg_resp.get("llm_output")
-                        if output:
-                            if self.db:
-                                await self.db.insert_chat(session_id, output, "Bot")
-                            await ws.send_text(output)
-
-                    finally:
-                        self._lock.release_write()
+                        self.limiter.admit(session_id)
+                    except Busy as b:
+                        await self._send_busy(ws, b.retry_after)
+                        continue
+                    queue.put_nowait((data, payload, kind))
 
             except WebSocketDisconnect:
-                self._cleanup_session(session_id)
+                pass
             except Exception as e:
                 try:
                     await ws.send_text(f"⚠️ Connection error: {e}")
                 except Exception:
                     pass
-                self._cleanup_session(session_id)
+            finally:
+                worker.cancel()
+                await asyncio.gather(worker, return_exceptions=True)
+                while not queue.empty():  # turns admitted but never started
+                    queue.get_nowait()
+                    self.limiter.release(session_id)
+                if self.active_connections.get(session_id) is ws:
+                    self._cleanup_session(session_id)
+
+    async def _session_worker(self, ws: WebSocket, session_id: str, queue: asyncio.Queue):
+        while True:
+            data, payload, kind = await queue.get()
+            try:
+                # one trace per message; CPU profiles are sampled only (WebSocket clients are end users)
+                with span("ws.message", kind="server", **{"session.id": session_id, "message.type": kind}), \
+                        profiled(f"ws {kind}"):
+                    await self._handle_turn(ws, session_id, data, payload, kind)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                try:
+                    await ws.send_text(f"⚠️ Error: {e}")
+                except Exception:
+                    pass
+            finally:
+                self.limiter.release(session_id)
+
+    async def _send_busy(self, ws: WebSocket, retry_after: int):
+        try:
+            await ws.send_text(f"⚠️ Busy, retry in {retry_after} seconds")
+        except Exception:
+            pass
+
+    async def _run_graph(self, **kwargs):
+        """LangGraph call whose latency (and failures) drive the admission limit."""
+        started = time.perf_counter()
+        ok = False
+        try:
+            resp = await self.langgraph.run_graph(**kwargs)
+            ok = True
+            return resp
+        finally:
+            self.limiter.observe(time.perf_counter() - started, ok)
+
+    async def _handle_turn(self, ws: WebSocket, session_id: str, data: str, payload: Optional[dict], kind: str):
+        started = time.perf_counter()
+        # turns of one session run sequentially in its worker; sessions run concurrently
+        # signed session/tenant: downstream services derive the RAG partitions from it
+        rag_scope = scope.sign(session_id, self.tenants.get(session_id))
+        try:
+            # ---------------- FILE UPLOAD ----------------
+            if kind == "file_upload":
+                # uploads are private to the session that sent them
+                filename, namespace = payload["filename"], f"session-{session_id}"
+                await ws.send_text(f"📁 Received {filename}, indexing...")
+                indexed = await self.rag.upsert_file(filename, base64.b64decode(payload["data"]), namespace, rag_scope)
+                await ws.send_text(f"✅ Knowledge base updated with {filename}")
+                lg_resp = await self._run_graph(
+                    session_id=session_id,
+                    message=f"Summarize {filename}",
+                    file_meta={**{k: v for k, v in payload.items() if k != "data"},
+                               "namespace": namespace, "indexed": indexed},
+                    msg_type="file_uploaded",
+                    rag_scope=rag_scope,
+                )
+            # ---------------- USER MESSAGE ----------------
+            else:
+                message = payload.get("message") if payload else data
+                # persist user message
+                if self.db:
+                    await self.db.insert_chat(session_id, message, "User")
+
+                lg_resp = await self._run_graph(
+                    session_id=session_id,
+                    message=message,
+                    msg_type="user_message",
+                    rag_scope=rag_scope,
+                )
+
+            # Forward LangGraph events
+            for ev in lg_resp.get("events", []):
+                await ws.send_text(ev)
+
+            output = lg_resp.get("llm_output")
+            if output:
+                if self.db:
+                    await self.db.insert_chat(session_id, output, "Bot")
+                await ws.send_text(output)
+
+        finally:
+            WS_TURN_LATENCY.labels(kind).observe(time.perf_counter() - started)
 
     async def monitor_idle_sessions(self):
         while True:
@@ -111,3 +193,4 @@ class WebSocketManager:
         self.active_connections.pop(session_id, None)
         self.last_active.pop(session_id, None)
         self._last_warning_sent.pop(session_id, None)
+        self.tenants.pop(session_id, None)
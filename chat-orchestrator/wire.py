@@ -0,0 +1,98 @@
+# chat-orchestrator/wire.py
+import sys
+from array import array
+from typing import Any, Dict, Iterable, List, Optional
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+    print("⚠️ msgpack not available, inter-service responses stay JSON.")
+
+JSON = "application/json"
+MSGPACK = "application/x-msgpack"
+FLOAT32 = "application/x-float32"  # raw little-endian float32 rows; shape in x-vector-* headers
+
+# what a client sends to get the compact encoding when the server offers it
+ACCEPT_COMPACT = {"accept": f"{MSGPACK}, {JSON};q=0.5"} if MSGPACK_AVAILABLE else {}
+
+
+# -----------------------------
+# Server side
+# -----------------------------
+def negotiate(request: Request, offered: Iterable[str] = (MSGPACK,)) -> str:
+    """Pick the caller's most preferred encoding among `offered`; JSON by default."""
+    usable = {JSON} | {m for m in offered if m != MSGPACK or MSGPACK_AVAILABLE}
+    ranked = []
+    for i, part in enumerate(request.headers.get("accept", "").split(",")):
+        media, _, params = part.partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    pass
+        ranked.append((-q, i, media.strip().lower()))
+    for neg_q, _, media in sorted(ranked):
+        if neg_q < 0 and media in usable:
+            return media
+    return JSON
+
+
+def project(obj: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    """Keep only `fields` of a response object (all of it when no fields are asked for)."""
+    if not fields:
+        return obj
+    return {k: obj[k] for k in fields if k in obj}
+
+
+def encode(payload: Any, media_type: str = JSON, single_float: bool = False) -> Response:
+    """
+    Render a response body directly (skipping FastAPI's jsonable_encoder pass).
+    msgpack keeps doubles; `single_float` packs every float as float32 and is
+    only for vector payloads, which are float32 to begin with.
+    """
+    if media_type == MSGPACK:
+        return Response(msgpack.packb(payload, use_single_float=single_float, default=str), media_type=MSGPACK)
+    return JSONResponse(payload)
+
+
+def respond(request: Request, payload: Any) -> Response:
+    return encode(payload, negotiate(request))
+
+
+def pack_vectors(vectors: List[List[float]]) -> Response:
+    """Vectors as one raw float32 buffer: 4 bytes per dimension instead of ~20 JSON characters."""
+    dim = len(vectors[0]) if vectors else 0
+    buf = array("f", (x for v in vectors for x in v))
+    if sys.byteorder == "big":
+        buf.byteswap()
+    return Response(buf.tobytes(), media_type=FLOAT32,
+                    headers={"x-vector-count": str(len(vectors)), "x-vector-dim": str(dim)})
+
+
+# -----------------------------
+# Client side
+# -----------------------------
+def unpack_vectors(body: bytes, dim: int) -> List[List[float]]:
+    buf = array("f")
+    buf.frombytes(body)
+    if sys.byteorder == "big":
+        buf.byteswap()
+    return [buf[i:i + dim].tolist() for i in range(0, len(buf), dim)] if dim else []
+
+
+def decode(resp) -> Any:
+    """Parse an httpx response in whichever encoding the server chose (float32 bodies -> list of vectors)."""
+    media_type = resp.headers.get("content-type", "").split(";")[0].strip().lower()
+    if media_type == MSGPACK:
+        return msgpack.unpackb(resp.content)
+    if media_type == FLOAT32:
+        return unpack_vectors(resp.content, int(resp.headers.get("x-vector-dim", 0)))
+    return resp.json()
@@ -0,0 +1,198 @@
+# context_packer.py
+"""
+Turns retrieved passages into the context block sent to the LLM:
+
+  1. adaptive k: passages scoring under CONTEXT_MIN_SCORE_RATIO of the best
+     one, or past the first large drop in the score curve, are dropped
+  2. neighbouring chunks of the same document whose texts overlap (the
+     splitter's chunk_overlap) are merged, so the shared text appears once
+  3. MMR selection: the next passage is the one with the best trade-off
+     between relevance and novelty against those already picked; passages
+     nearly identical to a picked one are skipped outright
+  4. passages are added until the token budget is reached
+
+Novelty is measured on term vectors, so packing needs no extra embedding calls.
+"""
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from config import (CONTEXT_TOKEN_BUDGET, CONTEXT_MIN_SCORE_RATIO, CONTEXT_SCORE_GAP, CONTEXT_MMR_LAMBDA,
+                    CONTEXT_DUPLICATE_SIMILARITY, CONTEXT_MIN_OVERLAP)
+
+_WORD = re.compile(r"\w+")
+_MAX_OVERLAP = 2000  # characters compared when looking for a shared suffix/prefix
+SEPARATOR = "\n\n"
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token)."""
+    return max(1, len(text) // 4)
+
+
+class Passage:
+    """
+    One retrieved chunk. `group` identifies the source document and
+    `position` the chunk's sequence number in it, when known. Only passages
+    of the same group are merged, and only neighbours when positions are known.
+    """
+
+    def __init__(self, text: str, score: float, group: Optional[Hashable] = None,
+                 position: Optional[int] = None, item: Any = None):
+        self.text = text or ""
+        self.score = float(score or 0.0)
+        self.group = group
+        self.first = self.last = position  # chunk range covered once merged
+        self.items = [item] if item is not None else []  # the original results this passage covers
+        self._terms = None
+
+    @property
+    def terms(self) -> Counter:
+        if self._terms is None:
+            self._terms = Counter(_WORD.findall(self.text.lower()))
+        return self._terms
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.text)
+
+    def __repr__(self):
+        return f"Passage(score={self.score:.3f}, group={self.group!r}, chunks={self.first}-{self.last}, chars={len(self.text)})"
+
+
+# -----------------------------
+# Adaptive k
+# -----------------------------
+def adaptive_cutoff(passages: List[Passage], min_ratio: float = CONTEXT_MIN_SCORE_RATIO,
+                    gap: float = CONTEXT_SCORE_GAP) -> List[Passage]:
+    """Passages by score, cut at the relevance floor or at the first drop larger than `gap` x the best score."""
+    ranked = sorted(passages, key=lambda p: p.score, reverse=True)
+    if not ranked or ranked[0].score <= 0:
+        return ranked
+    top = ranked[0].score
+    kept = ranked[:1]
+    for prev, p in zip(ranked, ranked[1:]):
+        if p.score < top * min_ratio or prev.score - p.score > top * gap:
+            break
+        kept.append(p)
+    return kept
+
+
+# -----------------------------
+# Overlap merge
+# -----------------------------
+def _overlap(left: str, right: str, min_overlap: int) -> int:
+    """Length of the longest suffix of `left` that is also a prefix of `right`; 0 if under min_overlap."""
+    for n in range(min(len(left), len(right), _MAX_OVERLAP), min_overlap - 1, -1):
+        if left.endswith(right[:n]):
+            return n
+    return 0
+
+
+def _neighbours(a: Passage, b: Passage) -> bool:
+    if a.group is None or a.group != b.group:
+        return False
+    if None in (a.first, b.first):
+        return True
+    return b.first - a.last == 1 or a.first - b.last == 1
+
+
+def _join(a: Passage, b: Passage, min_overlap: int) -> Optional[Passage]:
+    """`a` and `b` as one passage if the end of one repeats the start of the other."""
+    orders = [(a, b), (b, a)]
+    if None not in (a.first, b.first):
+        orders = [(a, b) if a.first < b.first else (b, a)]
+    for left, right in orders:
+        n = _overlap(left.text, right.text, min_overlap)
+        if n:
+            merged = Passage(left.text + right.text[n:], max(a.score, b.score), a.group)
+            merged.first, merged.last = left.first, right.last
+            merged.items = left.items + right.items
+            return merged
+    return None
+
+
+def merge_overlapping(passages: List[Passage], min_overlap: int = CONTEXT_MIN_OVERLAP) -> List[Passage]:
+    """Merge overlapping neighbours of the same document (repeatedly, so runs of chunks collapse into one)."""
+    out = list(passages)
+    i = 0
+    while i < len(out):
+        for j in range(i + 1, len(out)):
+            joined = _join(out[i], out[j], min_overlap) if _neighbours(out[i], out[j]) else None
+            if joined is not None:
+                out[i] = joined
+                del out[j]
+                break
+        else:
+            i += 1
+    return out
+
+
+# -----------------------------
+# MMR + budget
+# -----------------------------
+def similarity(a: Passage, b: Passage) -> float:
+    """Cosine similarity of the passages' term counts."""
+    ta, tb = a.terms, b.terms
+    if not ta or not tb:
+        return 0.0
+    if len(ta) > len(tb):
+        ta, tb = tb, ta
+    dot = sum(n * tb[t] for t, n in ta.items() if t in tb)
+    norm = math.sqrt(sum(n * n for n in ta.values())) * math.sqrt(sum(n * n for n in tb.values()))
+    return dot / norm
+
+
+def _truncate(text: str, tokens: int) -> str:
+    cut = text[:tokens * 4]
+    return cut[:cut.rfind(" ")] if " " in cut else cut
+
+
+def pack(passages: List[Passage], budget: int = CONTEXT_TOKEN_BUDGET, mmr_lambda: float = CONTEXT_MMR_LAMBDA,
+         duplicate_similarity: float = CONTEXT_DUPLICATE_SIMILARITY,
+         min_overlap: int = CONTEXT_MIN_OVERLAP) -> Tuple[str, List[Passage], Dict[str, int]]:
+    """
+    Select and order passages for the prompt. Returns (context text, passages
+    used in prompt order, stats). The best passage is always included,
+    truncated if it alone exceeds the budget.
+    """
+    stats = {"candidates": len(passages), "below_cutoff": 0, "merged": 0, "duplicates": 0,
+             "over_budget": 0, "selected": 0, "tokens": 0, "budget": budget}
+    ranked = adaptive_cutoff(passages)
+    stats["below_cutoff"] = len(passages) - len(ranked)
+    candidates = merge_overlapping(ranked, min_overlap)
+    stats["merged"] = len(ranked) - len(candidates)
+    if not candidates:
+        return "", [], stats
+
+    top = max(p.score for p in candidates)
+    relevance = {id(p): (p.score / top if top > 0 else 1.0) for p in candidates}
+    selected: List[Passage] = []
+    used = 0
+    sep = estimate_tokens(SEPARATOR)
+    while candidates:
+        best, best_value, best_sim = None, -math.inf, 0.0
+        for p in candidates:
+            sim = max((similarity(p, s) for s in selected), default=0.0)
+            value = mmr_lambda * relevance[id(p)] - (1 - mmr_lambda) * sim
+            if value > best_value:
+                best, best_value, best_sim = p, value, sim
+        candidates.remove(best)
+        if best_sim >= duplicate_similarity:
+            stats["duplicates"] += 1
+            continue
+        cost = best.tokens + (sep if selected else 0)
+        if used + cost > budget:
+            if selected:
+                stats["over_budget"] += 1
+                continue  # a shorter passage further down may still fit
+            best.text = _truncate(best.text, budget)
+            best._terms = None
+            cost = best.tokens
+        selected.append(best)
+        used += cost
+
+    stats["selected"] = len(selected)
+    stats["tokens"] = used
+    return SEPARATOR.join(p.text for p in selected), selected, stats
@@ -6,6 +6,38 @@ EMBEDDING_SERVICE_PORT = int(os.environ.get("EMBEDDING_SERVICE_PORT", 8002))
 
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 SERVICE_API_KEY = os.environ.get("SERVICE_API_KEY", "default-embedding-key")
+API_KEY = os.environ.get("API_KEY", SERVICE_API_KEY)
+
+EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "text-embedding-3-small")
 
 # Optional fallback LLM configuration
 FALLBACK_LLM_MODEL = os.environ.get("FALLBACK_LLM_MODEL", "gpt-4.0-mini")
+LLM_MODEL = os.environ.get("LLM_MODEL", FALLBACK_LLM_MODEL)
+LLM_MAX_TOKENS = int(os.environ.get("LLM_MAX_TOKENS", 512))
+
+# Provider rate-limit scheduler: per-model requests/tokens per minute (start values; the
+# x-ratelimit-* response headers take over once the provider reports its own limits)
+LLM_RPM = int(os.environ.get("LLM_RPM", 500))
+LLM_TPM = int(os.environ.get("LLM_TPM", 200000))
+EMBED_RPM = int(os.environ.get("EMBED_RPM", 3000))
+EMBED_TPM = int(os.environ.get("EMBED_TPM", 1000000))
+# Share of each bucket that bulk (ingestion) requests may never use, kept for interactive chat
+BULK_RESERVE = float(os.environ.get("BULK_RESERVE", 0.2))
+# How long a request may wait for capacity (seconds), per priority; x-deadline-ms overrides
+INTERACTIVE_DEADLINE = float(os.environ.get("INTERACTIVE_DEADLINE", 10))
+BULK_DEADLINE = float(os.environ.get("BULK_DEADLINE", 120))
+RATE_LIMIT_BACKOFF = float(os.environ.get("RATE_LIMIT_BACKOFF", 1.0))  # after a 429 without retry-after
+EMBED_BATCH_SIZE = int(os.environ.get("EMBED_BATCH_SIZE", 256))  # inputs per provider call in /embed_batch
+
+# Tracing: W3C traceparent propagation; spans go to a JSON-lines file and/or an OTLP/HTTP collector
+SERVICE_NAME = os.environ.get("SERVICE_NAME", "embedding-service")
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", 1.0))
+TRACE_EXPORT_FILE = os.environ.get("TRACE_EXPORT_FILE", "")  # e.g. traces/embedding-service.jsonl
+TRACE_COLLECTOR_URL = os.environ.get("TRACE_COLLECTOR_URL", "")  # e.g. http://otel-collector:4318/v1/traces
+
+# Opt-in sampled CPU profiling (pyinstrument); keeps the PROFILE_KEEP slowest requests
+PROFILE_ENABLED = os.environ.get("PROFILE_ENABLED", "0") in ("1", "true", "True")
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0.05))
+PROFILE_SLOW_MS = float(os.environ.get("PROFILE_SLOW_MS", 2000))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", 20))
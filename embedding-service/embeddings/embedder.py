@@ -1,37 +1,88 @@
 # embedding-service/embedder.py
 import os
 import openai
-from config import OPENAI_API_KEY, EMBEDDING_MODEL, LLM_MODEL
+from typing import Any, Dict, List, Optional
+from config import OPENAI_API_KEY, EMBEDDING_MODEL, LLM_MODEL, LLM_MAX_TOKENS
+from metrics import EMBED_CALLS, LLM_CALLS, PROVIDER_LATENCY, record_usage
+from tracing import span
 openai.api_key = OPENAI_API_KEY
+# the rate-limit scheduler handles 429s (pause + requeue); SDK retries would hide them from it
+openai.max_retries = 0
+
+
+def _get(obj, key, default=None):
+    """Field access that works for both dict responses and SDK objects."""
+    return obj.get(key, default) if isinstance(obj, dict) else getattr(obj, key, default)
+
+
+def _create(resource, meta: Optional[Dict[str, Any]], **kwargs):
+    """
+    Call `resource.create`, capturing the provider's response headers
+    (x-ratelimit-*) and token usage into `meta` for the rate-limit scheduler.
+    """
+    raw_api = getattr(resource, "with_raw_response", None)
+    if raw_api is None:
+        resp = resource.create(**kwargs)
+    else:
+        raw = raw_api.create(**kwargs)
+        if meta is not None:
+            meta["headers"] = {k.lower(): v for k, v in raw.headers.items()}
+        resp = raw.parse()
+    if meta is not None:
+        usage = _get(resp, "usage")
+        if usage is not None:
+            meta["tokens"] = _get(usage, "total_tokens")
+    return resp
+
 
 class Embedder:
     def __init__(self):
         pass
 
-    def embed_text(self, text: str):
+    def embed_text(self, text: str, meta: Optional[Dict[str, Any]] = None):
         """
-        Synchronous embedding (wraps OpenAI). For large batches, implement batching.
+        Synchronous embedding (wraps OpenAI).
         """
-        resp = openai.embeddings.create(model=EMBEDDING_MODEL, input=text)
-        emb = resp["data"][0]["embedding"]
-        return emb
+        return self.embed_documents([text], meta)[0]
 
-    def embed_documents(self, texts: list):
-        # NOTE: this calls OpenAI in a loop; consider using batch embeddings if available
-        return [self.embed_text(t) for t in texts]
+    def embed_documents(self, texts: List[str], meta: Optional[Dict[str, Any]] = None):
+        """
+        One provider call for the whole list (the caller keeps batches within
+        the provider's per-request input limit).
+        """
+        try:
+            with PROVIDER_LATENCY.labels("embed").time(), span("embedding.create", **{"llm.model": EMBEDDING_MODEL, "embedding.inputs": len(texts)}):
+                resp = _create(openai.embeddings, meta, model=EMBEDDING_MODEL, input=texts)
+        except Exception:
+            EMBED_CALLS.labels(EMBEDDING_MODEL, "error").inc()
+            raise
+        EMBED_CALLS.labels(EMBEDDING_MODEL, "ok").inc()
+        record_usage(EMBEDDING_MODEL, resp, kind="embedding")
+        data = sorted(_get(resp, "data", []), key=lambda d: _get(d, "index", 0))
+        return [list(_get(d, "embedding")) for d in data]
 
-    def fallback_llm(self, prompt: str):
+    def fallback_llm(self, prompt: str, model: str = LLM_MODEL, max_tokens: int = LLM_MAX_TOKENS,
+                     meta: Optional[Dict[str, Any]] = None):
         """
         A simple fallback LLM call (synchronous).
         Adjust to your async flow if needed.
         """
-        resp = openai.chat.completions.create(
-            model=LLM_MODEL,
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=512
-        )
+        try:
+            with PROVIDER_LATENCY.labels("llm").time(), span("llm.chat", **{"llm.model": model, "llm.max_tokens": max_tokens}):
+                resp = _create(
+                    openai.chat.completions, meta,
+                    model=model,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=max_tokens
+                )
+        except Exception:
+            LLM_CALLS.labels(model, "error").inc()
+            raise
+        LLM_CALLS.labels(model, "ok").inc()
+        record_usage(model, resp)
         # generic extraction
-        choices = resp.get("choices", [])
+        choices = _get(resp, "choices", [])
         if choices:
-            return choices[0].get("message", {}).get("content", "").strip()
+            message = _get(choices[0], "message", {})
+            return (_get(message, "content", "") or "").strip()
         return ""
@@ -1,12 +1,33 @@
 # embedding-service/main.py
-from fastapi import FastAPI, HTTPException, Header, Depends
+import asyncio
+from fastapi import FastAPI, HTTPException, Header, Depends, Request
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
-from config import API_KEY
-from embedder import Embedder  # your existing logic
+from typing import Optional, Dict, Any, List
+from config import API_KEY, LLM_MODEL, LLM_MAX_TOKENS, EMBEDDING_MODEL, EMBED_BATCH_SIZE
+from embeddings.embedder import Embedder  # your existing logic
+from singleflight import SingleFlight, prompt_key
+from scheduler import scheduler, SchedulerTimeout, PRIORITIES, INTERACTIVE, estimate_tokens
+import wire
+import tracing
+from metrics import (instrument, on_scrape, LLM_SINGLEFLIGHT_CALLS, LLM_SINGLEFLIGHT_COLLAPSED,
+                     LLM_SINGLEFLIGHT_INFLIGHT, LLM_SINGLEFLIGHT_HIT_RATIO)
 
 app = FastAPI(title="Embedding Service")
 embedder = Embedder()
+# identical concurrent prompts share one completion call
+llm_inflight = SingleFlight()
+instrument(app)
+tracing.instrument(app, api_key=API_KEY)
+on_scrape(scheduler.collect_metrics)
+
+
+@on_scrape
+def _collect_singleflight():
+    stats = llm_inflight.stats()
+    LLM_SINGLEFLIGHT_CALLS.set(stats["calls"])
+    LLM_SINGLEFLIGHT_COLLAPSED.set(stats["collapsed"])
+    LLM_SINGLEFLIGHT_INFLIGHT.set(stats["inflight"])
+    LLM_SINGLEFLIGHT_HIT_RATIO.set(stats["collapse_ratio"])
 
 # --------------------- Auth check ---------------------
 def auth_check(request: Request):
@@ -18,26 +39,110 @@ def auth_check(request: Request):
 class EmbedRequest(BaseModel):
     content: str
 
+class EmbedBatchRequest(BaseModel):
+    texts: List[str]
+
 class LLMRequest(BaseModel):
     prompt: str
 
+# --------------------- Helpers ---------------------
+def _admission(request: Request):
+    """
+    Scheduling class and deadline of a call: `x-priority: interactive|bulk`
+    (chat vs ingestion, interactive by default) and optional `x-deadline-ms`.
+    """
+    name = request.headers.get("x-priority", "interactive").lower()
+    if name not in PRIORITIES:
+        raise HTTPException(status_code=400, detail=f"x-priority must be one of {sorted(PRIORITIES)}")
+    deadline = request.headers.get("x-deadline-ms")
+    try:
+        deadline = float(deadline) / 1000 if deadline else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="x-deadline-ms must be a number")
+    return PRIORITIES[name], deadline
+
+async def _scheduled(model: str, tokens: int, fn, priority: int, deadline: Optional[float], kind: str = "chat"):
+    """Run a provider call through the rate-limit scheduler; no capacity before the deadline -> 429."""
+    try:
+        return await scheduler.submit(model, tokens, fn, priority=priority, kind=kind, deadline=deadline)
+    except SchedulerTimeout as e:
+        raise HTTPException(status_code=429, detail=str(e),
+                            headers={"Retry-After": str(max(1, round(e.retry_after)))})
+
+async def _complete(prompt: str, priority: int = INTERACTIVE, deadline: Optional[float] = None) -> str:
+    """
+    Run the (blocking) completion in a thread, coalesced with identical
+    in-flight prompts. If every waiter disconnects the shared call is cancelled
+    (the worker thread finishes, but its result is discarded).
+    """
+    # per priority: a bulk caller must not get its completion through an interactive call, or vice versa
+    key = prompt_key("chat", prompt, model=LLM_MODEL, max_tokens=LLM_MAX_TOKENS, priority=priority)
+    tokens = estimate_tokens(prompt) + LLM_MAX_TOKENS
+    return await llm_inflight.do(
+        key, lambda: _scheduled(
+            LLM_MODEL, tokens,
+            lambda meta: asyncio.to_thread(embedder.fallback_llm, prompt, LLM_MODEL, LLM_MAX_TOKENS, meta),
+            priority, deadline,
+        )
+    )
+
+async def _embed(texts: List[str], priority: int, deadline: Optional[float]) -> List[List[float]]:
+    tokens = sum(estimate_tokens(t) for t in texts)
+    return await _scheduled(
+        EMBEDDING_MODEL, tokens, lambda meta: asyncio.to_thread(embedder.embed_documents, texts, meta),
+        priority, deadline, kind="embedding",
+    )
+
+def _vectors_response(request: Request, vectors: List[List[float]], key: str, payload):
+    media_type = wire.negotiate(request, offered=(wire.FLOAT32, wire.MSGPACK))
+    if media_type == wire.FLOAT32:
+        return wire.pack_vectors(vectors)
+    return wire.encode({key: payload}, media_type, single_float=True)
+
 # --------------------- Endpoints ---------------------
 @app.post("/llm_rag")
 async def llm_rag(req: LLMRequest, request: Request):
     auth_check(request)
     # This endpoint can be used for RAG-specific completions
     # Here we simply call fallback_llm for demonstration (could be specialized)
-    out = embedder.fallback_llm(req.prompt)
+    out = await _complete(req.prompt, *_admission(request))
     return {"llm_output": out}
 
 @app.post("/fallback_llm")
 async def fallback_llm(req: LLMRequest, request: Request):
     auth_check(request)
-    out = embedder.fallback_llm(req.prompt)
+    out = await _complete(req.prompt, *_admission(request))
     return {"output": out}
 
 @app.post("/embed")
 async def embed(req: EmbedRequest, request: Request):
+    """
+    JSON by default; `Accept: application/x-float32` returns the raw float32
+    vector and `application/x-msgpack` the same object with single-precision floats.
+    """
+    auth_check(request)
+    emb = (await _embed([req.content], *_admission(request)))[0]
+    return _vectors_response(request, [emb], "embedding", emb)
+
+@app.post("/embed_batch")
+async def embed_batch(req: EmbedBatchRequest, request: Request):
+    """
+    Embed many texts, EMBED_BATCH_SIZE per provider call. Ingestion sends
+    `x-priority: bulk`, so each sub-batch queues behind interactive traffic.
+    """
+    auth_check(request)
+    priority, deadline = _admission(request)
+    embeddings: List[List[float]] = []
+    for i in range(0, len(req.texts), EMBED_BATCH_SIZE):
+        embeddings.extend(await _embed(req.texts[i:i + EMBED_BATCH_SIZE], priority, deadline))
+    return _vectors_response(request, embeddings, "embeddings", embeddings)
+
+@app.get("/llm_inflight/stats")
+async def llm_inflight_stats(request: Request):
+    auth_check(request)
+    return llm_inflight.stats()
+
+@app.get("/scheduler/stats")
+async def scheduler_stats(request: Request):
     auth_check(request)
-    emb = embedder.embed_text(req.content)
-    return {"embedding": emb}
+    return scheduler.stats()
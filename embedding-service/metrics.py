@@ -0,0 +1,142 @@
+# embedding-service/metrics.py
+import time
+from typing import Callable, List
+
+from fastapi import FastAPI, Request, Response
+
+try:
+    from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+    print("⚠️ prometheus_client not available, /metrics will be empty.")
+
+
+class _NoopMetric:
+    """Stand-in used when prometheus_client is missing, so call sites never branch."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def dec(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+    def observe(self, value):
+        pass
+
+    def time(self):
+        return _NoopTimer()
+
+
+class _NoopTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+if not PROMETHEUS_AVAILABLE:
+    Counter = Gauge = Histogram = _NoopMetric
+
+# -----------------------------
+# HTTP
+# -----------------------------
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route", "status"],
+)
+
+# -----------------------------
+# Provider calls
+# -----------------------------
+LLM_CALLS = Counter("llm_calls_total", "Chat completions sent to the provider", ["model", "outcome"])
+EMBED_CALLS = Counter("embedding_calls_total", "Embedding requests sent to the provider", ["model", "outcome"])
+TOKENS = Counter("provider_tokens_total", "Tokens billed by the provider", ["model", "kind"])
+PROVIDER_LATENCY = Histogram(
+    "provider_call_duration_seconds", "Provider call latency", ["op"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60),
+)
+
+# -----------------------------
+# Rate-limit scheduler
+# -----------------------------
+SCHEDULER_WAIT = Histogram(
+    "scheduler_wait_seconds", "Time a provider call waited for rate-limit capacity", ["model", "priority"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+SCHEDULER_REJECTED = Counter(
+    "scheduler_rejected_total", "Calls that got no capacity before their deadline", ["model", "priority"],
+)
+SCHEDULER_QUEUED = Gauge("scheduler_queued", "Calls waiting for capacity", ["model", "priority"])
+SCHEDULER_AVAILABLE = Gauge("scheduler_available", "Capacity left in the bucket", ["model", "resource"])
+PROVIDER_RATE_LIMITED = Counter("provider_rate_limited_total", "429 responses from the provider", ["model"])
+
+# -----------------------------
+# Coalescing (identical in-flight prompts)
+# -----------------------------
+LLM_SINGLEFLIGHT_CALLS = Gauge("llm_singleflight_calls", "Completion requests seen by the single-flight layer")
+LLM_SINGLEFLIGHT_COLLAPSED = Gauge("llm_singleflight_collapsed", "Requests served by another caller's in-flight call")
+LLM_SINGLEFLIGHT_INFLIGHT = Gauge("llm_singleflight_inflight", "Distinct completions currently in flight")
+LLM_SINGLEFLIGHT_HIT_RATIO = Gauge("llm_singleflight_hit_ratio", "collapsed / calls")
+
+
+def record_usage(model: str, resp, kind: str = "chat"):
+    """Add the provider-reported token usage of `resp` to TOKENS (dict or SDK object)."""
+    usage = resp.get("usage") if isinstance(resp, dict) else getattr(resp, "usage", None)
+    if usage is None:
+        return
+    get = usage.get if isinstance(usage, dict) else (lambda k: getattr(usage, k, None))
+    if kind == "embedding":
+        TOKENS.labels(model, "embedding").inc(get("total_tokens") or get("prompt_tokens") or 0)
+    else:
+        TOKENS.labels(model, "prompt").inc(get("prompt_tokens") or 0)
+        TOKENS.labels(model, "completion").inc(get("completion_tokens") or 0)
+
+# -----------------------------
+# Exposition
+# -----------------------------
+_collectors: List[Callable[[], None]] = []
+
+
+def on_scrape(fn: Callable[[], None]):
+    """Register a callback that refreshes point-in-time gauges right before /metrics renders."""
+    _collectors.append(fn)
+    return fn
+
+
+def instrument(app: FastAPI):
+    """Add request-latency middleware and the /metrics endpoint to `app`."""
+
+    @app.middleware("http")
+    async def _observe_latency(request: Request, call_next):
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            # label by route template, not raw path, to keep cardinality bounded
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            REQUEST_LATENCY.labels(request.method, route, str(status)).observe(time.perf_counter() - started)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        for fn in _collectors:
+            try:
+                fn()
+            except Exception as e:
+                print(f"[Metrics] collector failed: {e}")
+        if not PROMETHEUS_AVAILABLE:
+            return Response("# prometheus_client not installed\n", media_type="text/plain")
+        return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,312 @@
+# embedding-service/scheduler.py
+import asyncio
+import heapq
+import itertools
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from config import (
+    LLM_RPM, LLM_TPM, EMBED_RPM, EMBED_TPM, BULK_RESERVE,
+    INTERACTIVE_DEADLINE, BULK_DEADLINE, RATE_LIMIT_BACKOFF,
+)
+from metrics import (SCHEDULER_WAIT, SCHEDULER_REJECTED, SCHEDULER_QUEUED, SCHEDULER_AVAILABLE,
+                     PROVIDER_RATE_LIMITED)
+
+INTERACTIVE = 0
+BULK = 1
+PRIORITIES = {"interactive": INTERACTIVE, "bulk": BULK}
+_PRIORITY_NAMES = {v: k for k, v in PRIORITIES.items()}
+
+
+class SchedulerTimeout(Exception):
+    """The request could not get provider capacity before its deadline."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"provider rate limit: no capacity before deadline (retry in {retry_after:.1f}s)")
+        self.retry_after = retry_after
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) used to reserve TPM before a call."""
+    return max(1, len(text) // 4)
+
+
+def _duration(value: Optional[str]) -> Optional[float]:
+    """Parse provider reset/retry values: "20ms", "1s", "6m0s", "1h2m3.5s" or plain seconds."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = re.findall(r"([\d.]+)(ms|h|m|s)", value)
+    if not parts:
+        return None
+    scale = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(n) * scale[u] for n, u in parts)
+
+
+class _Bucket:
+    """Token bucket refilled continuously at capacity per minute."""
+
+    def __init__(self, capacity: float):
+        self.capacity = float(capacity)
+        self.level = float(capacity)
+        self._at = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self._at) * self.capacity / 60.0)
+        self._at = now
+
+    def wait_for(self, amount: float, floor: float) -> float:
+        """Seconds until `amount` can be taken while leaving `floor` in the bucket."""
+        deficit = amount + floor - self.level
+        return max(0.0, deficit * 60.0 / self.capacity) if self.capacity else float("inf")
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "tokens", "future", "enqueued")
+
+    def __init__(self, priority: int, seq: int, tokens: int, future: asyncio.Future):
+        self.priority = priority
+        self.seq = seq
+        self.tokens = tokens
+        self.future = future
+        self.enqueued = time.monotonic()
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class _Lane:
+    """Requests/minute and tokens/minute buckets plus the priority queue for one model."""
+
+    def __init__(self, model: str, rpm: int, tpm: int):
+        self.model = model
+        self.requests = _Bucket(rpm)
+        self.tokens = _Bucket(tpm)
+        self.paused_until = 0.0
+        self.strikes = 0  # consecutive 429s, for backoff when the provider gives no retry-after
+        self.queue: List[_Waiter] = []
+        self.wake = asyncio.Event()
+        self.pump: Optional[asyncio.Task] = None
+        self.granted = {INTERACTIVE: 0, BULK: 0}
+        self.rejected = {INTERACTIVE: 0, BULK: 0}
+        self.wait_total = {INTERACTIVE: 0.0, BULK: 0.0}
+        self.rate_limited = 0
+
+    def _floor(self, priority: int, bucket: _Bucket) -> float:
+        # bulk work may not dip into the headroom kept for interactive requests
+        return bucket.capacity * BULK_RESERVE if priority == BULK else 0.0
+
+    def wait_time(self, priority: int, tokens: int, now: float) -> float:
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        tokens = min(tokens, self.tokens.capacity)  # an oversized call goes once the bucket is full
+        return max(self.paused_until - now,
+                   self.requests.wait_for(1, self._floor(priority, self.requests)),
+                   self.tokens.wait_for(tokens, self._floor(priority, self.tokens)))
+
+    def take(self, tokens: int):
+        self.requests.level -= 1
+        self.tokens.level -= min(tokens, self.tokens.capacity)
+
+
+class RateLimitScheduler:
+    """
+    Central gate for provider calls. Each model has RPM and TPM token buckets;
+    callers wait in a priority queue (interactive before bulk, FIFO within a
+    class) until the buckets can pay for their request, or fail with
+    SchedulerTimeout at their deadline. Bulk requests never take the last
+    BULK_RESERVE of either bucket, so chat keeps headroom during a reindex.
+    The buckets follow the provider's x-ratelimit-* headers (the quota is
+    shared with anything else using the same key), and a 429 pauses the
+    model until the provider's reset time before the request is retried.
+    """
+
+    def __init__(self):
+        self._lanes: Dict[str, _Lane] = {}
+        self._seq = itertools.count()
+
+    def lane(self, model: str, kind: str = "chat") -> _Lane:
+        if model not in self._lanes:
+            rpm, tpm = (EMBED_RPM, EMBED_TPM) if kind == "embedding" else (LLM_RPM, LLM_TPM)
+            self._lanes[model] = _Lane(model, rpm, tpm)
+        return self._lanes[model]
+
+    # -----------------------------
+    # Admission
+    # -----------------------------
+    async def _acquire(self, lane: _Lane, priority: int, tokens: int, deadline: float):
+        now = time.monotonic()
+        wait = lane.wait_time(priority, tokens, now)
+        if wait == 0 and not any(not w.future.done() and w.priority <= priority for w in lane.queue):
+            lane.take(tokens)
+            lane.granted[priority] += 1
+            SCHEDULER_WAIT.labels(lane.model, _PRIORITY_NAMES[priority]).observe(0)
+            return
+
+        remaining = deadline - now
+        if wait > remaining:
+            self._reject(lane, priority)
+            raise SchedulerTimeout(wait)
+
+        waiter = _Waiter(priority, next(self._seq), tokens, asyncio.get_running_loop().create_future())
+        heapq.heappush(lane.queue, waiter)
+        lane.wake.set()
+        if lane.pump is None or lane.pump.done():
+            lane.pump = asyncio.create_task(self._pump(lane))
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=max(0.0, remaining))
+        except asyncio.TimeoutError:
+            if not waiter.future.done():
+                waiter.future.cancel()
+                self._reject(lane, priority)
+                raise SchedulerTimeout(lane.wait_time(priority, tokens, time.monotonic()))
+        except asyncio.CancelledError:
+            if not waiter.future.cancel() and waiter.future.result():
+                # granted in the same tick the caller went away: give the capacity back
+                lane.requests.level += 1
+                lane.tokens.level += min(tokens, lane.tokens.capacity)
+            raise
+        waited = time.monotonic() - waiter.enqueued
+        lane.wait_total[priority] += waited
+        SCHEDULER_WAIT.labels(lane.model, _PRIORITY_NAMES[priority]).observe(waited)
+
+    def _reject(self, lane: _Lane, priority: int):
+        lane.rejected[priority] += 1
+        SCHEDULER_REJECTED.labels(lane.model, _PRIORITY_NAMES[priority]).inc()
+
+    async def _pump(self, lane: _Lane):
+        """Grant queued requests in priority order as the buckets refill."""
+        while lane.queue:
+            head = lane.queue[0]
+            if head.future.done():
+                heapq.heappop(lane.queue)
+                continue
+            wait = lane.wait_time(head.priority, head.tokens, time.monotonic())
+            if wait == 0:
+                heapq.heappop(lane.queue)
+                lane.take(head.tokens)
+                lane.granted[head.priority] += 1
+                head.future.set_result(True)
+                continue
+            # sleep until the head is affordable, or until a new (possibly higher-priority) arrival
+            lane.wake.clear()
+            try:
+                await asyncio.wait_for(lane.wake.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+    # -----------------------------
+    # Calls
+    # -----------------------------
+    async def submit(self, model: str, tokens: int, fn: Callable[[Dict[str, Any]], Awaitable[Any]],
+                     priority: int = INTERACTIVE, kind: str = "chat", deadline: Optional[float] = None) -> Any:
+        """
+        Run `fn(meta)` once the model has capacity. `fn` may put the provider's
+        response headers in meta["headers"] and its actual token usage in
+        meta["tokens"]; both are fed back into the buckets. A 429 from the
+        provider pauses the model and re-queues the call until its deadline.
+        """
+        lane = self.lane(model, kind)
+        if deadline is None:
+            deadline = INTERACTIVE_DEADLINE if priority == INTERACTIVE else BULK_DEADLINE
+        deadline_at = time.monotonic() + deadline
+        while True:
+            await self._acquire(lane, priority, tokens, deadline_at)
+            meta: Dict[str, Any] = {}
+            try:
+                result = await fn(meta)
+            except Exception as e:
+                if _status(e) != 429:
+                    raise
+                retry = self._rate_limited(lane, _headers_of(e))
+                if time.monotonic() + retry >= deadline_at:
+                    self._reject(lane, priority)
+                    raise SchedulerTimeout(retry) from e
+                continue
+            finally:
+                self._observe(lane, meta.get("headers"))
+            lane.strikes = 0
+            if meta.get("tokens") is not None:
+                # settle the estimate against what the provider actually counted
+                lane.tokens.level -= meta["tokens"] - min(tokens, lane.tokens.capacity)
+            return result
+
+    def _observe(self, lane: _Lane, headers):
+        """Follow the provider's own view of the quota (limits can change, other clients share it)."""
+        if not headers:
+            return
+        for bucket, suffix in ((lane.requests, "requests"), (lane.tokens, "tokens")):
+            limit = headers.get(f"x-ratelimit-limit-{suffix}")
+            remaining = headers.get(f"x-ratelimit-remaining-{suffix}")
+            try:
+                if limit is not None and float(limit) > 0:
+                    bucket.capacity = float(limit)
+                if remaining is not None:
+                    bucket.level = min(bucket.level, float(remaining))
+            except ValueError:
+                continue
+
+    def _rate_limited(self, lane: _Lane, headers) -> float:
+        """Pause the model after a 429 for as long as the provider asks; returns the pause in seconds."""
+        lane.rate_limited += 1
+        lane.strikes += 1
+        PROVIDER_RATE_LIMITED.labels(lane.model).inc()
+        headers = headers or {}
+        retry_ms = _duration(headers.get("retry-after-ms"))
+        retry = (retry_ms / 1000 if retry_ms else None) or _duration(headers.get("retry-after")) or max(
+            _duration(headers.get("x-ratelimit-reset-requests")) or 0,
+            _duration(headers.get("x-ratelimit-reset-tokens")) or 0,
+        ) or RATE_LIMIT_BACKOFF * 2 ** min(lane.strikes - 1, 5)
+        lane.paused_until = max(lane.paused_until, time.monotonic() + retry)
+        print(f"⏳ {lane.model}: provider rate limit, pausing {retry:.1f}s")
+        return retry
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        out = {}
+        for model, lane in self._lanes.items():
+            lane.requests.refill(now)
+            lane.tokens.refill(now)
+            queued = {name: 0 for name in PRIORITIES}
+            for w in lane.queue:
+                if not w.future.done():
+                    queued[_PRIORITY_NAMES[w.priority]] += 1
+            out[model] = {
+                "rpm_limit": lane.requests.capacity,
+                "tpm_limit": lane.tokens.capacity,
+                "requests_available": round(lane.requests.level, 1),
+                "tokens_available": round(lane.tokens.level),
+                "paused_for_s": round(max(0.0, lane.paused_until - now), 2),
+                "queued": queued,
+                "granted": {_PRIORITY_NAMES[p]: n for p, n in lane.granted.items()},
+                "rejected": {_PRIORITY_NAMES[p]: n for p, n in lane.rejected.items()},
+                "avg_wait_s": {
+                    _PRIORITY_NAMES[p]: round(lane.wait_total[p] / lane.granted[p], 4) if lane.granted[p] else 0.0
+                    for p in lane.granted
+                },
+                "rate_limited": lane.rate_limited,
+            }
+        return out
+
+    def collect_metrics(self):
+        for model, s in self.stats().items():
+            for name, n in s["queued"].items():
+                SCHEDULER_QUEUED.labels(model, name).set(n)
+            SCHEDULER_AVAILABLE.labels(model, "requests").set(s["requests_available"])
+            SCHEDULER_AVAILABLE.labels(model, "tokens").set(s["tokens_available"])
+
+
+def _status(e: Exception) -> Optional[int]:
+    status = getattr(e, "status_code", None) or getattr(getattr(e, "response", None), "status_code", None)
+    return int(status) if status is not None else None
+
+
+def _headers_of(e: Exception):
+    return getattr(getattr(e, "response", None), "headers", None)
+
+
+scheduler = RateLimitScheduler()
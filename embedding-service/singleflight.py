@@ -0,0 +1,67 @@
+# embedding-service/singleflight.py
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    In-flight request table: concurrent calls with the same key wait on one
+    upstream call instead of each making their own.
+    - A waiter that disconnects/cancels does not cancel the shared call.
+    - When the last waiter goes away, the shared call is cancelled.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, _Call] = {}
+        self.calls = 0       # total requests seen
+        self.upstream = 0    # requests that started an upstream call
+        self.collapsed = 0   # requests served by someone else's call
+        self.cancelled = 0   # upstream calls abandoned by all waiters
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        call = self._inflight.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._inflight[key] = call
+            self.upstream += 1
+            call.task.add_done_callback(lambda _t, k=key, c=call: self._forget(k, c))
+        else:
+            self.collapsed += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+                self.cancelled += 1
+                self._forget(key, call)
+
+    def _forget(self, key: Hashable, call: _Call):
+        if self._inflight.get(key) is call:
+            del self._inflight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "upstream": self.upstream,
+            "collapsed": self.collapsed,
+            "cancelled": self.cancelled,
+            "inflight": len(self._inflight),
+            "collapse_ratio": round(self.collapsed / self.calls, 4) if self.calls else 0.0,
+        }
+
+
+def prompt_key(kind: str, prompt: str, **params) -> tuple:
+    """Key on whitespace-normalized prompt plus every model parameter that changes the output."""
+    return (kind, " ".join(prompt.split()), tuple(sorted(params.items())))
@@ -0,0 +1,6 @@
+# embedding-service/tests/conftest.py
+"""Modules are imported the way the service imports them (`from config import ...`)."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,123 @@
+# embedding-service/tests/test_scheduler.py
+import asyncio
+
+import pytest
+
+import scheduler as scheduler_module
+from scheduler import BULK, INTERACTIVE, RateLimitScheduler, SchedulerTimeout, _Bucket
+
+
+class RateLimited(Exception):
+    """Stands in for the SDK's 429 error: status_code plus a response carrying headers."""
+
+    def __init__(self, headers):
+        super().__init__("429")
+        self.status_code = 429
+        self.response = type("Response", (), {"headers": headers})()
+
+
+def _empty_lane(sched, rpm):
+    """A lane with no requests left, refilling at `rpm` per minute."""
+    lane = sched.lane("test-model")
+    lane.requests = _Bucket(rpm)
+    lane.requests.level = 0.0
+    return lane
+
+
+def test_interactive_is_granted_before_bulk_queued_earlier(monkeypatch):
+    monkeypatch.setattr(scheduler_module, "BULK_RESERVE", 0.0)
+
+    async def run():
+        sched = RateLimitScheduler()
+        _empty_lane(sched, rpm=1200)  # one request every 50 ms
+        order = []
+
+        def call(name):
+            async def fn(meta):
+                order.append(name)
+                return name
+            return fn
+
+        bulk = asyncio.create_task(sched.submit("test-model", 1, call("bulk"), priority=BULK, deadline=5))
+        await asyncio.sleep(0)  # bulk is queued first
+        interactive = asyncio.create_task(sched.submit("test-model", 1, call("interactive"),
+                                                       priority=INTERACTIVE, deadline=5))
+        await asyncio.gather(bulk, interactive)
+        return order
+
+    assert asyncio.run(run()) == ["interactive", "bulk"]
+
+
+def test_bulk_leaves_the_reserve_to_interactive(monkeypatch):
+    monkeypatch.setattr(scheduler_module, "BULK_RESERVE", 0.5)
+
+    async def run():
+        sched = RateLimitScheduler()
+        lane = _empty_lane(sched, rpm=60)
+        lane.requests.level = 10.0  # under half of 60: bulk may not take any of it
+
+        async def fn(meta):
+            return "ok"
+
+        with pytest.raises(SchedulerTimeout):
+            await sched.submit("test-model", 1, fn, priority=BULK, deadline=0.05)
+        return await sched.submit("test-model", 1, fn, priority=INTERACTIVE, deadline=0.05)
+
+    assert asyncio.run(run()) == "ok"
+
+
+def test_request_that_cannot_get_capacity_before_its_deadline_is_rejected_without_calling():
+    async def run():
+        sched = RateLimitScheduler()
+        lane = _empty_lane(sched, rpm=60)  # next request in ~1 s
+        calls = []
+
+        async def fn(meta):
+            calls.append(1)
+
+        with pytest.raises(SchedulerTimeout) as err:
+            await sched.submit("test-model", 1, fn, priority=INTERACTIVE, deadline=0.1)
+        return calls, lane, err.value
+
+    calls, lane, err = asyncio.run(run())
+    assert calls == []
+    assert lane.rejected[INTERACTIVE] == 1
+    assert err.retry_after > 0.1
+
+
+def test_provider_429_pauses_the_model_and_retries():
+    async def run():
+        sched = RateLimitScheduler()
+        attempts = []
+
+        async def fn(meta):
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RateLimited({"retry-after-ms": "30"})
+            return "ok"
+
+        result = await sched.submit("test-model", 1, fn, priority=INTERACTIVE, deadline=5)
+        return result, attempts, sched.lane("test-model")
+
+    result, attempts, lane = asyncio.run(run())
+    assert result == "ok"
+    assert len(attempts) == 2
+    assert lane.rate_limited == 1
+    assert lane.strikes == 0
+
+
+def test_provider_headers_update_the_buckets():
+    async def run():
+        sched = RateLimitScheduler()
+
+        async def fn(meta):
+            meta["headers"] = {"x-ratelimit-limit-requests": "100", "x-ratelimit-remaining-requests": "7"}
+            meta["tokens"] = 50
+            return "ok"
+
+        await sched.submit("test-model", 10, fn)
+        return sched.lane("test-model")
+
+    lane = asyncio.run(run())
+    assert lane.requests.capacity == 100
+    assert lane.requests.level <= 7
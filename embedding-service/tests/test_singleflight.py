@@ -0,0 +1,99 @@
+# embedding-service/tests/test_singleflight.py
+import asyncio
+
+from singleflight import SingleFlight, prompt_key
+
+
+class Upstream:
+    """A slow upstream call that counts how often it starts and whether it was cancelled."""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.started = 0
+        self.cancelled = 0
+
+    async def __call__(self, value="answer"):
+        self.started += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return value
+
+
+def test_concurrent_identical_calls_share_one_upstream_call():
+    flight, upstream = SingleFlight(), Upstream()
+
+    async def run():
+        return await asyncio.gather(*(flight.do("k", upstream) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["answer"] * 5
+    assert upstream.started == 1
+    assert flight.stats() == {"calls": 5, "upstream": 1, "collapsed": 4, "cancelled": 0, "inflight": 0,
+                              "collapse_ratio": 0.8}
+
+
+def test_different_keys_and_later_calls_are_not_shared():
+    flight, upstream = SingleFlight(), Upstream(delay=0)
+
+    async def run():
+        await asyncio.gather(flight.do("a", upstream), flight.do("b", upstream))
+        await flight.do("a", upstream)  # the first "a" finished: nothing is cached
+
+    asyncio.run(run())
+    assert upstream.started == 3
+
+
+def test_errors_reach_every_waiter():
+    flight = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def run():
+        return await asyncio.gather(*(flight.do("k", failing) for _ in range(3)), return_exceptions=True)
+
+    errors = asyncio.run(run())
+    assert [str(e) for e in errors] == ["upstream down"] * 3
+    assert flight.stats()["inflight"] == 0
+
+
+def test_one_waiter_leaving_does_not_cancel_the_shared_call():
+    flight, upstream = SingleFlight(), Upstream()
+
+    async def run():
+        leaving = asyncio.create_task(flight.do("k", upstream))
+        staying = asyncio.create_task(flight.do("k", upstream))
+        await asyncio.sleep(0.01)
+        leaving.cancel()
+        return await staying
+
+    assert asyncio.run(run()) == "answer"
+    assert upstream.cancelled == 0
+
+
+def test_last_waiter_leaving_cancels_the_upstream_call():
+    flight, upstream = SingleFlight(), Upstream(delay=1)
+
+    async def run():
+        waiters = [asyncio.create_task(flight.do("k", upstream)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for w in waiters:
+            w.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)  # let the upstream task see its cancellation
+        # a new caller starts a fresh call instead of joining the abandoned one
+        return await flight.do("k", Upstream(delay=0))
+
+    assert asyncio.run(run()) == "answer"
+    assert upstream.cancelled == 1
+    assert flight.stats()["cancelled"] == 1
+
+
+def test_prompt_key_normalises_whitespace_and_keeps_parameters_apart():
+    assert prompt_key("rag", "What  is\nthis?", model="m", priority=0) == prompt_key("rag", "What is this?",
+                                                                                     priority=0, model="m")
+    assert prompt_key("rag", "q", model="m", priority=0) != prompt_key("rag", "q", model="m", priority=1)
+    assert prompt_key("rag", "q") != prompt_key("fallback", "q")
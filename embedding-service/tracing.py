@@ -0,0 +1,323 @@
+# embedding-service/tracing.py
+import contextvars
+import hmac
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import (SERVICE_NAME, TRACE_SAMPLE_RATE, TRACE_EXPORT_FILE, TRACE_COLLECTOR_URL,
+                    PROFILE_ENABLED, PROFILE_SAMPLE_RATE, PROFILE_SLOW_MS, PROFILE_DIR, PROFILE_KEEP)
+
+try:
+    from pyinstrument import Profiler
+    PYINSTRUMENT_AVAILABLE = True
+except ImportError:
+    PYINSTRUMENT_AVAILABLE = False
+    if PROFILE_ENABLED:
+        print("⚠️ pyinstrument not available, request profiling disabled.")
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_KINDS = {"internal": 1, "server": 2, "client": 3}
+
+_current: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+# -----------------------------
+# Spans
+# -----------------------------
+class Span:
+    __slots__ = ("name", "kind", "trace_id", "span_id", "parent_id", "sampled",
+                 "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, kind: str, trace_id: str, parent_id: Optional[str], sampled: bool,
+                 attributes: Dict[str, Any]):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def set(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """W3C traceparent -> (trace_id, parent_span_id, sampled), or None if absent/invalid."""
+    m = _TRACEPARENT.match((header or "").strip().lower())
+    if not m or m.group(1) == "0" * 32:
+        return None
+    return m.group(1), m.group(2), bool(int(m.group(3), 16) & 1)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def start_span(name: str, kind: str = "internal", remote: Optional[Tuple[str, str, bool]] = None,
+               **attributes) -> Span:
+    """New span under `remote` (an incoming traceparent) or the current span; a new trace otherwise."""
+    parent = current_span()
+    if remote:
+        trace_id, parent_id, sampled = remote
+    elif parent:
+        trace_id, parent_id, sampled = parent.trace_id, parent.span_id, parent.sampled
+    else:
+        trace_id, parent_id, sampled = os.urandom(16).hex(), None, random.random() < TRACE_SAMPLE_RATE
+    return Span(name, kind, trace_id, parent_id, sampled, attributes)
+
+
+def end_span(s: Span, error: Optional[BaseException] = None):
+    s.end_ns = time.time_ns()
+    if error is not None:
+        s.error = f"{type(error).__name__}: {error}"
+    if s.sampled:
+        exporter.submit(s)
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", remote: Optional[Tuple[str, str, bool]] = None, **attributes):
+    """Run the block inside a span that becomes the current span (works across awaits)."""
+    s = start_span(name, kind, remote, **attributes)
+    token = _current.set(s)
+    error = None
+    try:
+        yield s
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _current.reset(token)
+        end_span(s, error)
+
+
+# -----------------------------
+# Export
+# -----------------------------
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(s: Span) -> Dict[str, Any]:
+    out = {
+        "traceId": s.trace_id,
+        "spanId": s.span_id,
+        "name": s.name,
+        "kind": _KINDS.get(s.kind, 1),
+        "startTimeUnixNano": str(s.start_ns),
+        "endTimeUnixNano": str(s.end_ns),
+        "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()],
+        "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+    }
+    if s.parent_id:
+        out["parentSpanId"] = s.parent_id
+    return out
+
+
+class SpanExporter:
+    """
+    Background exporter. Finished spans are queued (dropped when the queue is
+    full, never blocking a request) and flushed in batches to a JSON-lines file
+    and/or an OTLP/HTTP collector (e.g. http://otel-collector:4318/v1/traces).
+    """
+
+    def __init__(self, path: str = TRACE_EXPORT_FILE, collector_url: str = TRACE_COLLECTOR_URL,
+                 max_queue: int = 10000, batch_size: int = 256, interval: float = 2.0):
+        self.path = path
+        self.collector_url = collector_url
+        self.batch_size = batch_size
+        self.interval = interval
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path or self.collector_url)
+
+    def submit(self, s: Span):
+        if not self.enabled:
+            return
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(s)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch: List[Span] = [self._queue.get()]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    def _flush(self, batch: List[Span]):
+        spans = [_otlp_span(s) for s in batch]
+        if self.path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    for item in spans:
+                        f.write(json.dumps({"service": SERVICE_NAME, **item}) + "\n")
+            except OSError as e:
+                print(f"[Tracing] Failed to write spans: {e}")
+        if self.collector_url:
+            body = {"resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+                "scopeSpans": [{"scope": {"name": "scalingChatbot"}, "spans": spans}],
+            }]}
+            req = urllib.request.Request(self.collector_url, data=json.dumps(body).encode(),
+                                         headers={"Content-Type": "application/json"}, method="POST")
+            try:
+                urllib.request.urlopen(req, timeout=5).close()
+            except Exception as e:
+                print(f"[Tracing] Collector export failed: {e}")
+
+
+exporter = SpanExporter()
+
+
+# -----------------------------
+# httpx propagation
+# -----------------------------
+async def _on_request(request):
+    s = start_span(f"HTTP {request.method} {request.url.path}", kind="client",
+                   **{"http.method": request.method, "http.url": str(request.url)})
+    request.headers["traceparent"] = s.traceparent()
+    request.extensions["trace_span"] = s
+
+
+async def _on_response(response):
+    s = response.request.extensions.pop("trace_span", None)
+    if s is not None:
+        s.set("http.status_code", response.status_code)
+        end_span(s, RuntimeError(f"HTTP {response.status_code}") if response.status_code >= 500 else None)
+
+
+def httpx_event_hooks():
+    """event_hooks for an httpx.AsyncClient: a client span per call and a traceparent header."""
+    return {"request": [_on_request], "response": [_on_response]}
+
+
+def merge_event_hooks(*hooks: Dict[str, list]) -> Dict[str, list]:
+    merged: Dict[str, list] = {"request": [], "response": []}
+    for h in hooks:
+        for kind, fns in h.items():
+            merged[kind].extend(fns)
+    return merged
+
+
+# -----------------------------
+# Profiling (opt-in)
+# -----------------------------
+@contextmanager
+def profiled(name: str, force: bool = False):
+    """
+    Sample a CPU profile of the block when profiling is enabled and this request
+    is sampled (PROFILE_SAMPLE_RATE) or explicitly asked for one (`force`).
+    The profile is kept only if the block took >= PROFILE_SLOW_MS (or was
+    forced), so PROFILE_DIR ends up holding the slowest requests.
+    """
+    if not (PROFILE_ENABLED and PYINSTRUMENT_AVAILABLE) or not (force or random.random() < PROFILE_SAMPLE_RATE):
+        yield
+        return
+    profiler = Profiler(async_mode="enabled")
+    started = time.perf_counter()
+    profiler.start()
+    try:
+        yield
+    finally:
+        profiler.stop()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if force or elapsed_ms >= PROFILE_SLOW_MS:
+            _save_profile(profiler, name, elapsed_ms)
+
+
+def _save_profile(profiler, name: str, elapsed_ms: float):
+    s = current_span()
+    trace_id = s.trace_id if s else "notrace"
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", name)[:60]
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    # zero-padded duration first, so a name sort orders profiles by slowness
+    path = os.path.join(PROFILE_DIR, f"{int(elapsed_ms):08d}ms-{int(time.time())}-{safe}-{trace_id}.html")
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(profiler.output_html())
+    except OSError as e:
+        print(f"[Profiler] Failed to save profile: {e}")
+        return
+    if s:
+        s.set("profile.path", path)
+    print(f"[Profiler] {name} took {elapsed_ms:.0f} ms, profile saved to {path}")
+    # keep only the PROFILE_KEEP slowest
+    files = sorted(f for f in os.listdir(PROFILE_DIR) if f.endswith(".html"))
+    for old in files[:-PROFILE_KEEP] if PROFILE_KEEP > 0 else []:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, old))
+        except OSError:
+            pass
+
+
+# -----------------------------
+# FastAPI
+# -----------------------------
+def instrument(app, api_key: Optional[str] = None):
+    """
+    Continue the caller's trace (traceparent header) in a server span per request,
+    and profile it when enabled. `x-profile: 1` forces a profile only for callers
+    presenting `api_key` (x-api-key); everyone else is just sampled.
+    """
+
+    def _may_force(request) -> bool:
+        key = request.headers.get("x-api-key")
+        return bool(api_key and key) and hmac.compare_digest(key.encode(), api_key.encode())
+
+    @app.middleware("http")
+    async def _trace_request(request, call_next):
+        remote = parse_traceparent(request.headers.get("traceparent"))
+        name = f"{request.method} {request.url.path}"
+        with span(name, kind="server", remote=remote, **{"http.method": request.method}) as s:
+            with profiled(name, force=request.headers.get("x-profile") == "1" and _may_force(request)):
+                response = await call_next(request)
+            route = getattr(request.scope.get("route"), "path", None)
+            if route:
+                s.name = f"{request.method} {route}"
+            s.set("http.status_code", response.status_code)
+            response.headers["traceparent"] = s.traceparent()
+            return response
@@ -0,0 +1,178 @@
+# index_versions.py
+"""
+Blue/green versions of RAGEngine's global FAISS index.
+
+Each full rebuild goes to its own directory, faiss_redis/versions/<name>/,
+and the alias file faiss_redis/CURRENT says which version readers use:
+
+    {"current": "versions/v20260101-120000-000", "previous": "versions/v...", "flipped_at": ...}
+
+The alias is replaced atomically (write to a temp file, fsync, os.replace),
+so a reader always sees either the old or the new version, never a partial
+one. The previous version stays on disk for rollback. Without an alias file
+the index at the top of faiss_redis (the pre-versioning layout) is current.
+
+Writers of the global index (uploads, rebuilds, rollbacks, deletes) may run
+in different processes (the server and reindex.py), so they also take
+WriteLock, an flock on faiss_redis/.write.lock.
+"""
+import fcntl
+import json
+import os
+import shutil
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+from config import REINDEX_VALIDATION_SAMPLES, REINDEX_MIN_SELF_RECALL, REINDEX_MIN_DOC_RATIO
+
+ALIAS_FILE = "CURRENT"
+VERSIONS_DIR = "versions"
+LEGACY = "."  # the unversioned index at the top of faiss_redis
+WRITE_LOCK_FILE = ".write.lock"
+
+
+def read_alias(root: str) -> Dict[str, Optional[str]]:
+    try:
+        with open(os.path.join(root, ALIAS_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"current": LEGACY, "previous": None}
+
+
+def alias_mtime(root: str) -> Optional[int]:
+    try:
+        return os.stat(os.path.join(root, ALIAS_FILE)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def write_alias(root: str, current: str, previous: Optional[str]):
+    """Point readers at `current` in one atomic step."""
+    path = os.path.join(root, ALIAS_FILE)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"current": current, "previous": previous, "flipped_at": time.time()}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    try:  # make the rename itself durable
+        fd = os.open(root, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+
+class WriteLock:
+    """
+    Cross-process exclusive lock on the global index. Acquired without
+    blocking (try_acquire) so an async caller can poll and stay cancellable;
+    the OS drops it if the holder dies.
+    """
+
+    def __init__(self, root: str):
+        self.path = os.path.join(root, WRITE_LOCK_FILE)
+        self._file = None
+
+    def try_acquire(self) -> bool:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        f = open(self.path, "a")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            f.close()
+            return False
+        self._file = f
+        return True
+
+    def release(self):
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+
+def resolve(root: str, name: str) -> str:
+    return os.path.normpath(os.path.join(root, name))
+
+
+def new_version(root: str) -> str:
+    """Name (relative to root) for a fresh shadow directory."""
+    now = time.time()
+    name = os.path.join(VERSIONS_DIR, time.strftime("v%Y%m%d-%H%M%S", time.gmtime(now)) + f"-{int(now * 1000) % 1000:03d}")
+    os.makedirs(resolve(root, name), exist_ok=False)
+    return name
+
+
+def prune(root: str, keep):
+    """Delete every version (including a legacy top-level index) other than those in `keep`."""
+    keep = {os.path.normpath(k) for k in keep if k}
+    base = os.path.join(root, VERSIONS_DIR)
+    for name in os.listdir(base) if os.path.isdir(base) else []:
+        rel = os.path.join(VERSIONS_DIR, name)
+        if rel not in keep:
+            shutil.rmtree(os.path.join(base, name), ignore_errors=True)
+            print(f"🧹 Removed old index version '{rel}'")
+    if LEGACY not in keep:
+        for name in os.listdir(root):
+            if name.startswith("faiss_index."):
+                os.remove(os.path.join(root, name))
+
+
+def discard(root: str, name: str):
+    shutil.rmtree(resolve(root, name), ignore_errors=True)
+
+
+def drop(root: str):
+    """
+    Delete the versions the alias refers to (or the legacy top-level index)
+    and the alias itself. Shadow versions still being built and anything else
+    under `root` (partitions) are left alone.
+    """
+    alias = read_alias(root)
+    for name in (alias.get("current"), alias.get("previous")):
+        if name and name != LEGACY:
+            discard(root, name)
+    for name in os.listdir(root) if os.path.isdir(root) else []:
+        if name.startswith("faiss_index.") or name == ALIAS_FILE:
+            os.remove(os.path.join(root, name))
+
+
+def validate(store, current_count: int = 0) -> Dict[str, float]:
+    """
+    Checks a freshly built store before it may become current:
+      - it is non-empty and the FAISS ids all map to docstore entries
+      - it is not much smaller than the index it replaces (REINDEX_MIN_DOC_RATIO),
+        which catches a rebuild from a half-synced or wrong source folder
+      - sampled stored vectors find themselves as nearest neighbour
+        (REINDEX_MIN_SELF_RECALL), which catches a broken or mis-trained index
+    Raises ValueError with the reason; returns the measurements otherwise.
+    """
+    import quantized_index
+
+    n = store.index.ntotal
+    if n == 0:
+        raise ValueError("new index is empty")
+    if len(store.index_to_docstore_id) != n:
+        raise ValueError(f"index has {n} vectors but {len(store.index_to_docstore_id)} docstore ids")
+    if current_count and n < current_count * REINDEX_MIN_DOC_RATIO:
+        raise ValueError(f"new index has {n} vectors, under {REINDEX_MIN_DOC_RATIO:.0%} of the current {current_count}")
+
+    ids = np.random.default_rng(0).choice(n, size=min(n, REINDEX_VALIDATION_SAMPLES), replace=False)
+    exact = getattr(store, "exact_vectors", None)
+    vectors = exact.rows(ids) if exact is not None else None
+    if vectors is None:
+        vectors = np.stack([store.index.reconstruct(int(i)) for i in ids])
+    hits = 0
+    for i, vec in zip(ids, vectors):
+        D, I = quantized_index.search(store, vec.reshape(1, -1).astype(np.float32), 1)
+        # a duplicate chunk elsewhere in the index is as good a hit as the chunk itself
+        hits += int(I[0][0] == i or D[0][0] <= 1e-6)
+    recall = hits / len(ids)
+    if recall < REINDEX_MIN_SELF_RECALL:
+        raise ValueError(f"self-retrieval recall {recall:.2f} below {REINDEX_MIN_SELF_RECALL}")
+    return {"vectors": n, "self_recall": recall}
@@ -9,3 +9,55 @@ SERVICE_API_KEY = os.environ.get("SERVICE_API_KEY", "default-langgraph-key")
 # Endpoints for RAG + Embedding microservices
 RAG_SERVICE_URL = os.environ.get("RAG_SERVICE_URL", "http://rag-service:8001")
 EMBEDDING_SERVICE_URL = os.environ.get("EMBEDDING_SERVICE_URL", "http://embedding-service:8002")
+LANGGRAPH_API_KEY = os.environ.get("LANGGRAPH_API_KEY", SERVICE_API_KEY)
+OUTBOUND_API_KEY = os.environ.get("OUTBOUND_API_KEY", SERVICE_API_KEY)
+HTTPX_TIMEOUT = float(os.environ.get("HTTPX_TIMEOUT", 30.0))
+
+# Pooled inter-service HTTP clients (one per upstream, opened/closed by the app lifespan)
+UPSTREAM_MAX_CONNECTIONS = int(os.environ.get("UPSTREAM_MAX_CONNECTIONS", 100))
+UPSTREAM_MAX_KEEPALIVE = int(os.environ.get("UPSTREAM_MAX_KEEPALIVE", 20))
+# keep below the upstream's own idle timeout (uvicorn --timeout-keep-alive)
+UPSTREAM_KEEPALIVE_EXPIRY = float(os.environ.get("UPSTREAM_KEEPALIVE_EXPIRY", 60))
+UPSTREAM_POOL_TIMEOUT = float(os.environ.get("UPSTREAM_POOL_TIMEOUT", 5))  # wait for a free connection
+# per-upstream connection limits, e.g. "rag=50,embedding=20"
+UPSTREAM_LIMITS = {
+    name.strip(): int(limit)
+    for name, _, limit in (item.partition("=") for item in os.environ.get("UPSTREAM_LIMITS", "").split(","))
+    if name.strip() and limit.strip()
+}
+UPSTREAM_HTTP2 = os.environ.get("UPSTREAM_HTTP2", "0") in ("1", "true", "True")  # needs the h2 package
+# h2c: plain-http upstreams served by an HTTP/2 server (e.g. hypercorn); uvicorn speaks HTTP/1.1 only
+UPSTREAM_HTTP2_PRIOR_KNOWLEDGE = os.environ.get("UPSTREAM_HTTP2_PRIOR_KNOWLEDGE", "0") in ("1", "true", "True")
+
+# Query router: send small talk straight to generation, skipping retrieval
+ROUTER_ENABLED = os.environ.get("ROUTER_ENABLED", "1") not in ("0", "false", "False")
+ROUTER_SMALLTALK_MAX_WORDS = int(os.environ.get("ROUTER_SMALLTALK_MAX_WORDS", 8))
+ROUTER_FOLLOWUP_MAX_WORDS = int(os.environ.get("ROUTER_FOLLOWUP_MAX_WORDS", 6))
+
+# Context packing: what rag_generate sends to the LLM (see nodes/context_packer.py)
+CONTEXT_CANDIDATES = int(os.environ.get("CONTEXT_CANDIDATES", 10))  # matches requested from /search
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", 1500))
+CONTEXT_MIN_SCORE_RATIO = float(os.environ.get("CONTEXT_MIN_SCORE_RATIO", 0.5))  # vs the best match
+CONTEXT_SCORE_GAP = float(os.environ.get("CONTEXT_SCORE_GAP", 0.3))  # cut at the first drop this large
+CONTEXT_MMR_LAMBDA = float(os.environ.get("CONTEXT_MMR_LAMBDA", 0.7))  # 1.0 = relevance only
+CONTEXT_DUPLICATE_SIMILARITY = float(os.environ.get("CONTEXT_DUPLICATE_SIMILARITY", 0.85))
+CONTEXT_MIN_OVERLAP = int(os.environ.get("CONTEXT_MIN_OVERLAP", 20))  # characters shared to merge chunks
+
+# Speculative execution: start the fallback answer in parallel with /search and cancel whichever
+# branch decide_node does not pick (the speculative fallback is generated without retrieved context)
+SPECULATIVE_EXECUTION = os.environ.get("SPECULATIVE_EXECUTION", "0") in ("1", "true", "True")
+SPECULATION_BUDGET_PER_MINUTE = float(os.environ.get("SPECULATION_BUDGET_PER_MINUTE", 30))  # wasted calls allowed
+SPECULATION_MIN_FALLBACK_RATE = float(os.environ.get("SPECULATION_MIN_FALLBACK_RATE", 0.2))
+
+# Tracing: W3C traceparent propagation; spans go to a JSON-lines file and/or an OTLP/HTTP collector
+SERVICE_NAME = os.environ.get("SERVICE_NAME", "langgraph-service")
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", 1.0))
+TRACE_EXPORT_FILE = os.environ.get("TRACE_EXPORT_FILE", "")  # e.g. traces/langgraph-service.jsonl
+TRACE_COLLECTOR_URL = os.environ.get("TRACE_COLLECTOR_URL", "")  # e.g. http://otel-collector:4318/v1/traces
+
+# Opt-in sampled CPU profiling (pyinstrument); keeps the PROFILE_KEEP slowest requests
+PROFILE_ENABLED = os.environ.get("PROFILE_ENABLED", "0") in ("1", "true", "True")
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0.05))
+PROFILE_SLOW_MS = float(os.environ.get("PROFILE_SLOW_MS", 2000))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", 20))
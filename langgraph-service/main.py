@@ -1,12 +1,32 @@
 # langgraph-service/main.py
 import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, HTTPException
 from pydantic import BaseModel
 from typing import Optional, Dict, Any, List
 from nodes.langgraph_nodes import LangGraphNodes
+from nodes.query_router import router
+from nodes.speculation import speculation
 from config import LANGGRAPH_API_KEY
+from metrics import instrument
+from http_clients import clients
+import tracing
+import wire
 
-app = FastAPI(title="LangGraph Service")
+nodes = LangGraphNodes()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # one pooled keep-alive client per upstream for the life of the process
+    clients.open()
+    yield
+    await clients.aclose()
+
+
+app = FastAPI(title="LangGraph Service", lifespan=lifespan)
+instrument(app)
+tracing.instrument(app, api_key=LANGGRAPH_API_KEY)
 
 class RunGraphRequest(BaseModel):
     session_id: str
@@ -15,6 +35,7 @@ class RunGraphRequest(BaseModel):
     file_meta: Optional[Dict[str, Any]] = None
     history: Optional[List[str]] = None
     extra: Optional[Dict[str, Any]] = None
+    fields: Optional[List[str]] = None  # response fields to return, e.g. ["events", "llm_output"]; all if omitted
 
 class RunGraphResponse(BaseModel):
     events: List[str]
@@ -26,11 +47,13 @@ def auth_check(request: Request):
     if not api_key or api_key != LANGGRAPH_API_KEY:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
-@app.post("/run_graph", response_model=RunGraphResponse)
+@app.post("/run_graph", response_model=RunGraphResponse,
+          responses={200: {"content": {wire.MSGPACK: {}}, "description": "Trimmed to `fields`"}})
 async def run_graph(req: RunGraphRequest, request: Request):
     """
     LangGraph orchestration endpoint.
-    Expects header: x-api-key
+    Expects header: x-api-key (and x-rag-scope, forwarded to the RAG service)
+    `fields` trims the response (the full final state is large); msgpack if accepted.
     """
     auth_check(request)
 
@@ -46,17 +69,38 @@ async def run_graph(req: RunGraphRequest, request: Request):
         "use_rag": False,
         "rag_answer": "",
         "confidence": 0.0,
-        "summary": ""
+        "summary": "",
+        # the orchestrator's signed session/tenant scope; the RAG service derives the partitions from it
+        "rag_scope": request.headers.get("x-rag-scope"),
     }
 
-    nodes = LangGraphNodes()  # creates httpx clients internally
     try:
         result_state = await nodes.run_graph(state)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"LangGraph run failed: {e}")
 
-    return RunGraphResponse(
+    # a returned Response bypasses response_model, so validate against it before encoding
+    response = RunGraphResponse(
         events=result_state.get("events", []),
         llm_output=result_state.get("llm_output"),
-        state=result_state
+        state=result_state,
     )
+    return wire.respond(request, wire.project(response.model_dump(), req.fields))
+
+@app.get("/router/stats")
+async def router_stats(request: Request):
+    """How many turns skipped retrieval (and the /search + embedding calls that saved)."""
+    auth_check(request)
+    return router.stats.snapshot()
+
+@app.get("/speculation/stats")
+async def speculation_stats(request: Request):
+    """How often the speculative fallback answer was used, and the waste budget left."""
+    auth_check(request)
+    return speculation.stats()
+
+@app.get("/http/stats")
+async def http_stats(request: Request):
+    """Connection-pool state and connection reuse per upstream service."""
+    auth_check(request)
+    return clients.stats()
@@ -0,0 +1,162 @@
+# langgraph-service/metrics.py
+import time
+from typing import Callable, List
+
+from fastapi import FastAPI, Request, Response
+
+try:
+    from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+    print("⚠️ prometheus_client not available, /metrics will be empty.")
+
+
+class _NoopMetric:
+    """Stand-in used when prometheus_client is missing, so call sites never branch."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def dec(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+    def observe(self, value):
+        pass
+
+    def time(self):
+        return _NoopTimer()
+
+
+class _NoopTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+if not PROMETHEUS_AVAILABLE:
+    Counter = Gauge = Histogram = _NoopMetric
+
+# -----------------------------
+# HTTP
+# -----------------------------
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route", "status"],
+)
+
+# -----------------------------
+# Graph
+# -----------------------------
+NODE_LATENCY = Histogram(
+    "graph_node_duration_seconds", "Latency of each LangGraph node", ["node"],
+    buckets=(0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+ROUTER_DECISIONS = Counter("router_decisions_total", "Query-router decisions", ["route", "reason"])
+SPECULATION_OUTCOMES = Counter(
+    "speculation_outcomes_total", "Speculative fallback branches",
+    ["outcome"],  # used | wasted | skipped_budget | skipped_rate
+)
+CONTEXT_TOKENS = Histogram(
+    "rag_context_tokens", "Estimated tokens of packed RAG context per generation",
+    buckets=(0, 100, 250, 500, 1000, 1500, 2000, 3000, 4000),
+)
+CONTEXT_PASSAGES = Counter(
+    "rag_context_passages_total", "Retrieved passages by what packing did with them",
+    ["outcome"],  # selected | below_cutoff | merged | duplicates | over_budget
+)
+
+# -----------------------------
+# Downstream calls
+# -----------------------------
+UPSTREAM_LATENCY = Histogram(
+    "upstream_call_duration_seconds", "Latency of calls to the RAG and embedding services",
+    ["endpoint", "outcome"],
+)
+UPSTREAM_POOL_CONNECTIONS = Gauge(
+    "upstream_pool_connections", "Pooled connections per upstream service", ["upstream", "state"],
+)
+UPSTREAM_POOL_QUEUED = Gauge("upstream_pool_queued_requests", "Requests waiting for a pooled connection", ["upstream"])
+UPSTREAM_CONNECTS = Counter(
+    "upstream_connections_opened_total", "New TCP connections and TLS handshakes per upstream", ["upstream", "kind"],
+)
+LLM_CALLS = Counter("llm_calls_total", "LLM completions requested from the embedding service", ["endpoint", "outcome"])
+_LLM_ENDPOINTS = ("/llm_rag", "/fallback_llm")
+
+
+async def _on_request(request):
+    request.extensions["metrics_started"] = time.perf_counter()
+
+
+async def _on_response(response):
+    request = response.request
+    started = request.extensions.get("metrics_started")
+    endpoint = request.url.path
+    outcome = "ok" if response.status_code < 400 else str(response.status_code)
+    if started is not None:
+        UPSTREAM_LATENCY.labels(endpoint, outcome).observe(time.perf_counter() - started)
+    if endpoint in _LLM_ENDPOINTS:
+        LLM_CALLS.labels(endpoint, outcome).inc()
+
+
+def httpx_event_hooks():
+    """event_hooks for an httpx.AsyncClient that time every outbound call."""
+    return {"request": [_on_request], "response": [_on_response]}
+
+
+def timed_node(name: str, fn):
+    """Wrap a graph node so each invocation is observed in NODE_LATENCY."""
+    async def _node(state):
+        with NODE_LATENCY.labels(name).time():
+            return await fn(state)
+    return _node
+
+# -----------------------------
+# Exposition
+# -----------------------------
+_collectors: List[Callable[[], None]] = []
+
+
+def on_scrape(fn: Callable[[], None]):
+    """Register a callback that refreshes point-in-time gauges right before /metrics renders."""
+    _collectors.append(fn)
+    return fn
+
+
+def instrument(app: FastAPI):
+    """Add request-latency middleware and the /metrics endpoint to `app`."""
+
+    @app.middleware("http")
+    async def _observe_latency(request: Request, call_next):
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            # label by route template, not raw path, to keep cardinality bounded
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            REQUEST_LATENCY.labels(request.method, route, str(status)).observe(time.perf_counter() - started)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        for fn in _collectors:
+            try:
+                fn()
+            except Exception as e:
+                print(f"[Metrics] collector failed: {e}")
+        if not PROMETHEUS_AVAILABLE:
+            return Response("# prometheus_client not installed\n", media_type="text/plain")
+        return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -2,8 +2,15 @@
 import asyncio
 from typing import Dict, Any, Optional
 from langgraph.graph import StateGraph, END
-from config import RAG_SERVICE_URL, EMBEDDING_SERVICE_URL, OUTBOUND_API_KEY, HTTPX_TIMEOUT
 import httpx
+from nodes.query_router import router, ROUTE_RETRIEVE
+from nodes import context_packer
+from nodes.speculation import speculation
+from config import CONTEXT_CANDIDATES
+from metrics import timed_node, ROUTER_DECISIONS, CONTEXT_TOKENS, CONTEXT_PASSAGES
+from http_clients import clients
+import tracing
+import wire
 
 class LangGraphNodes:
     """
@@ -12,24 +19,68 @@ class LangGraphNodes:
     Events are appended to state['events'] for orchestrator to forward to WebSocket.
     """
 
-    def __init__(self):
-        self._client = httpx.AsyncClient(timeout=HTTPX_TIMEOUT, headers={"x-api-key": OUTBOUND_API_KEY})
+    def __init__(self, rag_client: Optional[httpx.AsyncClient] = None,
+                 embedding_client: Optional[httpx.AsyncClient] = None):
+        # pooled keep-alive clients shared across requests; owned by the app lifespan
+        self._rag_client = rag_client
+        self._embedding_client = embedding_client
+
+    @property
+    def _rag(self) -> httpx.AsyncClient:
+        return self._rag_client or clients.get("rag")
+
+    @property
+    def _embedding(self) -> httpx.AsyncClient:
+        return self._embedding_client or clients.get("embedding")
+
+    @staticmethod
+    def _passage(match: Dict[str, Any]) -> "context_packer.Passage":
+        """A /search match as a packer passage; ids are `source~chunk_id`, which gives the document."""
+        text = match.get("text", match.get("metadata", {}).get("text", ""))
+        source, _, chunk = str(match.get("id") or "").rpartition("~")
+        position = match.get("position", match.get("metadata", {}).get("position"))
+        if position is None and source and chunk.isdigit():
+            position = int(chunk)  # chunks indexed before ids were content-derived
+        return context_packer.Passage(text, match.get("score", 0.0), source or None, position, item=match)
+
+    async def route_node(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Cheap routing stage: small talk goes straight to generation without a /search call.
+        File uploads always retrieve.
+        """
+        if state.get("type") == "file_uploaded":
+            route, reason = ROUTE_RETRIEVE, "file_uploaded"
+        else:
+            route, reason = router.route(state.get("session_id"), state.get("user_message", ""))
+        state["route"] = route
+        ROUTER_DECISIONS.labels(route, reason).inc()
+        state.setdefault("events", []).append(f"WS:route:{route}:{reason}")
+        return state
 
     async def retrieve_node(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """
         Call RAG /search for relevant docs and store rag_answer/confidence.
+        rag_answer is the packed context (adaptive k, merged overlaps, MMR,
+        token budget), not every match.
         """
         query = state.get("user_message", "")
+        # no namespaces: the RAG service searches every partition the forwarded scope may read
+        headers = {**wire.ACCEPT_COMPACT, **({"x-rag-scope": state["rag_scope"]} if state.get("rag_scope") else {})}
         try:
-            resp = await self._client.post(f"{RAG_SERVICE_URL}/search", json={"query": query, "top_k": 5})
+            resp = await self._rag.post("/search", headers=headers,
+                                        json={"query": query, "top_k": CONTEXT_CANDIDATES,
+                                              "fields": ["id", "score", "text", "position"]})
             resp.raise_for_status()
-            data = resp.json()
+            data = wire.decode(resp)
             # data['matches'] expected shape from RAG service
             matches = data.get("matches") or data.get("results") or []
-            # combine page content if present into rag_answer
-            context = "\n\n".join([m.get("text", m.get("metadata", {}).get("text", "")) for m in matches])
-            state["retrieved_docs"] = matches
+            context, packed, stats = context_packer.pack([self._passage(m) for m in matches])
+            state["retrieved_docs"] = [m for p in packed for m in p.items]
             state["rag_answer"] = context
+            state["context_stats"] = stats
+            CONTEXT_TOKENS.observe(stats["tokens"])
+            for outcome in ("selected", "below_cutoff", "merged", "duplicates", "over_budget"):
+                CONTEXT_PASSAGES.labels(outcome).inc(stats[outcome])
             # crude confidence – average of scores if provided
             scores = [m.get("score", 0.0) for m in matches]
             state["confidence"] = round(sum(scores) / len(scores), 3) if scores else 0.0
@@ -46,6 +97,7 @@ class LangGraphNodes:
         """
         use_rag = bool(state.get("rag_answer")) and float(state.get("confidence", 0)) >= 0.35
         state["use_rag"] = use_rag
+        speculation.observe(use_rag)
         state.setdefault("events", []).append("WS:rag:using" if use_rag else "WS:fallback:using")
         return state
 
@@ -59,7 +111,7 @@ class LangGraphNodes:
 
         try:
             # Try a dedicated RAG LLM endpoint first
-            resp = await self._client.post(f"{EMBEDDING_SERVICE_URL}/llm_rag", json={"prompt": prompt})
+            resp = await self._embedding.post("/llm_rag", json={"prompt": prompt})
             resp.raise_for_status()
             out = resp.json().get("llm_output") or resp.json().get("output") or resp.json().get("text")
             state["llm_output"] = out or "⚠️ RAG generation returned empty."
@@ -67,7 +119,7 @@ class LangGraphNodes:
         except Exception as e:
             # fallback to fallback_llm if error
             try:
-                resp2 = await self._client.post(f"{EMBEDDING_SERVICE_URL}/fallback_llm", json={"prompt": prompt})
+                resp2 = await self._embedding.post("/fallback_llm", json={"prompt": prompt})
                 resp2.raise_for_status()
                 out2 = resp2.json().get("output") or resp2.json().get("text")
                 state["llm_output"] = out2 or "⚠️ RAG fallback returned empty."
@@ -87,7 +139,7 @@ class LangGraphNodes:
         prompt = f"{short_context}\nUser: {user_msg}\nRespond conversationally."
 
         try:
-            resp = await self._client.post(f"{EMBEDDING_SERVICE_URL}/fallback_llm", json={"prompt": prompt})
+            resp = await self._embedding.post("/fallback_llm", json={"prompt": prompt})
             resp.raise_for_status()
             out = resp.json().get("output") or resp.json().get("text")
             state["llm_output"] = out or "⚠️ Fallback LLM returned empty."
@@ -97,6 +149,37 @@ class LangGraphNodes:
             state.setdefault("events", []).append(f"WS:generated:error:{e}")
         return state
 
+    async def speculative_node(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        retrieve -> decide -> generate with the fallback answer started up
+        front, on a copy of the state without retrieved context. The fallback
+        request is cancelled as soon as decide picks RAG; otherwise its answer
+        is used and the turn costs about one LLM call of latency.
+        """
+        shadow = {**state, "rag_answer": "", "summary": "", "events": []}
+        branch = asyncio.create_task(self.fallback_node(shadow))
+        used = False
+        try:
+            await self.retrieve_node(state)
+            await self.decide_node(state)
+            if state["use_rag"]:
+                branch.cancel()
+                return await self.rag_generate_node(state)
+            await branch
+            state["llm_output"] = shadow["llm_output"]
+            state.setdefault("events", []).extend(shadow["events"])
+            used = True
+            return state
+        finally:
+            if not branch.done():
+                branch.cancel()
+            speculation.settle(used)
+
+    def _after_route(self, state: Dict[str, Any]) -> str:
+        if state.get("route") != ROUTE_RETRIEVE:
+            return "fallback"
+        return "speculative" if speculation.allow() else "retrieve"
+
     async def memory_node(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """
         Return memory payload for orchestrator to persist.
@@ -107,29 +190,38 @@ class LangGraphNodes:
             state.setdefault("memory", {})["bot_reply"] = reply
         return state
 
-    async def run_graph(self, initial_state: Dict[str, Any]) -> Dict[str, Any]:
+    def build_graph(self):
         """
-        Compile and run a simple LangGraph StateGraph using the nodes above.
+        Compile a simple LangGraph StateGraph using the nodes above.
         """
+        def node(name, fn):
+            return timed_node(name, tracing.traced_node(name, fn))
+
         graph = StateGraph(dict)
-        graph.add_node("retrieve", self.retrieve_node)
-        graph.add_node("decide", self.decide_node)
-        graph.add_node("rag_generate", self.rag_generate_node)
-        graph.add_node("fallback", self.fallback_node)
-        graph.add_node("memory", self.memory_node)
+        graph.add_node("route", node("route", self.route_node))
+        graph.add_node("retrieve", node("retrieve", self.retrieve_node))
+        graph.add_node("decide", node("decide", self.decide_node))
+        graph.add_node("rag_generate", node("rag_generate", self.rag_generate_node))
+        graph.add_node("fallback", node("fallback", self.fallback_node))
+        graph.add_node("speculative", node("speculative", self.speculative_node))
+        graph.add_node("memory", node("memory", self.memory_node))
 
+        graph.add_conditional_edges("route", self._after_route)
         graph.add_edge("retrieve", "decide")
         graph.add_conditional_edges("decide", lambda s: "rag_generate" if s.get("use_rag") else "fallback")
         graph.add_edge("rag_generate", "memory")
         graph.add_edge("fallback", "memory")
+        graph.add_edge("speculative", "memory")
         graph.add_edge("memory", END)
 
-        graph.set_entry_point("retrieve")
-        compiled = graph.compile()
+        graph.set_entry_point("route")
+        return graph.compile()
 
+    async def run_graph(self, initial_state: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Compile and run the graph for one request.
+        """
+        compiled = self.build_graph()
         final_state = await compiled.ainvoke(initial_state)
         final_state.setdefault("events", final_state.get("events", []))
         return final_state
-
-    async def close(self):
-        await self._client.aclose()
@@ -1,76 +1,127 @@
 import asyncio
 from datetime import datetime, timezone
 from typing import Optional, List
-from langgraph.graph import StateGraph, END
-from langchain_core.messages import HumanMessage
 from utils import RWLock
+from query_router import router, ROUTE_RETRIEVE
+from speculation import speculation
+from config import CONTEXT_CANDIDATES
+import context_packer
+
+def _human(content: str):
+    from langchain_core.messages import HumanMessage
+    return HumanMessage(content=content)
+
+
+def _source_of(doc):
+    """Chunks split from the same loaded page share this key; only those may be merged."""
+    meta = getattr(doc, "metadata", None) or {}
+    source = meta.get("source")
+    return (source, meta.get("page")) if source is not None else None
+
 
 class LangGraphNodes:
 
+    @staticmethod
+    async def route_node(state: dict) -> dict:
+        """
+        Cheap routing stage: small talk skips retrieval and summarisation entirely.
+        """
+        route, reason = router.route(state.get("session_id"), state.get("user_message", ""))
+        state["route"] = route
+        state["route_reason"] = reason
+        print(f"[Router] {route} ({reason})")
+        return state
+
     @staticmethod
     async def retrieve_node(state: dict, ws: Optional = None) -> dict:
         """
         Retrieve relevant documents from RAG engine and summarize.
+        The candidates are packed (adaptive k, overlap merge, MMR, token
+        budget) before summarisation, so only the useful text is sent on.
         """
+        try:
+            await LangGraphNodes._search(state)
+            if state["rag_answer"]:
+                await LangGraphNodes._summarize(state, ws)
+        except Exception as e:
+            print("[Retrieve Node Error]", e)
+        return state
+
+    @staticmethod
+    async def _search(state: dict):
         rag = state.get("rag")
         query = state.get("user_message")
         state.update({"retrieved_docs": [], "rag_answer": "", "confidence": 0.0, "summary": ""})
 
+        rwlock: RWLock = state.get("rag_lock")
+        await rwlock.acquire_read()
         try:
-            rwlock: RWLock = state.get("rag_lock")
-            await rwlock.acquire_read()
+            # only the partitions this session may see: global, its tenant's and its own uploads
+            partitions = state.get("partitions") or rag.partitions_for_session(
+                state.get("session_id"), state.get("tenant_id"))
+            hits = await rag.similarity_search_with_score(query, k=CONTEXT_CANDIDATES, partitions=partitions,
+                                                          with_similarity=True)
+        finally:
+            await rwlock.release_read()
+
+        if not hits:
+            return
+
+        docs, scores, _ = zip(*hits)
+        # the packer's cut-offs need absolute similarities: the confidence is relative to this query's hits
+        context, packed, stats = context_packer.pack([
+            context_packer.Passage(d.page_content, similarity, _source_of(d), item=d)
+            for d, _, similarity in hits
+        ])
+        state["retrieved_docs"] = [d for p in packed for d in p.items]
+        state["rag_answer"] = context
+        state["context_stats"] = stats
+        state["confidence"] = round(sum(scores) / len(scores), 3) if scores else 0.5
+        print(f"[RAG] Retrieved {len(docs)} docs, packed {stats['selected']} passages "
+              f"({stats['tokens']}/{stats['budget']} tokens), confidence: {state['confidence']:.3f}")
+
+    @staticmethod
+    async def _summarize(state: dict, ws: Optional = None):
+        # Chunk summaries
+        summaries: List[str] = []
+        llm_calls = 0
+        all_text = state["rag_answer"]
+        max_chunk_size = 2000
+        total_chunks = (len(all_text) + max_chunk_size - 1) // max_chunk_size if all_text else 0
+
+        for idx, start in enumerate(range(0, len(all_text), max_chunk_size), start=1):
+            chunk_text = all_text[start:start + max_chunk_size]
+            summary_prompt = f"Summarize the following document excerpt briefly:\n{chunk_text}\nChunk summary:"
+            llm_calls += 1
             try:
-                docs_with_scores = await rag.similarity_search_with_score(query, k=10)
-            finally:
-                await rwlock.release_read()
-
-            if not docs_with_scores:
-                return state
-
-            docs, scores = zip(*docs_with_scores) if docs_with_scores else ([], [])
-            state["retrieved_docs"] = list(docs)
-            state["rag_answer"] = "\n\n".join([d.page_content for d in docs])
-            state["confidence"] = round(sum(scores) / len(scores), 3) if scores else 0.5
-            print(f"[RAG] Retrieved {len(docs)} docs, confidence: {state['confidence']:.3f}")
-
-            # Chunk summaries
-            summaries: List[str] = []
-            all_text = state["rag_answer"]
-            max_chunk_size = 2000
-            total_chunks = (len(all_text) + max_chunk_size - 1) // max_chunk_size if all_text else 0
-
-            for idx, start in enumerate(range(0, len(all_text), max_chunk_size), start=1):
-                chunk_text = all_text[start:start + max_chunk_size]
-                summary_prompt = f"Summarize the following document excerpt briefly:\n{chunk_text}\nChunk summary:"
-                try:
-                    resp = await state["llm"].ainvoke([HumanMessage(content=summary_prompt)])
-                    chunk_summary = getattr(resp, "content", "").strip()
-                except Exception:
-                    chunk_summary = ""
-                summaries.append(chunk_summary)
-                if ws:
-                    try:
-                        await ws.send_text(f"⏳ Summarizing chunk {idx}/{total_chunks}...")
-                    except Exception:
-                        pass
-                await asyncio.sleep(0.01)
-
-            if summaries:
-                combined_text = "\n\n".join([s for s in summaries if s])
-                final_prompt = f"Combine the following summaries (<=300 words):\n{combined_text}\nFinal summary:"
+                resp = await state["llm"].ainvoke([_human(summary_prompt)])
+                chunk_summary = getattr(resp, "content", "").strip()
+            except Exception:
+                chunk_summary = ""
+            summaries.append(chunk_summary)
+            if ws:
                 try:
-                    final_resp = await state["llm"].ainvoke([HumanMessage(content=final_prompt)])
-                    state["summary"] = getattr(final_resp, "content", "").strip()
+                    await ws.send_text(f"⏳ Summarizing chunk {idx}/{total_chunks}...")
                 except Exception:
-                    state["summary"] = combined_text
+                    pass
+            await asyncio.sleep(0.01)
 
-        except Exception as e:
-            print("[Retrieve Node Error]", e)
-        return state
+        if summaries:
+            combined_text = "\n\n".join([s for s in summaries if s])
+            final_prompt = f"Combine the following summaries (<=300 words):\n{combined_text}\nFinal summary:"
+            llm_calls += 1
+            try:
+                final_resp = await state["llm"].ainvoke([_human(final_prompt)])
+                state["summary"] = getattr(final_resp, "content", "").strip()
+            except Exception:
+                state["summary"] = combined_text
+        # what a small-talk turn saves by skipping this node
+        router.stats.record_retrieval(llm_calls)
 
     @staticmethod
     async def decide_node(state: dict) -> dict:
         state["use_rag"] = bool(state.get("rag_answer")) and float(state.get("confidence", 0)) >= 0.4
+        speculation.observe(state["use_rag"])
         print(f"[RAG Decision] Using {'RAG' if state['use_rag'] else 'Fallback'}")
         ws = state.get("ws")
         if ws:
@@ -80,6 +131,39 @@ class LangGraphNodes:
                 pass
         return state
 
+    @staticmethod
+    async def speculative_node(state: dict) -> dict:
+        """
+        retrieve -> decide -> generate with the fallback answer started up
+        front. The fallback branch runs on a copy of the state without
+        retrieved context; it is cancelled as soon as decide picks RAG, and
+        otherwise its answer is used (skipping summarisation, which only the
+        RAG branch needs). Fallback-heavy turns then cost about one LLM call
+        of latency instead of retrieval + summaries + generation.
+        """
+        branch = asyncio.create_task(LangGraphNodes.fallback_node({**state, "summary": ""}))
+        used = False
+        try:
+            try:
+                await LangGraphNodes._search(state)
+            except Exception as e:
+                print("[Retrieve Node Error]", e)
+            await LangGraphNodes.decide_node(state)
+            if state["use_rag"]:
+                branch.cancel()
+                try:
+                    await LangGraphNodes._summarize(state, state.get("ws"))
+                except Exception as e:
+                    print("[Retrieve Node Error]", e)
+                return await LangGraphNodes.rag_generate_node(state)
+            state["llm_output"] = (await branch)["llm_output"]
+            used = True
+            return state
+        finally:
+            if not branch.done():
+                branch.cancel()
+            speculation.settle(used)
+
     @staticmethod
     async def rag_generate_node(state: dict) -> dict:
         llm, db, sid = state["llm"], state["db"], state["session_id"]
@@ -88,7 +172,7 @@ class LangGraphNodes:
         conversation = "\n".join(hist)
         prompt = f"RAG Summary:\n{summary}\nConversation:\n{conversation}\nUser: {msg}"
         try:
-            resp = await llm.ainvoke([HumanMessage(content=prompt)])
+            resp = await llm.ainvoke([_human(prompt)])
             state["llm_output"] = getattr(resp, "content", "").strip()
         except Exception:
             state["llm_output"] = "⚠️ Failed to generate RAG response."
@@ -105,7 +189,7 @@ class LangGraphNodes:
             conv += f"\n\n[Uploaded File Summary]:\n{summary}"
         prompt = f"{conv}\nUser: {msg}"
         try:
-            resp = await llm.ainvoke([HumanMessage(content=prompt)])
+            resp = await llm.ainvoke([_human(prompt)])
             state["llm_output"] = getattr(resp, "content", "").strip()
         except Exception:
             state["llm_output"] = "⚠️ Fallback LLM failed."
@@ -122,18 +206,33 @@ class LangGraphNodes:
         return state
 
     @staticmethod
-    async def run_graph(state: dict) -> dict:
+    def _after_route(state: dict) -> str:
+        if state.get("route") != ROUTE_RETRIEVE:
+            return "fallback"
+        return "speculative" if speculation.allow() else "retrieve"
+
+    @staticmethod
+    def build_graph():
+        from langgraph.graph import StateGraph, END  # heavy; imported on first use, not at app startup
         graph = StateGraph(dict)
+        graph.add_node("route", LangGraphNodes.route_node)
         graph.add_node("retrieve", LangGraphNodes.retrieve_node)
         graph.add_node("decide", LangGraphNodes.decide_node)
         graph.add_node("rag_generate", LangGraphNodes.rag_generate_node)
         graph.add_node("fallback", LangGraphNodes.fallback_node)
+        graph.add_node("speculative", LangGraphNodes.speculative_node)
         graph.add_node("memory", LangGraphNodes.memory_node)
+        graph.add_conditional_edges("route", LangGraphNodes._after_route)
         graph.add_edge("retrieve", "decide")
         graph.add_conditional_edges("decide", lambda s: "rag_generate" if s.get("use_rag") else "fallback")
         graph.add_edge("rag_generate", "memory")
         graph.add_edge("fallback", "memory")
+        graph.add_edge("speculative", "memory")
         graph.add_edge("memory", END)
-        graph.set_entry_point("retrieve")
-        compiled_graph = graph.compile()
+        graph.set_entry_point("route")
+        return graph.compile()
+
+    @staticmethod
+    async def run_graph(state: dict) -> dict:
+        compiled_graph = LangGraphNodes.build_graph()
         return await compiled_graph.ainvoke(state)
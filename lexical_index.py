@@ -0,0 +1,149 @@
+# lexical_index.py
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# keep identifiers like "INV-2024-001", "report_v2.pdf" or "a/b/c" whole, and also index their parts
+_TOKEN = re.compile(r"\w+(?:[-./:]\w+)*")
+_PART = re.compile(r"[A-Za-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for tok in _TOKEN.findall(text.lower()):
+        tokens.append(tok)
+        parts = _PART.findall(tok)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class BM25Index:
+    """
+    In-memory inverted index with Okapi BM25 scoring, built alongside the vectors.
+    Postings are {term: {vector_id: term_frequency}}; per-doc length and metadata
+    are kept so lexical hits can be returned without touching the vector store.
+    """
+
+    def __init__(self, path: Optional[str] = None, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self.postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.doc_len: Dict[str, int] = {}
+        self.doc_terms: Dict[str, List[str]] = {}
+        self.metadata: Dict[str, Dict[str, Any]] = {}
+        self.total_len = 0
+        if path and os.path.exists(path):
+            self.load()
+
+    def __len__(self):
+        return len(self.doc_len)
+
+    # -----------------------------
+    # Write path
+    # -----------------------------
+    def add(self, vec_id: str, text: str, metadata: Optional[Dict[str, Any]] = None):
+        tf = Counter(tokenize(text))
+        with self._lock:
+            self._remove(vec_id)
+            for term, n in tf.items():
+                self.postings[term][vec_id] = n
+            length = sum(tf.values())
+            self.doc_len[vec_id] = length
+            self.doc_terms[vec_id] = list(tf)
+            self.metadata[vec_id] = metadata or {}
+            self.total_len += length
+
+    def remove(self, ids: Iterable[str]):
+        with self._lock:
+            for vec_id in ids:
+                self._remove(vec_id)
+
+    def _remove(self, vec_id: str):
+        if vec_id not in self.doc_len:
+            return
+        for term in self.doc_terms.pop(vec_id, []):
+            bucket = self.postings.get(term)
+            if bucket is not None:
+                bucket.pop(vec_id, None)
+                if not bucket:
+                    del self.postings[term]
+        self.total_len -= self.doc_len.pop(vec_id)
+        self.metadata.pop(vec_id, None)
+
+    # -----------------------------
+    # Read path
+    # -----------------------------
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
+        terms = set(tokenize(query))
+        with self._lock:
+            n_docs = len(self.doc_len)
+            if not n_docs or not terms:
+                return []
+            avg_len = self.total_len / n_docs
+            scores: Dict[str, float] = defaultdict(float)
+            for term in terms:
+                bucket = self.postings.get(term)
+                if not bucket:
+                    continue
+                idf = math.log(1 + (n_docs - len(bucket) + 0.5) / (len(bucket) + 0.5))
+                for vec_id, tf in bucket.items():
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_len[vec_id] / avg_len)
+                    scores[vec_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:top_k]
+
+    # -----------------------------
+    # Persistence
+    # -----------------------------
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = {"doc_terms": self.doc_terms, "metadata": self.metadata,
+                    "postings": self.postings, "doc_len": self.doc_len}
+            tmp = f"{self.path}.tmp"
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    def load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        with self._lock:
+            self.postings = defaultdict(dict, data["postings"])
+            self.doc_len = data["doc_len"]
+            self.doc_terms = data["doc_terms"]
+            self.metadata = data["metadata"]
+            self.total_len = sum(self.doc_len.values())
+        print(f"[Lexical] Loaded BM25 index with {len(self.doc_len)} chunks from '{self.path}'")
+
+
+def lexical_confidence(score: float, half: float) -> float:
+    """
+    Absolute 0..1 confidence for a raw BM25 score: score / (score + half), so a
+    score of `half` maps to 0.5. Unlike a score relative to the top hit, a weak
+    keyword match stays weak even when it is the best one.
+    """
+    return score / (score + half) if score > 0 else 0.0
+
+
+def is_decisive(hits: List[Tuple[str, float]], min_score: float, ratio: float) -> bool:
+    """The lexical top hit is strong on its own and clearly ahead of the runner-up."""
+    if not hits or hits[0][1] < min_score:
+        return False
+    return len(hits) == 1 or hits[0][1] >= ratio * hits[1][1]
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    fused: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, vec_id in enumerate(ranking):
+            fused[vec_id] += 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda kv: kv[1], reverse=True)
@@ -1,11 +1,14 @@
 import os
 import asyncio
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 
 from rag_engine import RAGEngine
 from db_postgres import AsyncPostgresDB
 from websocket_manager import WebSocketManager
+from query_router import router
+from speculation import speculation
 from config import POSTGRES_DSN, REDIS_URL
 
 # ============================================================
@@ -23,15 +26,43 @@ class AppServer:
         # Setup WebSocket route
         self.websocket_manager.setup_routes(self.app)
 
+        @self.app.get("/health")
+        async def health():
+            """Liveness: the process is up and serving."""
+            return {"status": "ok"}
+
+        @self.app.get("/ready")
+        async def ready():
+            """Readiness: 200 once the RAG index is loaded (or known to be absent), 503 until then."""
+            status = self.rag.readiness()
+            return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+        @self.app.get("/router/stats")
+        async def router_stats():
+            """How many turns skipped retrieval, and the LLM work that saved."""
+            return router.stats.snapshot()
+
+        @self.app.get("/speculation/stats")
+        async def speculation_stats():
+            """How often the speculative fallback answer was used, and the waste budget left."""
+            return speculation.stats()
+
+        @self.app.get("/search/batch/stats")
+        async def search_batch_stats():
+            """How many queries each batched FAISS search served."""
+            return self.rag.query_batcher.stats()
+
+        @self.app.get("/index/versions")
+        async def index_versions():
+            """Which global index version is live, and which one a rollback would restore."""
+            return self.rag.versions_info()
+
     @asynccontextmanager
     async def _lifespan(self, app: FastAPI):
-        """Initialize DB and RAG index at startup."""
+        """Initialize DB at startup; the RAG index loads in the background (see /ready)."""
         await self.db.init_db()
-        try:
-            await self.rag.init_redis()
-            await self.rag.load_index()
-        except FileNotFoundError:
-            print("⚠️ No existing RAG index found. Upload files to build it.")
+        await self.rag.init_redis()
+        self.rag.start_warm_up()
         # Start background task to monitor idle sessions
         asyncio.create_task(self.websocket_manager.monitor_idle_sessions())
         yield
@@ -0,0 +1,204 @@
+# quantized_index.py
+"""
+Quantized vector storage for RAGEngine's FAISS stores.
+
+The in-memory index holds compressed codes (fp16 / 8-bit / 4-bit scalar
+quantization or product quantization) instead of float32, and the
+full-precision vectors are kept on disk next to the index
+(`faiss_index.f32`, raw float32 rows). They are memory-mapped, so only the
+rows of the top candidates are read when re-ranking, and the page cache is
+shared by every worker on the node.
+"""
+import os
+from typing import List, Optional
+
+import numpy as np
+import faiss
+
+from config import VECTOR_QUANTIZATION, PQ_SUBQUANTIZERS, PQ_BITS, RERANK_EXACT, RERANK_FACTOR
+
+EXACT_FILE = "faiss_index.f32"
+
+_SQ_TYPES = {
+    "fp16": faiss.ScalarQuantizer.QT_fp16,
+    "sq8": faiss.ScalarQuantizer.QT_8bit,
+    "sq4": faiss.ScalarQuantizer.QT_4bit,
+}
+
+
+class ExactVectors:
+    """Append-only float32 rows on disk, memory-mapped for reads."""
+
+    def __init__(self, path: str, dim: int):
+        self.path = path
+        self.dim = dim
+        self._mmap: Optional[np.memmap] = None
+
+    def __len__(self):
+        return os.path.getsize(self.path) // (4 * self.dim) if os.path.exists(self.path) else 0
+
+    def append(self, vectors):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "ab") as f:
+            f.write(np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim).tobytes())
+
+    def write(self, vectors):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self._mmap = None
+        self.append(vectors)
+
+    def truncate(self, n: int):
+        with open(self.path, "r+b") as f:
+            f.truncate(n * 4 * self.dim)
+        self._mmap = None
+
+    def rows(self, ids: np.ndarray) -> Optional[np.ndarray]:
+        """Full-precision rows for `ids`; None if the file does not cover them (yet)."""
+        if not len(ids):
+            return np.zeros((0, self.dim), dtype=np.float32)
+        needed = int(ids.max()) + 1
+        if self._mmap is None or len(self._mmap) < needed:
+            n = len(self)
+            if n < needed:
+                return None
+            self._mmap = np.memmap(self.path, dtype=np.float32, mode="r", shape=(n, self.dim))
+        return np.asarray(self._mmap[ids])
+
+
+# -----------------------------
+# Index construction
+# -----------------------------
+def kind_of(index) -> str:
+    """The quantization an index uses, in VECTOR_QUANTIZATION terms."""
+    if isinstance(index, faiss.IndexScalarQuantizer):
+        for kind, qtype in _SQ_TYPES.items():
+            if index.sq.qtype == qtype:
+                return kind
+    if isinstance(index, faiss.IndexPQ):
+        return "pq"
+    return "none"
+
+
+def _pq_subquantizers(dim: int) -> int:
+    """Largest divisor of `dim` not above PQ_SUBQUANTIZERS (PQ needs dim % M == 0)."""
+    return max(m for m in range(1, min(PQ_SUBQUANTIZERS, dim) + 1) if dim % m == 0)
+
+
+def _effective(kind: str, n: int) -> str:
+    """PQ needs at least one training vector per centroid; smaller stores use sq8 until they grow."""
+    return "sq8" if kind == "pq" and n < 2 ** PQ_BITS else kind
+
+
+def build(vectors: np.ndarray, kind: str = VECTOR_QUANTIZATION):
+    """A trained L2 index holding `vectors` with the given quantization."""
+    n, dim = vectors.shape
+    kind = _effective(kind, n)
+    if kind in _SQ_TYPES:
+        index = faiss.IndexScalarQuantizer(dim, _SQ_TYPES[kind], faiss.METRIC_L2)
+    elif kind == "pq":
+        index = faiss.IndexPQ(dim, _pq_subquantizers(dim), PQ_BITS, faiss.METRIC_L2)
+    else:
+        index = faiss.IndexFlatL2(dim)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return index
+
+
+def memory_bytes(index) -> int:
+    return int(getattr(index, "code_size", index.d * 4)) * index.ntotal
+
+
+# -----------------------------
+# Store integration
+# -----------------------------
+def attach(store, folder: str, vectors: List[List[float]]):
+    """
+    Called when `store` was just built from `vectors`: keep the float32 copy on
+    disk and swap the flat index for a quantized one.
+    """
+    if VECTOR_QUANTIZATION == "none":
+        return
+    arr = np.asarray(vectors, dtype=np.float32)
+    exact = ExactVectors(os.path.join(folder, EXACT_FILE), arr.shape[1])
+    exact.write(arr)
+    flat_bytes = memory_bytes(store.index)
+    store.index = build(arr, VECTOR_QUANTIZATION)
+    store.exact_vectors = exact
+    print(f"🗜️ {arr.shape[0]} vectors stored as {kind_of(store.index)}: "
+          f"{flat_bytes / 1e6:.1f} MB -> {memory_bytes(store.index) / 1e6:.1f} MB in memory")
+
+
+def append(store, vectors: List[List[float]]):
+    """Record float32 copies of vectors about to be added to a quantized store (before the index sees them)."""
+    exact = getattr(store, "exact_vectors", None)
+    if exact is not None:
+        exact.append(vectors)
+
+
+def rollback(store, n: int):
+    """Drop float32 rows past `n` after a failed add, so rows stay aligned with index ids."""
+    exact = getattr(store, "exact_vectors", None)
+    if exact is not None and len(exact) > n:
+        exact.truncate(n)
+
+
+def prepare(store, folder: str) -> bool:
+    """
+    After loading a store from `folder`: open its float32 file and bring the
+    index in line with VECTOR_QUANTIZATION (a flat index is migrated, a
+    differently quantized one is re-encoded from the exact vectors).
+    Returns True if the index changed and should be saved again.
+    """
+    index = store.index
+    exact = ExactVectors(os.path.join(folder, EXACT_FILE), index.d)
+    have = len(exact)
+    if have > index.ntotal:  # rows appended by an add that was never saved
+        exact.truncate(index.ntotal)
+        have = index.ntotal
+
+    current = kind_of(index)
+    if current == "none" and VECTOR_QUANTIZATION != "none":
+        vectors = index.reconstruct_n(0, index.ntotal)
+        attach(store, folder, vectors)
+        return True
+
+    if have == index.ntotal:
+        store.exact_vectors = exact
+        if current != _effective(VECTOR_QUANTIZATION, have):
+            vectors = exact.rows(np.arange(have))
+            store.index = build(vectors, VECTOR_QUANTIZATION)
+            if VECTOR_QUANTIZATION == "none":
+                store.exact_vectors = None
+            print(f"🗜️ Re-encoded {have} vectors {current} -> {kind_of(store.index)}")
+            return True
+    elif current != "none":
+        print(f"⚠️ {folder}: float32 vectors missing ({have}/{index.ntotal}), searching without exact re-rank.")
+    return False
+
+
+def search(store, queries: np.ndarray, k: int):
+    """
+    store.index.search for an (n, d) query matrix, with quantized candidates
+    (k * RERANK_FACTOR per query) re-ranked by exact L2 distance on the
+    full-precision vectors. Rows with fewer than k results are padded with -1.
+    """
+    index = store.index
+    exact = getattr(store, "exact_vectors", None)
+    if not RERANK_EXACT or exact is None or kind_of(index) == "none":
+        return index.search(queries, k)
+    D, I = index.search(queries, k * RERANK_FACTOR)
+    out_D = np.full((len(queries), k), np.inf, dtype=np.float32)
+    out_I = np.full((len(queries), k), -1, dtype=np.int64)
+    for row, query in enumerate(queries):
+        candidates = I[row][I[row] >= 0]
+        rows = exact.rows(candidates)
+        if rows is None:
+            out_D[row], out_I[row] = D[row, :k], I[row, :k]
+            continue
+        dist = ((rows - query) ** 2).sum(axis=1)
+        order = np.argsort(dist)[:k]
+        out_D[row, :len(order)] = dist[order]
+        out_I[row, :len(order)] = candidates[order]
+    return out_D, out_I
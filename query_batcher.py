@@ -0,0 +1,106 @@
+# query_batcher.py
+"""
+Micro-batching for FAISS searches. Concurrent similarity searches against
+the same store are collected for up to QUERY_BATCH_WAIT_MS (or until
+QUERY_BATCH_MAX_SIZE queries are waiting) and sent to FAISS as one query
+matrix in one worker thread. Each caller gets back its own row, so one
+matrix search replaces many single-row searches competing for the default
+thread pool.
+"""
+import asyncio
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+from config import QUERY_BATCH_MAX_SIZE, QUERY_BATCH_WAIT_MS
+
+SearchFn = Callable[[Any, np.ndarray, int], Tuple[np.ndarray, np.ndarray]]
+
+
+class _Batch:
+    __slots__ = ("store", "items", "timer")
+
+    def __init__(self, store):
+        self.store = store
+        self.items: List[Tuple[np.ndarray, int, asyncio.Future]] = []  # (query row, k, result)
+        self.timer = None
+
+
+class QueryBatcher:
+    """
+    `search_fn(store, queries, k)` must accept an (n, d) float32 matrix and
+    return (D, I) of shape (n, k). Queries asking for different k share a
+    batch, searched with the largest k, and each caller gets its own first k.
+    """
+
+    def __init__(self, search_fn: SearchFn, max_batch: int = QUERY_BATCH_MAX_SIZE,
+                 max_wait_ms: float = QUERY_BATCH_WAIT_MS):
+        self.search_fn = search_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending: Dict[int, _Batch] = {}  # keyed by id(store); the batch holds the store itself
+        self._running = set()
+        self.batches = 0
+        self.queries = 0
+        self.largest = 0
+
+    async def search(self, store, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Distances and ids for one query vector, as one row of a batched search."""
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        if self.max_batch <= 1:
+            D, I = await asyncio.to_thread(self.search_fn, store, query.reshape(1, -1), k)
+            self._record(1)
+            return D[0], I[0]
+
+        loop = asyncio.get_running_loop()
+        key = id(store)
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = self._pending[key] = _Batch(store)
+            batch.timer = loop.call_later(self.max_wait, self._flush, key, batch)
+        future = loop.create_future()
+        batch.items.append((query, k, future))
+        if len(batch.items) >= self.max_batch:
+            self._flush(key, batch)
+        return await future
+
+    def _flush(self, key: int, batch: _Batch):
+        if self._pending.get(key) is batch:
+            del self._pending[key]
+        batch.timer.cancel()
+        task = asyncio.ensure_future(self._run(batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: _Batch):
+        items = [item for item in batch.items if not item[2].done()]  # skip callers that gave up
+        if not items:
+            return
+        queries = np.stack([query for query, _, _ in items])
+        k = max(k for _, k, _ in items)
+        try:
+            D, I = await asyncio.to_thread(self.search_fn, batch.store, queries, k)
+        except Exception as e:
+            for _, _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self._record(len(items))
+        for row, (_, k_row, future) in enumerate(items):
+            if not future.done():
+                future.set_result((D[row, :k_row], I[row, :k_row]))
+
+    def _record(self, size: int):
+        self.batches += 1
+        self.queries += size
+        self.largest = max(self.largest, size)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "queries": self.queries,
+            "avg_batch": round(self.queries / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest,
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+        }
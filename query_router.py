@@ -0,0 +1,140 @@
+# query_router.py
+import re
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from config import ROUTER_ENABLED, ROUTER_SMALLTALK_MAX_WORDS, ROUTER_FOLLOWUP_MAX_WORDS
+
+ROUTE_CHAT = "chat"
+ROUTE_RETRIEVE = "retrieve"
+
+_WORD = re.compile(r"[a-z0-9']+")
+# identifiers, codes, file names, numbers: lexical evidence of a knowledge question
+_IDENTIFIER = re.compile(r"\w+[-_./]\w+|\d{2,}")
+
+_SMALLTALK = {
+    "hi", "hello", "hey", "yo", "hiya", "howdy", "morning", "evening", "afternoon", "good",
+    "thanks", "thank", "thx", "ty", "cheers", "appreciate", "great", "cool", "nice", "awesome",
+    "ok", "okay", "k", "sure", "yes", "yeah", "yep", "no", "nope", "alright", "fine", "perfect",
+    "bye", "goodbye", "later", "see", "you", "ya", "night", "lol", "haha", "wow", "sorry",
+    "please", "welcome", "np", "it", "that", "this", "is", "so", "much", "very", "a", "lot",
+    "the", "all", "got", "understood", "done", "again", "too", "there", "how", "are", "doing",
+    "i", "am", "im", "me", "we", "be", "for", "your", "help", "helps", "helped", "helpful", "oh",
+}
+_QUESTION = {
+    "what", "why", "when", "where", "which", "who", "whom", "whose",
+    "explain", "summarize", "summarise", "describe", "list", "define", "compare",
+    "find", "show", "tell", "give", "document", "file", "page", "section", "upload", "uploaded",
+    "according", "policy", "report", "table", "figure", "chapter", "details",
+}
+# words that make a turn unambiguously conversational ("thanks, that helps")
+_ANCHORS = {
+    "hi", "hello", "hey", "hiya", "howdy", "morning", "thanks", "thank", "thx", "ty", "cheers",
+    "ok", "okay", "cool", "great", "awesome", "perfect", "bye", "goodbye", "lol", "haha", "you",
+}
+# short follow-ups that only make sense against the previous (retrieved) answer
+_FOLLOWUP = {"more", "else", "also", "and", "elaborate", "continue", "expand", "example", "examples",
+             "why", "how", "it", "that", "those", "them", "this", "these", "about", "what"}
+
+
+class RouterStats:
+    """
+    Routing counters. Retrieval cost (LLM calls made while retrieving/summarising)
+    is sampled from routed-to-retrieval turns, so the work saved by the chat route
+    can be estimated as chat_turns x average retrieval cost.
+    """
+
+    def __init__(self):
+        self.routes: Counter = Counter()
+        self.reasons: Counter = Counter()
+        self.retrievals_measured = 0
+        self.retrieval_llm_calls = 0
+        self.classify_seconds = 0.0
+
+    def record_route(self, route: str, reason: str, elapsed: float):
+        self.routes[route] += 1
+        self.reasons[reason] += 1
+        self.classify_seconds += elapsed
+
+    def record_retrieval(self, llm_calls: int):
+        self.retrievals_measured += 1
+        self.retrieval_llm_calls += llm_calls
+
+    def snapshot(self) -> Dict[str, Any]:
+        total = sum(self.routes.values())
+        chat = self.routes[ROUTE_CHAT]
+        avg_cost = self.retrieval_llm_calls / self.retrievals_measured if self.retrievals_measured else 0.0
+        return {
+            "total": total,
+            "routes": dict(self.routes),
+            "reasons": dict(self.reasons),
+            "chat_ratio": round(chat / total, 3) if total else 0.0,
+            "avg_retrieval_llm_calls": round(avg_cost, 2),
+            # each chat turn skips one query embedding + one vector search + the summarisation calls
+            "embedding_calls_saved": chat,
+            "searches_saved": chat,
+            "llm_calls_saved_estimate": round(chat * avg_cost, 1),
+            "avg_classify_ms": round(1000 * self.classify_seconds / total, 3) if total else 0.0,
+        }
+
+
+class QueryRouter:
+    """
+    Cheap lexical/heuristic classifier in front of retrieval.
+    Greetings, thanks and other short conversational turns go straight to
+    generation; anything that looks like a knowledge question, names an
+    identifier, or is a short follow-up to a retrieved answer goes to retrieval.
+    When unsure it retrieves, so the router can only remove work, not answers.
+    """
+
+    def __init__(self, enabled: bool = ROUTER_ENABLED,
+                 smalltalk_max_words: int = ROUTER_SMALLTALK_MAX_WORDS,
+                 followup_max_words: int = ROUTER_FOLLOWUP_MAX_WORDS,
+                 max_sessions: int = 10000):
+        self.enabled = enabled
+        self.smalltalk_max_words = smalltalk_max_words
+        self.followup_max_words = followup_max_words
+        self.max_sessions = max_sessions
+        self._last_route: "OrderedDict[str, str]" = OrderedDict()
+        self.stats = RouterStats()
+
+    def classify(self, message: str, last_route: Optional[str] = None) -> Tuple[str, str]:
+        """Return (route, reason) for one user message."""
+        text = (message or "").strip()
+        words = _WORD.findall(text.lower())
+        if not words:
+            return ROUTE_CHAT, "empty"
+        if _IDENTIFIER.search(text):
+            return ROUTE_RETRIEVE, "identifier"
+        if any(w in _QUESTION for w in words):
+            return ROUTE_RETRIEVE, "question_word"
+        smalltalk = len(words) <= self.smalltalk_max_words and all(w in _SMALLTALK for w in words)
+        if smalltalk and any(w in _ANCHORS for w in words):
+            return ROUTE_CHAT, "smalltalk"
+        if last_route == ROUTE_RETRIEVE and len(words) <= self.followup_max_words \
+                and any(w in _FOLLOWUP for w in words):
+            return ROUTE_RETRIEVE, "followup"
+        if smalltalk:
+            return ROUTE_CHAT, "smalltalk"
+        return ROUTE_RETRIEVE, "default"
+
+    def route(self, session_id: Optional[str], message: str) -> Tuple[str, str]:
+        """Classify using the session's previous route as context, and record metrics."""
+        if not self.enabled:
+            return ROUTE_RETRIEVE, "disabled"
+        started = time.perf_counter()
+        key = session_id or ""
+        route, reason = self.classify(message, self._last_route.get(key))
+        self._last_route[key] = route
+        self._last_route.move_to_end(key)
+        while len(self._last_route) > self.max_sessions:
+            self._last_route.popitem(last=False)
+        self.stats.record_route(route, reason, time.perf_counter() - started)
+        return route, reason
+
+    def forget(self, session_id: str):
+        self._last_route.pop(session_id, None)
+
+
+router = QueryRouter()
@@ -7,6 +7,81 @@ RAG_SERVICE_PORT = int(os.environ.get("RAG_SERVICE_PORT", 8001))
 # Pinecone configuration
 PINECONE_API_KEY = os.environ.get("PINECONE_API_KEY")
 PINECONE_ENVIRONMENT = os.environ.get("PINECONE_ENVIRONMENT", "us-west1-gcp")
+PINECONE_ENV = os.environ.get("PINECONE_ENV", PINECONE_ENVIRONMENT)
 PINECONE_INDEX_NAME = os.environ.get("PINECONE_INDEX_NAME", "default-index")
+PINECONE_NAMESPACE = os.environ.get("PINECONE_NAMESPACE", "")
+BATCH_SIZE = int(os.environ.get("BATCH_SIZE", 64))
+QUERY_CONCURRENCY = int(os.environ.get("QUERY_CONCURRENCY", 8))
 
 SERVICE_API_KEY = os.environ.get("SERVICE_API_KEY", "default-rag-key")
+API_KEY = os.environ.get("API_KEY", SERVICE_API_KEY)
+
+# Ingestion manifest (file hash + chunk hashes per source)
+REDIS_URL = os.environ.get("REDIS_URL", "redis://redis:6379/0")
+MANIFEST_PREFIX = os.environ.get("MANIFEST_PREFIX", "rag:manifest")
+
+# Streaming ingestion: bounded queues between load/split/embed/upsert stages
+INGEST_QUEUE_SIZE = int(os.environ.get("INGEST_QUEUE_SIZE", 4))
+EMBED_CONCURRENCY = int(os.environ.get("EMBED_CONCURRENCY", 2))
+UPSERT_CONCURRENCY = int(os.environ.get("UPSERT_CONCURRENCY", 2))
+UPLOAD_READ_SIZE = int(os.environ.get("UPLOAD_READ_SIZE", 1 << 20))
+
+# Token-aware splitter
+CHUNK_TOKENS = int(os.environ.get("CHUNK_TOKENS", 400))
+CHUNK_OVERLAP_TOKENS = int(os.environ.get("CHUNK_OVERLAP_TOKENS", 50))
+
+# Bulk reindex: retry/backoff for embed + upsert calls, checkpoint location
+RETRY_ATTEMPTS = int(os.environ.get("RETRY_ATTEMPTS", 5))
+RETRY_BASE_DELAY = float(os.environ.get("RETRY_BASE_DELAY", 1.0))
+RETRY_MAX_DELAY = float(os.environ.get("RETRY_MAX_DELAY", 60.0))
+REINDEX_CHECKPOINT = os.environ.get("REINDEX_CHECKPOINT", "reindex_checkpoint.json")
+
+# Vector store backend: "pinecone" (managed) or "local" (FAISS/NumPy on disk)
+VECTOR_BACKEND = os.environ.get("VECTOR_BACKEND", "pinecone").lower()
+LOCAL_INDEX_DIR = os.environ.get("LOCAL_INDEX_DIR", "local_index")
+EMBED_DIM = int(os.environ.get("EMBED_DIM", 1536))
+# "service" (embedding-service, sharing its provider rate-limit scheduler with chat), "openai"
+# (direct; its 429s are invisible to that scheduler) or "hash" (offline embeddings for tests/benchmarks)
+EMBEDDER = os.environ.get("EMBEDDER", "service").lower()
+EMBEDDING_SERVICE_URL = os.environ.get("EMBEDDING_SERVICE_URL", "http://embedding-service:8002")
+EMBEDDING_SERVICE_KEY = os.environ.get("EMBEDDING_SERVICE_KEY", "default-embedding-key")
+EMBEDDING_SERVICE_TIMEOUT = float(os.environ.get("EMBEDDING_SERVICE_TIMEOUT", 180))
+
+# Search result cache: in-process LRU + Redis, keyed by query and per-namespace index version
+SEARCH_CACHE_ENABLED = os.environ.get("SEARCH_CACHE_ENABLED", "1") in ("1", "true", "True")
+SEARCH_CACHE_SIZE = int(os.environ.get("SEARCH_CACHE_SIZE", 2048))  # LRU entries
+SEARCH_CACHE_TTL = float(os.environ.get("SEARCH_CACHE_TTL", 300))  # seconds, in-process tier
+SEARCH_CACHE_REDIS_TTL = int(os.environ.get("SEARCH_CACHE_REDIS_TTL", 3600))  # seconds, Redis tier
+SEARCH_CACHE_PREFIX = os.environ.get("SEARCH_CACHE_PREFIX", "rag:search")
+# no caching for a namespace this long after a write: Pinecone queries may not see it yet (eventual consistency)
+SEARCH_CACHE_SETTLE_SECONDS = float(os.environ.get("SEARCH_CACHE_SETTLE_SECONDS",
+                                                   10 if VECTOR_BACKEND == "pinecone" else 0))
+
+# Lexical (BM25) index + hybrid search
+LEXICAL_INDEX_PATH = os.environ.get("LEXICAL_INDEX_PATH", "lexical_index/bm25.json")
+# how often a search checks whether another replica rewrote the BM25 file (seconds)
+LEXICAL_REFRESH_SECONDS = float(os.environ.get("LEXICAL_REFRESH_SECONDS", 2.0))
+# "vector" | "lexical" | "hybrid" | "auto" (lexical short-circuit, else hybrid)
+SEARCH_MODE = os.environ.get("SEARCH_MODE", "auto").lower()
+LEXICAL_MIN_SCORE = float(os.environ.get("LEXICAL_MIN_SCORE", 5.0))
+LEXICAL_DECISIVE_RATIO = float(os.environ.get("LEXICAL_DECISIVE_RATIO", 1.5))
+RRF_K = int(os.environ.get("RRF_K", 60))
+# BM25 score that maps to confidence 0.5 for lexical-only matches (see lexical_confidence)
+LEXICAL_CONFIDENCE_HALF = float(os.environ.get("LEXICAL_CONFIDENCE_HALF", LEXICAL_MIN_SCORE))
+
+# Tracing: W3C traceparent propagation; spans go to a JSON-lines file and/or an OTLP/HTTP collector
+SERVICE_NAME = os.environ.get("SERVICE_NAME", "rag-indexer")
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", 1.0))
+TRACE_EXPORT_FILE = os.environ.get("TRACE_EXPORT_FILE", "")  # e.g. traces/rag-indexer.jsonl
+TRACE_COLLECTOR_URL = os.environ.get("TRACE_COLLECTOR_URL", "")  # e.g. http://otel-collector:4318/v1/traces
+
+# Opt-in sampled CPU profiling (pyinstrument); keeps the PROFILE_KEEP slowest requests
+PROFILE_ENABLED = os.environ.get("PROFILE_ENABLED", "0") in ("1", "true", "True")
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0.05))
+PROFILE_SLOW_MS = float(os.environ.get("PROFILE_SLOW_MS", 2000))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", 20))
+
+# Caller scope: HMAC secret shared with the chat orchestrator, which signs each turn's session/tenant
+RAG_SCOPE_SECRET = os.environ.get("RAG_SCOPE_SECRET", "default-scope-secret")
+RAG_SCOPE_TTL = float(os.environ.get("RAG_SCOPE_TTL", 300))  # seconds a signed scope stays valid
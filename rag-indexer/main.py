@@ -1,10 +1,18 @@
-from fastapi import FastAPI, Request, UploadFile, File, HTTPException, Header
+from fastapi import FastAPI, Request, UploadFile, File, Form, HTTPException, Header, Depends
 from pydantic import BaseModel
-from typing import List, Dict, Any
-from pipeline.index_build import PineconeIndexer
-from pipeline.loader import load_documents_from_file
-from pipeline.search import pinecone_search, pinecone_retrieve
-from config import API_KEY
+from typing import List, Dict, Any, Optional
+from pipeline.backend import get_indexer
+from pipeline.ingest import ingest_file
+from pipeline.manifest import IngestManifest
+from pipeline.search import pinecone_search, pinecone_search_batch, pinecone_retrieve
+from pipeline.search import inflight as search_inflight
+from pipeline.result_cache import search_cache
+from config import API_KEY, UPLOAD_READ_SIZE
+import scope
+import tracing
+import wire
+from metrics import (instrument, on_scrape, SEARCH_SINGLEFLIGHT_CALLS, SEARCH_SINGLEFLIGHT_COLLAPSED,
+                     SEARCH_SINGLEFLIGHT_HIT_RATIO, SEARCH_CACHE_ENTRIES)
 import uvicorn
 import tempfile
 import os
@@ -12,77 +20,130 @@ import shutil
 import asyncio
 
 app = FastAPI(title="RAG Service (Pinecone)")
-indexer = PineconeIndexer()
+indexer = get_indexer()
+manifest = IngestManifest()
+instrument(app)
+tracing.instrument(app, api_key=API_KEY)
+
+
+@on_scrape
+def _collect_search_cache():
+    stats = search_inflight.stats()
+    SEARCH_SINGLEFLIGHT_CALLS.set(stats["calls"])
+    SEARCH_SINGLEFLIGHT_COLLAPSED.set(stats["collapsed"])
+    SEARCH_SINGLEFLIGHT_HIT_RATIO.set(stats["collapsed"] / stats["calls"] if stats["calls"] else 0.0)
+    SEARCH_CACHE_ENTRIES.set(search_cache.stats()["local_entries"])
 
 def auth_check(x_api_key: str = Header(...)):
     if x_api_key != API_KEY:
         raise HTTPException(status_code=403, detail="Forbidden")
 
+def caller_scope(x_rag_scope: Optional[str] = Header(None)) -> Optional[Dict[str, Any]]:
+    """Verified session/tenant of the end user this call is made for; None for unscoped callers."""
+    return scope.verify(x_rag_scope)
+
+def permitted(requested: Optional[List[str]], allowed: List[str]) -> List[str]:
+    """Requested namespaces if the scope covers all of them; every allowed one if none were asked for."""
+    if not requested:
+        return allowed
+    denied = sorted({ns or "" for ns in requested} - set(allowed))
+    if denied:
+        raise HTTPException(status_code=403, detail=f"Namespace not permitted: {', '.join(denied)}")
+    return requested
+
 # -----------------------------
 # Models
 # -----------------------------
 class SearchRequest(BaseModel):
     query: str
     top_k: int = 5
+    mode: Optional[str] = None  # vector | lexical | hybrid | auto
+    namespaces: Optional[List[str]] = None  # subset of the caller's scope to search; all of it if omitted
+    fields: Optional[List[str]] = None  # keys to return per match, e.g. ["id", "score", "text"]; all if omitted
+
+class SearchBatchRequest(BaseModel):
+    queries: List[str]
+    top_k: int = 5
+    mode: Optional[str] = None
+    namespaces: Optional[List[str]] = None
+    fields: Optional[List[str]] = None
 
 class RetrieveRequest(BaseModel):
     ids: List[str]
+    namespace: Optional[str] = None
 
 
 # -----------------------------
 # Endpoints
 # -----------------------------
 @app.post("/upsert", dependencies=[Depends(auth_check)])
-async def upsert_file(file: UploadFile = File(...)):
+async def upsert_file(file: UploadFile = File(...), namespace: str = Form(""),
+                      claims: Optional[Dict[str, Any]] = Depends(caller_scope)):
     """
-    Upload a file, split into chunks and upsert to Pinecone
+    Upload a file, split into chunks and upsert to Pinecone.
+    Only chunks whose content hash changed since the last upload are re-embedded.
+    `namespace` is the tenant/session partition the file belongs to; it defaults to
+    the caller's session partition and must be one the signed scope may write.
     """
+    namespace = permitted([namespace] if namespace else None, scope.writable(claims))[-1]
     # save to temp file
     tmpdir = tempfile.mkdtemp()
     path = os.path.join(tmpdir, file.filename)
+    # stream the upload to disk instead of holding it in memory
     with open(path, "wb") as f:
-        f.write(await file.read())
+        while block := await file.read(UPLOAD_READ_SIZE):
+            f.write(block)
     try:
-        docs = await load_documents_from_file(path)
-        # You will need a text splitter; here assume docs list contains page_content
-        chunks = []
-        for d_idx, d in enumerate(docs):
-            text = getattr(d, "page_content", None) or getattr(d, "text", None) or str(d)
-            # naive chunking: split by 1000 chars. Replace with your splitter strategy.
-            chunk_size = 1000
-            for i in range(0, len(text), chunk_size):
-                chunks.append({
-                    "id": file.filename,
-                    "chunk_id": i // chunk_size,
-                    "text": text[i:i+chunk_size],
-                    "metadata": {"filename": file.filename}
-                })
-        # upsert (run in threadpool)
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, indexer.upsert_documents, chunks)
-        return {"status": "ok", "chunks_indexed": len(chunks)}
+        # unchanged files/chunks are skipped via the ingestion manifest
+        result = await ingest_file(path, indexer, manifest, source_id=file.filename, namespace=namespace)
+        return result
     finally:
         shutil.rmtree(tmpdir, ignore_errors=True)
 
 
 @app.post("/search", dependencies=[Depends(auth_check)])
-async def search_endpoint(req: SearchRequest, x_api_key: str = Header(...)):
+async def search_endpoint(req: SearchRequest, request: Request, x_api_key: str = Header(...),
+                          claims: Optional[Dict[str, Any]] = Depends(caller_scope)):
     """
-    pinecone_search
+    pinecone_search over the partitions the caller's scope may read.
+    Matches are trimmed to `fields`; msgpack if the caller accepts it.
     """
-    results = await pinecone_search(req.query, top_k=req.top_k)
-    return {"matches": results}
+    namespaces = permitted(req.namespaces, scope.readable(claims))
+    results = await pinecone_search(req.query, top_k=req.top_k, mode=req.mode, namespaces=namespaces)
+    return wire.respond(request, {"matches": [wire.project(m, req.fields) for m in results]})
+
+
+@app.post("/search_batch", dependencies=[Depends(auth_check)])
+async def search_batch_endpoint(req: SearchBatchRequest, request: Request,
+                                claims: Optional[Dict[str, Any]] = Depends(caller_scope)):
+    """
+    Search many queries at once: one embedding call and one vector-store round
+    for the whole batch. Results are returned in request order.
+    """
+    results = await pinecone_search_batch(req.queries, top_k=req.top_k, mode=req.mode,
+                                          namespaces=permitted(req.namespaces, scope.readable(claims)))
+    return wire.respond(request, {"results": [
+        {"query": q, "matches": [wire.project(m, req.fields) for m in matches]}
+        for q, matches in zip(req.queries, results)
+    ]})
 
 
 @app.post("/retrieve", dependencies=[Depends(auth_check)])
-async def retrieve_endpoint(req: RetrieveRequest, x_api_key: str = Header(...)):
+async def retrieve_endpoint(req: RetrieveRequest, request: Request, x_api_key: str = Header(...),
+                            claims: Optional[Dict[str, Any]] = Depends(caller_scope)):
     """
     Retrieve exact vector items by ID.
     Used by LangGraph for confirmatory lookups,
     or when your application stores known chunk IDs.
     """
-    res = await pinecone_retrieve(req.ids)
-    return {"records": res}
+    namespace = permitted([req.namespace or ""], scope.readable(claims))[0]
+    res = await pinecone_retrieve(req.ids, namespace=namespace)
+    return wire.respond(request, {"records": res})
+
+
+@app.get("/search/cache/stats", dependencies=[Depends(auth_check)])
+async def search_cache_stats():
+    return {**search_cache.stats(), "singleflight": search_inflight.stats()}
 
 
 @app.get("/health")
@@ -0,0 +1,127 @@
+# rag-indexer/metrics.py
+import time
+from typing import Callable, List
+
+from fastapi import FastAPI, Request, Response
+
+try:
+    from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+    print("⚠️ prometheus_client not available, /metrics will be empty.")
+
+
+class _NoopMetric:
+    """Stand-in used when prometheus_client is missing, so call sites never branch."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def dec(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+    def observe(self, value):
+        pass
+
+    def time(self):
+        return _NoopTimer()
+
+
+class _NoopTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+if not PROMETHEUS_AVAILABLE:
+    Counter = Gauge = Histogram = _NoopMetric
+
+# -----------------------------
+# HTTP
+# -----------------------------
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route", "status"],
+)
+
+# -----------------------------
+# Embeddings
+# -----------------------------
+EMBED_CALLS = Counter("embedding_calls_total", "Embedding calls made by the indexer", ["op"])
+EMBED_TEXTS = Counter("embedding_texts_total", "Texts embedded", ["op"])
+EMBED_TOKENS = Counter("embedding_tokens_total", "Approximate tokens embedded", ["op"])
+
+# -----------------------------
+# Search
+# -----------------------------
+SEARCH_PATH = Counter(
+    "search_requests_total", "Searches by mode and the path that answered them", ["mode", "path"],
+)
+SEARCH_LATENCY = Histogram("search_backend_duration_seconds", "Vector-store query latency", ["op"])
+SEARCH_SINGLEFLIGHT_CALLS = Gauge("search_singleflight_calls", "Searches seen by the single-flight layer")
+SEARCH_SINGLEFLIGHT_COLLAPSED = Gauge("search_singleflight_collapsed", "Searches served by an identical in-flight search")
+SEARCH_SINGLEFLIGHT_HIT_RATIO = Gauge("search_singleflight_hit_ratio", "collapsed / calls")
+SEARCH_CACHE_LOOKUPS = Counter("search_cache_lookups_total", "Search result cache lookups by outcome", ["result"])
+SEARCH_CACHE_ENTRIES = Gauge("search_cache_local_entries", "Entries in the in-process search result cache")
+
+# -----------------------------
+# Ingestion
+# -----------------------------
+INGEST_QUEUE_DEPTH = Gauge("ingest_queue_depth", "Items waiting between ingestion stages", ["stage"])
+INGEST_ACTIVE = Gauge("ingest_active_files", "Files currently being ingested")
+INGEST_STAGE_LATENCY = Histogram(
+    "ingest_stage_duration_seconds", "Per-batch latency of each ingestion stage", ["stage"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+INGEST_CHUNKS = Counter("ingest_chunks_total", "Chunks processed by ingestion", ["result"])
+
+# -----------------------------
+# Exposition
+# -----------------------------
+_collectors: List[Callable[[], None]] = []
+
+
+def on_scrape(fn: Callable[[], None]):
+    """Register a callback that refreshes point-in-time gauges right before /metrics renders."""
+    _collectors.append(fn)
+    return fn
+
+
+def instrument(app: FastAPI):
+    """Add request-latency middleware and the /metrics endpoint to `app`."""
+
+    @app.middleware("http")
+    async def _observe_latency(request: Request, call_next):
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            # label by route template, not raw path, to keep cardinality bounded
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            REQUEST_LATENCY.labels(request.method, route, str(status)).observe(time.perf_counter() - started)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        for fn in _collectors:
+            try:
+                fn()
+            except Exception as e:
+                print(f"[Metrics] collector failed: {e}")
+        if not PROMETHEUS_AVAILABLE:
+            return Response("# prometheus_client not installed\n", media_type="text/plain")
+        return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
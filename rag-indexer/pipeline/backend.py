@@ -0,0 +1,46 @@
+# rag-service/pipeline/backend.py
+from urllib.parse import quote
+
+from config import VECTOR_BACKEND
+
+_indexer = None
+
+
+def get_indexer():
+    """
+    Process-wide vector store selected by VECTOR_BACKEND ("pinecone" | "local").
+    Both backends expose upsert_documents / query / retrieve_by_ids.
+    """
+    global _indexer
+    if _indexer is None:
+        if VECTOR_BACKEND == "local":
+            from pipeline.local_index import LocalIndexer
+            _indexer = LocalIndexer()
+        elif VECTOR_BACKEND == "pinecone":
+            from pipeline.index_build import PineconeIndexer
+            _indexer = PineconeIndexer()
+        else:
+            raise RuntimeError(f"Unknown VECTOR_BACKEND '{VECTOR_BACKEND}'")
+    return _indexer
+
+
+def safe_name(name: str) -> str:
+    """Injective file-name form of a namespace: percent-encoding, so "a/b" and "a_b" stay apart."""
+    encoded = quote(name, safe="")
+    return encoded if encoded.strip(".") else encoded.replace(".", "%2E")  # never "." or ".."
+
+
+_lexical = {}
+
+
+def get_lexical_index(namespace: str = ""):
+    """
+    Process-wide BM25 index per namespace, persisted next to the vectors and
+    kept in sync by ingestion. Replicas share the files: every batch is
+    appended to a shared log, and searches replay what others appended.
+    """
+    namespace = namespace or ""
+    if namespace not in _lexical:
+        from pipeline.lexical import BM25Index, namespace_path
+        _lexical[namespace] = BM25Index(path=namespace_path(namespace))
+    return _lexical[namespace]
@@ -0,0 +1,55 @@
+# rag-service/pipeline/checkpoint.py
+import json
+import os
+from typing import Any, Dict
+
+from config import REINDEX_CHECKPOINT
+
+
+class ReindexCheckpoint:
+    """
+    JSON checkpoint for bulk reindex runs, rewritten atomically after every
+    committed batch:
+      {"files": {source_id: {"file_hash": str, "status": "in_progress"|"done",
+                             "committed_batch": int}}}
+    """
+
+    def __init__(self, path: str = REINDEX_CHECKPOINT):
+        self.path = path
+        self.state: Dict[str, Any] = {"files": {}}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.state = json.load(f)
+
+    def _save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.path)
+
+    def _entry(self, source_id: str, file_hash: str) -> Dict[str, Any]:
+        entry = self.state["files"].get(source_id)
+        if not entry or entry.get("file_hash") != file_hash:
+            # file changed since the checkpoint was written: start it over
+            entry = {"file_hash": file_hash, "status": "in_progress", "committed_batch": -1}
+            self.state["files"][source_id] = entry
+        return entry
+
+    def is_done(self, source_id: str, file_hash: str) -> bool:
+        return self._entry(source_id, file_hash)["status"] == "done"
+
+    def committed_batch(self, source_id: str, file_hash: str) -> int:
+        return self._entry(source_id, file_hash)["committed_batch"]
+
+    def commit_batch(self, source_id: str, file_hash: str, batch_no: int):
+        self._entry(source_id, file_hash)["committed_batch"] = batch_no
+        self._save()
+
+    def mark_done(self, source_id: str, file_hash: str):
+        self._entry(source_id, file_hash)["status"] = "done"
+        self._save()
+
+    def clear(self):
+        self.state = {"files": {}}
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,83 @@
+# rag-service/pipeline/embedder.py
+"""
+Embedders shared by both vector-store backends (Pinecone and local),
+selected by EMBEDDER. All expose embed_query / embed_documents.
+"""
+import hashlib
+import re
+from typing import List
+
+import httpx
+import numpy as np
+from config import (EMBED_DIM, EMBEDDER, EMBEDDING_SERVICE_URL, EMBEDDING_SERVICE_KEY,
+                    EMBEDDING_SERVICE_TIMEOUT)
+
+try:
+    from langchain_openai import OpenAIEmbeddings
+except Exception:
+    OpenAIEmbeddings = None
+
+_TOKEN = re.compile(r"\w+")
+
+
+class HashEmbedder:
+    """
+    Deterministic, network-free embedder (feature hashing of word tokens).
+    Not semantically strong, but stable across runs: meant for tests,
+    benchmarks and offline development with EMBEDDER=hash.
+    """
+
+    def __init__(self, dim: int = EMBED_DIM):
+        self.dim = dim
+
+    def embed_query(self, text: str) -> List[float]:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for tok in _TOKEN.findall(text.lower()):
+            h = int.from_bytes(hashlib.blake2b(tok.encode("utf-8"), digest_size=8).digest(), "little")
+            vec[h % self.dim] += 1.0 if (h >> 63) & 1 else -1.0
+        return vec.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(t) for t in texts]
+
+
+class ServiceEmbedder:
+    """
+    Embeds through embedding-service, whose scheduler owns the provider quota:
+    documents go as `x-priority: bulk` so a reindex queues behind chat traffic
+    instead of pushing it into 429s; queries go as interactive.
+    """
+
+    def __init__(self, url: str = EMBEDDING_SERVICE_URL, api_key: str = EMBEDDING_SERVICE_KEY):
+        self._client = httpx.Client(
+            base_url=url, timeout=EMBEDDING_SERVICE_TIMEOUT,
+            headers={"x-api-key": api_key, "accept": "application/x-float32, application/json;q=0.5"},
+        )
+
+    def _embed(self, texts: List[str], priority: str) -> List[List[float]]:
+        if not texts:
+            return []
+        resp = self._client.post("/embed_batch", json={"texts": texts}, headers={"x-priority": priority})
+        resp.raise_for_status()  # 429 when the scheduler had no capacity in time; the ingest retry backs off
+        if resp.headers.get("content-type", "").startswith("application/x-float32"):
+            dim = int(resp.headers["x-vector-dim"])
+            return np.frombuffer(resp.content, dtype="<f4").reshape(-1, dim).tolist()
+        return resp.json()["embeddings"]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text], "interactive")[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts, "interactive")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts, "bulk")
+
+
+def default_embedder():
+    if EMBEDDER == "hash":
+        return HashEmbedder()
+    if EMBEDDER == "service":
+        return ServiceEmbedder()
+    # no SDK retries: the ingest retry (to_thread_with_retry) already backs off on 429s and timeouts
+    return OpenAIEmbeddings(max_retries=0) if OpenAIEmbeddings is not None else None
@@ -0,0 +1,109 @@
+# rag-service/pipeline/index_build.py
+import os
+import pinecone
+import math
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+from config import PINECONE_API_KEY, PINECONE_ENV, PINECONE_INDEX_NAME, PINECONE_NAMESPACE, BATCH_SIZE, QUERY_CONCURRENCY
+from httpx import TimeoutException
+from pipeline.embedder import default_embedder
+
+class PineconeIndexer:
+    def __init__(self, embedder=None):
+        if not PINECONE_API_KEY:
+            raise RuntimeError("PINECONE_API_KEY not set")
+        pinecone.init(api_key=PINECONE_API_KEY, environment=PINECONE_ENV)
+        self.index_name = PINECONE_INDEX_NAME
+        self.namespace = PINECONE_NAMESPACE or None
+
+        # create index if not exists
+        if self.index_name not in pinecone.list_indexes():
+            embedder = embedder or default_embedder()
+            if embedder is not None:
+                dim = len(embedder.embed_query("test"))
+            else:
+                # fallback dimension, assume 1536 (OpenAI text-embedding-3-small / 1536)
+                dim = int(os.getenv("EMBED_DIM", "1536"))
+            pinecone.create_index(self.index_name, dimension=dim)
+        self.index = pinecone.Index(self.index_name)
+        self.embedder = embedder or default_embedder()
+
+    def _make_id(self, source_id: str, chunk_id: str | int):
+        return f"{source_id}~{chunk_id}"
+
+    def embed_chunks(self, docs: List[Dict[str, Any]]):
+        """
+        Embed one batch of chunks and return Pinecone-ready (id, values, metadata) tuples.
+        """
+        if not self.embedder:
+            # Placeholder: raise if no embedder
+            raise RuntimeError("No embedder configured for PineconeIndexer")
+        batch_embs = self.embedder.embed_documents([d["text"] for d in docs])
+        vectors = []
+        for j, emb in enumerate(batch_embs):
+            d = docs[j]
+            vec_id = self._make_id(d["id"], d.get("chunk_id", j))
+            metadata = dict(d.get("metadata", {}))
+            # keep a short snippet in metadata for retrieval convenience
+            metadata.setdefault("snippet", d["text"][:500])
+            metadata.update({"source_id": d["id"], "chunk_id": d.get("chunk_id", j)})
+            vectors.append((vec_id, emb, metadata))
+        return vectors
+
+    def _ns(self, namespace: Optional[str]):
+        # None / "" -> the configured default namespace (PINECONE_NAMESPACE); partitions pass through
+        return namespace or self.namespace
+
+    def upsert_vectors(self, vectors, namespace: Optional[str] = None):
+        self.index.upsert(vectors=vectors, namespace=self._ns(namespace))
+
+    def upsert_documents(self, docs: List[Dict[str, Any]], namespace: Optional[str] = None):
+        """
+        docs: list of dicts: {id: source_id, chunk_id: str | int, text: str, metadata: dict}
+        """
+        # embed + upsert in batches
+        for i in range(0, len(docs), BATCH_SIZE):
+            self.upsert_vectors(self.embed_chunks(docs[i:i+BATCH_SIZE]), namespace=namespace)
+
+    def delete_ids(self, ids: List[str], namespace: Optional[str] = None):
+        """Remove vectors whose chunks no longer exist in the source file."""
+        for i in range(0, len(ids), BATCH_SIZE):
+            self.index.delete(ids=ids[i:i+BATCH_SIZE], namespace=self._ns(namespace))
+
+    def query(self, query_text: str, top_k: int = 5, namespace: Optional[str] = None):
+        if self.embedder:
+            q_emb = self.embedder.embed_query(query_text)
+        else:
+            raise RuntimeError("No embedder configured for query")
+        res = self.index.query(vector=q_emb, top_k=top_k, include_metadata=True, namespace=self._ns(namespace))
+        return res
+
+    def query_batch(self, query_texts: List[str], top_k: int = 5, namespaces: Optional[List[str]] = None):
+        """
+        Embed all queries in one call, then query Pinecone per (vector, namespace)
+        on a small thread pool (the client has no multi-vector query). Matches
+        from several namespaces are merged by score per query.
+        """
+        if not self.embedder:
+            raise RuntimeError("No embedder configured for query")
+        if len(query_texts) == 1:
+            q_embs = [self.embedder.embed_query(query_texts[0])]
+        else:
+            q_embs = getattr(self.embedder, "embed_queries", self.embedder.embed_documents)(query_texts)
+        jobs = [(qi, ns) for qi in range(len(q_embs)) for ns in (namespaces or [None])]
+
+        def _query(job):
+            qi, ns = job
+            res = self.index.query(vector=q_embs[qi], top_k=top_k, include_metadata=True, namespace=self._ns(ns))
+            return qi, ns, res if isinstance(res, dict) else res.to_dict()
+
+        merged = [[] for _ in q_embs]
+        with ThreadPoolExecutor(max_workers=min(len(jobs), QUERY_CONCURRENCY) or 1) as pool:
+            for qi, ns, res in pool.map(_query, jobs):
+                merged[qi].extend({**m, "namespace": ns or ""} for m in res.get("matches", []))
+        return [{"matches": sorted(ms, key=lambda m: m.get("score", 0.0), reverse=True)[:top_k]} for ms in merged]
+
+    def retrieve_by_ids(self, ids: List[str], namespace: Optional[str] = None):
+        # fetch vectors by ids
+        res = self.index.fetch(ids=ids, namespace=self._ns(namespace))
+        return res
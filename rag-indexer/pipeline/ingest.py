@@ -0,0 +1,208 @@
+# rag-service/pipeline/ingest.py
+import asyncio
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+
+from config import BATCH_SIZE, INGEST_QUEUE_SIZE, EMBED_CONCURRENCY, UPSERT_CONCURRENCY
+from pipeline.backend import get_lexical_index
+from pipeline.loader import iter_documents_from_file
+from pipeline.manifest import IngestManifest, file_sha256, chunk_sha256
+from pipeline.result_cache import search_cache
+from pipeline.retry import to_thread_with_retry
+from pipeline.splitter import TextSplitter
+from metrics import (on_scrape, EMBED_CALLS, EMBED_TEXTS, EMBED_TOKENS, INGEST_ACTIVE, INGEST_CHUNKS,
+                     INGEST_QUEUE_DEPTH, INGEST_STAGE_LATENCY)
+from tracing import span
+
+_DONE = object()
+
+# stage queues of runs in progress, sampled for the queue-depth gauges at scrape time
+_live_queues: Dict[str, set] = {"embed": set(), "upsert": set()}
+
+
+@on_scrape
+def _collect_queue_depth():
+    for stage, queues in _live_queues.items():
+        INGEST_QUEUE_DEPTH.labels(stage).set(sum(q.qsize() for q in queues))
+    INGEST_ACTIVE.set(len(_live_queues["embed"]))
+
+
+class IngestPipeline:
+    """
+    Streaming ingestion: load -> split -> embed -> upsert.
+    Stages are joined by bounded queues, so memory stays flat regardless of file
+    size and embedding of batch N+1 overlaps with the upsert of batch N.
+    Throughput is bounded by the slowest stage rather than the sum of all stages.
+    """
+
+    def __init__(self, indexer, manifest: IngestManifest,
+                 batch_size: int = BATCH_SIZE,
+                 queue_size: int = INGEST_QUEUE_SIZE,
+                 embed_concurrency: int = EMBED_CONCURRENCY,
+                 upsert_concurrency: int = UPSERT_CONCURRENCY,
+                 splitter: Optional[TextSplitter] = None):
+        self.indexer = indexer
+        self.manifest = manifest
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.embed_concurrency = max(1, embed_concurrency)
+        self.upsert_concurrency = max(1, upsert_concurrency)
+        self.splitter = splitter or TextSplitter()
+
+    async def run(self, path: str, source_id: str = None, force: bool = False,
+                  file_hash: Optional[str] = None, resume_after: int = -1,
+                  on_batch_committed: Optional[Callable[[int], None]] = None,
+                  namespace: str = "") -> Dict[str, Any]:
+        """
+        Index one file, doing only the work the manifest says is needed:
+          - unchanged file hash  -> skip parse/embed/upsert entirely
+          - changed chunk hashes -> re-embed and upsert only those chunks
+          - chunks that vanished -> delete their vectors
+        `force` re-embeds every chunk but still deletes the vanished ones.
+        Batches are numbered deterministically; batches <= `resume_after` are
+        skipped, and `on_batch_committed(n)` fires whenever every batch up to n
+        has been upserted (the resumable watermark). `namespace` selects the
+        tenant/session partition that vectors, BM25 postings and manifest go to.
+        """
+        # the span must be current before the stage tasks are created so they inherit it
+        result = None
+        try:
+            with span("ingest.file", **{"ingest.path": os.path.basename(path), "ingest.namespace": namespace}) as s:
+                result = await self._run(path, source_id, force, file_hash, resume_after,
+                                         on_batch_committed, namespace)
+                s.set("ingest.status", result["status"])
+                s.set("ingest.chunks_indexed", result["chunks_indexed"])
+                return result
+        finally:
+            # new version for the namespace (also after a partial, failed run): cached searches go stale
+            if result is None or result["status"] != "unchanged":
+                await search_cache.invalidate(namespace)
+
+    async def _run(self, path: str, source_id: Optional[str], force: bool, file_hash: Optional[str],
+                   resume_after: int, on_batch_committed: Optional[Callable[[int], None]],
+                   namespace: str) -> Dict[str, Any]:
+        started = time.perf_counter()
+        source_id = source_id or os.path.basename(path)
+        file_hash = file_hash or await asyncio.to_thread(file_sha256, path)
+        lexical = get_lexical_index(namespace)
+        if not force and await self.manifest.file_unchanged(source_id, file_hash, namespace):
+            return {"status": "unchanged", "chunks_indexed": 0, "chunks_deleted": 0}
+
+        # read even when forced: chunks that vanished must still be deleted
+        previous = await self.manifest.chunk_hashes(source_id, namespace)
+        current: Dict[str, str] = {}
+        stats = {"chunks_total": 0, "chunks_indexed": 0, "batches": 0}
+        pending_commits = set()
+        watermark = resume_after
+        embed_q: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        upsert_q: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+
+        async def produce():
+            # load + split + manifest filter + batching
+            batch = []
+            batch_no = -1
+
+            async def emit(batch):
+                nonlocal batch_no
+                batch_no += 1
+                if batch_no > resume_after:
+                    await embed_q.put((batch_no, batch))
+
+            pages = iter_documents_from_file(path, max_pending=self.queue_size)
+            async for chunk in self.splitter.split_stream(pages, source_id):
+                stats["chunks_total"] += 1
+                vec_id = self.indexer._make_id(chunk["id"], chunk["chunk_id"])
+                digest = chunk_sha256(chunk)
+                current[vec_id] = digest
+                if not force and previous.get(vec_id) == digest:
+                    continue
+                batch.append(chunk)
+                if len(batch) >= self.batch_size:
+                    await emit(batch)
+                    batch = []
+            if batch:
+                await emit(batch)
+            for _ in range(self.embed_concurrency):
+                await embed_q.put(_DONE)
+
+        async def embed_worker():
+            while (item := await embed_q.get()) is not _DONE:
+                batch_no, batch = item
+                with INGEST_STAGE_LATENCY.labels("embed").time(), \
+                        span("ingest.embed", **{"ingest.batch": batch_no, "ingest.chunks": len(batch)}):
+                    vectors = await to_thread_with_retry(self.indexer.embed_chunks, batch)
+                EMBED_CALLS.labels("ingest").inc()
+                EMBED_TEXTS.labels("ingest").inc(len(batch))
+                EMBED_TOKENS.labels("ingest").inc(sum(self.splitter.count_tokens(c["text"]) for c in batch))
+                await upsert_q.put((batch_no, batch, vectors))
+
+        async def embed_stage():
+            async with asyncio.TaskGroup() as tg:
+                for _ in range(self.embed_concurrency):
+                    tg.create_task(embed_worker())
+            for _ in range(self.upsert_concurrency):
+                await upsert_q.put(_DONE)
+
+        async def upsert_worker():
+            nonlocal watermark
+            while (item := await upsert_q.get()) is not _DONE:
+                batch_no, batch, vectors = item
+                with INGEST_STAGE_LATENCY.labels("upsert").time(), \
+                        span("ingest.upsert", **{"ingest.batch": batch_no, "ingest.chunks": len(vectors)}):
+                    await to_thread_with_retry(self.indexer.upsert_vectors, vectors, namespace)
+                # durable before the watermark passes this batch: a resumed run skips it
+                await asyncio.to_thread(lexical.add_many, [(vec_id, chunk["text"], metadata)
+                                                           for chunk, (vec_id, _, metadata) in zip(batch, vectors)])
+                INGEST_CHUNKS.labels("indexed").inc(len(vectors))
+                stats["chunks_indexed"] += len(vectors)
+                stats["batches"] += 1
+                # workers finish out of order; only advance over a contiguous prefix
+                pending_commits.add(batch_no)
+                advanced = False
+                while watermark + 1 in pending_commits:
+                    watermark += 1
+                    pending_commits.discard(watermark)
+                    advanced = True
+                if advanced and on_batch_committed:
+                    on_batch_committed(watermark)
+
+        _live_queues["embed"].add(embed_q)
+        _live_queues["upsert"].add(upsert_q)
+        try:
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(produce())
+                tg.create_task(embed_stage())
+                for _ in range(self.upsert_concurrency):
+                    tg.create_task(upsert_worker())
+        except ExceptionGroup as eg:
+            # surface the first stage failure, not the group wrapper
+            raise eg.exceptions[0]
+        finally:
+            _live_queues["embed"].discard(embed_q)
+            _live_queues["upsert"].discard(upsert_q)
+
+        removed = [vec_id for vec_id in previous if vec_id not in current]
+        if removed:
+            await to_thread_with_retry(self.indexer.delete_ids, removed, namespace)
+            await asyncio.to_thread(lexical.remove, removed)
+            INGEST_CHUNKS.labels("deleted").inc(len(removed))
+        flush = getattr(self.indexer, "flush", None)  # local backend: one snapshot per run
+        if flush is not None:
+            await asyncio.to_thread(flush, namespace)
+        await asyncio.to_thread(lexical.save)  # compacts the BM25 log when it has grown
+        await self.manifest.commit(source_id, file_hash, current, namespace)
+        return {
+            "status": "ok",
+            "chunks_total": stats["chunks_total"],
+            "chunks_indexed": stats["chunks_indexed"],
+            "chunks_deleted": len(removed),
+            "batches": stats["batches"],
+            "elapsed": time.perf_counter() - started,
+        }
+
+
+async def ingest_file(path: str, indexer, manifest: IngestManifest,
+                      source_id: str = None, force: bool = False, namespace: str = "") -> Dict[str, Any]:
+    return await IngestPipeline(indexer, manifest).run(path, source_id=source_id, force=force,
+                                                       namespace=namespace)
@@ -0,0 +1,275 @@
+# rag-service/pipeline/lexical.py
+import fcntl
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config import LEXICAL_INDEX_PATH, LEXICAL_REFRESH_SECONDS
+from pipeline.backend import safe_name
+
+# keep identifiers like "INV-2024-001", "report_v2.pdf" or "a/b/c" whole, and also index their parts
+_TOKEN = re.compile(r"\w+(?:[-./:]\w+)*")
+_PART = re.compile(r"[A-Za-z0-9]+")
+_MIN_COMPACT_BYTES = 1 << 20  # logs under this size are never worth compacting
+
+
+def namespace_path(namespace: str = "", base_path: str = LEXICAL_INDEX_PATH) -> str:
+    """Default namespace keeps LEXICAL_INDEX_PATH; others live beside it as bm25.{namespace}.json."""
+    if not namespace:
+        return base_path
+    return os.path.join(os.path.dirname(base_path), f"bm25.{safe_name(namespace)}.json")
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for tok in _TOKEN.findall(text.lower()):
+        tokens.append(tok)
+        parts = _PART.findall(tok)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class BM25Index:
+    """
+    In-memory inverted index with Okapi BM25 scoring, built alongside the vectors.
+    Postings are {term: {vector_id: term_frequency}}; per-doc length and metadata
+    are kept so lexical hits can be returned without touching the vector store.
+
+    On disk, shared by every replica:
+      {path}                snapshot (JSON) of the index as of log generation G
+      {path}.G.log          changes since that snapshot, one JSON line per add/remove batch
+    Each add_many/remove appends its own batch to the log under a file lock,
+    first replaying lines other replicas appended, so a write costs I/O in
+    proportion to the batch and is durable once it returns. save() compacts:
+    once the log outgrows the snapshot it writes a new snapshot (generation
+    G+1) and starts a new log. Searches pick up other replicas' writes
+    within `refresh_seconds`.
+    """
+
+    def __init__(self, path: Optional[str] = LEXICAL_INDEX_PATH, k1: float = 1.5, b: float = 0.75,
+                 refresh_seconds: float = LEXICAL_REFRESH_SECONDS):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.RLock()
+        self.postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.doc_len: Dict[str, int] = {}
+        self.doc_terms: Dict[str, List[str]] = {}
+        self.metadata: Dict[str, Dict[str, Any]] = {}
+        self.total_len = 0
+        self._generation = 0
+        self._snapshot_stamp = None  # (mtime_ns, size) of the snapshot as loaded
+        self._log_offset = 0  # bytes of the current log already applied
+        self._checked = time.monotonic()
+        if path and (os.path.exists(path) or os.path.exists(self._log_path(0))):
+            self.load()
+
+    def __len__(self):
+        return len(self.doc_len)
+
+    # -----------------------------
+    # Write path
+    # -----------------------------
+    def add(self, vec_id: str, text: str, metadata: Optional[Dict[str, Any]] = None):
+        self.add_many([(vec_id, text, metadata)])
+
+    def add_many(self, items: Iterable[Tuple[str, str, Optional[Dict[str, Any]]]]):
+        """Index (vec_id, text, metadata) items as one logged batch."""
+        record = {"op": "add", "docs": [[vec_id, dict(Counter(tokenize(text))), metadata or {}]
+                                        for vec_id, text, metadata in items]}
+        if record["docs"]:
+            self._commit(record)
+
+    def remove(self, ids: Iterable[str]):
+        record = {"op": "remove", "ids": list(ids)}
+        if record["ids"]:
+            self._commit(record)
+
+    def _apply(self, record: Dict[str, Any]):
+        if record["op"] == "add":
+            for vec_id, tf, metadata in record["docs"]:
+                self._add(vec_id, tf, metadata)
+        else:
+            for vec_id in record["ids"]:
+                self._remove(vec_id)
+
+    def _add(self, vec_id: str, tf: Dict[str, int], metadata: Dict[str, Any]):
+        self._remove(vec_id)
+        for term, n in tf.items():
+            self.postings[term][vec_id] = n
+        length = sum(tf.values())
+        self.doc_len[vec_id] = length
+        self.doc_terms[vec_id] = list(tf)
+        self.metadata[vec_id] = metadata
+        self.total_len += length
+
+    def _remove(self, vec_id: str):
+        if vec_id not in self.doc_len:
+            return
+        for term in self.doc_terms.pop(vec_id, []):
+            bucket = self.postings.get(term)
+            if bucket is not None:
+                bucket.pop(vec_id, None)
+                if not bucket:
+                    del self.postings[term]
+        self.total_len -= self.doc_len.pop(vec_id)
+        self.metadata.pop(vec_id, None)
+
+    # -----------------------------
+    # Read path
+    # -----------------------------
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
+        terms = set(tokenize(query))
+        self.refresh()
+        with self._lock:
+            n_docs = len(self.doc_len)
+            if not n_docs or not terms:
+                return []
+            avg_len = self.total_len / n_docs
+            scores: Dict[str, float] = defaultdict(float)
+            for term in terms:
+                bucket = self.postings.get(term)
+                if not bucket:
+                    continue
+                idf = math.log(1 + (n_docs - len(bucket) + 0.5) / (len(bucket) + 0.5))
+                for vec_id, tf in bucket.items():
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_len[vec_id] / avg_len)
+                    scores[vec_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:top_k]
+
+    # -----------------------------
+    # Persistence
+    # -----------------------------
+    def _log_path(self, generation: int) -> str:
+        return f"{self.path}.{generation}.log"
+
+    def _stamp(self, path: str):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _flock(self, mode: int):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        lock_file = open(f"{self.path}.lock", "a")
+        fcntl.flock(lock_file, mode)
+        return lock_file  # closing it releases the lock
+
+    def _commit(self, record: Dict[str, Any]):
+        if not self.path:
+            with self._lock:
+                self._apply(record)
+            return
+        line = (json.dumps(record) + "\n").encode("utf-8")
+        with self._flock(fcntl.LOCK_EX), self._lock:
+            self._catch_up()
+            with open(self._log_path(self._generation), "ab") as f:
+                if f.tell() > self._log_offset:  # a torn line left by a crashed writer
+                    f.truncate(self._log_offset)
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self._log_offset += len(line)
+            self._apply(record)
+
+    def _catch_up(self):
+        """Reload if the snapshot was compacted, then apply complete log lines past our offset."""
+        if self._stamp(self.path) != self._snapshot_stamp:
+            self._load_unlocked()
+            return
+        try:
+            with open(self._log_path(self._generation), "rb") as f:
+                f.seek(self._log_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        end = data.rfind(b"\n") + 1
+        for raw in data[:end].splitlines():
+            self._apply(json.loads(raw))
+        self._log_offset += end
+
+    def refresh(self):
+        """Apply other replicas' writes (checked at most every refresh_seconds)."""
+        if not self.path or time.monotonic() - self._checked < self.refresh_seconds:
+            return
+        self._checked = time.monotonic()
+        log = self._stamp(self._log_path(self._generation))
+        if self._stamp(self.path) == self._snapshot_stamp and (log is None or log[1] == self._log_offset):
+            return
+        with self._flock(fcntl.LOCK_SH), self._lock:
+            self._catch_up()
+
+    def save(self):
+        """Compact once the log has outgrown the snapshot (so rewrites stay amortized O(1) per change)."""
+        if not self.path:
+            return
+        with self._flock(fcntl.LOCK_EX), self._lock:
+            self._catch_up()
+            snapshot = self._stamp(self.path)
+            if self._log_offset <= max(_MIN_COMPACT_BYTES, snapshot[1] if snapshot else 0):
+                return
+            old = self._generation
+            data = {"generation": old + 1, "doc_terms": self.doc_terms, "metadata": self.metadata,
+                    "postings": self.postings, "doc_len": self.doc_len}
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+            self._generation, self._log_offset = old + 1, 0
+            self._snapshot_stamp = self._stamp(self.path)
+            try:
+                os.remove(self._log_path(old))
+            except FileNotFoundError:
+                pass
+
+    def load(self):
+        with self._flock(fcntl.LOCK_SH), self._lock:
+            self._load_unlocked()
+        print(f"[Lexical] Loaded BM25 index with {len(self.doc_len)} chunks from '{self.path}'")
+
+    def _load_unlocked(self):
+        data = {}
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        self.postings = defaultdict(dict, data.get("postings", {}))
+        self.doc_len = data.get("doc_len", {})
+        self.doc_terms = data.get("doc_terms", {})
+        self.metadata = data.get("metadata", {})
+        self.total_len = sum(self.doc_len.values())
+        self._generation = data.get("generation", 0)
+        self._snapshot_stamp = self._stamp(self.path)
+        self._log_offset = 0
+        self._catch_up()
+
+
+def lexical_confidence(score: float, half: float) -> float:
+    """
+    Absolute 0..1 confidence for a raw BM25 score: score / (score + half), so a
+    score of `half` maps to 0.5. Unlike a score relative to the top hit, a weak
+    keyword match stays weak even when it is the best one.
+    """
+    return score / (score + half) if score > 0 else 0.0
+
+
+def is_decisive(hits: List[Tuple[str, float]], min_score: float, ratio: float) -> bool:
+    """The lexical top hit is strong on its own and clearly ahead of the runner-up."""
+    if not hits or hits[0][1] < min_score:
+        return False
+    return len(hits) == 1 or hits[0][1] >= ratio * hits[1][1]
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    fused: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, vec_id in enumerate(ranking):
+            fused[vec_id] += 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda kv: kv[1], reverse=True)
@@ -1,5 +1,7 @@
 import os
 import asyncio
+import queue
+import threading
 
 from langchain_community.document_loaders import (
     PyPDFLoader,
@@ -18,6 +20,24 @@ except ImportError:
     OFFICE_LOADER_AVAILABLE = False
     print("⚠️ Office loaders not available, .doc/.xls/.ppt will be skipped.")
 
+_DONE = object()
+
+
+def _select_loader(path: str):
+    lower = path.lower()
+    if lower.endswith(".pdf"):
+        return PyPDFLoader(path)
+    elif lower.endswith(".txt") or lower.endswith(".md"):
+        return TextLoader(path, encoding="utf-8")
+    elif OFFICE_LOADER_AVAILABLE and lower.endswith((".doc", ".docx")):
+        return UnstructuredWordDocumentLoader(path)
+    elif OFFICE_LOADER_AVAILABLE and lower.endswith((".xls", ".xlsx")):
+        return UnstructuredExcelLoader(path)
+    elif OFFICE_LOADER_AVAILABLE and lower.endswith((".ppt", ".pptx")):
+        return UnstructuredPowerPointLoader(path)
+    return None
+
+
 async def load_documents_from_file(path: str):
     """
     Load documents from a folder asynchronously.
@@ -26,20 +46,62 @@ async def load_documents_from_file(path: str):
     Returns:
         list[langchain.schema.Document]
     """
-    lower = path.lower()
-    loader = None
-    if lower.endswith(".pdf"):
-        loader = PyPDFLoader(path)
-    elif lower.endswith(".txt") or lower.endswith(".md"):
-        loader = TextLoader(path, encoding="utf-8")
-    elif OFFICE_LOADER_AVAILABLE and lower.endswith((".doc", ".docx")):
-        loader = UnstructuredWordDocumentLoader(path)
-    elif OFFICE_LOADER_AVAILABLE and lower.endswith((".xls", ".xlsx")):
-        loader = UnstructuredExcelLoader(path)
-    elif OFFICE_LOADER_AVAILABLE and lower.endswith((".ppt", ".pptx")):
-        loader = UnstructuredPowerPointLoader(path)
-    else:
+    loader = _select_loader(path)
+    if loader is None:
         return []
 
     docs = await asyncio.to_thread(loader.load)
     return docs
+
+
+async def iter_documents_from_file(path: str, max_pending: int = 4):
+    """
+    Stream documents (pages) from a file without materialising the whole list.
+    The loader's lazy_load() runs in a worker thread and hands pages over
+    through a bounded queue, so at most `max_pending` pages are held at once.
+    """
+    loader = _select_loader(path)
+    if loader is None:
+        return
+
+    pages: queue.Queue = queue.Queue(maxsize=max_pending)
+    stop = threading.Event()
+
+    def _put(item) -> bool:
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get():
+        while not stop.is_set():
+            try:
+                return pages.get(timeout=0.5)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _produce():
+        try:
+            for doc in loader.lazy_load():
+                if not _put(doc):
+                    return
+            _put(_DONE)
+        except Exception as e:
+            _put(e)
+
+    producer = asyncio.create_task(asyncio.to_thread(_produce))
+    try:
+        while True:
+            item = await asyncio.to_thread(_get)
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        await producer
@@ -0,0 +1,308 @@
+# rag-service/pipeline/local_index.py
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from config import LOCAL_INDEX_DIR, EMBED_DIM, BATCH_SIZE
+from pipeline.backend import safe_name
+from pipeline.embedder import default_embedder
+
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+    print("⚠️ faiss not available, local index will use NumPy brute-force search.")
+
+class _LocalStore:
+    """
+    One namespace's vectors: a flat inner-product index on local disk.
+      {path}/vectors.npy        float32 matrix, one row per vector (snapshot)
+      {path}/meta.json          {"ids": [...], "metadata": [...]} in row order
+      {path}/segments/NNN.*     writes since the snapshot, one segment per batch
+    A write changes memory under `lock` (the one searches hold) and then
+    appends a small segment file outside it, so each batch costs I/O in
+    proportion to its own size and searches never wait on disk. flush()
+    folds the segments into a new snapshot, once per ingest run.
+    """
+
+    def __init__(self, path: str, dim: int, lock: threading.RLock):
+        self.path = path
+        self.lock = lock
+        self._io_lock = threading.Lock()  # orders segment writes and flushes of this store
+        self._ids: List[str] = []
+        self._meta: List[Dict[str, Any]] = []
+        self._pos: Dict[str, int] = {}
+        self._buf = np.zeros((0, dim), dtype=np.float32)  # grown by doubling; rows [0, len) are live
+        self._faiss = None  # rebuilt lazily after updates/deletes; appends are added in place
+        self._seq = 0  # last segment number written
+        self._dirty = False
+        self._load()
+
+    def __len__(self):
+        return len(self._ids)
+
+    @property
+    def _vectors(self) -> np.ndarray:
+        return self._buf[:len(self._ids)]
+
+    def _paths(self):
+        return os.path.join(self.path, "vectors.npy"), os.path.join(self.path, "meta.json")
+
+    def _segment_dir(self):
+        return os.path.join(self.path, "segments")
+
+    def _segments(self):
+        """(seq, json path) of complete segments, oldest first."""
+        folder = self._segment_dir()
+        names = os.listdir(folder) if os.path.isdir(folder) else []
+        return sorted((int(n[:-5]), os.path.join(folder, n)) for n in names if n.endswith(".json"))
+
+    def _load(self):
+        vec_path, meta_path = self._paths()
+        if os.path.exists(vec_path) and os.path.exists(meta_path):
+            self._buf = np.load(vec_path)
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self._ids, self._meta = meta["ids"], meta["metadata"]
+            self._pos = {vid: i for i, vid in enumerate(self._ids)}
+        segments = self._segments()
+        for seq, json_path in segments:
+            with open(json_path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+            if record["op"] == "delete":
+                self._delete(record["ids"])
+            else:
+                rows = np.load(json_path[:-5] + ".npy")
+                self._upsert(list(zip(record["ids"], rows, record["metadata"])))
+            self._seq = seq
+        self._dirty = bool(segments)
+        if self._ids:
+            print(f"[LocalIndex] Loaded {len(self._ids)} vectors from '{self.path}' ({len(segments)} segments)")
+
+    def _write_segment(self, seq: int, record: Dict[str, Any], rows: Optional[np.ndarray] = None):
+        folder = self._segment_dir()
+        os.makedirs(folder, exist_ok=True)
+        base = os.path.join(folder, f"{seq:012d}")
+        if rows is not None:
+            with open(f"{base}.npy", "wb") as f:
+                np.save(f, rows)
+        # the .json is written last and atomically: it is what marks the segment complete
+        with open(f"{base}.json.tmp", "w", encoding="utf-8") as f:
+            json.dump(record, f)
+        os.replace(f"{base}.json.tmp", f"{base}.json")
+
+    def flush(self):
+        """Write a snapshot of the current state and drop the segments it covers."""
+        with self._io_lock:
+            with self.lock:
+                if not self._dirty:
+                    return
+                vectors, ids, meta, seq = self._vectors.copy(), list(self._ids), list(self._meta), self._seq
+                self._dirty = False
+            os.makedirs(self.path, exist_ok=True)
+            vec_path, meta_path = self._paths()
+            with open(f"{vec_path}.tmp", "wb") as f:
+                np.save(f, vectors)
+            with open(f"{meta_path}.tmp", "w", encoding="utf-8") as f:
+                json.dump({"ids": ids, "metadata": meta}, f)
+            os.replace(f"{vec_path}.tmp", vec_path)
+            os.replace(f"{meta_path}.tmp", meta_path)
+            for n, json_path in self._segments():
+                if n <= seq:
+                    os.remove(json_path)
+                    if os.path.exists(json_path[:-5] + ".npy"):
+                        os.remove(json_path[:-5] + ".npy")
+
+    # -----------------------------
+    # Writes
+    # -----------------------------
+    def _append(self, rows: np.ndarray):
+        n = len(self._ids) - len(rows)  # ids are already appended
+        if len(self._ids) > len(self._buf):
+            grown = np.zeros((max(len(self._ids), 2 * len(self._buf), 1024), self._buf.shape[1]), dtype=np.float32)
+            grown[:n] = self._buf[:n]
+            self._buf = grown
+        self._buf[n:len(self._ids)] = rows
+        if self._faiss is not None:
+            self._faiss.add(rows)
+
+    def _upsert(self, items):
+        """items: (id, normalised row, metadata)."""
+        base, new_rows = len(self._ids), []
+        for vid, row, metadata in items:
+            pos = self._pos.get(vid)
+            if pos is None:
+                self._pos[vid] = len(self._ids)
+                self._ids.append(vid)
+                self._meta.append(metadata)
+                new_rows.append(row)
+            elif pos >= base:  # repeated id within this batch
+                new_rows[pos - base] = row
+                self._meta[pos] = metadata
+            else:
+                self._buf[pos] = row
+                self._meta[pos] = metadata
+                self._faiss = None
+        if new_rows:
+            self._append(np.asarray(new_rows, dtype=np.float32))
+
+    def _delete(self, ids: List[str]):
+        drop = {self._pos[vid] for vid in ids if vid in self._pos}
+        if not drop:
+            return
+        keep = [i for i in range(len(self._ids)) if i not in drop]
+        self._buf = self._vectors[keep]
+        self._ids = [self._ids[i] for i in keep]
+        self._meta = [self._meta[i] for i in keep]
+        self._pos = {vid: i for i, vid in enumerate(self._ids)}
+        self._faiss = None
+
+    def upsert(self, vectors):
+        mat = _normalize(np.asarray([v for _, v, _ in vectors], dtype=np.float32))
+        ids, meta = [vid for vid, _, _ in vectors], [m for _, _, m in vectors]
+        with self._io_lock:
+            with self.lock:
+                self._upsert(list(zip(ids, mat, meta)))
+                self._seq += 1
+                self._dirty = True
+            self._write_segment(self._seq, {"op": "upsert", "ids": ids, "metadata": meta}, mat)
+
+    def delete(self, ids: List[str]):
+        with self._io_lock:
+            with self.lock:
+                if not any(vid in self._pos for vid in ids):
+                    return
+                self._delete(ids)
+                self._seq += 1
+                self._dirty = True
+            self._write_segment(self._seq, {"op": "delete", "ids": list(ids)})
+
+    def search(self, q: np.ndarray, top_k: int) -> List[List[Dict[str, Any]]]:
+        n = len(self._ids)
+        if n == 0:
+            return [[] for _ in range(len(q))]
+        top_k = min(top_k, n)
+        if FAISS_AVAILABLE:
+            if self._faiss is None:
+                self._faiss = faiss.IndexFlatIP(self._vectors.shape[1])
+                self._faiss.add(self._vectors)
+            D, I = self._faiss.search(q, top_k)
+        else:
+            scores = q @ self._vectors.T
+            idx = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+            part = np.take_along_axis(scores, idx, axis=1)
+            order = np.argsort(-part, axis=1)
+            D, I = np.take_along_axis(part, order, axis=1), np.take_along_axis(idx, order, axis=1)
+        return [[{"id": self._ids[i], "score": float(s), "metadata": self._meta[i]}
+                 for s, i in zip(scores, rows) if i >= 0] for scores, rows in zip(D, I)]
+
+    def fetch(self, ids: List[str]) -> Dict[str, Any]:
+        return {
+            vid: {"id": vid, "values": self._vectors[self._pos[vid]].tolist(), "metadata": self._meta[self._pos[vid]]}
+            for vid in ids if vid in self._pos
+        }
+
+
+class LocalIndexer:
+    """
+    Drop-in replacement for PineconeIndexer backed by flat inner-product indexes
+    on local disk. Vectors are L2-normalised, so scores are cosine similarities.
+    Each namespace (tenant/session partition) is its own sub-index, so a search
+    only scans the partitions it asks for:
+      {index_dir}/                    default namespace
+      {index_dir}/namespaces/{name}/  every other namespace
+    """
+
+    def __init__(self, embedder=None, index_dir: str = LOCAL_INDEX_DIR, dim: int = EMBED_DIM):
+        self.index_dir = index_dir
+        self.dim = dim
+        self.namespace = None
+        self.embedder = embedder or default_embedder()
+        self._lock = threading.RLock()
+        self._stores: Dict[str, _LocalStore] = {}
+        os.makedirs(index_dir, exist_ok=True)
+        self._store(None)
+
+    def _store(self, namespace: Optional[str]) -> _LocalStore:
+        name = namespace or ""
+        with self._lock:
+            store = self._stores.get(name)
+            if store is None:
+                path = self.index_dir if not name else os.path.join(self.index_dir, "namespaces", safe_name(name))
+                store = self._stores[name] = _LocalStore(path, self.dim, self._lock)
+            return store
+
+    # -----------------------------
+    # Write path (same signatures as PineconeIndexer)
+    # -----------------------------
+    def _make_id(self, source_id: str, chunk_id: str | int):
+        return f"{source_id}~{chunk_id}"
+
+    def embed_chunks(self, docs: List[Dict[str, Any]]):
+        if not self.embedder:
+            raise RuntimeError("No embedder configured for LocalIndexer")
+        batch_embs = self.embedder.embed_documents([d["text"] for d in docs])
+        vectors = []
+        for j, emb in enumerate(batch_embs):
+            d = docs[j]
+            metadata = dict(d.get("metadata", {}))
+            metadata.setdefault("snippet", d["text"][:500])
+            metadata.update({"source_id": d["id"], "chunk_id": d.get("chunk_id", j)})
+            vectors.append((self._make_id(d["id"], d.get("chunk_id", j)), emb, metadata))
+        return vectors
+
+    def upsert_vectors(self, vectors, namespace: Optional[str] = None):
+        if not vectors:
+            return
+        self._store(namespace).upsert(vectors)
+
+    def upsert_documents(self, docs: List[Dict[str, Any]], namespace: Optional[str] = None):
+        for i in range(0, len(docs), BATCH_SIZE):
+            self.upsert_vectors(self.embed_chunks(docs[i:i+BATCH_SIZE]), namespace=namespace)
+        self.flush(namespace)
+
+    def delete_ids(self, ids: List[str], namespace: Optional[str] = None):
+        self._store(namespace).delete(ids)
+
+    def flush(self, namespace: Optional[str] = None):
+        """Compact the namespace's write segments into its snapshot (once per ingest run)."""
+        self._store(namespace).flush()
+
+    # -----------------------------
+    # Read path
+    # -----------------------------
+    def query(self, query_text: str, top_k: int = 5, namespace: Optional[str] = None):
+        return self.query_batch([query_text], top_k, namespaces=[namespace])[0]
+
+    def query_batch(self, query_texts: List[str], top_k: int = 5, namespaces: Optional[List[str]] = None):
+        """
+        Embed all queries in one call and search them as a single matrix against
+        each requested namespace; per-query matches are merged by score.
+        """
+        if not self.embedder:
+            raise RuntimeError("No embedder configured for query")
+        if len(query_texts) == 1:
+            embeddings = [self.embedder.embed_query(query_texts[0])]
+        else:
+            embeddings = getattr(self.embedder, "embed_queries", self.embedder.embed_documents)(query_texts)
+        q = _normalize(np.asarray(embeddings, dtype=np.float32))
+        merged: List[List[Dict[str, Any]]] = [[] for _ in query_texts]
+        with self._lock:
+            for ns in namespaces or [None]:
+                for qi, matches in enumerate(self._store(ns).search(q, top_k)):
+                    merged[qi].extend({**m, "namespace": ns or ""} for m in matches)
+        return [{"matches": sorted(ms, key=lambda m: m["score"], reverse=True)[:top_k]} for ms in merged]
+
+    def retrieve_by_ids(self, ids: List[str], namespace: Optional[str] = None):
+        with self._lock:
+            vectors = self._store(namespace).fetch(ids)
+        return {"vectors": vectors, "namespace": namespace or ""}
+
+
+def _normalize(mat: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return mat / norms
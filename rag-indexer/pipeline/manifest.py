@@ -0,0 +1,82 @@
+# rag-service/pipeline/manifest.py
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+import redis.asyncio as aioredis
+from config import REDIS_URL, MANIFEST_PREFIX
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    """Hash a file in fixed-size blocks so large uploads are never fully read into memory."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def chunk_sha256(chunk: Dict[str, Any]) -> str:
+    """Hash the parts of a chunk that end up in the vector store (text + metadata)."""
+    h = hashlib.sha256(chunk["text"].encode("utf-8"))
+    h.update(json.dumps(chunk.get("metadata", {}), sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+class IngestManifest:
+    """
+    Redis-backed record of what has been ingested, per source file and namespace.
+      {prefix}:file:{scope}   -> sha256 of the raw file
+      {prefix}:chunks:{scope} -> hash of {vector_id: chunk sha256}
+    where scope is the source_id, prefixed with "{namespace}/" outside the default namespace.
+    """
+
+    def __init__(self, redis_url: str = REDIS_URL, prefix: str = MANIFEST_PREFIX):
+        self.redis_url = redis_url
+        self.prefix = prefix
+        self.redis: Optional[aioredis.Redis] = None
+
+    async def connect(self):
+        if self.redis is None:
+            self.redis = aioredis.from_url(self.redis_url, decode_responses=True)
+        return self
+
+    async def close(self):
+        if self.redis is not None:
+            await self.redis.close()
+            self.redis = None
+
+    @staticmethod
+    def _scope(source_id: str, namespace: str = "") -> str:
+        return f"{namespace}/{source_id}" if namespace else source_id
+
+    def _file_key(self, source_id: str, namespace: str = "") -> str:
+        return f"{self.prefix}:file:{self._scope(source_id, namespace)}"
+
+    def _chunks_key(self, source_id: str, namespace: str = "") -> str:
+        return f"{self.prefix}:chunks:{self._scope(source_id, namespace)}"
+
+    async def file_unchanged(self, source_id: str, file_hash: str, namespace: str = "") -> bool:
+        await self.connect()
+        return await self.redis.get(self._file_key(source_id, namespace)) == file_hash
+
+    async def chunk_hashes(self, source_id: str, namespace: str = "") -> Dict[str, str]:
+        await self.connect()
+        return await self.redis.hgetall(self._chunks_key(source_id, namespace))
+
+    async def commit(self, source_id: str, file_hash: str, chunk_hashes: Dict[str, str], namespace: str = ""):
+        """
+        Replace the manifest entry for a source. Called only after the vector
+        store accepted the upserts/deletes, so a crash mid-ingest re-processes the file.
+        """
+        await self.connect()
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(self._chunks_key(source_id, namespace))
+            if chunk_hashes:
+                pipe.hset(self._chunks_key(source_id, namespace), mapping=chunk_hashes)
+            pipe.set(self._file_key(source_id, namespace), file_hash)
+            await pipe.execute()
+
+    async def forget(self, source_id: str, namespace: str = ""):
+        await self.connect()
+        await self.redis.delete(self._file_key(source_id, namespace), self._chunks_key(source_id, namespace))
@@ -0,0 +1,213 @@
+# rag-service/pipeline/result_cache.py
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import redis.asyncio as aioredis
+from config import (REDIS_URL, SEARCH_CACHE_ENABLED, SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL,
+                    SEARCH_CACHE_REDIS_TTL, SEARCH_CACHE_PREFIX, SEARCH_CACHE_SETTLE_SECONDS)
+from metrics import SEARCH_CACHE_LOOKUPS
+
+_REDIS_RETRY_AFTER = 30.0  # seconds to run LRU-only after a Redis error
+
+Versions = Tuple[int, ...]
+
+
+class SearchResultCache:
+    """
+    Two-tier cache of search results: an in-process LRU in front of Redis.
+
+    Keys are (normalized query, top_k, mode, namespaces) plus the current
+    version of each namespace searched. Ingestion bumps a namespace's version
+    in Redis after every write (`invalidate`), so entries cached before new
+    data landed are simply never looked up again and age out by TTL/LRU. The
+    versions are read from Redis on every lookup (one MGET), which keeps
+    replicas and the reindex script coherent; if Redis is down the cache
+    falls back to process-local versions and the LRU tier alone.
+
+    A write may not be visible to queries right away (Pinecone is eventually
+    consistent), and a search run just after the bump would cache the old
+    results under the new version. So for `settle` seconds after an
+    invalidate the namespace is "settling": versions() returns None and the
+    request neither reads nor writes the cache.
+    """
+
+    def __init__(self, redis_url: str = REDIS_URL, prefix: str = SEARCH_CACHE_PREFIX,
+                 size: int = SEARCH_CACHE_SIZE, ttl: float = SEARCH_CACHE_TTL,
+                 redis_ttl: int = SEARCH_CACHE_REDIS_TTL, enabled: bool = SEARCH_CACHE_ENABLED,
+                 settle: float = SEARCH_CACHE_SETTLE_SECONDS):
+        self.redis_url = redis_url
+        self.prefix = prefix
+        self.size = size
+        self.ttl = ttl
+        self.redis_ttl = redis_ttl
+        self.enabled = enabled
+        self.settle = settle
+        self.redis: Optional[aioredis.Redis] = None
+        self._redis_down_until = 0.0
+        self._local: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}  # used when Redis is unreachable
+        self._settling: Dict[str, float] = {}  # namespace -> end of its no-cache window (monotonic)
+
+    # -----------------------------
+    # Redis
+    # -----------------------------
+    def _client(self) -> Optional[aioredis.Redis]:
+        if time.monotonic() < self._redis_down_until:
+            return None
+        if self.redis is None:
+            self.redis = aioredis.from_url(self.redis_url, decode_responses=True)
+        return self.redis
+
+    def _redis_failed(self, e: Exception):
+        if time.monotonic() >= self._redis_down_until:
+            print(f"⚠️ Search cache: Redis unavailable ({e}), using the in-process tier only")
+        self._redis_down_until = time.monotonic() + _REDIS_RETRY_AFTER
+
+    def _version_key(self, namespace: str) -> str:
+        return f"{self.prefix}:version:{namespace}"
+
+    def _settle_key(self, namespace: str) -> str:
+        return f"{self.prefix}:settling:{namespace}"
+
+    def _result_key(self, key: Hashable, versions: Versions) -> str:
+        digest = hashlib.sha256(json.dumps([key, versions], default=list).encode("utf-8")).hexdigest()
+        return f"{self.prefix}:result:{digest}"
+
+    async def close(self):
+        if self.redis is not None:
+            await self.redis.close()
+            self.redis = None
+
+    # -----------------------------
+    # Versions
+    # -----------------------------
+    async def versions(self, namespaces: Tuple[str, ...]) -> Optional[Versions]:
+        """
+        Current data version of each namespace, read once per request; None
+        while any of them is settling after a write (don't use the cache).
+        """
+        if not self.enabled:
+            return ()
+        now = time.monotonic()
+        if any(self._settling.get(ns, 0.0) > now for ns in namespaces):
+            return None
+        client = self._client()
+        if client is not None:
+            try:
+                values = await client.mget([self._version_key(ns) for ns in namespaces] +
+                                           [self._settle_key(ns) for ns in namespaces])
+                if any(values[len(namespaces):]):
+                    return None
+                return tuple(int(v or 0) for v in values[:len(namespaces)])
+            except Exception as e:
+                self._redis_failed(e)
+        return tuple(self._versions.get(ns, 0) for ns in namespaces)
+
+    async def invalidate(self, namespace: str = ""):
+        """
+        Advance the namespace's version: results cached for the old version are
+        never served again, and nothing is cached for it for the next `settle` seconds.
+        """
+        self._versions[namespace] = self._versions.get(namespace, 0) + 1
+        if self.settle > 0:
+            self._settling[namespace] = time.monotonic() + self.settle
+        client = self._client()
+        if client is not None:
+            try:
+                async with client.pipeline(transaction=False) as pipe:
+                    pipe.incr(self._version_key(namespace))
+                    if self.settle > 0:
+                        pipe.set(self._settle_key(namespace), 1, px=int(self.settle * 1000))
+                    await pipe.execute()
+            except Exception as e:
+                self._redis_failed(e)
+        # process-local fallback versions may repeat numbers already used in Redis
+        self._local.clear()
+
+    # -----------------------------
+    # Lookups
+    # -----------------------------
+    def _local_get(self, key: Hashable):
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._local[key]
+            return None
+        self._local.move_to_end(key)
+        return value
+
+    def _local_set(self, key: Hashable, value):
+        self._local[key] = (time.monotonic() + self.ttl, value)
+        self._local.move_to_end(key)
+        while len(self._local) > self.size:
+            self._local.popitem(last=False)
+
+    async def get_many(self, keys: List[Hashable], versions: Optional[Versions]) -> Dict[Hashable, Any]:
+        """Cached results for whichever of `keys` are present (LRU first, then one Redis MGET)."""
+        if not self.enabled or not keys:
+            return {}
+        if versions is None:
+            SEARCH_CACHE_LOOKUPS.labels("settling").inc(len(keys))
+            return {}
+        found = {}
+        missing = []
+        for key in keys:
+            value = self._local_get((key, versions))
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+                SEARCH_CACHE_LOOKUPS.labels("local").inc()
+        client = self._client() if missing else None
+        if client is not None:
+            try:
+                values = await client.mget([self._result_key(k, versions) for k in missing])
+            except Exception as e:
+                self._redis_failed(e)
+                values = [None] * len(missing)
+            for key, raw in zip(missing, values):
+                if raw is not None:
+                    found[key] = json.loads(raw)
+                    self._local_set((key, versions), found[key])
+                    SEARCH_CACHE_LOOKUPS.labels("redis").inc()
+        SEARCH_CACHE_LOOKUPS.labels("miss").inc(len(keys) - len(found))
+        return found
+
+    async def get(self, key: Hashable, versions: Optional[Versions]):
+        return (await self.get_many([key], versions)).get(key)
+
+    async def set_many(self, items: Dict[Hashable, Any], versions: Optional[Versions]):
+        if not self.enabled or not items or versions is None:
+            return
+        for key, value in items.items():
+            self._local_set((key, versions), value)
+        client = self._client()
+        if client is None:
+            return
+        try:
+            async with client.pipeline(transaction=False) as pipe:
+                for key, value in items.items():
+                    pipe.set(self._result_key(key, versions), json.dumps(value, default=str), ex=self.redis_ttl)
+                await pipe.execute()
+        except Exception as e:
+            self._redis_failed(e)
+
+    async def set(self, key: Hashable, versions: Optional[Versions], value):
+        await self.set_many({key: value}, versions)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "local_entries": len(self._local),
+            "local_size": self.size,
+            "settle_seconds": self.settle,
+            "redis": time.monotonic() >= self._redis_down_until,
+        }
+
+
+search_cache = SearchResultCache()
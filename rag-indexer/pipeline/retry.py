@@ -0,0 +1,45 @@
+# rag-service/pipeline/retry.py
+import asyncio
+import random
+
+from config import RETRY_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY
+
+# exception class names (OpenAI, httpx, Pinecone/urllib3) that mean "try again later"
+_TRANSIENT_NAMES = ("Timeout", "Connect", "Network", "RemoteProtocol", "RateLimit", "ServiceUnavailable", "TooManyRequests")
+
+
+def _status_code(e: Exception):
+    for obj in (e, getattr(e, "response", None)):
+        code = getattr(obj, "status_code", None) or getattr(obj, "status", None)
+        if isinstance(code, int):
+            return code
+    return None
+
+
+def is_transient(e: Exception) -> bool:
+    """Timeouts, connection errors, 429 and 5xx; everything else (bad input, 4xx, config errors) is permanent."""
+    if isinstance(e, (TimeoutError, ConnectionError, asyncio.TimeoutError)):
+        return True
+    code = _status_code(e)
+    if code is not None:
+        return code == 429 or code >= 500
+    return any(name in cls.__name__ for cls in type(e).__mro__ for name in _TRANSIENT_NAMES)
+
+
+async def to_thread_with_retry(fn, *args, attempts: int = RETRY_ATTEMPTS,
+                               base_delay: float = RETRY_BASE_DELAY,
+                               max_delay: float = RETRY_MAX_DELAY):
+    """
+    Run a blocking call in a thread, retrying transient failures (rate limits,
+    timeouts, connection errors, 5xx) with exponential backoff + jitter.
+    Permanent errors are raised immediately.
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            return await asyncio.to_thread(fn, *args)
+        except Exception as e:
+            if attempt == attempts or not is_transient(e):
+                raise
+            delay = min(max_delay, base_delay * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+            print(f"⚠️ {getattr(fn, '__name__', fn)} failed ({e}), retry {attempt}/{attempts - 1} in {delay:.1f}s")
+            await asyncio.sleep(delay)
@@ -1,28 +1,189 @@
 # rag-service/pipeline/search.py
-from .index_build import PineconeIndexer
-from typing import List, Dict, Any
-from config import API_KEY
+import asyncio
+from .backend import get_indexer, get_lexical_index
+from .lexical import is_decisive, lexical_confidence, reciprocal_rank_fusion
+from .result_cache import search_cache
+from .singleflight import SingleFlight
+from .splitter import TextSplitter
+from metrics import EMBED_CALLS, EMBED_TEXTS, EMBED_TOKENS, SEARCH_LATENCY, SEARCH_PATH
+from tracing import span
+from typing import List, Dict, Any, Optional, Tuple
+from config import SEARCH_MODE, LEXICAL_MIN_SCORE, LEXICAL_DECISIVE_RATIO, RRF_K, LEXICAL_CONFIDENCE_HALF
 
-indexer = PineconeIndexer()
+# concurrent identical searches share one backend call
+inflight = SingleFlight()
+_tokens = TextSplitter()
 
-async def pinecone_search(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+# a lexical hit is ((namespace, vector_id), bm25_score)
+LexicalHit = Tuple[Tuple[str, str], float]
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.split())
+
+
+def normalize_namespaces(namespaces: Optional[List[str]]) -> Tuple[str, ...]:
+    """Deduplicated partitions to search; None/empty means the default namespace only."""
+    return tuple(dict.fromkeys(ns or "" for ns in namespaces)) if namespaces else ("",)
+
+
+def _format(vec_id: str, score: float, metadata: Dict[str, Any], namespace: str = "") -> Dict[str, Any]:
+    return {
+        "id": vec_id,
+        "score": score,
+        "namespace": namespace,
+        "metadata": metadata,
+        "text": metadata.get("snippet", ""),
+        "position": metadata.get("position"),
+    }
+
+
+async def _query_backend(queries: List[str], top_k: int, namespaces: Tuple[str, ...]):
+    """One embedding call + one vector-store round for all `queries`."""
+    EMBED_CALLS.labels("query").inc()
+    EMBED_TEXTS.labels("query").inc(len(queries))
+    EMBED_TOKENS.labels("query").inc(sum(_tokens.count_tokens(q) for q in queries))
+    with SEARCH_LATENCY.labels("query_batch").time(), \
+            span("vector.search", **{"search.queries": len(queries), "search.top_k": top_k,
+                                     "search.namespaces": ",".join(namespaces)}):
+        return await asyncio.to_thread(get_indexer().query_batch, queries, top_k, list(namespaces))
+
+
+def _format_matches(res) -> List[Dict[str, Any]]:
+    matches = res.get("matches", []) if isinstance(res, dict) else []
+    return [_format(m.get("id"), m.get("score"), m.get("metadata", {}), m.get("namespace", "")) for m in matches]
+
+
+async def vector_search(query: str, top_k: int = 5, namespaces: Tuple[str, ...] = ("",)) -> List[Dict[str, Any]]:
     """
     Async wrapper for Pinecone query; run blocking call in thread if necessary.
     """
-    loop = __import__("asyncio").get_event_loop()
-    res = await loop.run_in_executor(None, indexer.query, query, top_k)
-    matches = res.get("matches", []) if isinstance(res, dict) else []
-    formatted = []
-    for m in matches:
-        formatted.append({
-            "id": m.get("id"),
-            "score": m.get("score"),
-            "metadata": m.get("metadata", {}),
-            "text": m.get("metadata", {}).get("snippet", "")
-        })
-    return formatted
-
-async def pinecone_retrieve(ids: List[str]):
-    loop = __import__("asyncio").get_event_loop()
-    res = await loop.run_in_executor(None, indexer.retrieve_by_ids, ids)
+    res = await _query_backend([query], top_k, namespaces)
+    return _format_matches(res[0])
+
+
+def _lexical_hits(query: str, top_k: int, namespaces: Tuple[str, ...]) -> List[LexicalHit]:
+    with span("lexical.search", **{"search.top_k": top_k}) as s:
+        hits = []
+        for ns in namespaces:
+            hits.extend(((ns, vec_id), score) for vec_id, score in get_lexical_index(ns).search(query, top_k))
+        s.set("search.hits", len(hits))
+        return sorted(hits, key=lambda h: h[1], reverse=True)[:top_k]
+
+
+def _lexical_matches(hits: List[LexicalHit], cap: float = 1.0) -> List[Dict[str, Any]]:
+    """
+    BM25 hits as matches. `score` is the calibrated lexical_confidence (at most
+    `cap`), so it can feed the same confidence checks as cosine scores; the
+    raw BM25 score is kept as `bm25`.
+    """
+    return [{**_format(vec_id, round(min(cap, lexical_confidence(score, LEXICAL_CONFIDENCE_HALF)), 4),
+                       get_lexical_index(ns).metadata.get(vec_id, {}), ns), "bm25": round(score, 4)}
+            for (ns, vec_id), score in hits]
+
+
+def lexical_search(query: str, top_k: int = 5, namespaces: Tuple[str, ...] = ("",)) -> List[Dict[str, Any]]:
+    return _lexical_matches(_lexical_hits(query, top_k, namespaces))
+
+
+def _fuse(vector_hits: List[Dict[str, Any]], hits: List[LexicalHit], top_k: int) -> List[Dict[str, Any]]:
+    """Reciprocal-rank fusion of vector matches and BM25 hits."""
+    if not hits:
+        return vector_hits
+    by_key = {(m["namespace"], m["id"]): m for m in vector_hits}
+    # a hit only BM25 found is never more confident than the weakest vector match
+    cap = min((m["score"] for m in vector_hits if m.get("score") is not None), default=1.0)
+    lexical_by_key = {(m["namespace"], m["id"]): m for m in _lexical_matches(hits, cap)}
+    fused = reciprocal_rank_fusion([list(by_key), [key for key, _ in hits]], k=RRF_K)
+    # keep the vector score where there is one; lexical-only hits carry their calibrated BM25 confidence
+    return [{**(by_key.get(key) or lexical_by_key[key]), "rrf_score": rrf} for key, rrf in fused[:top_k]]
+
+
+async def _search(query: str, top_k: int, mode: str, namespaces: Tuple[str, ...]) -> List[Dict[str, Any]]:
+    if mode == "vector":
+        SEARCH_PATH.labels(mode, "vector").inc()
+        return await vector_search(query, top_k, namespaces)
+    if mode == "lexical":
+        SEARCH_PATH.labels(mode, "lexical").inc()
+        return lexical_search(query, top_k, namespaces)
+
+    hits = _lexical_hits(query, top_k, namespaces)
+    if mode == "auto" and is_decisive(hits, LEXICAL_MIN_SCORE, LEXICAL_DECISIVE_RATIO):
+        SEARCH_PATH.labels(mode, "lexical_shortcut").inc()
+        return _lexical_matches(hits)
+    SEARCH_PATH.labels(mode, "hybrid").inc()
+    return _fuse(await vector_search(query, top_k, namespaces), hits, top_k)
+
+
+async def pinecone_search(query: str, top_k: int = 5, mode: Optional[str] = None,
+                          namespaces: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    mode:
+      vector  - embedding + vector store only
+      lexical - BM25 only (no embedding call)
+      hybrid  - both, merged with reciprocal-rank fusion
+      auto    - BM25 first; answer from it alone when its top hit is decisive
+                (exact identifiers, file names, codes), otherwise hybrid
+    namespaces: the tenant/session partitions the caller is entitled to; only
+    those sub-indexes are searched.
+    Repeats are served from the result cache until the searched namespaces
+    change; concurrent identical misses are coalesced into one backend call.
+    """
+    mode = (mode or SEARCH_MODE).lower()
+    query = normalize_query(query)
+    namespaces = normalize_namespaces(namespaces)
+    key = (query, top_k, mode, namespaces)
+    # read before searching: results computed during an ingest are filed under the old version
+    versions = await search_cache.versions(namespaces)
+    cached = await search_cache.get(key, versions)
+    if cached is not None:
+        return cached
+    return await inflight.do((key, versions), lambda: _search_and_cache(key, versions))
+
+
+async def _search_and_cache(key, versions) -> List[Dict[str, Any]]:
+    query, top_k, mode, namespaces = key
+    results = await _search(query, top_k, mode, namespaces)
+    await search_cache.set(key, versions, results)
+    return results
+
+
+async def pinecone_search_batch(queries: List[str], top_k: int = 5, mode: Optional[str] = None,
+                                namespaces: Optional[List[str]] = None) -> List[List[Dict[str, Any]]]:
+    """
+    Search many queries with one embedding call and one vector-store round.
+    Duplicate queries in the batch are searched once, cached ones not at all;
+    in auto mode queries with a decisive lexical hit are answered without
+    being embedded.
+    """
+    mode = (mode or SEARCH_MODE).lower()
+    namespaces = normalize_namespaces(namespaces)
+    queries = [normalize_query(q) for q in queries]
+    versions = await search_cache.versions(namespaces)
+    cached = await search_cache.get_many([(q, top_k, mode, namespaces) for q in dict.fromkeys(queries)], versions)
+    answers: Dict[str, List[Dict[str, Any]]] = {key[0]: value for key, value in cached.items()}
+    unique = [q for q in dict.fromkeys(queries) if q not in answers]
+
+    lexical_hits = {q: _lexical_hits(q, top_k, namespaces) for q in unique} if mode != "vector" else {}
+    if mode == "lexical":
+        SEARCH_PATH.labels(mode, "lexical").inc(len(unique))
+        answers.update({q: _lexical_matches(lexical_hits[q]) for q in unique})
+    else:
+        pending = []
+        for q in unique:
+            if mode == "auto" and is_decisive(lexical_hits[q], LEXICAL_MIN_SCORE, LEXICAL_DECISIVE_RATIO):
+                SEARCH_PATH.labels(mode, "lexical_shortcut").inc()
+                answers[q] = _lexical_matches(lexical_hits[q])
+            else:
+                pending.append(q)
+        if pending:
+            SEARCH_PATH.labels(mode, "vector" if mode == "vector" else "hybrid").inc(len(pending))
+            results = await _query_backend(pending, top_k, namespaces)
+            for q, res in zip(pending, results):
+                answers[q] = _fuse(_format_matches(res), lexical_hits.get(q, []), top_k)
+    await search_cache.set_many({(q, top_k, mode, namespaces): answers[q] for q in unique}, versions)
+    return [answers[q] for q in queries]
+
+async def pinecone_retrieve(ids: List[str], namespace: Optional[str] = None):
+    res = await asyncio.to_thread(get_indexer().retrieve_by_ids, ids, namespace)
     return res
@@ -1,17 +1,166 @@
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import asyncio
+import hashlib
+import re
+from collections import Counter
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+from config import CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+    print("⚠️ tiktoken not available, falling back to approximate token counts.")
+
+# split after line breaks and sentence ends; separators stay attached to the left piece
+_BOUNDARY = re.compile(r"(?<=\n)|(?<=[.!?]\s)")
+_APPROX_TOKEN = re.compile(r"\w+|[^\w\s]")
+# a chunk at least half full ends early after a segment whose hash is 0 mod this (content-defined boundary)
+_ANCHOR_EVERY = 8
+
+
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _is_anchor(segment: str) -> bool:
+    return int(_digest(segment.strip()), 16) % _ANCHOR_EVERY == 0
+
 
 class TextSplitter:
-    def __init__(self, chunk_size=1000, chunk_overlap=200):
+    def __init__(self, chunk_size=CHUNK_TOKENS, chunk_overlap=CHUNK_OVERLAP_TOKENS,
+                 encoding_name="cl100k_base"):
         """
-        Chunk_size: number of characters per chunk
-        chunk_overlap: overlapping characters for context
+        Chunk_size: number of tokens per chunk
+        chunk_overlap: overlapping tokens for context
         """
-        self.splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            length_function=len
-        )
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self._enc = tiktoken.get_encoding(encoding_name) if TIKTOKEN_AVAILABLE else None
+
+    # -----------------------------
+    # Token helpers
+    # -----------------------------
+    def count_tokens(self, text: str) -> int:
+        if self._enc:
+            return len(self._enc.encode(text, disallowed_special=()))
+        return len(_APPROX_TOKEN.findall(text))
+
+    def _hard_split(self, text: str) -> List[str]:
+        """Cut a single oversized sentence into chunk_size-token windows."""
+        if self._enc:
+            toks = self._enc.encode(text, disallowed_special=())
+            return [self._enc.decode(toks[i:i + self.chunk_size])
+                    for i in range(0, len(toks), self.chunk_size)]
+        words = text.split(" ")
+        pieces, current, n = [], [], 0
+        for w in words:
+            wn = max(1, self.count_tokens(w))
+            if current and n + wn > self.chunk_size:
+                pieces.append(" ".join(current) + " ")
+                current, n = [], 0
+            current.append(w)
+            n += wn
+        if current:
+            pieces.append(" ".join(current))
+        return pieces
+
+    def _segments(self, text: str) -> List[Tuple[str, int]]:
+        """Split one page into (segment, token_count) pieces no larger than chunk_size."""
+        out = []
+        for seg in _BOUNDARY.split(text):
+            if not seg:
+                continue
+            n = self.count_tokens(seg)
+            if n <= self.chunk_size:
+                out.append((seg, n))
+            else:
+                out.extend((p, self.count_tokens(p)) for p in self._hard_split(seg))
+        return out
 
+    # -----------------------------
+    # Splitting
+    # -----------------------------
     async def split_text(self, text: str):
         # Split text asynchronously
-        return await asyncio.to_thread(self.splitter.split_text, text)
+        return [c["text"] async for c in self.split_stream(_single(text), source_id="")]
+
+    async def split_stream(self, pages: AsyncIterator, source_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Split a stream of pages into token-bounded, overlapping chunks.
+        Only the current page and the open chunk are held in memory; chunks may
+        span page boundaries.
+
+        chunk_id is derived from the chunk's text (a hash plus an occurrence
+        counter for repeated text), and a chunk at least half full also ends at
+        an "anchor" segment picked by its hash. Boundaries therefore depend on
+        nearby content only: after an edit they realign within a few chunks,
+        and every unchanged chunk keeps its `source_id~chunk_id`, so a
+        re-ingest re-embeds just the edited region. metadata["position"] is
+        the chunk's sequence number in the document.
+        """
+        buffer: List[Tuple[str, int, Any]] = []  # (segment, tokens, page)
+        buffered = 0
+        fresh = 0  # segments added since the last emitted chunk
+        seq = 0
+        seen: Counter = Counter()  # digest -> chunks with that text so far
+
+        def emit():
+            nonlocal buffer, buffered, fresh, seq
+            text = "".join(s for s, _, _ in buffer).strip()
+            digest = _digest(text)
+            chunk = {
+                "id": source_id,
+                "chunk_id": f"{digest}-{seen[digest]}",
+                "text": text,
+                "metadata": {"filename": source_id, "page": buffer[0][2], "position": seq},
+            }
+            seen[digest] += 1
+            seq += 1
+            # carry trailing segments forward as overlap
+            keep, kept = [], 0
+            for item in reversed(buffer):
+                if kept + item[1] > self.chunk_overlap:
+                    break
+                keep.insert(0, item)
+                kept += item[1]
+            buffer, buffered, fresh = keep, kept, 0
+            return chunk
+
+        async for page_no, d in _enumerate(pages):
+            text = getattr(d, "page_content", None) or getattr(d, "text", None) or str(d)
+            page = (getattr(d, "metadata", None) or {}).get("page", page_no)
+            for seg, n in await asyncio.to_thread(self._segments, text):
+                if buffer and buffered + n > self.chunk_size:
+                    chunk = emit()
+                    if chunk["text"]:
+                        yield chunk
+                    # overlap + this segment might still not fit
+                    while buffer and buffered + n > self.chunk_size:
+                        buffered -= buffer.pop(0)[1]
+                buffer.append((seg, n, page))
+                buffered += n
+                fresh += 1
+                if buffered * 2 >= self.chunk_size and _is_anchor(seg):
+                    chunk = emit()
+                    if chunk["text"]:
+                        yield chunk
+
+        if fresh:
+            chunk = emit()
+            if chunk["text"]:
+                yield chunk
+
+
+async def _single(text: str):
+    yield text
+
+
+async def _enumerate(aiter: AsyncIterator):
+    i = 0
+    async for item in aiter:
+        yield i, item
+        i += 1
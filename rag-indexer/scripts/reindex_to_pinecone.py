@@ -1,29 +1,80 @@
 # rag-service/scripts/reindex_to_pinecone.py
+import argparse
 import asyncio
 import os
-from pipeline.loader import load_documents_from_file
-from pipeline.index_build import PineconeIndexer
+import time
+from pipeline.ingest import IngestPipeline
+from pipeline.backend import get_indexer
+from pipeline.manifest import IngestManifest, file_sha256
+from pipeline.checkpoint import ReindexCheckpoint
+from config import REINDEX_CHECKPOINT
 
-async def reindex_folder(folder_path: str):
-    indexer = PineconeIndexer()
-    for fname in os.listdir(folder_path):
-        path = os.path.join(folder_path, fname)
-        docs = await load_documents_from_file(path)
-        chunks = []
-        for d in docs:
-            text = getattr(d, "page_content", None) or getattr(d, "text", None) or str(d)
-            chunk_size = 1000
-            for i in range(0, len(text), chunk_size):
-                chunks.append({
-                    "id": fname,
-                    "chunk_id": i // chunk_size,
-                    "text": text[i:i+chunk_size],
-                    "metadata": {"filename": fname}
-                })
-        indexer.upsert_documents(chunks)
-        print(f"Indexed {len(chunks)} chunks from {fname}")
+async def reindex_folder(folder_path: str, force: bool = False,
+                         checkpoint_path: str = REINDEX_CHECKPOINT, restart: bool = False,
+                         namespace: str = ""):
+    """
+    Reindex every file in a folder. Progress is checkpointed per file and per
+    committed batch, so a crashed or rate-limited run resumes where it stopped.
+    """
+    indexer = get_indexer()
+    manifest = IngestManifest()
+    pipeline = IngestPipeline(indexer, manifest)
+    checkpoint = ReindexCheckpoint(checkpoint_path)
+    if restart:
+        checkpoint.clear()
+
+    totals = {"files": 0, "chunks": 0, "embedded": 0}
+    started = time.perf_counter()
+    try:
+        for fname in sorted(os.listdir(folder_path)):
+            path = os.path.join(folder_path, fname)
+            if not os.path.isfile(path):
+                continue
+            file_hash = await asyncio.to_thread(file_sha256, path)
+            key = f"{namespace}/{fname}" if namespace else fname
+            if checkpoint.is_done(key, file_hash):
+                print(f"Skipped {fname} (done in checkpoint)")
+                continue
+
+            resume_after = checkpoint.committed_batch(key, file_hash)
+            if resume_after >= 0:
+                print(f"Resuming {fname} after batch {resume_after}")
+            result = await pipeline.run(
+                path, source_id=fname, force=force, file_hash=file_hash,
+                resume_after=resume_after,
+                on_batch_committed=lambda n, k=key, h=file_hash: checkpoint.commit_batch(k, h, n),
+                namespace=namespace,
+            )
+            checkpoint.mark_done(key, file_hash)
+
+            if result["status"] == "unchanged":
+                print(f"Skipped {fname} (unchanged)")
+                continue
+            totals["files"] += 1
+            totals["chunks"] += result["chunks_total"]
+            totals["embedded"] += result["chunks_indexed"]
+            elapsed = max(result["elapsed"], 1e-9)
+            print(f"Indexed {result['chunks_indexed']} chunks, deleted {result['chunks_deleted']} from {fname} "
+                  f"({result['chunks_total'] / elapsed:.1f} chunks/s, "
+                  f"{result['chunks_indexed'] / elapsed:.1f} embeddings/s)")
+    finally:
+        await manifest.close()
+
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    print(f"✅ Reindexed {totals['files']} files in {elapsed:.1f}s: "
+          f"{totals['chunks'] / elapsed:.1f} chunks/s, {totals['embedded'] / elapsed:.1f} embeddings/s")
+    # the whole folder made it through; the next run starts fresh (the manifest tracks deltas)
+    checkpoint.clear()
+    return totals
 
 if __name__ == "__main__":
-    import sys
-    folder = sys.argv[1] if len(sys.argv) > 1 else "/data/uploads"
-    asyncio.run(reindex_folder(folder))
+    parser = argparse.ArgumentParser(description="Reindex a folder into the vector store.")
+    parser.add_argument("folder", nargs="?", default="/data/uploads")
+    parser.add_argument("--force", action="store_true", help="ignore the manifest and re-embed everything")
+    parser.add_argument("--checkpoint", default=REINDEX_CHECKPOINT, help="checkpoint file path")
+    parser.add_argument("--restart", action="store_true", help="discard the checkpoint and start over")
+    parser.add_argument("--namespace", default="", help="tenant/session partition to index into")
+    args = parser.parse_args()
+    asyncio.run(reindex_folder(args.folder, force=args.force,
+                               checkpoint_path=args.checkpoint, restart=args.restart,
+                               namespace=args.namespace))
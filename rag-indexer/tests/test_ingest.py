@@ -0,0 +1,279 @@
+# rag-service/tests/test_ingest.py
+import asyncio
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("langchain_community")
+
+from pipeline import ingest
+from pipeline.checkpoint import ReindexCheckpoint
+from pipeline.ingest import IngestPipeline
+from pipeline.lexical import BM25Index
+from pipeline.result_cache import SearchResultCache
+from pipeline.splitter import TextSplitter
+
+_WORDS = "invoice refund policy contract payment customer account order shipping delivery warranty".split()
+
+
+def _text(n_sentences: int, start: int = 0) -> str:
+    """Distinct sentences, one per line, so every chunk's text is unique."""
+    return "".join(f"Sentence {i} about {_WORDS[i % len(_WORDS)]} and {_WORDS[i * 7 % len(_WORDS)]}.\n"
+                   for i in range(start, start + n_sentences))
+
+
+class MemoryManifest:
+    """IngestManifest without Redis."""
+
+    def __init__(self):
+        self.files, self.chunks = {}, {}
+
+    async def file_unchanged(self, source_id, file_hash, namespace=""):
+        return self.files.get((namespace, source_id)) == file_hash
+
+    async def chunk_hashes(self, source_id, namespace=""):
+        return dict(self.chunks.get((namespace, source_id), {}))
+
+    async def commit(self, source_id, file_hash, chunk_hashes, namespace=""):
+        self.files[(namespace, source_id)] = file_hash
+        self.chunks[(namespace, source_id)] = dict(chunk_hashes)
+
+
+class RecordingIndexer:
+    """Vector store stand-in that records what the pipeline sends it."""
+
+    def __init__(self):
+        self.vectors = {}
+        self.upserted, self.deleted = [], []
+
+    def _make_id(self, source_id, chunk_id):
+        return f"{source_id}~{chunk_id}"
+
+    def embed_chunks(self, docs):
+        return [(self._make_id(d["id"], d["chunk_id"]), [float(len(d["text"]))], dict(d["metadata"])) for d in docs]
+
+    def upsert_vectors(self, vectors, namespace=None):
+        for vec_id, _, _ in vectors:
+            self.vectors[vec_id] = namespace
+            self.upserted.append(vec_id)
+
+    def delete_ids(self, ids, namespace=None):
+        for vec_id in ids:
+            self.vectors.pop(vec_id, None)
+            self.deleted.append(vec_id)
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    lexical = BM25Index(path=str(tmp_path / "bm25.json"))
+    monkeypatch.setattr(ingest, "get_lexical_index", lambda namespace="": lexical)
+    # nothing listens on port 1: invalidation stays process-local
+    monkeypatch.setattr(ingest, "search_cache", SearchResultCache(redis_url="redis://127.0.0.1:1/0"))
+    path = tmp_path / "doc.txt"
+
+    def pipeline(**kwargs):
+        return IngestPipeline(RecordingIndexer(), MemoryManifest(),
+                              splitter=TextSplitter(chunk_size=40, chunk_overlap=0), **kwargs)
+
+    return path, lexical, pipeline
+
+
+def _run(pipeline, path, **kwargs):
+    return asyncio.run(pipeline.run(str(path), source_id="doc", **kwargs))
+
+
+def test_unchanged_file_is_skipped(env):
+    path, _, make = env
+    path.write_text(_text(60))
+    pipeline = make()
+    first = _run(pipeline, path)
+    assert first["status"] == "ok" and first["chunks_indexed"] == first["chunks_total"] > 3
+    pipeline.indexer.upserted.clear()
+    assert _run(pipeline, path)["status"] == "unchanged"
+    assert pipeline.indexer.upserted == []
+
+
+def test_appended_text_only_embeds_new_chunks(env):
+    path, _, make = env
+    path.write_text(_text(60))
+    pipeline = make()
+    first = _run(pipeline, path)
+    before = set(pipeline.indexer.vectors)
+    pipeline.indexer.upserted.clear()
+
+    path.write_text(_text(60) + _text(10, start=1000))
+    second = _run(pipeline, path)
+    assert second["chunks_total"] > first["chunks_total"]
+    assert 0 < second["chunks_indexed"] < first["chunks_total"] // 2
+    assert set(pipeline.indexer.upserted).isdisjoint(before)  # no unchanged chunk is embedded again
+    assert second["chunks_deleted"] <= 1  # at most the old tail chunk, which grew
+
+
+def test_vanished_chunks_are_deleted_everywhere(env):
+    path, lexical, make = env
+    path.write_text(_text(60))
+    pipeline = make()
+    _run(pipeline, path)
+    path.write_text(_text(20))
+    result = _run(pipeline, path)
+
+    gone = set(pipeline.indexer.deleted)
+    assert result["chunks_deleted"] == len(gone) > 0
+    assert gone.isdisjoint(pipeline.indexer.vectors)
+    assert set(pipeline.manifest.chunks[("", "doc")]) == set(pipeline.indexer.vectors)
+    assert not any(vec_id in gone for vec_id, _ in lexical.search("sentence 50", top_k=100))
+
+
+def test_forced_run_reembeds_everything_and_still_deletes(env):
+    path, _, make = env
+    path.write_text(_text(60))
+    pipeline = make()
+    _run(pipeline, path)
+    path.write_text(_text(20))
+    pipeline.indexer.upserted.clear()
+    result = _run(pipeline, path, force=True)
+
+    assert result["chunks_indexed"] == result["chunks_total"]
+    assert result["chunks_deleted"] > 0
+    assert set(pipeline.indexer.vectors) == set(pipeline.manifest.chunks[("", "doc")])
+
+
+class BlockingIndexer(RecordingIndexer):
+    """Upserts wait until released, like a stalled vector store."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+        self.embedded = 0
+
+    def embed_chunks(self, docs):
+        self.embedded += 1
+        return super().embed_chunks(docs)
+
+    def upsert_vectors(self, vectors, namespace=None):
+        self.release.wait(5)
+        super().upsert_vectors(vectors, namespace)
+
+
+def _stalled(env, **kwargs):
+    path, _, _ = env
+    path.write_text(_text(60))
+    indexer = BlockingIndexer()
+    pipeline = IngestPipeline(indexer, MemoryManifest(), batch_size=1, queue_size=1, embed_concurrency=1,
+                              upsert_concurrency=1, splitter=TextSplitter(chunk_size=40, chunk_overlap=0))
+    return path, indexer, pipeline
+
+
+def test_stalled_upserts_stop_the_embed_stage(env):
+    path, indexer, pipeline = _stalled(env)
+
+    async def run():
+        task = asyncio.create_task(pipeline.run(str(path), source_id="doc"))
+        await asyncio.sleep(0.3)
+        # one batch in the upsert worker, one queued, one embedded and waiting to be queued
+        stalled_at = indexer.embedded
+        indexer.release.set()
+        return stalled_at, await task
+
+    stalled_at, result = asyncio.run(run())
+    assert 0 < stalled_at <= 3 < result["chunks_total"]
+    assert result["chunks_indexed"] == result["chunks_total"]
+    assert not ingest._live_queues["embed"] and not ingest._live_queues["upsert"]
+
+
+def test_cancelled_run_stops_every_stage_and_commits_nothing(env):
+    path, indexer, pipeline = _stalled(env)
+
+    async def run():
+        task = asyncio.create_task(pipeline.run(str(path), source_id="doc"))
+        await asyncio.sleep(0.2)
+        task.cancel()
+        try:
+            await task
+        finally:
+            indexer.release.set()
+        return task
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(run())
+    assert pipeline.manifest.files == {}
+    assert not ingest._live_queues["embed"] and not ingest._live_queues["upsert"]
+
+
+def test_permanent_failure_surfaces_unwrapped(env):
+    path, _, make = env
+    path.write_text(_text(60))
+    pipeline = make()
+
+    def reject(vectors, namespace=None):
+        raise ValueError("dimension mismatch")
+
+    pipeline.indexer.upsert_vectors = reject
+    with pytest.raises(ValueError, match="dimension mismatch"):
+        _run(pipeline, path)
+    assert pipeline.manifest.files == {}
+
+
+def test_resume_skips_batches_below_the_checkpoint_watermark(env, tmp_path):
+    path, _, _ = env
+    path.write_text(_text(60))
+    checkpoint = ReindexCheckpoint(str(tmp_path / "checkpoint.json"))
+    indexer = RecordingIndexer()
+    pipeline = IngestPipeline(indexer, MemoryManifest(), batch_size=1, embed_concurrency=1, upsert_concurrency=1,
+                              splitter=TextSplitter(chunk_size=40, chunk_overlap=0))
+    upsert = indexer.upsert_vectors
+
+    def crash_on_fifth(vectors, namespace=None):
+        if len(indexer.upserted) == 4:
+            raise ValueError("process killed")
+        upsert(vectors, namespace)
+
+    indexer.upsert_vectors = crash_on_fifth
+    with pytest.raises(ValueError):
+        _run(pipeline, path, file_hash="h1", on_batch_committed=lambda n: checkpoint.commit_batch("doc", "h1", n))
+    first = list(indexer.upserted)
+
+    # a new process reads the checkpoint back and continues after the last committed batch
+    resume_after = ReindexCheckpoint(checkpoint.path).committed_batch("doc", "h1")
+    assert resume_after == 3
+    indexer.upsert_vectors = upsert
+    result = _run(pipeline, path, file_hash="h1", resume_after=resume_after)
+    assert result["chunks_indexed"] == result["chunks_total"] - 4
+    assert set(first).isdisjoint(indexer.upserted[4:])
+    assert set(indexer.upserted) == set(pipeline.manifest.chunks[("", "doc")])
+
+
+def test_watermark_only_advances_over_contiguous_batches(env):
+    path, _, _ = env
+    path.write_text(_text(60))
+    indexer = RecordingIndexer()
+    upsert = indexer.upsert_vectors
+
+    def slow_first_batch(vectors, namespace=None):
+        if not indexer.upserted and not getattr(indexer, "delayed", False):
+            indexer.delayed = True
+            time.sleep(0.2)  # batch 0 finishes after batch 1
+        upsert(vectors, namespace)
+
+    indexer.upsert_vectors = slow_first_batch
+    pipeline = IngestPipeline(indexer, MemoryManifest(), batch_size=1, upsert_concurrency=2,
+                              splitter=TextSplitter(chunk_size=40, chunk_overlap=0))
+    watermarks = []
+    result = _run(pipeline, path, on_batch_committed=watermarks.append)
+    assert watermarks == sorted(set(watermarks))
+    assert watermarks[-1] == result["batches"] - 1
+    assert watermarks[0] >= 1  # batch 1 was upserted first but waited for batch 0
+
+
+def test_checkpoint_starts_a_changed_file_over(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    checkpoint = ReindexCheckpoint(path)
+    checkpoint.commit_batch("doc", "h1", 7)
+    checkpoint.mark_done("other", "h2")
+    reloaded = ReindexCheckpoint(path)
+    assert reloaded.committed_batch("doc", "h1") == 7
+    assert reloaded.is_done("other", "h2")
+    assert reloaded.committed_batch("doc", "h2") == -1  # the file changed: start over
+    reloaded.clear()
+    assert ReindexCheckpoint(path).state == {"files": {}}
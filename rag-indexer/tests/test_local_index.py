@@ -0,0 +1,89 @@
+# rag-service/tests/test_local_index.py
+import os
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from pipeline.embedder import HashEmbedder
+from pipeline.local_index import LocalIndexer
+
+DOCS = {
+    "refunds": "refund policy for returned orders",
+    "shipping": "shipping and delivery times",
+    "passwords": "password reset and login help",
+}
+
+
+def _indexer(path):
+    return LocalIndexer(embedder=HashEmbedder(64), index_dir=str(path), dim=64)
+
+
+def _docs(names, source="kb"):
+    return [{"id": source, "chunk_id": name, "text": DOCS[name], "metadata": {}} for name in names]
+
+
+def _ids(indexer, query, namespace=None, top_k=5):
+    return [m["id"] for m in indexer.query(query, top_k=top_k, namespace=namespace)["matches"]]
+
+
+def _segments(path):
+    folder = os.path.join(path, "segments")
+    return sorted(os.listdir(folder)) if os.path.isdir(folder) else []
+
+
+def test_unflushed_segments_replay_on_restart(tmp_path):
+    indexer = _indexer(tmp_path)
+    indexer.upsert_vectors(indexer.embed_chunks(_docs(["refunds", "shipping"])))
+    indexer.upsert_vectors(indexer.embed_chunks(_docs(["passwords"])))
+    indexer.delete_ids(["kb~shipping"])
+    assert len(_segments(tmp_path)) == 5  # two upserts (.json + .npy) and one delete (.json), no snapshot yet
+    assert not os.path.exists(tmp_path / "vectors.npy")
+
+    reopened = _indexer(tmp_path)
+    assert _ids(reopened, "refund policy", top_k=1) == ["kb~refunds"]
+    assert sorted(_ids(reopened, "anything", top_k=10)) == ["kb~passwords", "kb~refunds"]
+
+
+def test_flush_compacts_segments_into_a_snapshot(tmp_path):
+    indexer = _indexer(tmp_path)
+    indexer.upsert_vectors(indexer.embed_chunks(_docs(DOCS)))
+    indexer.delete_ids(["kb~passwords"])
+    indexer.flush()
+    assert _segments(tmp_path) == []
+
+    reopened = _indexer(tmp_path)
+    assert sorted(_ids(reopened, "anything", top_k=10)) == ["kb~refunds", "kb~shipping"]
+    fetched = reopened.retrieve_by_ids(["kb~refunds", "kb~passwords"])["vectors"]
+    assert list(fetched) == ["kb~refunds"]
+    assert fetched["kb~refunds"]["metadata"]["snippet"] == DOCS["refunds"]
+
+
+def test_upsert_replaces_an_existing_id(tmp_path):
+    indexer = _indexer(tmp_path)
+    indexer.upsert_vectors(indexer.embed_chunks(_docs(["refunds"])))
+    changed = [{"id": "kb", "chunk_id": "refunds", "text": DOCS["passwords"], "metadata": {}}]
+    indexer.upsert_vectors(indexer.embed_chunks(changed))
+    matches = indexer.query(DOCS["passwords"], top_k=5)["matches"]
+    assert [m["id"] for m in matches] == ["kb~refunds"]
+    assert matches[0]["score"] == pytest.approx(1.0, abs=1e-5)
+    assert _ids(_indexer(tmp_path), "password reset") == ["kb~refunds"]
+
+
+def test_deleting_unknown_ids_writes_nothing(tmp_path):
+    indexer = _indexer(tmp_path)
+    indexer.delete_ids(["kb~missing"])
+    assert _segments(tmp_path) == []
+
+
+def test_namespaces_are_separate_stores(tmp_path):
+    indexer = _indexer(tmp_path)
+    indexer.upsert_vectors(indexer.embed_chunks(_docs(["refunds"])))
+    indexer.upsert_vectors(indexer.embed_chunks(_docs(["passwords"], source="mine")), namespace="session-a/../b")
+    indexer.flush("session-a/../b")
+
+    assert _ids(indexer, "password reset") == ["kb~refunds"]  # the default namespace only
+    merged = indexer.query_batch(["password reset"], top_k=2, namespaces=["", "session-a/../b"])[0]["matches"]
+    assert [(m["id"], m["namespace"]) for m in merged] == [("mine~passwords", "session-a/../b"), ("kb~refunds", "")]
+    # the namespace name cannot escape the index directory
+    assert os.listdir(tmp_path / "namespaces") == ["session-a%2F..%2Fb"]
@@ -0,0 +1,76 @@
+# rag-service/tests/test_result_cache.py
+import asyncio
+
+import pytest
+
+pytest.importorskip("redis")
+
+from pipeline.result_cache import SearchResultCache
+
+KEY = ("refund policy", 5, "auto", ("",))
+
+
+def _cache(**kwargs):
+    # nothing listens on port 1: the cache runs on process-local versions and the LRU tier
+    return SearchResultCache(redis_url="redis://127.0.0.1:1/0", **{"settle": 0.0, **kwargs})
+
+
+def test_invalidate_makes_older_results_unreachable():
+    async def run():
+        cache = _cache()
+        before = await cache.versions(("",))
+        await cache.set(KEY, before, ["old"])
+        assert await cache.get(KEY, before) == ["old"]
+        await cache.invalidate("")
+        after = await cache.versions(("",))
+        return before, after, await cache.get(KEY, after)
+
+    before, after, value = asyncio.run(run())
+    assert after != before
+    assert value is None
+
+
+def test_invalidate_only_moves_its_own_namespace():
+    async def run():
+        cache = _cache()
+        await cache.invalidate("tenant-a")
+        return await cache.versions(("", "tenant-a", "tenant-b"))
+
+    assert asyncio.run(run()) == (0, 1, 0)
+
+
+def test_nothing_is_cached_while_a_write_settles():
+    async def run():
+        cache = _cache(settle=0.2)
+        await cache.invalidate("")
+        settling = await cache.versions(("",))
+        await cache.set(KEY, settling, ["maybe stale"])
+        await asyncio.sleep(0.25)
+        settled = await cache.versions(("",))
+        return settling, settled, await cache.get(KEY, settled)
+
+    settling, settled, value = asyncio.run(run())
+    assert settling is None
+    assert settled == (1,)
+    assert value is None
+
+
+def test_lru_tier_is_bounded():
+    async def run():
+        cache = _cache(size=2)
+        versions = await cache.versions(("",))
+        for q in ("a", "b", "c"):
+            await cache.set((q, 5, "auto", ("",)), versions, [q])
+        return [await cache.get((q, 5, "auto", ("",)), versions) for q in ("a", "b", "c")]
+
+    assert asyncio.run(run()) == [None, ["b"], ["c"]]
+
+
+def test_disabled_cache_stores_nothing():
+    async def run():
+        cache = _cache(enabled=False)
+        versions = await cache.versions(("",))
+        await cache.set(KEY, versions, ["x"])
+        return await cache.get(KEY, versions)
+
+    assert asyncio.run(run()) is None
@@ -0,0 +1,30 @@
+# rag-service/tests/test_scope.py
+import time
+
+import scope
+
+
+def test_signed_scope_reads_its_own_partitions_only():
+    claims = scope.verify(scope.sign("s1", "acme"))
+    assert scope.readable(claims) == ["", "tenant-acme", "session-s1"]
+    assert scope.writable(claims) == ["tenant-acme", "session-s1"]
+
+
+def test_unscoped_caller_sees_the_default_namespace_only():
+    assert scope.verify(None) is None
+    assert scope.readable(None) == [""]
+    assert scope.writable(None) == [""]
+
+
+def test_tampered_token_is_rejected():
+    body, _, mac = scope.sign("s1").partition(".")
+    forged_body = scope.sign("s2").partition(".")[0]
+    assert scope.verify(f"{forged_body}.{mac}") is None
+    assert scope.verify(scope.sign("s1", secret="other")) is None
+    assert scope.verify(f"{body}.{mac}")["sid"] == "s1"
+
+
+def test_expired_token_is_rejected(monkeypatch):
+    token = scope.sign("s1", ttl=10)
+    monkeypatch.setattr(time, "time", lambda: 1e12)
+    assert scope.verify(token) is None
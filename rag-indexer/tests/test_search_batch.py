@@ -0,0 +1,78 @@
+# rag-service/tests/test_search_batch.py
+import asyncio
+
+import pytest
+
+pytest.importorskip("redis")
+
+from pipeline import search
+from pipeline.lexical import BM25Index
+from pipeline.result_cache import SearchResultCache
+
+
+class RecordingIndexer:
+    """Vector store stand-in: one match per query, named after the query."""
+
+    def __init__(self):
+        self.calls = []
+
+    def query_batch(self, queries, top_k=5, namespaces=None):
+        self.calls.append((list(queries), list(namespaces or [])))
+        return [{"matches": [{"id": f"vec:{q}", "score": 0.9, "metadata": {"snippet": q}, "namespace": ""}]}
+                for q in queries]
+
+
+@pytest.fixture
+def indexer(tmp_path, monkeypatch):
+    indexer = RecordingIndexer()
+    lexical = {}
+
+    def lexical_index(namespace=""):
+        if namespace not in lexical:
+            lexical[namespace] = BM25Index(path=str(tmp_path / f"bm25{namespace}.json"))
+        return lexical[namespace]
+
+    kb = lexical_index("")
+    kb.add_many([(f"doc-{i}", f"general notes about shipping and billing, page {i}", {"snippet": f"doc {i}"})
+                 for i in range(20)])
+    kb.add_many([("invoice", "Invoice INV-12345 for the March order", {"snippet": "invoice"})])
+    monkeypatch.setattr(search, "get_indexer", lambda: indexer)
+    monkeypatch.setattr(search, "get_lexical_index", lexical_index)
+    monkeypatch.setattr(search, "search_cache", SearchResultCache(redis_url="redis://127.0.0.1:1/0", settle=0.0))
+    return indexer
+
+
+def _batch(queries, **kwargs):
+    return asyncio.run(search.pinecone_search_batch(queries, **kwargs))
+
+
+def test_duplicates_are_searched_once_and_answered_in_order(indexer):
+    results = _batch(["refund policy", "  refund   policy ", "opening hours", "refund policy"], mode="vector")
+    assert indexer.calls == [(["refund policy", "opening hours"], [""])]
+    assert [r[0]["id"] for r in results] == ["vec:refund policy", "vec:refund policy",
+                                             "vec:opening hours", "vec:refund policy"]
+
+
+def test_cached_queries_are_not_sent_again(indexer):
+    _batch(["refund policy", "opening hours"], mode="vector")
+    results = _batch(["opening hours", "warranty terms"], mode="vector")
+    assert indexer.calls[1] == (["warranty terms"], [""])
+    assert [r[0]["id"] for r in results] == ["vec:opening hours", "vec:warranty terms"]
+
+
+def test_decisive_lexical_hits_skip_the_embedding_call(indexer):
+    results = _batch(["INV-12345", "refund policy", "opening hours"], mode="auto")
+    assert indexer.calls == [(["refund policy", "opening hours"], [""])]
+    assert results[0][0]["id"] == "invoice" and "bm25" in results[0][0]
+
+
+def test_lexical_mode_never_embeds(indexer):
+    results = _batch(["INV-12345", "shipping billing"], mode="lexical")
+    assert indexer.calls == []
+    assert results[0][0]["id"] == "invoice"
+    assert results[1] and all(m["id"].startswith("doc-") for m in results[1])
+
+
+def test_namespaces_are_searched_together(indexer):
+    _batch(["refund policy"], mode="vector", namespaces=["session-a", "", "session-a"])
+    assert indexer.calls == [(["refund policy"], ["session-a", ""])]
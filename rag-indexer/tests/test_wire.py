@@ -0,0 +1,78 @@
+# rag-service/tests/test_wire.py
+import json
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from starlette.requests import Request
+
+import wire
+
+
+def _request(accept=None):
+    headers = [(b"accept", accept.encode())] if accept is not None else []
+    return Request({"type": "http", "method": "POST", "path": "/", "headers": headers})
+
+
+class _Resp:
+    """The parts of an httpx response that wire.decode reads."""
+
+    def __init__(self, response):
+        self.headers = response.headers
+        self.content = response.body
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def _round_trip(response):
+    return wire.decode(_Resp(response))
+
+
+@pytest.mark.parametrize("accept, offered, expected", [
+    (None, (wire.MSGPACK,), wire.JSON),
+    ("*/*", (wire.MSGPACK,), wire.JSON),
+    ("application/json", (wire.MSGPACK,), wire.JSON),
+    ("application/x-msgpack, application/json;q=0.5", (wire.MSGPACK,), wire.MSGPACK),
+    ("application/json;q=0.9, application/x-msgpack", (wire.MSGPACK,), wire.MSGPACK),
+    ("application/x-msgpack;q=0, application/json", (wire.MSGPACK,), wire.JSON),
+    ("application/x-float32, application/x-msgpack;q=0.8", (wire.FLOAT32, wire.MSGPACK), wire.FLOAT32),
+    ("application/x-float32", (wire.MSGPACK,), wire.JSON),  # not offered by this endpoint
+    ("application/x-msgpack;q=abc", (wire.MSGPACK,), wire.MSGPACK),  # a bad q counts as 1
+])
+def test_negotiate(accept, offered, expected):
+    if expected == wire.MSGPACK and not wire.MSGPACK_AVAILABLE:
+        expected = wire.JSON
+    assert wire.negotiate(_request(accept), offered) == expected
+
+
+def test_pack_vectors_round_trip():
+    vectors = [[0.5, -1.25, 3.0], [1e-3, 2.0, -0.0]]
+    response = wire.pack_vectors(vectors)
+    assert response.headers["x-vector-count"] == "2" and response.headers["x-vector-dim"] == "3"
+    assert len(response.body) == 2 * 3 * 4
+    decoded = _round_trip(response)
+    assert len(decoded) == 2
+    for got, want in zip(decoded, vectors):
+        assert got == pytest.approx(want, rel=1e-6)
+
+
+def test_pack_vectors_empty():
+    assert _round_trip(wire.pack_vectors([])) == []
+
+
+def test_msgpack_keeps_doubles_unless_asked_for_single_floats():
+    msgpack = pytest.importorskip("msgpack")
+    payload = {"score": 0.123456789012345, "ids": ["a", "b"], "n": 3, "text": None}
+    assert _round_trip(wire.encode(payload, wire.MSGPACK)) == payload
+    single = _round_trip(wire.encode({"embedding": [0.1, 0.2]}, wire.MSGPACK, single_float=True))
+    assert single["embedding"] == pytest.approx([0.1, 0.2], rel=1e-6) and single["embedding"][0] != 0.1
+    assert msgpack.unpackb(wire.encode({"x": 1.5}, wire.MSGPACK).body) == {"x": 1.5}
+
+
+def test_json_round_trip_and_projection():
+    payload = {"events": ["WS:done"], "llm_output": "hi", "state": {"big": list(range(10))}}
+    assert _round_trip(wire.respond(_request("application/json"), payload)) == payload
+    assert wire.project(payload, ["llm_output", "missing"]) == {"llm_output": "hi"}
+    assert wire.project(payload, None) is payload
@@ -1,39 +1,75 @@
 import os
+import time
 import asyncio
 import shutil
-from typing import List, Optional
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote, unquote
 import numpy as np
 import redis.asyncio as aioredis
-from config import REDIS_URL
-
-from langchain_community.vectorstores import FAISS
-from langchain_community.document_loaders import PyPDFLoader, TextLoader, PyMuPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.messages import HumanMessage
-from langchain_classic.chains.combine_documents import create_stuff_documents_chain
-from langchain_classic.chains.retrieval import create_retrieval_chain
-
-try:
-    from langchain_community.document_loaders import (
-        UnstructuredWordDocumentLoader,
-        UnstructuredExcelLoader,
-        UnstructuredPowerPointLoader,
-    )
-    OFFICE_LOADER_AVAILABLE = True
-except ImportError:
-    OFFICE_LOADER_AVAILABLE = False
-    print("⚠️ Office loaders not available. .doc/.xls/.ppt files skipped.")
+from config import REDIS_URL, PARTITION_CACHE_SIZE, SESSION_PARTITION_TTL, SEARCH_MODE, LEXICAL_MIN_SCORE, LEXICAL_DECISIVE_RATIO, RRF_K, LEXICAL_CONFIDENCE_HALF, WRITE_LOCK_POLL_SECONDS
+from lexical_index import BM25Index, is_decisive, lexical_confidence, reciprocal_rank_fusion
+import index_versions
+from query_batcher import QueryBatcher
+
+# langchain, FAISS and the document loaders take seconds to import: they are
+# imported where first used (normally by the background warm-up), so the app
+# starts serving health checks and WebSockets right away.
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+
+_office_loaders = None
+
+
+def office_loaders():
+    """(Word, Excel, PowerPoint) loader classes, or None if unstructured is not installed."""
+    global _office_loaders
+    if _office_loaders is None:
+        try:
+            from langchain_community.document_loaders import (
+                UnstructuredWordDocumentLoader,
+                UnstructuredExcelLoader,
+                UnstructuredPowerPointLoader,
+            )
+            _office_loaders = (UnstructuredWordDocumentLoader, UnstructuredExcelLoader, UnstructuredPowerPointLoader)
+        except ImportError:
+            _office_loaders = ()
+            print("⚠️ Office loaders not available. .doc/.xls/.ppt files skipped.")
+    return _office_loaders or None
+
+
+def import_heavy_modules():
+    """Import everything the RAG path needs, so the first query does not pay for it."""
+    import quantized_index  # noqa: F401 (faiss)
+    from langchain_community.vectorstores import FAISS  # noqa: F401
+    from langchain_community.document_loaders import TextLoader, PyMuPDFLoader  # noqa: F401
+    from langchain_text_splitters import RecursiveCharacterTextSplitter  # noqa: F401
+    from langchain_openai import OpenAIEmbeddings, ChatOpenAI  # noqa: F401
+    from langchain_core.messages import HumanMessage  # noqa: F401
+    from langchain_classic.chains.retrieval import create_retrieval_chain  # noqa: F401
+    office_loaders()
+
 
 FAISS_TEMP_DIR = os.path.join(os.getcwd(), "faiss_redis")
 os.makedirs(FAISS_TEMP_DIR, exist_ok=True)
+PARTITIONS_DIR = os.path.join(FAISS_TEMP_DIR, "partitions")
+
+# the shared knowledge base; tenant/session uploads go to their own partitions
+GLOBAL_PARTITION = "global"
 
 
 class RAGEngine:
     """
     Async RAG Engine using FAISS in local folder (faiss_redis).
     Supports incremental updates on file uploads and auto-loading local index.
+    The global index lives in the version of faiss_redis the CURRENT alias
+    points at (see index_versions; full rebuilds go to a new version and flip
+    the alias). Tenant and session partitions are separate FAISS/BM25 pairs
+    under faiss_redis/partitions/, loaded on first use, so a query only scans
+    the partitions it may see. At most PARTITION_CACHE_SIZE partitions stay
+    loaded, and a session's partition is unloaded when the session ends and
+    deleted from disk once idle for SESSION_PARTITION_TTL.
     """
 
     def __init__(self, api_key=None, redis_url=REDIS_URL, redis_key="faiss_index"):
@@ -45,68 +81,380 @@ class RAGEngine:
         self.redis_key = redis_key
         self.redis: Optional[aioredis.Redis] = None
 
-        self.embeddings = OpenAIEmbeddings(api_key=self.api_key)
-        self.llm = ChatOpenAI(model="gpt-4o-mini", api_key=self.api_key)
-        self.vectorstore: Optional[FAISS] = None
+        self._embeddings = None
+        self._llm = None
+        self.vectorstore: Optional["FAISS"] = None
         self.retriever = None
         self.rag_chain = None
+        # BM25 over the same chunks as the FAISS docstore (rebuilt on load)
+        self.lexical = BM25Index()
+        # loaded non-global partitions, least recently used first: name -> (FAISS, BM25Index)
+        self.partitions: "OrderedDict[str, Tuple[FAISS, BM25Index]]" = OrderedDict()
+        self._partition_lock = asyncio.Lock()
+        # concurrent searches of the same store are merged into one FAISS matrix search
+        self.query_batcher = QueryBatcher(self._faiss_search)
 
         # Index paths
         self.index_dir = FAISS_TEMP_DIR
         self.redis_index_name = "faiss_index"
-
-        # Start async task safely
-        try:
-            loop = asyncio.get_running_loop()
-            loop.create_task(self.load_local_index_if_available())
-        except RuntimeError:
-            asyncio.run(self.load_local_index_if_available())
+        # version of the global index in memory, and the alias file state it came from
+        self.index_version = index_versions.LEGACY
+        self._alias_mtime: Optional[int] = None
+        self._alias_lock = asyncio.Lock()
+        # held by anything that writes the global index (upload into it, full rebuild)
+        self._global_write_lock = asyncio.Lock()
+
+        # Startup: the index is loaded once, in the background (start_warm_up)
+        self.state = "starting"  # starting -> loading -> ready | empty | failed
+        self.load_error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self._warm_up_task: Optional[asyncio.Task] = None
+
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            from langchain_openai import OpenAIEmbeddings
+            self._embeddings = OpenAIEmbeddings(api_key=self.api_key)
+        return self._embeddings
+
+    @embeddings.setter
+    def embeddings(self, value):
+        self._embeddings = value
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            from langchain_openai import ChatOpenAI
+            self._llm = ChatOpenAI(model="gpt-4o-mini", api_key=self.api_key)
+        return self._llm
+
+    @llm.setter
+    def llm(self, value):
+        self._llm = value
 
     async def init_redis(self):
         self.redis = aioredis.from_url(self.redis_url)
         print(f"✅ Connected to Redis at {self.redis_url}")
 
+    # -----------------------------
+    # Startup
+    # -----------------------------
+    def start_warm_up(self) -> asyncio.Task:
+        """Schedule the one-time background load (idempotent); must be called from the event loop."""
+        if self._warm_up_task is None:
+            self._warm_up_task = asyncio.create_task(self.load_local_index_if_available())
+        return self._warm_up_task
+
+    @property
+    def ready(self) -> bool:
+        """True once RAG traffic can be served (index loaded, or confirmed there is none yet)."""
+        return self.state in ("ready", "empty")
+
+    def readiness(self) -> dict:
+        return {
+            "ready": self.ready,
+            "state": self.state,
+            "index_version": self.index_version,
+            "documents": self.vectorstore.index.ntotal if self.vectorstore is not None else 0,
+            "load_seconds": self.load_seconds,
+            "error": self.load_error,
+        }
+
+    async def wait_until_loaded(self):
+        """Let the warm-up finish first, so it cannot replace an index built or changed meanwhile."""
+        if self._warm_up_task is not None:
+            await asyncio.shield(self._warm_up_task)
+
     async def load_local_index_if_available(self):
         """
-        Load FAISS index from local folder if it exists.
+        Load FAISS index from local folder if it exists. Module imports, index
+        load and the BM25 rebuild all run in one worker thread, off the event loop.
         """
-        if self.redis:
-            try:
-                exists = await self.redis.exists(self.redis_index_name)
-                if exists:
-                    print("[RAG] Redis already has an index. Skipping local load.")
-                    return
-            except Exception:
-                pass
-
-        faiss_file = os.path.join(self.index_dir, "faiss_index.faiss")
-        pkl_file = os.path.join(self.index_dir, "faiss_index.pkl")
-        if not (os.path.exists(faiss_file) and os.path.exists(pkl_file)):
-            print("[RAG] No local FAISS index found. You may upload files to build it.")
-            return
-
+        self.state = "loading"
+        started = time.perf_counter()
         try:
-            print("[RAG] Loading local FAISS index from disk...")
-            self.vectorstore = FAISS.load_local(
-                folder_path=self.index_dir,
-                embeddings=self.embeddings,
-                index_name="faiss_index",
-                allow_dangerous_deserialization=True
-            )
-            self.retriever = self.vectorstore.as_retriever(search_kwargs={"k": 4})
-            self._build_chain()
-            print("[RAG] Local FAISS index successfully loaded.")
+            loaded = await asyncio.to_thread(self._warm_up)
         except Exception as e:
+            self.state, self.load_error = "failed", str(e)
             print(f"[RAG] Failed to load local FAISS index: {e}")
+            return
+        self.load_seconds = round(time.perf_counter() - started, 3)
+        if not loaded:
+            self.state = "empty"
+            print("[RAG] No local FAISS index found. You may upload files to build it.")
+            return
+        self._build_chain()
+        self.state = "ready"
+        print(f"[RAG] Local FAISS index loaded in {self.load_seconds}s ({self.vectorstore.index.ntotal} vectors).")
+
+    def _warm_up(self) -> bool:
+        import_heavy_modules()
+        _ = self.embeddings, self.llm  # build the provider clients here too, off the event loop
+        self._alias_mtime = index_versions.alias_mtime(self.index_dir)
+        self.index_version = index_versions.read_alias(self.index_dir)["current"]
+        folder = self.global_dir
+        faiss_file = os.path.join(folder, "faiss_index.faiss")
+        pkl_file = os.path.join(folder, "faiss_index.pkl")
+        if not (os.path.exists(faiss_file) and os.path.exists(pkl_file)):
+            return False
+        print(f"[RAG] Loading local FAISS index from disk ({self.index_version})...")
+        store = self._load_store(folder)
+        self.lexical = self._lexical_for(store)
+        self.vectorstore = store
+        self.retriever = store.as_retriever(search_kwargs={"k": 4})
+        return True
+
+    # -----------------------------
+    # Versions (blue/green rebuild)
+    # -----------------------------
+    @property
+    def global_dir(self) -> str:
+        return index_versions.resolve(self.index_dir, self.index_version)
+
+    def _install(self, version: str, store: "FAISS", lexical: BM25Index):
+        """Make a loaded version the one queries use (plain attribute swaps, no await in between)."""
+        self.lexical = lexical
+        self.vectorstore = store
+        self.retriever = store.as_retriever(search_kwargs={"k": 4})
+        self.index_version = version
+        self._build_chain()
+        self.state = "ready"
 
-    async def build_index_from_folder(self, folder_path: str, incremental: bool = True):
-        if incremental:
+    def _open_version(self, version: str):
+        store = self._load_store(index_versions.resolve(self.index_dir, version))
+        return store, self._lexical_for(store)
+
+    async def _follow_alias(self):
+        """Switch to the version the alias points at if another process flipped it (one stat per call)."""
+        mtime = index_versions.alias_mtime(self.index_dir)
+        if mtime == self._alias_mtime or self.state not in ("ready", "empty"):
+            return
+        async with self._alias_lock:
+            if mtime == self._alias_mtime:
+                return
+            version = index_versions.read_alias(self.index_dir)["current"]
+            if version != self.index_version:
+                store, lexical = await asyncio.to_thread(self._open_version, version)
+                self._install(version, store, lexical)
+                print(f"[RAG] Following alias: now serving index version '{version}'")
+            self._alias_mtime = mtime
+
+    @asynccontextmanager
+    async def _global_write(self):
+        """
+        Exclusive access to the global index: the asyncio lock orders this
+        process's writers, the file lock orders them against other processes
+        (reindex.py rebuilding while the server takes uploads).
+        """
+        async with self._global_write_lock:
+            lock = index_versions.WriteLock(self.index_dir)
+            while not lock.try_acquire():
+                await asyncio.sleep(WRITE_LOCK_POLL_SECONDS)
+            try:
+                yield
+            finally:
+                lock.release()
+
+    async def rebuild_index(self, folder_path: str) -> dict:
+        """
+        Full reindex without downtime: build `folder_path` into a new shadow
+        version while queries keep using the current one, validate it, then
+        flip the alias and swap it in. The replaced version is kept for
+        rollback_index(); older ones are removed. A failed build or
+        validation leaves the current version untouched.
+        """
+        await self.wait_until_loaded()
+        async with self._global_write():
+            # another process may have flipped or written since we loaded
+            await self._follow_alias()
+            chunks = await self._load_chunks(folder_path)
+            if not chunks:
+                raise ValueError(f"No documents to index in '{folder_path}'")
+            version = index_versions.new_version(self.index_dir)
+            folder = index_versions.resolve(self.index_dir, version)
+            current_count = self.vectorstore.index.ntotal if self.vectorstore is not None else 0
+            try:
+                store, _ = await asyncio.to_thread(self._index_chunks, None, chunks, folder)
+                report = await asyncio.to_thread(index_versions.validate, store, current_count)
+                await asyncio.to_thread(store.save_local, folder, "faiss_index")
+                lexical = await asyncio.to_thread(self._lexical_for, store)
+            except Exception:
+                index_versions.discard(self.index_dir, version)
+                raise
+            previous = self.index_version if self.vectorstore is not None else None
+            await self._flip(version, previous, store, lexical)
+            print(f"✅ Rebuilt index as '{version}' ({report['vectors']} vectors, "
+                  f"self-recall {report['self_recall']:.2f}); previous '{previous}' kept for rollback")
+            return {"version": version, "previous": previous, **report}
+
+    async def rollback_index(self) -> dict:
+        """Flip the alias back to the previous version (which then becomes the new previous)."""
+        await self.wait_until_loaded()
+        async with self._global_write():
+            alias = index_versions.read_alias(self.index_dir)
+            target = alias.get("previous")
+            if not target or not os.path.exists(os.path.join(index_versions.resolve(self.index_dir, target),
+                                                              "faiss_index.faiss")):
+                raise ValueError("No previous index version to roll back to")
+            store, lexical = await asyncio.to_thread(self._open_version, target)
+            await self._flip(target, alias["current"], store, lexical)
+            print(f"↩️ Rolled back index to '{target}'")
+            return {"version": target, "previous": alias["current"]}
+
+    async def _flip(self, version: str, previous: Optional[str], store: "FAISS", lexical: BM25Index):
+        index_versions.write_alias(self.index_dir, version, previous)
+        self._alias_mtime = index_versions.alias_mtime(self.index_dir)
+        self._install(version, store, lexical)
+        index_versions.prune(self.index_dir, keep=(version, previous))
+        if not self.redis:
+            await self.init_redis()
+        await self.redis.set(self.redis_key, version)
+
+    def versions_info(self) -> dict:
+        return {**index_versions.read_alias(self.index_dir), "serving": self.index_version}
+
+    # -----------------------------
+    # Partitions
+    # -----------------------------
+    @staticmethod
+    def partitions_for_session(session_id: Optional[str] = None, tenant_id: Optional[str] = None) -> List[str]:
+        """Partitions a session is entitled to search: global, its tenant's and its own."""
+        names = [GLOBAL_PARTITION]
+        if tenant_id:
+            names.append(f"tenant-{tenant_id}")
+        if session_id:
+            names.append(f"session-{session_id}")
+        return names
+
+    @staticmethod
+    def _partition_dir(name: str) -> str:
+        # percent-encoding is injective: "session-a/b" and "session-a_b" get different folders
+        return os.path.join(PARTITIONS_DIR, quote(name, safe=""))
+
+    def _remember(self, name: str, pair: Tuple["FAISS", BM25Index]):
+        """Keep a partition loaded, unloading the least recently used ones over PARTITION_CACHE_SIZE."""
+        self.partitions[name] = pair
+        self.partitions.move_to_end(name)
+        while len(self.partitions) > PARTITION_CACHE_SIZE:
+            evicted, _ = self.partitions.popitem(last=False)
+            print(f"[RAG] Unloaded partition '{evicted}'")
+
+    async def get_partition(self, name: str) -> Optional[Tuple["FAISS", BM25Index]]:
+        """(FAISS, BM25) for a partition, loading it from disk on first use; None if it has no data."""
+        if name == GLOBAL_PARTITION:
+            return (self.vectorstore, self.lexical) if self.vectorstore else None
+        if name in self.partitions:
+            self.partitions.move_to_end(name)
+            return self.partitions[name]
+        async with self._partition_lock:
+            if name in self.partitions:
+                return self.partitions[name]
+            folder = self._partition_dir(name)
+            if not os.path.exists(os.path.join(folder, "faiss_index.faiss")):
+                return None
+
+            def _load():
+                store = self._load_store(folder)
+                return store, self._lexical_for(store)
+
+            pair = await asyncio.to_thread(_load)
+            self._remember(name, pair)
+            print(f"[RAG] Loaded partition '{name}'")
+            return pair
+
+    def unload_partition(self, name: str):
+        """Drop a partition from memory; it stays on disk and is loaded again on next use."""
+        if self.partitions.pop(name, None) is not None:
+            print(f"[RAG] Unloaded partition '{name}'")
+
+    async def delete_partition(self, name: str):
+        if name == GLOBAL_PARTITION:
+            return await self.delete_index()
+        self.partitions.pop(name, None)
+        shutil.rmtree(self._partition_dir(name), ignore_errors=True)
+        print(f"🧹 Partition '{name}' deleted")
+
+    async def expire_session_partitions(self, active_sessions: Iterable[str] = (),
+                                        ttl: float = SESSION_PARTITION_TTL):
+        """Delete session partitions not written for `ttl` seconds, except those of `active_sessions`."""
+        keep = set(self.partitions_for_session(sid)[-1] for sid in active_sessions)
+        cutoff = time.time() - ttl
+        for entry in os.listdir(PARTITIONS_DIR) if os.path.isdir(PARTITIONS_DIR) else []:
+            name = unquote(entry)
+            if not name.startswith("session-") or name in keep:
+                continue
+            folder = os.path.join(PARTITIONS_DIR, entry)
             try:
-                await self.load_index()
-            except FileNotFoundError:
-                print("⚠️ No existing FAISS index. Creating new index.")
-                self.vectorstore = None
+                written = max(os.stat(os.path.join(folder, f)).st_mtime for f in os.listdir(folder))
+            except (OSError, ValueError):
+                written = 0.0
+            if written < cutoff:
+                await self.delete_partition(name)
+
+    async def _build_partition(self, chunks, name: str):
+        existing = await self.get_partition(name)
+        folder = self._partition_dir(name)
+        if existing:
+            store, lexical = existing
+            _, ids = await asyncio.to_thread(self._index_chunks, store, chunks, folder)
+            for doc_id, chunk in zip(ids, chunks):
+                lexical.add(doc_id, chunk.page_content)
+        else:
+            store, _ = await asyncio.to_thread(self._index_chunks, None, chunks, folder)
+            lexical = await asyncio.to_thread(self._lexical_for, store)
+        await asyncio.to_thread(store.save_local, folder, "faiss_index")
+        self._remember(name, (store, lexical))
+        print(f"✅ Partition '{name}' updated and saved to '{folder}'")
+
+    async def build_index_from_folder(self, folder_path: str, incremental: bool = True,
+                                      partition: str = GLOBAL_PARTITION):
+        await self.wait_until_loaded()
+        if partition != GLOBAL_PARTITION:
+            chunks = await self._load_chunks(folder_path)
+            if chunks:
+                await self._build_partition(chunks, partition)
+            return
+
+        # an upload into the global index must not land in a version a running rebuild
+        # (here or in reindex.py) is replacing: wait for it, then write into what it flipped to
+        async with self._global_write():
+            await self._follow_alias()
+            if incremental:
+                try:
+                    await self.load_index()
+                except FileNotFoundError:
+                    print("⚠️ No existing FAISS index. Creating new index.")
+                    self.vectorstore = None
+            chunks = await self._load_chunks(folder_path)
+            if not chunks:
+                return
+            await self._add_to_global(chunks)
+
+    async def _add_to_global(self, chunks):
+        folder = self.global_dir
+        if self.vectorstore:
+            _, ids = await asyncio.to_thread(self._index_chunks, self.vectorstore, chunks, folder)
+            for doc_id, chunk in zip(ids, chunks):
+                self.lexical.add(doc_id, chunk.page_content)
+        else:
+            self.vectorstore, _ = await asyncio.to_thread(self._index_chunks, None, chunks, folder)
+            await asyncio.to_thread(self._rebuild_lexical)
 
+        self.retriever = self.vectorstore.as_retriever(search_kwargs={"k": 4})
+        self._build_chain()
+        self.state = "ready"
+        self.persist_index_local()
+        if not self.redis:
+            await self.init_redis()
+        await self.redis.set(self.redis_key, self.index_version)
+        print(f"✅ FAISS index updated and saved to '{folder}'")
+
+    async def _load_chunks(self, folder_path: str):
+        """Load every supported file in `folder_path` and split it into chunks ([] if nothing loaded)."""
+        from langchain_community.document_loaders import TextLoader, PyMuPDFLoader
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+        office = office_loaders()
         all_docs = []
         for filename in os.listdir(folder_path):
             path = os.path.join(folder_path, filename)
@@ -117,17 +465,17 @@ class RAGEngine:
                     loader = PyMuPDFLoader(path)
                 elif lower_name.endswith(".txt"):
                     loader = TextLoader(path, encoding="utf-8")
-                elif OFFICE_LOADER_AVAILABLE and lower_name.endswith((".doc", ".docx")):
-                    loader = UnstructuredWordDocumentLoader(path)
-                elif OFFICE_LOADER_AVAILABLE and lower_name.endswith((".xls", ".xlsx")):
+                elif office and lower_name.endswith((".doc", ".docx")):
+                    loader = office[0](path)
+                elif office and lower_name.endswith((".xls", ".xlsx")):
                     try:
-                        loader = UnstructuredExcelLoader(path)
+                        loader = office[1](path)
                     except Exception as e:
                         print(f"⚠️ Excel loader failed for {filename}: {e}")
                         continue
-                elif OFFICE_LOADER_AVAILABLE and lower_name.endswith((".ppt", ".pptx")):
+                elif office and lower_name.endswith((".ppt", ".pptx")):
                     try:
-                        loader = UnstructuredPowerPointLoader(path)
+                        loader = office[2](path)
                     except Exception as e:
                         print(f"⚠️ PowerPoint loader failed for {filename}: {e}")
                         continue
@@ -144,41 +492,79 @@ class RAGEngine:
 
         if not all_docs:
             print("⚠️ No new documents found. Skipping index update.")
-            return
+            return []
 
         splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
         chunks = await asyncio.to_thread(splitter.split_documents, all_docs)
         print(f"Processing {len(chunks)} new chunks...")
-
-        if self.vectorstore:
-            await asyncio.to_thread(self.vectorstore.add_documents, chunks)
-        else:
-            self.vectorstore = await asyncio.to_thread(FAISS.from_documents, chunks, self.embeddings)
-
-        self.retriever = self.vectorstore.as_retriever(search_kwargs={"k": 4})
-        self._build_chain()
-        self.persist_index_local()
-        if not self.redis:
-            await self.init_redis()
-        await self.redis.set(self.redis_key, "1")
-        print(f"✅ FAISS index updated and saved to '{FAISS_TEMP_DIR}'")
+        return chunks
 
     async def load_index(self):
-        faiss_file = os.path.join(FAISS_TEMP_DIR, "faiss_index.faiss")
+        """(Re)load the global index from disk; a no-op when it is already in memory (every write persists)."""
+        if self.vectorstore is not None:
+            return
+        folder = self.global_dir
+        faiss_file = os.path.join(folder, "faiss_index.faiss")
         if not os.path.exists(faiss_file):
             raise FileNotFoundError("FAISS index not found. Build it first.")
 
-        self.vectorstore = FAISS.load_local(
-            FAISS_TEMP_DIR,
-            self.embeddings,
-            index_name="faiss_index",
-            allow_dangerous_deserialization=True
-        )
+        self.vectorstore = await asyncio.to_thread(self._load_store, folder)
         self.retriever = self.vectorstore.as_retriever(search_kwargs={"k": 4})
         self._build_chain()
-        print(f"✅ FAISS index loaded successfully from '{FAISS_TEMP_DIR}'")
+        await asyncio.to_thread(self._rebuild_lexical)
+        print(f"✅ FAISS index loaded successfully from '{folder}'")
+
+    def _load_store(self, folder: str) -> "FAISS":
+        """Load a saved store and bring its index in line with VECTOR_QUANTIZATION."""
+        import quantized_index
+        from langchain_community.vectorstores import FAISS
+        store = FAISS.load_local(folder, self.embeddings, index_name="faiss_index",
+                                 allow_dangerous_deserialization=True)
+        if quantized_index.prepare(store, folder):
+            store.save_local(folder, "faiss_index")
+        return store
+
+    def _index_chunks(self, store: Optional["FAISS"], chunks, folder: str):
+        """
+        Embed `chunks` and add them to `store` (a new store when None); returns
+        (store, docstore ids). With quantization on, the index keeps compressed
+        codes and float32 copies are appended to the store's file in `folder`.
+        """
+        import quantized_index
+        from langchain_community.vectorstores import FAISS
+        texts = [c.page_content for c in chunks]
+        vectors = self.embeddings.embed_documents(texts)
+        pairs = list(zip(texts, vectors))
+        metadatas = [c.metadata for c in chunks]
+        if store is None:
+            store = FAISS.from_embeddings(pairs, self.embeddings, metadatas=metadatas)
+            quantized_index.attach(store, folder, vectors)
+            return store, list(store.index_to_docstore_id.values())
+
+        before = store.index.ntotal
+        quantized_index.append(store, vectors)
+        try:
+            return store, store.add_embeddings(pairs, metadatas=metadatas)
+        except Exception:
+            quantized_index.rollback(store, before)
+            raise
+
+    def _rebuild_lexical(self):
+        self.lexical = self._lexical_for(self.vectorstore)
+
+    @staticmethod
+    def _lexical_for(store: "FAISS") -> BM25Index:
+        lexical = BM25Index()
+        for doc_id in store.index_to_docstore_id.values():
+            doc = store.docstore.search(doc_id)
+            if hasattr(doc, "page_content"):
+                lexical.add(doc_id, doc.page_content)
+        return lexical
 
     def _build_chain(self):
+        from langchain_core.prompts import ChatPromptTemplate
+        from langchain_classic.chains.combine_documents import create_stuff_documents_chain
+        from langchain_classic.chains.retrieval import create_retrieval_chain
         system_prompt = (
             "You are a precise and helpful assistant. "
             "Answer the question using only the provided context. "
@@ -195,22 +581,27 @@ class RAGEngine:
     def persist_index_local(self):
         if not self.vectorstore:
             raise RuntimeError("No vectorstore to persist.")
-        self.vectorstore.save_local(FAISS_TEMP_DIR, index_name="faiss_index")
-        print(f"💾 FAISS index persisted to '{FAISS_TEMP_DIR}'")
+        self.vectorstore.save_local(self.global_dir, index_name="faiss_index")
+        print(f"💾 FAISS index persisted to '{self.global_dir}'")
 
     async def delete_index(self):
         if not self.redis:
             await self.init_redis()
-        await self.redis.delete(self.redis_key)
-        self.vectorstore = None
-        self.retriever = None
-        self.rag_chain = None
-        print(f"🧹 FAISS index deleted from Redis key '{self.redis_key}'")
-        if os.path.exists(FAISS_TEMP_DIR):
-            shutil.rmtree(FAISS_TEMP_DIR)
-            os.makedirs(FAISS_TEMP_DIR, exist_ok=True)
+        async with self._global_write():
+            await self.redis.delete(self.redis_key)
+            self.vectorstore = None
+            self.retriever = None
+            self.rag_chain = None
+            self.lexical = BM25Index()
+            self.state = "empty"
+            self.index_version = index_versions.LEGACY
+            self._alias_mtime = None
+            print(f"🧹 FAISS index deleted from Redis key '{self.redis_key}'")
+            # only the global index: partitions and shadow builds in progress are not ours to remove
+            await asyncio.to_thread(index_versions.drop, self.index_dir)
 
     async def query(self, question: str):
+        from langchain_core.messages import HumanMessage
         if self.retriever is None:
             return "I don't know.", 0.0
 
@@ -239,26 +630,81 @@ class RAGEngine:
             print("[RAG LLM Error]", e)
             return "I don't know.", confidence
 
-    async def similarity_search_with_score(self, query: str, k: int = 4):
+    async def similarity_search_with_score(self, query: str, k: int = 4, mode: Optional[str] = None,
+                                           partitions: Optional[List[str]] = None, with_similarity: bool = False):
         """
         Correct FAISS similarity search returning docs and normalized confidence scores.
+        mode: vector | lexical | hybrid | auto (default SEARCH_MODE). In auto mode a
+        decisive BM25 hit (exact identifiers, file names, codes) is returned without
+        paying for the query embedding; otherwise BM25 and FAISS are fused with RRF.
+        partitions: the partitions the caller is entitled to (default: global only).
+        The query is embedded once and each partition is searched on its own.
+        with_similarity: return (doc, confidence, similarity) triples. The confidence
+        is relative to the hits of this query (the worst one is 0); the similarity
+        is absolute (cosine for vector hits, calibrated BM25 for lexical-only ones),
+        so thresholds on it mean the same thing for every query.
         """
-        if not self.vectorstore:
+        await self._follow_alias()
+        stores = {}
+        for name in dict.fromkeys(partitions or [GLOBAL_PARTITION]):
+            pair = await self.get_partition(name)
+            if pair:
+                stores[name] = pair
+        if not stores:
             raise RuntimeError("Vectorstore not loaded. Build or load index first.")
 
-        def _search():
-            query_emb = np.array(self.embeddings.embed_query(query), dtype=np.float32).reshape(1, -1)
-            D, I = self.vectorstore.index.search(query_emb, k)  # distances & indices
-            docs = []
-            distances = D[0]
-            for idx in I[0]:
-                key = self.vectorstore.index_to_docstore_id[idx]
-                docs.append(self.vectorstore.docstore[key])
-            return docs, distances
-
-        docs, distances = await asyncio.to_thread(_search)
+        mode = (mode or SEARCH_MODE).lower()
+        hits = self._lexical_hits(query, k, stores) if mode != "vector" else []
+        if mode == "lexical" or (mode == "auto" and is_decisive(hits, LEXICAL_MIN_SCORE, LEXICAL_DECISIVE_RATIO)):
+            results = self._lexical_results(hits, stores)
+            return [(doc, score, score) for doc, score in results] if with_similarity else results
+
+        query_emb = await asyncio.to_thread(self.embeddings.embed_query, query)
+        # one batched search per partition; distances & indices (re-ranked if quantized)
+        rows = await asyncio.gather(*(self.query_batcher.search(store, query_emb, k)
+                                      for store, _ in stores.values()))
+        found = []  # (distance, (partition, docstore_id), doc)
+        for (name, (store, _)), (D, I) in zip(stores.items(), rows):
+            for dist, idx in zip(D, I):
+                if idx < 0:
+                    continue
+                key = store.index_to_docstore_id[idx]
+                found.append((float(dist), (name, key), store.docstore.search(key)))
+        # raw distances are comparable across partitions (same embedding model)
+        found = sorted(found, key=lambda f: f[0])[:k]
+        keys = [key for _, key, _ in found]
 
         # Normalize distances -> confidence (higher = more similar)
-        max_dist = max(distances) if distances.size > 0 else 1.0
-        results = [(doc, 1.0 - dist / max_dist) for doc, dist in zip(docs, distances)]
-        return results
+        max_dist = max((dist for dist, _, _ in found), default=1.0) or 1.0
+        # embeddings are unit length, so the squared L2 distance is 2 - 2 * cosine
+        results = [(doc, 1.0 - dist / max_dist, max(0.0, 1.0 - dist / 2)) for dist, _, doc in found]
+        if hits:
+            # hybrid: reciprocal-rank fusion, keeping the vector scores where we have them;
+            # a hit only BM25 found is never more confident than the weakest vector match
+            by_key = dict(zip(keys, results))
+            cap = min((score for _, score, _ in results), default=1.0)
+            sim_cap = min((sim for _, _, sim in results), default=1.0)
+            for key, (doc, score) in zip([key for key, _ in hits], self._lexical_results(hits, stores)):
+                by_key.setdefault(key, (doc, min(cap, score), min(sim_cap, score)))
+            fused = reciprocal_rank_fusion([keys, [key for key, _ in hits]], k=RRF_K)
+            results = [by_key[key] for key, _ in fused[:k]]
+        return results if with_similarity else [(doc, score) for doc, score, _ in results]
+
+    @staticmethod
+    def _faiss_search(store: "FAISS", queries: np.ndarray, k: int):
+        import quantized_index
+        return quantized_index.search(store, queries, k)
+
+    @staticmethod
+    def _lexical_hits(query: str, k: int, stores) -> list:
+        """BM25 hits across partitions as ((partition, docstore_id), score)."""
+        hits = []
+        for name, (_, lexical) in stores.items():
+            hits.extend(((name, doc_id), score) for doc_id, score in lexical.search(query, k))
+        return sorted(hits, key=lambda h: h[1], reverse=True)[:k]
+
+    @staticmethod
+    def _lexical_results(hits, stores):
+        """BM25 hits as (Document, score), the score being the calibrated lexical_confidence."""
+        return [(stores[name][0].docstore.search(doc_id), lexical_confidence(score, LEXICAL_CONFIDENCE_HALF))
+                for (name, doc_id), score in hits]
@@ -0,0 +1,36 @@
+# reindex.py
+"""
+Full rebuild of the global RAG index without downtime:
+
+    python reindex.py <folder>      build a new version, validate it, flip the alias
+    python reindex.py --rollback    flip back to the previous version
+
+Running servers keep answering from the old version while the new one
+builds, and switch on their next query once the alias is flipped. Their
+uploads into the global index wait on the shared write lock until the
+rebuild is done, then go into the new version.
+"""
+import argparse
+import asyncio
+import json
+
+from rag_engine import RAGEngine
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Blue/green rebuild of the global FAISS index")
+    parser.add_argument("folder", nargs="?", help="folder with the complete document set")
+    parser.add_argument("--rollback", action="store_true", help="restore the previous index version")
+    args = parser.parse_args()
+    if not args.rollback and not args.folder:
+        parser.error("folder is required unless --rollback is given")
+
+    rag = RAGEngine()
+    await rag.init_redis()
+    rag.start_warm_up()
+    result = await (rag.rollback_index() if args.rollback else rag.rebuild_index(args.folder))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
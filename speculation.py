@@ -0,0 +1,74 @@
+# speculation.py
+import time
+from typing import Any, Dict
+
+from config import SPECULATIVE_EXECUTION, SPECULATION_BUDGET_PER_MINUTE, SPECULATION_MIN_FALLBACK_RATE
+
+
+class SpeculationBudget:
+    """
+    Decides whether a turn may start its fallback generation speculatively,
+    in parallel with retrieval. A speculation that decide_node does not pick
+    is a wasted LLM call, so speculation is allowed only:
+      - while the recent fallback rate (EWMA of decide_node outcomes) is at
+        least SPECULATION_MIN_FALLBACK_RATE, i.e. it tends to pay off, and
+      - while the waste budget has room: each speculation takes one unit from
+        a bucket refilled at SPECULATION_BUDGET_PER_MINUTE, and gets it back
+        if its answer is used.
+    Without budget the turn simply runs sequentially.
+    """
+
+    def __init__(self, enabled: bool = SPECULATIVE_EXECUTION,
+                 per_minute: float = SPECULATION_BUDGET_PER_MINUTE,
+                 min_fallback_rate: float = SPECULATION_MIN_FALLBACK_RATE):
+        self.enabled = enabled
+        self.capacity = float(per_minute)
+        self.min_fallback_rate = min_fallback_rate
+        self.available = self.capacity
+        self.fallback_rate = 0.5  # no history yet: assume speculation might pay off
+        self._refilled = time.monotonic()
+        self.counts = {"used": 0, "wasted": 0, "skipped_budget": 0, "skipped_rate": 0}
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self._refilled) * self.capacity / 60.0)
+        self._refilled = now
+
+    def allow(self) -> bool:
+        """Take one unit of budget for a speculative call, if speculation is worthwhile right now."""
+        if not self.enabled:
+            return False
+        if self.fallback_rate < self.min_fallback_rate:
+            self.counts["skipped_rate"] += 1
+            return False
+        self._refill()
+        if self.available < 1:
+            self.counts["skipped_budget"] += 1
+            return False
+        self.available -= 1
+        return True
+
+    def settle(self, used: bool):
+        """Report whether the speculative answer was used; a used one costs nothing."""
+        if used:
+            self.available = min(self.capacity, self.available + 1)
+        self.counts["used" if used else "wasted"] += 1
+
+    def observe(self, use_rag: bool):
+        """Feed one decide_node outcome (speculative or not) into the fallback-rate estimate."""
+        self.fallback_rate = 0.9 * self.fallback_rate + 0.1 * (0.0 if use_rag else 1.0)
+
+    def stats(self) -> Dict[str, Any]:
+        self._refill()
+        speculated = self.counts["used"] + self.counts["wasted"]
+        return {
+            "enabled": self.enabled,
+            **self.counts,
+            "hit_ratio": round(self.counts["used"] / speculated, 3) if speculated else 0.0,
+            "fallback_rate": round(self.fallback_rate, 3),
+            "budget_available": round(self.available, 1),
+            "budget_per_minute": self.capacity,
+        }
+
+
+speculation = SpeculationBudget()
@@ -0,0 +1,11 @@
+# tests/conftest.py
+"""
+Tests for the root app. Each service has its own tests/ folder and its own
+`config` module, so run one folder per pytest invocation:
+    python -m pytest tests
+    python -m pytest rag-indexer/tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
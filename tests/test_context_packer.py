@@ -0,0 +1,71 @@
+# tests/test_context_packer.py
+import context_packer
+from context_packer import Passage, adaptive_cutoff, merge_overlapping, pack
+
+
+def _words(prefix, n):
+    return " ".join(f"{prefix}{i}" for i in range(n))
+
+
+def test_adaptive_cutoff_stops_under_the_floor_and_at_a_large_gap():
+    scores = [0.9, 0.85, 0.4, 0.38]
+    kept = adaptive_cutoff([Passage(f"p{s}", s) for s in scores], min_ratio=0.5, gap=0.3)
+    assert [p.score for p in kept] == [0.9, 0.85]
+
+    kept = adaptive_cutoff([Passage(f"p{s}", s) for s in [0.8, 0.78, 0.76]], min_ratio=0.5, gap=0.3)
+    assert len(kept) == 3
+
+
+def test_overlapping_neighbours_of_the_same_document_are_merged_once():
+    shared = "the refund window is thirty days from delivery"
+    first = Passage(f"{_words('a', 20)} {shared}", 0.9, group=("policy.pdf", 1), position=3, item="c3")
+    second = Passage(f"{shared} {_words('b', 20)}", 0.8, group=("policy.pdf", 1), position=4, item="c4")
+    other = Passage(f"{shared} {_words('b', 20)}", 0.7, group=("other.pdf", 1), position=4, item="o4")
+
+    merged = merge_overlapping([second, first, other], min_overlap=20)
+    assert len(merged) == 2
+    joined = next(p for p in merged if p.group == ("policy.pdf", 1))
+    assert joined.text.count(shared) == 1
+    assert joined.text.startswith("a0") and joined.text.endswith("b19")
+    assert (joined.first, joined.last) == (3, 4)
+    assert joined.items == ["c3", "c4"]
+    assert joined.score == 0.9
+
+
+def test_chunks_that_are_not_neighbours_stay_apart():
+    shared = "the refund window is thirty days from delivery"
+    a = Passage(f"x {shared}", 0.9, group="doc", position=1)
+    b = Passage(f"{shared} y", 0.9, group="doc", position=5)
+    assert len(merge_overlapping([a, b], min_overlap=20)) == 2
+
+
+def test_mmr_skips_near_duplicates_and_prefers_novel_passages():
+    base = _words("w", 40)
+    passages = [
+        Passage(base, 0.9, item="best"),
+        Passage(base + " extra", 0.89, item="copy"),
+        Passage(_words("z", 40), 0.7, item="novel"),
+    ]
+    _, selected, stats = pack(passages, budget=10_000, mmr_lambda=0.7, duplicate_similarity=0.85)
+    assert [p.items[0] for p in selected] == ["best", "novel"]
+    assert stats["duplicates"] == 1
+
+
+def test_budget_is_respected_and_the_best_passage_is_truncated_if_alone_too_long():
+    long_best = Passage(_words("l", 400), 0.9, item="long")
+    short = Passage(_words("s", 10), 0.85, item="short")
+    context, selected, stats = pack([long_best, short], budget=50)
+    assert selected[0].items == ["long"]
+    assert stats["tokens"] <= 50
+    assert context_packer.estimate_tokens(context) <= 50
+
+
+def test_passages_that_do_not_fit_are_skipped_for_shorter_ones():
+    passages = [
+        Passage(_words("a", 30), 0.9, item="a"),
+        Passage(_words("b", 200), 0.88, item="b"),
+        Passage(_words("c", 10), 0.87, item="c"),
+    ]
+    _, selected, stats = pack(passages, budget=200, mmr_lambda=1.0)
+    assert [p.items[0] for p in selected] == ["a", "c"]
+    assert stats["over_budget"] == 1
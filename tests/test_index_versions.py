@@ -0,0 +1,124 @@
+# tests/test_index_versions.py
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+faiss = pytest.importorskip("faiss")
+
+import index_versions
+from config import REINDEX_MIN_DOC_RATIO
+
+
+class Store:
+    """The parts of a langchain FAISS store that validate() reads."""
+
+    def __init__(self, vectors, ids=None):
+        self.index = faiss.IndexFlatL2(vectors.shape[1])
+        if len(vectors):
+            self.index.add(vectors)
+        self.index_to_docstore_id = ids if ids is not None else {i: f"doc-{i}" for i in range(len(vectors))}
+        self.exact_vectors = None
+
+
+class WrongRows:
+    """float32 rows that do not belong to the index (e.g. a mis-aligned exact file)."""
+
+    def rows(self, ids):
+        return np.random.default_rng(1).standard_normal((len(ids), 16)).astype(np.float32)
+
+
+def _vectors(n, dim=16):
+    return np.random.default_rng(0).standard_normal((n, dim)).astype(np.float32)
+
+
+def _version(root, name):
+    folder = index_versions.resolve(str(root), name)
+    os.makedirs(folder, exist_ok=True)
+    open(os.path.join(folder, "faiss_index.faiss"), "w").close()
+    return name
+
+
+def _flip(root, version, previous):
+    # what RAGEngine._flip does on disk
+    index_versions.write_alias(str(root), version, previous)
+    index_versions.prune(str(root), keep=(version, previous))
+
+
+def test_without_an_alias_the_legacy_index_is_current(tmp_path):
+    assert index_versions.read_alias(str(tmp_path)) == {"current": index_versions.LEGACY, "previous": None}
+    assert index_versions.alias_mtime(str(tmp_path)) is None
+
+
+def test_flip_and_rollback_keep_exactly_two_versions(tmp_path):
+    open(tmp_path / "faiss_index.faiss", "w").close()  # pre-versioning layout
+    v1 = _version(tmp_path, "versions/v1")
+    _flip(tmp_path, v1, index_versions.LEGACY)
+    assert (tmp_path / "faiss_index.faiss").exists()
+
+    v2 = _version(tmp_path, "versions/v2")
+    _flip(tmp_path, v2, v1)
+    alias = index_versions.read_alias(str(tmp_path))
+    assert (alias["current"], alias["previous"]) == (v2, v1)
+    assert not (tmp_path / "faiss_index.faiss").exists()  # legacy index pruned once two versions exist
+    assert not list(tmp_path.glob("CURRENT.tmp-*"))
+
+    # rollback swaps current and previous; nothing is deleted
+    _flip(tmp_path, alias["previous"], alias["current"])
+    alias = index_versions.read_alias(str(tmp_path))
+    assert (alias["current"], alias["previous"]) == (v1, v2)
+    assert sorted(os.listdir(tmp_path / "versions")) == ["v1", "v2"]
+
+    v3 = _version(tmp_path, "versions/v3")
+    _flip(tmp_path, v3, v1)
+    assert sorted(os.listdir(tmp_path / "versions")) == ["v1", "v3"]
+
+
+def test_new_version_names_are_unique_directories(tmp_path):
+    first = index_versions.new_version(str(tmp_path))
+    assert os.path.isdir(index_versions.resolve(str(tmp_path), first))
+    assert first.startswith(index_versions.VERSIONS_DIR + os.sep)
+    index_versions.discard(str(tmp_path), first)
+    assert not os.path.exists(index_versions.resolve(str(tmp_path), first))
+
+
+def test_drop_leaves_shadow_versions_and_partitions(tmp_path):
+    v1, v2 = _version(tmp_path, "versions/v1"), _version(tmp_path, "versions/v2")
+    _flip(tmp_path, v2, v1)
+    _version(tmp_path, "versions/v3")  # a rebuild still in progress
+    os.makedirs(tmp_path / "partitions" / "tenant-a")
+    index_versions.drop(str(tmp_path))
+    assert os.listdir(tmp_path / "versions") == ["v3"]
+    assert (tmp_path / "partitions" / "tenant-a").is_dir()
+    assert index_versions.read_alias(str(tmp_path))["current"] == index_versions.LEGACY
+
+
+def test_validate_accepts_a_healthy_index():
+    report = index_versions.validate(Store(_vectors(50)), current_count=60)
+    assert report == {"vectors": 50, "self_recall": 1.0}
+
+
+@pytest.mark.parametrize("store, current_count, reason", [
+    (Store(_vectors(0)), 0, "empty"),
+    (Store(_vectors(10), ids={i: str(i) for i in range(9)}), 0, "docstore ids"),
+    (Store(_vectors(10)), int(10 / REINDEX_MIN_DOC_RATIO) + 1, "under"),
+])
+def test_validate_rejects(store, current_count, reason):
+    with pytest.raises(ValueError, match=reason):
+        index_versions.validate(store, current_count)
+
+
+def test_validate_rejects_vectors_that_do_not_find_themselves():
+    store = Store(_vectors(50))
+    store.exact_vectors = WrongRows()
+    with pytest.raises(ValueError, match="self-retrieval recall"):
+        index_versions.validate(store)
+
+
+def test_write_lock_is_exclusive_until_released(tmp_path):
+    first, second = index_versions.WriteLock(str(tmp_path)), index_versions.WriteLock(str(tmp_path))
+    assert first.try_acquire()
+    assert not second.try_acquire()
+    first.release()
+    assert second.try_acquire()
+    second.release()
@@ -0,0 +1,107 @@
+# tests/test_quantized_index.py
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+faiss = pytest.importorskip("faiss")
+
+import quantized_index
+
+
+class Store:
+    """The two attributes of a langchain FAISS store that quantized_index touches."""
+
+    def __init__(self, index):
+        self.index = index
+        self.exact_vectors = None
+
+
+def _data(n=2000, dim=64, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, dim)).astype(np.float32)
+    queries = vectors[:100] + 0.05 * rng.standard_normal((min(n, 100), dim)).astype(np.float32)
+    return vectors, queries
+
+
+def _flat(vectors):
+    index = faiss.IndexFlatL2(vectors.shape[1])
+    index.add(vectors)
+    return index
+
+
+def _recall(found, truth):
+    return np.mean([len(set(a) & set(b)) / len(b) for a, b in zip(found, truth)])
+
+
+def test_prepare_migrates_a_flat_index_and_keeps_float32_on_disk(tmp_path, monkeypatch):
+    monkeypatch.setattr(quantized_index, "VECTOR_QUANTIZATION", "sq8")
+    vectors, _ = _data(n=500)
+    store = Store(_flat(vectors))
+    assert quantized_index.prepare(store, str(tmp_path)) is True
+    assert quantized_index.kind_of(store.index) == "sq8"
+    assert quantized_index.memory_bytes(store.index) * 4 == vectors.nbytes
+    assert os.path.getsize(tmp_path / quantized_index.EXACT_FILE) == vectors.nbytes
+    assert np.array_equal(store.exact_vectors.rows(np.array([0, 499])), vectors[[0, 499]])
+
+    # loaded again with the same setting: nothing to do
+    reloaded = Store(store.index)
+    assert quantized_index.prepare(reloaded, str(tmp_path)) is False
+    assert reloaded.exact_vectors is not None
+
+
+def test_prepare_re_encodes_when_the_setting_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(quantized_index, "VECTOR_QUANTIZATION", "sq8")
+    vectors, _ = _data(n=500)
+    store = Store(_flat(vectors))
+    quantized_index.prepare(store, str(tmp_path))
+
+    monkeypatch.setattr(quantized_index, "VECTOR_QUANTIZATION", "sq4")
+    assert quantized_index.prepare(store, str(tmp_path)) is True
+    assert quantized_index.kind_of(store.index) == "sq4"
+
+    monkeypatch.setattr(quantized_index, "VECTOR_QUANTIZATION", "none")
+    assert quantized_index.prepare(store, str(tmp_path)) is True
+    assert quantized_index.kind_of(store.index) == "none" and store.exact_vectors is None
+
+
+def test_small_stores_use_sq8_until_pq_can_be_trained():
+    vectors, _ = _data(n=100)
+    assert quantized_index.kind_of(quantized_index.build(vectors, "pq")) == "sq8"
+
+
+def test_prepare_drops_rows_of_an_unsaved_add(tmp_path, monkeypatch):
+    monkeypatch.setattr(quantized_index, "VECTOR_QUANTIZATION", "sq8")
+    vectors, _ = _data(n=300)
+    store = Store(_flat(vectors))
+    quantized_index.prepare(store, str(tmp_path))
+    quantized_index.append(store, vectors[:10])  # the add crashed before the index was saved
+    assert len(store.exact_vectors) == 310
+
+    assert quantized_index.prepare(Store(store.index), str(tmp_path)) is False
+    assert len(quantized_index.ExactVectors(str(tmp_path / quantized_index.EXACT_FILE), 64)) == 300
+
+
+def test_float32_rerank_restores_recall(tmp_path):
+    vectors, queries = _data()
+    _, truth = _flat(vectors).search(queries, 10)
+    store = Store(quantized_index.build(vectors, "sq4"))
+    store.exact_vectors = quantized_index.ExactVectors(str(tmp_path / quantized_index.EXACT_FILE), 64)
+    store.exact_vectors.write(vectors)
+
+    _, quantized = store.index.search(queries, 10)
+    D, reranked = quantized_index.search(store, queries, 10)
+    assert _recall(quantized, truth) < 0.9
+    assert _recall(reranked, truth) >= 0.99
+    exact = ((vectors[reranked[0]] - queries[0]) ** 2).sum(axis=1)
+    assert np.allclose(D[0], exact, rtol=1e-4)  # distances are the float32 ones
+
+
+def test_search_pads_rows_with_too_few_candidates(tmp_path):
+    vectors, queries = _data(n=3)
+    store = Store(quantized_index.build(vectors, "sq8"))
+    store.exact_vectors = quantized_index.ExactVectors(str(tmp_path / quantized_index.EXACT_FILE), 64)
+    store.exact_vectors.write(vectors)
+    D, I = quantized_index.search(store, queries[:1], 5)
+    assert sorted(I[0][:3]) == [0, 1, 2]
+    assert list(I[0][3:]) == [-1, -1] and np.isinf(D[0][3:]).all()
@@ -0,0 +1,89 @@
+# tests/test_query_batcher.py
+import asyncio
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from query_batcher import QueryBatcher
+
+
+def _fake_search(calls):
+    """search_fn whose distances encode (row, rank) so each caller can check it got its own row."""
+    def search(store, queries, k):
+        calls.append((store, queries.shape, k))
+        n = queries.shape[0]
+        D = np.arange(n)[:, None] * 100.0 + np.arange(k)[None, :]
+        I = np.tile(np.arange(k), (n, 1)) + queries[:, :1].astype(np.int64)
+        return D, I
+    return search
+
+
+def test_concurrent_queries_share_one_search_and_get_their_own_rows():
+    calls = []
+    batcher = QueryBatcher(_fake_search(calls), max_batch=8, max_wait_ms=20)
+
+    async def run():
+        return await asyncio.gather(*(batcher.search("store", np.full(4, i, dtype=np.float32), 3)
+                                      for i in range(5)))
+
+    results = asyncio.run(run())
+    assert calls == [("store", (5, 4), 3)]
+    for row, (D, I) in enumerate(results):
+        assert list(D) == [row * 100.0, row * 100.0 + 1, row * 100.0 + 2]
+        assert list(I) == [row, row + 1, row + 2]
+    assert batcher.stats()["largest_batch"] == 5
+
+
+def test_different_k_share_a_batch_searched_with_the_largest_k():
+    calls = []
+    batcher = QueryBatcher(_fake_search(calls), max_batch=8, max_wait_ms=20)
+
+    async def run():
+        return await asyncio.gather(batcher.search("store", np.zeros(4), 2),
+                                    batcher.search("store", np.ones(4), 5))
+
+    (D2, I2), (D5, I5) = asyncio.run(run())
+    assert [k for _, _, k in calls] == [5]
+    assert len(D2) == len(I2) == 2
+    assert len(D5) == len(I5) == 5
+    assert list(I5) == [1, 2, 3, 4, 5]
+
+
+def test_full_batch_is_sent_without_waiting_and_stores_are_not_mixed():
+    calls = []
+    batcher = QueryBatcher(_fake_search(calls), max_batch=2, max_wait_ms=10_000)
+
+    async def run():
+        return await asyncio.wait_for(asyncio.gather(
+            batcher.search("a", np.zeros(4), 1), batcher.search("b", np.zeros(4), 1),
+            batcher.search("a", np.zeros(4), 1), batcher.search("b", np.zeros(4), 1),
+        ), timeout=2)
+
+    asyncio.run(run())
+    assert sorted((store, shape[0]) for store, shape, _ in calls) == [("a", 2), ("b", 2)]
+
+
+def test_a_failed_search_fails_every_caller_in_the_batch():
+    def broken(store, queries, k):
+        raise RuntimeError("index gone")
+
+    batcher = QueryBatcher(broken, max_batch=8, max_wait_ms=5)
+
+    async def run():
+        return await asyncio.gather(*(batcher.search("store", np.zeros(4), 1) for _ in range(3)),
+                                    return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_max_batch_one_searches_each_query_on_its_own():
+    calls = []
+    batcher = QueryBatcher(_fake_search(calls), max_batch=1)
+
+    async def run():
+        return await asyncio.gather(*(batcher.search("store", np.zeros(4), 2) for _ in range(3)))
+
+    asyncio.run(run())
+    assert [shape for _, shape, _ in calls] == [(1, 4)] * 3
@@ -0,0 +1,66 @@
+# tests/test_query_router.py
+import pytest
+
+from query_router import QueryRouter, ROUTE_CHAT, ROUTE_RETRIEVE
+
+
+@pytest.mark.parametrize("message, last_route, expected", [
+    ("", None, (ROUTE_CHAT, "empty")),
+    ("   ?! ", None, (ROUTE_CHAT, "empty")),
+    ("hi", None, (ROUTE_CHAT, "smalltalk")),
+    ("Thanks, that helps a lot!", None, (ROUTE_CHAT, "smalltalk")),
+    ("ok cool", ROUTE_RETRIEVE, (ROUTE_CHAT, "smalltalk")),
+    ("good morning", None, (ROUTE_CHAT, "smalltalk")),
+    ("yes", None, (ROUTE_CHAT, "smalltalk")),  # smalltalk without an anchor word, no retrieval to follow up
+    ("What is the refund policy?", None, (ROUTE_RETRIEVE, "question_word")),
+    ("hi, can you summarize the uploaded file", None, (ROUTE_RETRIEVE, "question_word")),
+    ("status of INV-2024-001", None, (ROUTE_RETRIEVE, "identifier")),
+    ("open report_q3.pdf", None, (ROUTE_RETRIEVE, "identifier")),
+    ("thanks for order 12345", None, (ROUTE_RETRIEVE, "identifier")),
+    ("tell me more", ROUTE_RETRIEVE, (ROUTE_RETRIEVE, "question_word")),
+    ("and the other one?", ROUTE_RETRIEVE, (ROUTE_RETRIEVE, "followup")),
+    ("and the other one?", ROUTE_CHAT, (ROUTE_RETRIEVE, "default")),
+    ("that too", ROUTE_RETRIEVE, (ROUTE_RETRIEVE, "followup")),
+    ("that too", ROUTE_CHAT, (ROUTE_CHAT, "smalltalk")),
+    ("the shipping times for europe", None, (ROUTE_RETRIEVE, "default")),
+])
+def test_classification_table(message, last_route, expected):
+    assert QueryRouter().classify(message, last_route) == expected
+
+
+def test_long_conversational_turn_retrieves():
+    message = "hey " + " ".join(["so"] * 10)
+    assert QueryRouter(smalltalk_max_words=8).classify(message) == (ROUTE_RETRIEVE, "default")
+
+
+def test_route_uses_the_sessions_previous_route():
+    router = QueryRouter()
+    assert router.route("s1", "what is the warranty?")[0] == ROUTE_RETRIEVE
+    assert router.route("s1", "that too") == (ROUTE_RETRIEVE, "followup")
+    assert router.route("s2", "that too") == (ROUTE_CHAT, "smalltalk")
+    router.forget("s1")
+    assert router.route("s1", "that too") == (ROUTE_CHAT, "smalltalk")
+
+
+def test_disabled_router_always_retrieves():
+    assert QueryRouter(enabled=False).route("s", "hi") == (ROUTE_RETRIEVE, "disabled")
+
+
+def test_session_memory_is_bounded():
+    router = QueryRouter(max_sessions=2)
+    for sid in ("a", "b", "c"):
+        router.route(sid, "what is this?")
+    assert router.route("a", "that too") == (ROUTE_CHAT, "smalltalk")  # "a" was evicted
+    assert router.route("c", "that too") == (ROUTE_RETRIEVE, "followup")
+
+
+def test_stats_count_routes_and_saved_work():
+    router = QueryRouter()
+    for message in ("hi", "thanks", "what is the refund policy?"):
+        router.route("s", message)
+    router.stats.record_retrieval(llm_calls=2)
+    snapshot = router.stats.snapshot()
+    assert snapshot["routes"] == {ROUTE_CHAT: 2, ROUTE_RETRIEVE: 1}
+    assert snapshot["chat_ratio"] == pytest.approx(0.667)
+    assert snapshot["searches_saved"] == 2
+    assert snapshot["llm_calls_saved_estimate"] == 4.0
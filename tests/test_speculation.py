@@ -0,0 +1,141 @@
+# tests/test_speculation.py
+import asyncio
+
+import pytest
+
+import langgraph_nodes
+import speculation as speculation_module
+from langgraph_nodes import LangGraphNodes
+from query_router import ROUTE_CHAT, ROUTE_RETRIEVE
+from speculation import SpeculationBudget
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(speculation_module.time, "monotonic", clock)
+    return clock
+
+
+def test_disabled_budget_never_speculates(clock):
+    budget = SpeculationBudget(enabled=False, per_minute=10)
+    assert not budget.allow()
+    assert budget.counts == {"used": 0, "wasted": 0, "skipped_budget": 0, "skipped_rate": 0}
+
+
+def test_wasted_speculations_spend_the_budget_until_it_refills(clock):
+    budget = SpeculationBudget(enabled=True, per_minute=2, min_fallback_rate=0.2)
+    for _ in range(2):
+        assert budget.allow()
+        budget.settle(used=False)
+    assert not budget.allow()
+    assert budget.counts["skipped_budget"] == 1
+
+    clock.now += 30  # half a minute refills one unit
+    assert budget.allow()
+    assert not budget.allow()
+    assert budget.stats()["wasted"] == 2
+
+
+def test_used_speculations_cost_nothing(clock):
+    budget = SpeculationBudget(enabled=True, per_minute=1, min_fallback_rate=0.2)
+    for _ in range(5):
+        assert budget.allow()
+        budget.settle(used=True)
+    assert budget.stats()["hit_ratio"] == 1.0
+
+
+def test_speculation_stops_while_turns_mostly_use_rag(clock):
+    budget = SpeculationBudget(enabled=True, per_minute=100, min_fallback_rate=0.2)
+    for _ in range(20):
+        budget.observe(use_rag=True)
+    assert not budget.allow()
+    assert budget.counts["skipped_rate"] == 1
+    for _ in range(10):
+        budget.observe(use_rag=False)
+    assert budget.allow()
+
+
+class LLM:
+    """Answers by branch; the fallback branch can be made to hang so cancellation shows."""
+
+    def __init__(self, fallback_delay=0.0):
+        self.fallback_delay = fallback_delay
+        self.prompts = []
+        self.fallback_cancelled = False
+
+    async def ainvoke(self, messages):
+        prompt = messages[0].content
+        self.prompts.append(prompt)
+        if prompt.startswith("RAG Summary"):
+            return type("Resp", (), {"content": "rag answer"})()
+        try:
+            await asyncio.sleep(self.fallback_delay)
+        except asyncio.CancelledError:
+            self.fallback_cancelled = True
+            raise
+        return type("Resp", (), {"content": "fallback answer"})()
+
+
+class DB:
+    async def get_history(self, sid, limit=100):
+        return []
+
+
+@pytest.fixture
+def budget(monkeypatch, clock):
+    budget = SpeculationBudget(enabled=True, per_minute=10, min_fallback_rate=0.2)
+    monkeypatch.setattr(langgraph_nodes, "speculation", budget)
+    return budget
+
+
+def _retrieval(monkeypatch, answer, confidence):
+    async def search(state):
+        await asyncio.sleep(0)  # lets the speculative branch start, as a real search would
+        state.update({"rag_answer": answer, "confidence": confidence, "summary": ""})
+
+    async def summarize(state, ws=None):
+        state["summary"] = "summary"
+
+    monkeypatch.setattr(LangGraphNodes, "_search", staticmethod(search))
+    monkeypatch.setattr(LangGraphNodes, "_summarize", staticmethod(summarize))
+
+
+def _turn(llm):
+    return {"llm": llm, "db": DB(), "session_id": "s1", "user_message": "hi", "route": ROUTE_RETRIEVE}
+
+
+def test_fallback_wins_when_retrieval_is_not_confident(monkeypatch, budget):
+    _retrieval(monkeypatch, "", 0.0)
+    llm = LLM()
+    state = _turn(llm)
+    assert LangGraphNodes._after_route(state) == "speculative"
+    state = asyncio.run(LangGraphNodes.speculative_node(state))
+    assert state["llm_output"] == "fallback answer" and not state["use_rag"]
+    assert len(llm.prompts) == 1  # no summarisation, no second generation
+    assert budget.counts["used"] == 1 and budget.available == 10
+
+
+def test_rag_wins_and_cancels_the_fallback(monkeypatch, budget):
+    _retrieval(monkeypatch, "context", 0.9)
+    llm = LLM(fallback_delay=10)
+    state = _turn(llm)
+    assert LangGraphNodes._after_route(state) == "speculative"
+    state = asyncio.run(LangGraphNodes.speculative_node(state))
+    assert state["llm_output"] == "rag answer" and state["use_rag"]
+    assert llm.fallback_cancelled
+    assert budget.counts["wasted"] == 1 and budget.available == 9
+
+
+def test_turns_run_sequentially_without_budget(budget):
+    budget.available = 0
+    assert LangGraphNodes._after_route({"route": ROUTE_RETRIEVE}) == "retrieve"
+    assert LangGraphNodes._after_route({"route": ROUTE_CHAT}) == "fallback"
@@ -10,6 +10,7 @@ from typing import Dict, Optional
 from fastapi import WebSocket, WebSocketDisconnect
 from langgraph_nodes import LangGraphNodes
 from utils import RWLock, safe_ws_send
+from query_router import router
 
 # ============================================================
 # WebSocket manager for multi-user chat sessions
@@ -18,6 +19,7 @@ class WebSocketManager:
     IDLE_TIMEOUT = timedelta(minutes=3)
     WARNING_SECONDS = 30
     WARNING_INTERVAL = 5
+    PARTITION_SWEEP_INTERVAL = timedelta(minutes=10)
 
     def __init__(self, db, rag, llm=None):
         """
@@ -27,12 +29,17 @@ class WebSocketManager:
         """
         self.db = db
         self.rag = rag
-        self.llm = llm or rag.llm
+        self._llm = llm
         self.active_connections: Dict[str, WebSocket] = {}
         self.last_active: Dict[str, datetime] = {}
         self._last_warning_sent: Dict[str, int] = {}
         self._rag_lock = RWLock()
 
+    @property
+    def llm(self):
+        # rag.llm is built lazily (by the RAG warm-up or the first turn), not at startup
+        return self._llm or self.rag.llm
+
     # ============================================================
     # Setup FastAPI WebSocket route
     # ============================================================
@@ -84,7 +91,8 @@ class WebSocketManager:
             await self._rag_lock.acquire_write()
             try:
                 if hasattr(self.rag, "build_index_from_folder"):
-                    await self.rag.build_index_from_folder(temp_dir)
+                    # uploads are private to the session that sent them
+                    await self.rag.build_index_from_folder(temp_dir, partition=f"session-{session_id}")
                     await safe_ws_send(ws, f"✅ Knowledge base updated with {filename}")
             finally:
                 self._rag_lock.release_write()
@@ -140,8 +148,16 @@ class WebSocketManager:
     # Monitor idle sessions
     # ============================================================
     async def monitor_idle_sessions(self):
+        last_sweep = datetime.now(timezone.utc)
         while True:
             now = datetime.now(timezone.utc)
+            if now - last_sweep >= self.PARTITION_SWEEP_INTERVAL and hasattr(self.rag, "expire_session_partitions"):
+                last_sweep = now
+                try:
+                    # uploads of sessions gone for SESSION_PARTITION_TTL
+                    await self.rag.expire_session_partitions(list(self.active_connections))
+                except Exception as e:
+                    print("[Partition Sweep Error]", e)
             for sid, ws in list(self.active_connections.items()):
                 idle = now - self.last_active.get(sid, now)
                 secs = int((self.IDLE_TIMEOUT - idle).total_seconds())
@@ -166,3 +182,7 @@ class WebSocketManager:
         self.active_connections.pop(session_id, None)
         self.last_active.pop(session_id, None)
         self._last_warning_sent.pop(session_id, None)
+        router.forget(session_id)
+        if hasattr(self.rag, "unload_partition"):
+            # the session's uploads stay on disk for a reconnect, but not in memory
+            self.rag.unload_partition(f"session-{session_id}")